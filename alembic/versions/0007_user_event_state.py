@@ -0,0 +1,59 @@
+"""Materialized latest event per user and event name"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = "0007_user_event_state"
+down_revision = "0006_db_integrity_indexes"
+branch_labels = None
+depends_on = None
+
+
+_BACKFILL = """
+INSERT INTO user_event_state (user_id, name, last_ts, last_meta)
+SELECT user_id, name, ts, meta
+FROM (
+    SELECT
+        user_id,
+        name,
+        ts,
+        meta,
+        ROW_NUMBER() OVER (PARTITION BY user_id, name ORDER BY ts DESC, id DESC) AS rank
+    FROM events
+    WHERE user_id IS NOT NULL
+) AS ranked
+WHERE rank = 1
+"""
+
+
+def _json_type(bind) -> sa.types.TypeEngine:
+    if bind.dialect.name == "postgresql":
+        return postgresql.JSONB()
+    return sa.JSON()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.create_table(
+        "user_event_state",
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("last_ts", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_meta", _json_type(bind), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "name"),
+    )
+    op.create_index(
+        "ix_user_event_state_name_ts", "user_event_state", ["name", "last_ts"], unique=False
+    )
+    # Events written by older releases after this point are picked up by
+    # ``python -m tools.backfill_user_event_state``.
+    op.execute(_BACKFILL)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_event_state_name_ts", table_name="user_event_state")
+    op.drop_table("user_event_state")
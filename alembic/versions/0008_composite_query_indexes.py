@@ -0,0 +1,67 @@
+"""Composite indexes for hot repository queries"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0008_composite_query_indexes"
+down_revision = "0007_user_event_state"
+branch_labels = None
+depends_on = None
+
+
+_PENDING = sa.text("sent_at IS NULL")
+
+# (name, table, columns, extra keyword arguments)
+_INDEXES = [
+    ("ix_events_user_name_ts", "events", ["user_id", "name", "ts"], {}),
+    ("ix_events_user_ts", "events", ["user_id", "ts"], {}),
+    ("ix_events_name_ts", "events", ["name", "ts"], {}),
+    ("ix_users_created", "users", ["created"], {}),
+    ("ix_subscriptions_until", "subscriptions", ["until"], {}),
+    ("ix_ref_user_joined", "referrals", ["user_id", "joined_at"], {}),
+    ("ix_track_events_user_ts", "track_events", ["user_id", "ts"], {}),
+    ("ix_retention_journeys_user", "retention_journeys", ["user_id", "journey"], {}),
+    (
+        "ix_retention_journeys_pending",
+        "retention_journeys",
+        ["scheduled_at"],
+        {"sqlite_where": _PENDING, "postgresql_where": _PENDING},
+    ),
+]
+
+# Leading prefixes of the new composite indexes on the write-heavy events table.
+_SUPERSEDED = [
+    ("ix_events_user", "events", ["user_id"]),
+    ("ix_events_name", "events", ["name"]),
+]
+
+
+def _get_index_names(inspector: sa.Inspector, table: str) -> set[str]:
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    for name, table, columns, kwargs in _INDEXES:
+        if name not in _get_index_names(inspector, table):
+            op.create_index(name, table, columns, unique=False, **kwargs)
+
+    for name, table, _columns in _SUPERSEDED:
+        if name in _get_index_names(inspector, table):
+            op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    for name, table, columns in _SUPERSEDED:
+        if name not in _get_index_names(inspector, table):
+            op.create_index(name, table, columns, unique=False)
+
+    for name, table, _columns, _kwargs in reversed(_INDEXES):
+        if name in _get_index_names(inspector, table):
+            op.drop_index(name, table_name=table)
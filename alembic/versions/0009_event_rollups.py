@@ -0,0 +1,44 @@
+"""Daily event rollups and their high-water mark"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0009_event_rollups"
+down_revision = "0008_composite_query_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "event_daily_counts",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("dimension", sa.String(length=32), nullable=False, server_default=""),
+        sa.Column("value", sa.String(length=128), nullable=False, server_default=""),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("name", "day", "dimension", "value"),
+    )
+    op.create_index("ix_event_daily_counts_day", "event_daily_counts", ["day"], unique=False)
+    # The rollup job starts from event id 0 and folds the existing history in
+    # batches, so no backfill is needed here.
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("name", sa.String(length=32), primary_key=True),
+        sa.Column("last_event_id", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rollup_watermarks")
+    op.drop_index("ix_event_daily_counts_day", table_name="event_daily_counts")
+    op.drop_table("event_daily_counts")
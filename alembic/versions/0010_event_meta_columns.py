@@ -0,0 +1,58 @@
+"""Generated columns for hot event meta keys"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0010_event_meta_columns"
+down_revision = "0009_event_rollups"
+branch_labels = None
+depends_on = None
+
+
+# Mirrors ``app.db.models.EVENT_META_COLUMNS``; virtual on SQLite, stored on
+# PostgreSQL (which rewrites the table once while adding them).
+_COLUMNS = {key: f"substr(meta ->> '{key}', 1, 128)" for key in ("quiz", "calc", "source")}
+
+
+def _get_index_names(inspector: sa.Inspector) -> set[str]:
+    return {index["name"] for index in inspector.get_indexes("events")}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing = {column["name"] for column in inspector.get_columns("events")}
+    for key, expression in _COLUMNS.items():
+        if key not in existing:
+            op.add_column(
+                "events",
+                sa.Column(key, sa.String(length=128), sa.Computed(expression), nullable=True),
+            )
+
+    indexes = _get_index_names(inspector)
+    if "ix_events_name_ts_meta" not in indexes:
+        op.create_index(
+            "ix_events_name_ts_meta",
+            "events",
+            ["name", "ts", "quiz", "calc", "source"],
+            unique=False,
+        )
+    # The new index starts with (name, ts), so the old one is redundant.
+    if "ix_events_name_ts" in indexes:
+        op.drop_index("ix_events_name_ts", table_name="events")
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    indexes = _get_index_names(inspector)
+    if "ix_events_name_ts" not in indexes:
+        op.create_index("ix_events_name_ts", "events", ["name", "ts"], unique=False)
+    if "ix_events_name_ts_meta" in indexes:
+        op.drop_index("ix_events_name_ts_meta", table_name="events")
+
+    existing = {column["name"] for column in inspector.get_columns("events")}
+    for key in reversed(list(_COLUMNS)):
+        if key in existing:
+            op.drop_column("events", key)
@@ -0,0 +1,107 @@
+"""Materialized UTM key on profiles and incremental funnel members"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0011_utm_funnel"
+down_revision = "0010_event_meta_columns"
+branch_labels = None
+depends_on = None
+
+
+# Mirrors ``app.growth.attribution.encode_utm_key``.
+_UTM_KEYS = ("utm_source", "utm_medium", "utm_campaign", "utm_content")
+_SEPARATOR = "\x1f"
+_BATCH = 1000
+
+
+def _utm_key(utm: object) -> str | None:
+    if not isinstance(utm, dict):
+        return None
+    values = []
+    for key in _UTM_KEYS:
+        raw = utm.get(key)
+        cleaned = "" if raw is None else str(raw).strip().replace(_SEPARATOR, " ")
+        values.append(cleaned[:128] if cleaned else "—")
+    if all(value == "—" for value in values):
+        return None
+    return _SEPARATOR.join(values)
+
+
+def _backfill(bind: sa.Connection) -> None:
+    profiles = sa.table(
+        "user_profiles",
+        sa.column("user_id", sa.BigInteger()),
+        sa.column("utm", sa.JSON()),
+        sa.column("utm_key", sa.String()),
+    )
+    after = None
+    while True:
+        stmt = sa.select(profiles.c.user_id, profiles.c.utm).where(profiles.c.utm.is_not(None))
+        if after is not None:
+            stmt = stmt.where(profiles.c.user_id > after)
+        rows = bind.execute(stmt.order_by(profiles.c.user_id).limit(_BATCH)).all()
+        if not rows:
+            return
+        updates = [
+            {"uid": user_id, "key": key}
+            for user_id, utm in rows
+            if (key := _utm_key(utm)) is not None
+        ]
+        if updates:
+            bind.execute(
+                profiles.update()
+                .where(profiles.c.user_id == sa.bindparam("uid"))
+                .values(utm_key=sa.bindparam("key")),
+                updates,
+            )
+        after = rows[-1][0]
+
+
+def upgrade() -> None:
+    op.add_column("user_profiles", sa.Column("utm_key", sa.String(length=520), nullable=True))
+    op.add_column(
+        "user_profiles", sa.Column("utm_updated_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    # Backfilled profiles keep a NULL ``utm_updated_at``: the first funnel
+    # refresh covers every attributed profile anyway.
+    _backfill(op.get_bind())
+    op.create_index("ix_user_profiles_utm_key", "user_profiles", ["utm_key"], unique=False)
+    op.create_index(
+        "ix_user_profiles_utm_updated_at", "user_profiles", ["utm_updated_at"], unique=False
+    )
+    op.create_index("ix_subscriptions_started_at", "subscriptions", ["started_at"], unique=False)
+
+    op.create_table(
+        "utm_funnel_members",
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("utm_key", sa.String(length=520), nullable=False),
+        sa.Column("quiz_started", sa.Boolean(), nullable=False),
+        sa.Column("recommended", sa.Boolean(), nullable=False),
+        sa.Column("premium", sa.Boolean(), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_index(
+        "ix_utm_funnel_members_key",
+        "utm_funnel_members",
+        ["utm_key", "quiz_started", "recommended", "premium"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_utm_funnel_members_refreshed", "utm_funnel_members", ["refreshed_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_utm_funnel_members_refreshed", table_name="utm_funnel_members")
+    op.drop_index("ix_utm_funnel_members_key", table_name="utm_funnel_members")
+    op.drop_table("utm_funnel_members")
+    op.drop_index("ix_subscriptions_started_at", table_name="subscriptions")
+    op.drop_index("ix_user_profiles_utm_updated_at", table_name="user_profiles")
+    op.drop_index("ix_user_profiles_utm_key", table_name="user_profiles")
+    op.drop_column("user_profiles", "utm_updated_at")
+    op.drop_column("user_profiles", "utm_key")
@@ -0,0 +1,40 @@
+"""Per-recipient progress for resumable scheduler broadcasts"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0012_broadcast_recipients"
+down_revision = "0011_utm_funnel"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "broadcast_recipients",
+        sa.Column("run_key", sa.String(length=96), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("attempts", sa.SmallInteger(), nullable=False),
+        sa.Column("error", sa.String(length=255), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("run_key", "user_id"),
+    )
+    op.create_index(
+        "ix_broadcast_recipients_run_status",
+        "broadcast_recipients",
+        ["run_key", "status", "user_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_broadcast_recipients_updated", "broadcast_recipients", ["updated_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_broadcast_recipients_updated", table_name="broadcast_recipients")
+    op.drop_index("ix_broadcast_recipients_run_status", table_name="broadcast_recipients")
+    op.drop_table("broadcast_recipients")
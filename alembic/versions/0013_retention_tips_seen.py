@@ -0,0 +1,20 @@
+"""No-repeat bitmap of recently sent daily tips"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0013_retention_tips_seen"
+down_revision = "0012_broadcast_recipients"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("retention_settings", sa.Column("tips_seen", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("retention_settings", "tips_seen")
@@ -0,0 +1,320 @@
+"""Rate-limited, resumable broadcasts for scheduler jobs.
+
+A job hands :meth:`Broadcaster.run` a run key, its recipients and a ``send``
+coroutine.  Recipients are recorded in ``broadcast_recipients`` first, so a
+run restarted under the same key only sends to those still pending.  Sends
+then go out concurrently under one process-wide token bucket (Telegram allows
+about 30 messages per second per bot) with at most one message per chat per
+``per_chat_interval``.  ``RetryAfter`` and transient errors put just that
+recipient back in the queue after the delay; blocked users and bad chats are
+final.  Outcomes are written back in batches, so a crash repeats at most the
+last unflushed batch.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncContextManager, Awaitable, Callable, Iterable
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.session import session_scope
+from app.metrics import BROADCAST_MESSAGES, BROADCAST_RATE
+from app.repo import broadcasts as broadcasts_repo
+from app.utils.expiring import ExpiringDict
+
+SendFunc = Callable[[int], Awaitable[Any]]
+SentHook = Callable[[int], Awaitable[None] | None]
+SessionFactory = Callable[[], AsyncContextManager[AsyncSession]]
+
+_log = logging.getLogger("broadcast")
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity if capacity is not None else rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            await self._sleep((1.0 - self._tokens) / self.rate)
+
+
+@dataclass(slots=True)
+class BroadcastReport:
+    run_key: str
+    total: int = 0
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+    retried: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    sent_ids: list[int] = field(default_factory=list)
+
+    @property
+    def rate(self) -> float:
+        """Delivered messages per second over the run."""
+
+        return self.sent / self.seconds if self.seconds > 0 else 0.0
+
+
+class _Run:
+    """State of one :meth:`Broadcaster.run` call."""
+
+    def __init__(self, report: BroadcastReport, pending: list[int], workers: int) -> None:
+        self.report = report
+        self.queue: asyncio.Queue[int | None] = asyncio.Queue()
+        for user_id in pending:
+            self.queue.put_nowait(user_id)
+        self.remaining = len(pending)
+        self.workers = workers
+        self.attempts: dict[int, int] = {}
+        self.outcomes: list[tuple[int, str, int, str | None]] = []
+        self.timers: set[asyncio.TimerHandle] = set()
+        if not pending:
+            self._stop_workers()
+
+    def retry_later(self, user_id: int, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        handle: asyncio.TimerHandle
+
+        def _requeue() -> None:
+            self.timers.discard(handle)
+            self.queue.put_nowait(user_id)
+
+        handle = loop.call_later(max(0.0, delay), _requeue)
+        self.timers.add(handle)
+
+    def finish(self, user_id: int, status: str, error: str | None) -> None:
+        self.outcomes.append((user_id, status, self.attempts.get(user_id, 0), error))
+        self.remaining -= 1
+        if self.remaining == 0:
+            self._stop_workers()
+
+    def _stop_workers(self) -> None:
+        for _ in range(self.workers):
+            self.queue.put_nowait(None)
+
+    def cancel_timers(self) -> None:
+        for handle in self.timers:
+            handle.cancel()
+        self.timers.clear()
+
+
+class Broadcaster:
+    """Send one message per recipient concurrently under shared rate limits."""
+
+    def __init__(
+        self,
+        *,
+        rate: float = settings.BROADCAST_RATE,
+        concurrency: int = settings.BROADCAST_CONCURRENCY,
+        per_chat_interval: float = settings.BROADCAST_PER_CHAT_INTERVAL,
+        max_attempts: int = settings.BROADCAST_MAX_ATTEMPTS,
+        flush_every: int = 200,
+        backoff: float = 1.0,
+        keep_days: int = settings.BROADCAST_KEEP_DAYS,
+        session_factory: SessionFactory = session_scope,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.bucket = TokenBucket(rate, clock=clock, sleep=sleep)
+        self._concurrency = max(1, int(concurrency))
+        self._per_chat_interval = max(0.0, float(per_chat_interval))
+        self._max_attempts = max(1, int(max_attempts))
+        self._flush_every = max(1, int(flush_every))
+        self._backoff = max(0.0, float(backoff))
+        self._keep_days = keep_days
+        self._session_factory = session_factory
+        self._clock = clock
+        # Earliest next send per chat, shared by every run in the process.
+        self._chat_ready: ExpiringDict[int, float] = ExpiringDict(
+            ttl=max(self._per_chat_interval, 1.0), maxsize=100_000
+        )
+
+    async def run(
+        self,
+        run_key: str,
+        user_ids: Iterable[int],
+        send: SendFunc,
+        *,
+        job: str | None = None,
+        on_sent: SentHook | None = None,
+    ) -> BroadcastReport:
+        """Deliver ``send(user_id)`` to every recipient of ``run_key`` not yet done.
+
+        ``on_sent`` runs right after each successful send, so cheap follow-up
+        work such as emitting an event is not lost when the run is interrupted.
+        """
+
+        job = job or run_key.partition(":")[0]
+        submitted = list(dict.fromkeys(int(uid) for uid in user_ids))
+        async with self._session_factory() as session:
+            if self._keep_days > 0:
+                cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=self._keep_days)
+                await broadcasts_repo.prune(session, cutoff)
+            await broadcasts_repo.enqueue(session, run_key, submitted)
+            waiting = set(await broadcasts_repo.pending(session, run_key))
+            await session.commit()
+
+        pending = [uid for uid in submitted if uid in waiting]
+        report = BroadcastReport(
+            run_key=run_key, total=len(pending), skipped=len(submitted) - len(pending)
+        )
+        state = _Run(report, pending, self._concurrency)
+        started = self._clock()
+        workers = [
+            asyncio.create_task(self._worker(state, send, job, on_sent))
+            for _ in range(min(self._concurrency, max(1, len(pending))))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            state.cancel_timers()
+            for worker in workers:
+                worker.cancel()
+            await self._flush(run_key, state, force=True)
+            report.seconds = self._clock() - started
+            BROADCAST_RATE.set(report.rate, job=job)
+
+        _log.info(
+            "broadcast %s: sent=%s blocked=%s failed=%s retried=%s skipped=%s in %.1fs (%.1f/s)",
+            run_key,
+            report.sent,
+            report.blocked,
+            report.failed,
+            report.retried,
+            report.skipped,
+            report.seconds,
+            report.rate,
+        )
+        return report
+
+    async def _worker(
+        self, state: _Run, send: SendFunc, job: str, on_sent: SentHook | None
+    ) -> None:
+        report = state.report
+        while True:
+            user_id = await state.queue.get()
+            if user_id is None:
+                return
+
+            now = self._clock()
+            ready_at = self._chat_ready.get(user_id, 0.0)
+            if ready_at > now:
+                # Another message to this chat went out just now; come back later.
+                state.retry_later(user_id, ready_at - now)
+                continue
+            self._chat_ready[user_id] = now + self._per_chat_interval
+
+            await self.bucket.acquire()
+            attempts = state.attempts[user_id] = state.attempts.get(user_id, 0) + 1
+            try:
+                await send(user_id)
+            except TelegramRetryAfter as exc:
+                if self._retry(state, user_id, attempts, float(exc.retry_after), exc, job):
+                    continue
+            except TelegramForbiddenError as exc:
+                report.blocked += 1
+                BROADCAST_MESSAGES.inc(job=job, outcome="blocked")
+                _log.info("broadcast %s: user %s blocked the bot", report.run_key, user_id)
+                state.finish(user_id, broadcasts_repo.BLOCKED, str(exc))
+            except (TelegramBadRequest, TelegramNotFound) as exc:
+                self._fail(state, user_id, exc, job)
+            except Exception as exc:
+                delay = min(60.0, self._backoff * 2 ** (attempts - 1))
+                if self._retry(state, user_id, attempts, delay, exc, job):
+                    continue
+            else:
+                report.sent += 1
+                report.sent_ids.append(user_id)
+                BROADCAST_MESSAGES.inc(job=job, outcome="sent")
+                state.finish(user_id, broadcasts_repo.SENT, None)
+                if on_sent is not None:
+                    try:
+                        result = on_sent(user_id)
+                        if inspect.isawaitable(result):
+                            await result
+                    except Exception:
+                        _log.exception("broadcast %s: on_sent failed for %s", job, user_id)
+            await self._flush(report.run_key, state)
+
+    def _retry(
+        self, state: _Run, user_id: int, attempts: int, delay: float, exc: Exception, job: str
+    ) -> bool:
+        """Schedule another attempt; ``False`` (and a recorded failure) once out of tries."""
+
+        if attempts >= self._max_attempts:
+            self._fail(state, user_id, exc, job)
+            return False
+        state.report.retried += 1
+        BROADCAST_MESSAGES.inc(job=job, outcome="retried")
+        state.retry_later(user_id, delay)
+        return True
+
+    def _fail(self, state: _Run, user_id: int, exc: Exception, job: str) -> None:
+        state.report.failed += 1
+        BROADCAST_MESSAGES.inc(job=job, outcome="failed")
+        _log.warning(
+            "broadcast %s: giving up on user %s after %s attempt(s): %r",
+            state.report.run_key,
+            user_id,
+            state.attempts.get(user_id, 0),
+            exc,
+        )
+        state.finish(user_id, broadcasts_repo.FAILED, f"{type(exc).__name__}: {exc}")
+
+    async def _flush(self, run_key: str, state: _Run, *, force: bool = False) -> None:
+        if not state.outcomes or (not force and len(state.outcomes) < self._flush_every):
+            return
+        batch, state.outcomes = state.outcomes, []
+        try:
+            async with self._session_factory() as session:
+                await broadcasts_repo.record(session, run_key, batch)
+                await session.commit()
+        except Exception:
+            # Unrecorded recipients stay pending and are retried by a resumed run.
+            _log.exception("broadcast %s: failed to record %s outcome(s)", run_key, len(batch))
+
+
+broadcaster = Broadcaster()
+
+
+__all__ = ["BroadcastReport", "Broadcaster", "TokenBucket", "broadcaster"]
@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import json
 import logging
 import os
-from typing import Any, Awaitable, Callable, TypeVar
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
 
 try:  # pragma: no cover - prefer real aiocache when available
     from aiocache import Cache
@@ -14,14 +17,23 @@ try:  # pragma: no cover - prefer real aiocache when available
 except Exception:  # pragma: no cover - offline test fallback
     from app._compat.aiocache_stub import Cache, PickleSerializer
 
-from app.catalog.loader import CATALOG_SHA, catalog_version
+from app.catalog.loader import CatalogSnapshot, catalog_revision, on_catalog_reload
 from app.config import settings
+from app.utils.expiring import ExpiringDict
 
 T = TypeVar("T")
 
 _DEFAULT_TTL = int(os.getenv("CACHE_TTL", "90"))
+_L1_TTL = float(os.getenv("CACHE_L1_TTL", "30"))
+_L1_MAXSIZE = int(os.getenv("CACHE_L1_MAXSIZE", "4096"))
+_NEGATIVE_TTL = float(os.getenv("CACHE_NEGATIVE_TTL", "5"))
 _NAMESPACE = "catalog-cache"
 
+# Stored in place of ``None`` so a cached miss is told apart from no entry.
+_NONE = "\x00catalog-cache:none"
+
+_log = logging.getLogger("cache")
+
 
 def _create_cache() -> Cache:
     """Return a configured aiocache backend with Redis fallback."""
@@ -37,7 +49,7 @@ def _create_cache() -> Cache:
                     serializer=PickleSerializer(),
                 )
             except Exception:  # pragma: no cover - fallback to in-memory cache
-                logging.getLogger("cache").exception("redis cache init failed")
+                _log.exception("redis cache init failed")
 
     return Cache(
         Cache.MEMORY,
@@ -47,6 +59,85 @@ def _create_cache() -> Cache:
 
 
 _CACHE = _create_cache()
+_L1: ExpiringDict[Hashable, Any] = ExpiringDict(ttl=_L1_TTL, maxsize=_L1_MAXSIZE)
+_INFLIGHT: dict[Hashable, asyncio.Future[Any]] = {}
+
+# Bumped on every catalog swap and by :func:`invalidate`; L1 keys embed it.  L2
+# keys embed only the catalog revision, so replicas on the same catalog share
+# entries whether they started on it or hot-swapped to it.
+_EPOCH = 0
+_REVISION: str | None = None
+# Set by :func:`invalidate`; the next lookup clears the shared backend first.
+_L2_STALE = False
+
+
+def _on_catalog_swap(snapshot: CatalogSnapshot) -> None:
+    global _EPOCH, _REVISION
+    _EPOCH += 1
+    _REVISION = snapshot.revision
+
+
+on_catalog_reload(_on_catalog_swap)
+
+
+def invalidate() -> int:
+    """Start a new cache epoch and return it.
+
+    L1 entries are dropped at once; the shared L2 is cleared by the next lookup.
+    """
+
+    global _EPOCH, _REVISION, _L2_STALE
+    _EPOCH += 1
+    _REVISION = None
+    _L2_STALE = True
+    _L1.clear()
+    return _EPOCH
+
+
+async def _flush_l2() -> None:
+    global _L2_STALE
+    if _L2_STALE:
+        _L2_STALE = False
+        await _CACHE.clear()
+
+
+def _l2_prefix() -> str:
+    global _REVISION
+    if _REVISION is None:
+        _REVISION = catalog_revision()
+    return _REVISION
+
+
+@dataclass(slots=True)
+class CacheStats:
+    """Per-function counters; latencies are cumulative seconds."""
+
+    l1_hits: int = 0
+    l2_hits: int = 0
+    misses: int = 0
+    negative_hits: int = 0
+    coalesced: int = 0
+    errors: int = 0
+    hit_seconds: float = 0.0
+    miss_seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        hits = self.l1_hits + self.l2_hits
+        lookups = hits + self.misses
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "avg_hit_ms": self.hit_seconds / hits * 1000 if hits else 0.0,
+            "avg_miss_ms": self.miss_seconds / self.misses * 1000 if self.misses else 0.0,
+        }
+
+
+_STATS: dict[str, CacheStats] = {}
 
 
 def _normalize(obj: Any) -> Any:
@@ -62,41 +153,132 @@ def _normalize(obj: Any) -> Any:
     return repr(obj)
 
 
-def _make_key(func_name: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+def _digest(args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
     payload = _normalize({"args": args, "kwargs": kwargs})
     encoded = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
-    digest = hashlib.sha1(encoded.encode("utf-8")).hexdigest()
-    version = catalog_version()
-    return f"{CATALOG_SHA}:{version}:{func_name}:{digest}"
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def _local_key(func_name: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Hashable:
+    """Build the L1 key, hashing the arguments only when they are not hashable."""
+
+    items = tuple(sorted(kwargs.items())) if kwargs else ()
+    key = (func_name, _EPOCH, args, items)
+    try:
+        hash(key)
+    except TypeError:
+        return (func_name, _EPOCH, _digest(args, kwargs))
+    return key
+
+
+def _make_key(func_name: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+    return f"{_l2_prefix()}:{func_name}:{_digest(args, kwargs)}"
 
 
 def catalog_cached(
     func_name: str,
     ttl: int | None = None,
+    *,
+    negative_ttl: float | None = None,
 ) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
-    """Decorate an async callable with catalog-aware caching."""
+    """Decorate an async callable with catalog-aware two-tier caching.
+
+    Results are looked up in a per-process LRU first and in the shared
+    aiocache backend (Redis when enabled) second.  Concurrent misses for the
+    same arguments share a single call, and ``None`` results are cached for
+    ``negative_ttl`` seconds.  Cached values are shared between callers and
+    must be treated as read-only.
+    """
 
     expiry = ttl or _DEFAULT_TTL
+    local_ttl = min(float(expiry), _L1_TTL)
+    miss_ttl = _NEGATIVE_TTL if negative_ttl is None else negative_ttl
+    stats = _STATS.setdefault(func_name, CacheStats())
 
     def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
-        async def wrapped(*args: Any, **kwargs: Any) -> T:
+        async def _load(local: Hashable, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Any:
+            started = time.perf_counter()
+            await _flush_l2()
             key = _make_key(func_name, args, kwargs)
             cached = await _CACHE.get(key)
             if cached is not None:
+                stats.l2_hits += 1
+                stats.hit_seconds += time.perf_counter() - started
+                if isinstance(cached, str) and cached == _NONE:
+                    stats.negative_hits += 1
+                    _L1.set(local, _NONE, ttl=miss_ttl)
+                    return _NONE
+                _L1.set(local, cached, ttl=local_ttl)
                 return cached
 
             result = await func(*args, **kwargs)
-            if result is not None:
-                await _CACHE.set(key, result, ttl=expiry)
+            stats.misses += 1
+            stats.miss_seconds += time.perf_counter() - started
+            if result is None:
+                if miss_ttl > 0:
+                    _L1.set(local, _NONE, ttl=miss_ttl)
+                    await _CACHE.set(key, _NONE, ttl=max(1, int(miss_ttl)))
+                return _NONE
+            _L1.set(local, result, ttl=local_ttl)
+            await _CACHE.set(key, result, ttl=expiry)
             return result
 
+        async def wrapped(*args: Any, **kwargs: Any) -> T:
+            started = time.perf_counter()
+            local = _local_key(func_name, args, kwargs)
+            cached = _L1.get(local)
+            if cached is not None:
+                stats.l1_hits += 1
+                stats.hit_seconds += time.perf_counter() - started
+                if cached is _NONE:
+                    stats.negative_hits += 1
+                    return None  # type: ignore[return-value]
+                return cached
+
+            pending = _INFLIGHT.get(local)
+            if pending is not None:
+                stats.coalesced += 1
+                try:
+                    result = await asyncio.shield(pending)
+                except asyncio.CancelledError:
+                    if not pending.cancelled():
+                        raise
+                    # The caller doing the load was cancelled; load for ourselves.
+                    result = await _load(local, args, kwargs)
+            else:
+                future = asyncio.get_running_loop().create_future()
+                _INFLIGHT[local] = future
+                try:
+                    result = await _load(local, args, kwargs)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as exc:
+                    stats.errors += 1
+                    future.set_exception(exc)
+                    future.exception()  # waiters re-raise it; silence "never retrieved"
+                    raise
+                else:
+                    future.set_result(result)
+                finally:
+                    _INFLIGHT.pop(local, None)
+            return None if result is _NONE else result  # type: ignore[return-value]
+
+        wrapped.__wrapped__ = func  # type: ignore[attr-defined]
         return wrapped
 
     return decorator
 
 
+def cache_stats() -> dict[str, dict[str, float]]:
+    """Return hit, miss and latency counters per cached function."""
+
+    return {name: stats.as_dict() for name, stats in _STATS.items()}
+
+
 async def clear_cache() -> None:
-    await _CACHE.clear()
+    invalidate()
+    await _flush_l2()
 
 
-__all__ = ["catalog_cached", "clear_cache"]
+__all__ = ["CacheStats", "cache_stats", "catalog_cached", "clear_cache", "invalidate"]
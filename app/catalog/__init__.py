@@ -1,19 +1,29 @@
 """Catalog helpers."""
 
 from .loader import (
-    CATALOG_SHA,
     CatalogError,
+    CatalogWatcher,
+    catalog_revision,
+    catalog_sha,
     load_catalog,
     product_by_alias,
     product_by_id,
+    product_record,
+    reload_catalog,
     select_by_goals,
 )
+from .records import ProductRecord
 
 __all__ = [
-    "CATALOG_SHA",
     "CatalogError",
+    "CatalogWatcher",
+    "ProductRecord",
+    "catalog_revision",
+    "catalog_sha",
     "load_catalog",
     "product_by_alias",
     "product_by_id",
+    "product_record",
+    "reload_catalog",
     "select_by_goals",
 ]
@@ -2,25 +2,21 @@
 
 from __future__ import annotations
 
-from typing import Iterable
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping
 
-from .loader import load_catalog, product_by_alias, product_by_id
+from .loader import load_catalog, product_record
 
 
-def _resolve_product(code: str) -> dict | None:
-    product = product_by_id(code)
-    if product:
-        return product
-    return product_by_alias(code)
+def load_catalog_map() -> Mapping[str, Mapping[str, Any]]:
+    """Return a read-only view of the products of the current snapshot."""
 
-
-def load_catalog_map() -> dict:
     data = load_catalog()
-    return data["products"].copy()
+    return MappingProxyType(data["products"])
 
 
 def product_meta(code: str) -> dict | None:
-    product = _resolve_product(code)
+    product = product_record(code)
     if not product:
         return None
 
@@ -75,8 +71,8 @@ def pick_for_context(context: str, level: str | None, codes: Iterable[str]) -> l
                 "code": meta["code"],
                 "name": meta.get("name", meta["code"]),
                 "short": meta.get("short", ""),
-                "props": list(meta.get("props", []) or []),
-                "images": list(meta.get("images", []) or []),
+                "props": meta["props"],
+                "images": meta["images"],
                 "order_url": meta.get("order_url"),
                 "helps_text": helps_text,
             }
@@ -64,7 +64,9 @@ def _build_catalog_markup(catalog, discount_url: str | None) -> InlineKeyboardMa
 async def catalog_command(message: Message) -> None:
     if not message.from_user:
         return
-    remaining = touch_throttle(message.from_user.id, "catalog:command", CATALOG_COMMAND_THROTTLE)
+    remaining = await touch_throttle(
+        message.from_user.id, "catalog:command", CATALOG_COMMAND_THROTTLE
+    )
     if remaining > 0:
         await message.answer("Каталог уже открыт, попробуйте чуть позже.")
         log.debug(
@@ -77,7 +79,9 @@ async def catalog_command(message: Message) -> None:
 @router.callback_query(F.data == "catalog:menu")
 async def catalog_menu_callback(callback: CallbackQuery) -> None:
     if callback.from_user:
-        remaining = touch_throttle(callback.from_user.id, "catalog:menu", CATALOG_CALLBACK_THROTTLE)
+        remaining = await touch_throttle(
+            callback.from_user.id, "catalog:menu", CATALOG_CALLBACK_THROTTLE
+        )
         if remaining > 0:
             await callback.answer("Каталог обновляется, попробуйте позже.", show_alert=False)
             log.debug(
@@ -106,7 +110,7 @@ async def catalog_view_callback(callback: CallbackQuery) -> None:
         return
 
     if callback.from_user:
-        remaining = touch_throttle(
+        remaining = await touch_throttle(
             callback.from_user.id, f"catalog:view:{product_id}", CATALOG_CALLBACK_THROTTLE
         )
         if remaining > 0:
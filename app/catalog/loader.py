@@ -3,13 +3,21 @@
 from __future__ import annotations
 
 import hashlib
+import heapq
 import json
+import logging
 import os
-from functools import lru_cache
+import pickle
+import sys
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Iterable, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List
 
+from app.catalog import overrides as catalog_overrides
 from app.catalog.overrides import apply_overrides, load_overrides
+from app.catalog.records import ProductRecord
+from app.catalog.search import SearchIndex, product_terms
 
 CATALOG_DIR = os.path.dirname(__file__)
 CATALOG_PATH = os.path.join(CATALOG_DIR, "products.json")
@@ -30,7 +38,37 @@ def _compute_catalog_sha() -> str:
     return digest.hexdigest()
 
 
-CATALOG_SHA = os.getenv("CATALOG_SHA") or _compute_catalog_sha()
+_SHA_CACHE: tuple[tuple[str, int, int], str] | None = None
+
+
+def _catalog_file_sha() -> str:
+    """SHA1 of products.json, rehashed only when its path, size or mtime change."""
+
+    global _SHA_CACHE
+    try:
+        stat = os.stat(CATALOG_PATH)
+    except FileNotFoundError:
+        return "missing"
+    stamp = (CATALOG_PATH, stat.st_size, stat.st_mtime_ns)
+    if _SHA_CACHE is None or _SHA_CACHE[0] != stamp:
+        _SHA_CACHE = (stamp, _compute_catalog_sha())
+    return _SHA_CACHE[1]
+
+
+# The environment may pin the reported sha; otherwise products.json is hashed on
+# first load rather than at import.  _publish keeps CATALOG_SHA on the live snapshot.
+_PINNED_SHA = os.getenv("CATALOG_SHA") or None
+CATALOG_SHA: str | None = _PINNED_SHA
+CATALOG_RELOAD_INTERVAL = float(os.getenv("CATALOG_RELOAD_INTERVAL", "5"))
+# Prebuilt index written by ``tools/build_products.py build`` or
+# ``tools/catalog_build.py --compile``; an empty value disables it.
+CATALOG_SNAPSHOT_PATH = os.getenv(
+    "CATALOG_SNAPSHOT_PATH", os.path.join(CATALOG_DIR, "products.snapshot")
+)
+# Bump whenever CatalogSnapshot, _Entry, ProductRecord or SearchIndex change shape.
+_SNAPSHOT_FORMAT = 2
+
+_log = logging.getLogger("catalog")
 
 
 class CatalogError(RuntimeError):
@@ -109,22 +147,97 @@ def _load_manual_aliases() -> Dict[str, str]:
     return manual
 
 
-@lru_cache(maxsize=1)
-def load_catalog(refresh: bool = False) -> Dict[str, Any]:
-    """Load and index the catalog, optionally bypassing the cache."""
+@dataclass(slots=True)
+class _Entry:
+    source: Dict[str, Any]
+    override: Dict[str, Any]
+    product: Dict[str, Any]
+    record: ProductRecord
+    aliases: tuple[str, ...]
+    goals: tuple[str, ...]
+    terms: Dict[str, float]
 
-    if refresh:
-        load_catalog.cache_clear()  # type: ignore[attr-defined]
 
+@dataclass(slots=True)
+class CatalogSnapshot:
+    """One fully indexed catalog; never mutated after it is published."""
+
+    data: Dict[str, Any]
+    sha: str
+    revision: str
+    epoch: int
+    mtimes: tuple[float, ...]
+    entries: Dict[str, _Entry] = field(default_factory=dict)
+    reindexed: int = 0
+
+
+_SNAPSHOT: CatalogSnapshot | None = None
+_BUILD_LOCK = threading.Lock()
+_LISTENERS: list[Callable[[CatalogSnapshot], None]] = []
+
+
+def _watched_mtimes() -> tuple[float, ...]:
+    mtimes = []
+    for path in (CATALOG_PATH, catalog_overrides.CATALOG_OVERRIDES_PATH, ALIASES_PATH):
+        try:
+            mtimes.append(os.stat(path).st_mtime)
+        except FileNotFoundError:
+            mtimes.append(0.0)
+    return tuple(mtimes)
+
+
+def _revision_digest(sha: str) -> str:
+    digest = hashlib.sha1(sha.encode("ascii"))
+    for path in (catalog_overrides.CATALOG_OVERRIDES_PATH, ALIASES_PATH):
+        try:
+            digest.update(Path(path).read_bytes())
+        except FileNotFoundError:
+            digest.update(b"-")
+    return digest.hexdigest()[:16]
+
+
+def _index_product(item: Dict[str, Any], override: Dict[str, Any]) -> _Entry | None:
+    order_info = item.get("order") or {}
+    velavie_link = order_info.get("velavie_link")
+    if not isinstance(velavie_link, str) or not velavie_link.strip():
+        return None
+    product = apply_overrides(item, override)
+    aliases = product.get("aliases") or []
+    names = tuple(alias for alias in aliases if isinstance(alias, str) and alias)
+    goals = product.get("goals") or []
+    goal_keys = (
+        tuple(dict.fromkeys(str(goal).lower() for goal in goals if goal))
+        if isinstance(goals, list)
+        else ()
+    )
+    return _Entry(
+        source=item,
+        override=override,
+        product=product,
+        record=ProductRecord.from_product(product),
+        aliases=names,
+        goals=goal_keys,
+        terms=product_terms(product),
+    )
+
+
+def _build_snapshot(previous: CatalogSnapshot | None) -> CatalogSnapshot:
+    """Index the catalog, reusing entries whose source and overrides are unchanged."""
+
+    mtimes = _watched_mtimes()
     data = _read_raw()
     items: List[Dict[str, Any]] = data["products"]
     version = str(data.get("version") or _derive_version_fallback())
+    overrides = load_overrides()
+    known = previous.entries if previous is not None else {}
 
+    entries: Dict[str, _Entry] = {}
     by_id: Dict[str, Dict[str, Any]] = {}
+    records: Dict[str, ProductRecord] = {}
     by_alias: Dict[str, str] = {}
+    by_goal: Dict[str, List[int]] = {}
     ordered_ids: List[str] = []
-
-    overrides = load_overrides()
+    reindexed = 0
 
     for item in items:
         if not isinstance(item, dict):
@@ -132,21 +245,23 @@ def load_catalog(refresh: bool = False) -> Dict[str, Any]:
         product_id = item.get("id")
         if not isinstance(product_id, str) or not product_id:
             continue
-        order_info = item.get("order") or {}
-        velavie_link = order_info.get("velavie_link")
-        if not isinstance(velavie_link, str) or not velavie_link.strip():
-            continue
-
         canonical = product_id.strip()
+        override = overrides.get(canonical, {})
+        entry = known.get(canonical)
+        if entry is None or entry.source != item or entry.override != override:
+            entry = _index_product(item, override)
+            reindexed += 1
+            if entry is None:
+                continue
+
+        entries[canonical] = entry
+        for goal in entry.goals:
+            by_goal.setdefault(goal, []).append(len(ordered_ids))
         ordered_ids.append(canonical)
-        item_with_overrides = apply_overrides(item, overrides.get(canonical, {}))
-        by_id[canonical] = item_with_overrides
-
-        aliases = item_with_overrides.get("aliases") or []
-        if isinstance(aliases, list):
-            for alias in aliases:
-                if isinstance(alias, str) and alias:
-                    by_alias[alias.lower()] = canonical
+        by_id[canonical] = entry.product
+        records[canonical] = entry.record
+        for alias in entry.aliases:
+            by_alias[alias.lower()] = canonical
         by_alias[canonical.lower()] = canonical
         by_alias[canonical.upper()] = canonical
 
@@ -157,12 +272,182 @@ def load_catalog(refresh: bool = False) -> Dict[str, Any]:
             continue
         by_alias[alias] = target
 
-    return {
-        "products": by_id,
-        "aliases": by_alias,
-        "ordered": ordered_ids,
-        "version": version,
-    }
+    if previous is None:
+        sha = _PINNED_SHA or _catalog_file_sha()
+        epoch = 1
+    else:
+        sha = _catalog_file_sha()
+        epoch = previous.epoch + 1
+    return CatalogSnapshot(
+        data={
+            "products": by_id,
+            "records": records,
+            "aliases": by_alias,
+            "ordered": ordered_ids,
+            "goals": by_goal,
+            "search": SearchIndex(ordered_ids, (entries[pid].terms for pid in ordered_ids)),
+            "version": version,
+        },
+        sha=sha,
+        revision=_revision_digest(sha),
+        epoch=epoch,
+        mtimes=mtimes,
+        entries=entries,
+        reindexed=reindexed,
+    )
+
+
+def _publish(snapshot: CatalogSnapshot) -> None:
+    global _SNAPSHOT, CATALOG_SHA
+    _SNAPSHOT = snapshot
+    CATALOG_SHA = snapshot.sha
+    for listener in list(_LISTENERS):
+        try:
+            listener(snapshot)
+        except Exception:  # noqa: BLE001 - a listener must not block the swap
+            _log.exception("catalog reload listener failed")
+
+
+def _snapshot_key() -> str:
+    """Identify the catalog sources and the code that indexed them."""
+
+    python = f"{sys.version_info[0]}.{sys.version_info[1]}"
+    return f"{_SNAPSHOT_FORMAT}:{python}:{_revision_digest(_catalog_file_sha())}"
+
+
+def write_catalog_snapshot(path: str | os.PathLike[str] | None = None) -> Path:
+    """Index the catalog from JSON and pickle the result for fast cold starts.
+
+    The file starts with a small header holding :func:`_snapshot_key`, so a
+    stale snapshot is rejected without unpickling the index itself.
+    """
+
+    destination = Path(path or CATALOG_SNAPSHOT_PATH)
+    key = _snapshot_key()
+    snapshot = _build_snapshot(None)
+    tmp = destination.with_name(f".{destination.name}.tmp")
+    with open(tmp, "wb") as fh:
+        pickle.dump({"key": key}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(snapshot, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, destination)
+    return destination
+
+
+def _read_compiled() -> CatalogSnapshot | None:
+    """Return the prebuilt snapshot if it matches the catalog files on disk."""
+
+    if not CATALOG_SNAPSHOT_PATH:
+        return None
+    mtimes = _watched_mtimes()
+    key = _snapshot_key()
+    try:
+        with open(CATALOG_SNAPSHOT_PATH, "rb") as fh:
+            header = pickle.load(fh)
+            if not isinstance(header, dict) or header.get("key") != key:
+                _log.info("catalog snapshot is stale; indexing products.json")
+                return None
+            snapshot = pickle.load(fh)
+    except FileNotFoundError:
+        return None
+    except Exception:  # noqa: BLE001 - a broken snapshot only costs the JSON path
+        _log.warning("catalog snapshot unreadable; indexing products.json", exc_info=True)
+        return None
+    if not isinstance(snapshot, CatalogSnapshot):
+        return None
+    snapshot.sha = _PINNED_SHA or _catalog_file_sha()
+    snapshot.revision = _revision_digest(snapshot.sha)
+    snapshot.epoch = 1
+    snapshot.mtimes = mtimes
+    return snapshot
+
+
+def current_snapshot() -> CatalogSnapshot:
+    snapshot = _SNAPSHOT
+    if snapshot is None:
+        with _BUILD_LOCK:
+            snapshot = _SNAPSHOT
+            if snapshot is None:
+                snapshot = _read_compiled() or _build_snapshot(None)
+                _publish(snapshot)
+    return snapshot
+
+
+def reload_catalog(*, force: bool = False) -> bool:
+    """Rebuild the catalog if its files changed and swap it in.
+
+    Readers keep using the previous snapshot until the new one is fully
+    indexed.  Returns ``True`` when a new snapshot was published.
+    """
+
+    with _BUILD_LOCK:
+        previous = _SNAPSHOT
+        if previous is not None and not force and previous.mtimes == _watched_mtimes():
+            return False
+        snapshot = _build_snapshot(previous)
+        _publish(snapshot)
+    if previous is not None:
+        _log.info(
+            "catalog reloaded epoch=%s revision=%s products=%s reindexed=%s",
+            snapshot.epoch,
+            snapshot.revision,
+            len(snapshot.entries),
+            snapshot.reindexed,
+        )
+    return True
+
+
+def on_catalog_reload(listener: Callable[[CatalogSnapshot], None]) -> None:
+    """Call ``listener`` with every newly published snapshot."""
+
+    _LISTENERS.append(listener)
+
+
+def load_catalog(refresh: bool = False) -> Dict[str, Any]:
+    """Return the current catalog index, optionally forcing a rebuild first."""
+
+    if refresh:
+        reload_catalog(force=True)
+    return current_snapshot().data
+
+
+def catalog_sha() -> str:
+    return current_snapshot().sha
+
+
+def catalog_revision() -> str:
+    """Digest of the catalog, overrides and aliases behind the current snapshot."""
+
+    return current_snapshot().revision
+
+
+class CatalogWatcher:
+    """Poll the catalog files and hot-swap the snapshot when they change."""
+
+    def __init__(self, interval: float = CATALOG_RELOAD_INTERVAL) -> None:
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> bool:
+        if self._interval <= 0 or self._thread is not None:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-watch", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                reload_catalog()
+            except Exception:  # noqa: BLE001 - keep serving the last good snapshot
+                _log.exception("catalog reload failed; keeping the previous snapshot")
 
 
 def catalog_version() -> str:
@@ -198,30 +483,77 @@ def product_by_alias(alias: str) -> Dict[str, Any] | None:
     return catalog["products"].get(pid)
 
 
-def select_by_goals(goals: Iterable[str], limit: int = 6) -> List[Dict[str, Any]]:
+def product_record(code: str) -> ProductRecord | None:
+    """Return the shared read-only record for a product id or alias."""
+
+    if not code:
+        return None
     catalog = load_catalog()
-    goal_set = {goal.lower() for goal in goals if goal}
-    if not goal_set:
-        return []
+    records = catalog["records"]
+    record = records.get(code)
+    if record is None:
+        pid = catalog["aliases"].get(code.lower())
+        record = records.get(pid) if pid else None
+    return record
+
+
+def iter_goal_products(
+    catalog: Dict[str, Any], goals: Iterable[str], limit: int | None = None
+) -> Iterator[str]:
+    """Yield ids of products matching any of ``goals`` in catalog order.
+
+    ``catalog["goals"]`` maps a lower-cased goal to the ascending positions of
+    its products in ``catalog["ordered"]``.  Several goals are merged lazily, so
+    callers that stop early only pay for what they consume; with ``limit``
+    only the head of each posting list can make the cut and is merged eagerly.
+    """
+
+    index = catalog.get("goals") or {}
+    keys = {goal.lower() for goal in goals if goal}
+    postings = [index[key] for key in keys if key in index]
+    if limit is not None:
+        postings = [posting[: max(limit, 0)] for posting in postings]
+    ordered = catalog["ordered"]
+    positions: Iterable[int]
+    if len(postings) == 1:
+        positions = postings[0]
+    elif limit is not None:
+        positions = sorted(set().union(*postings))[: max(limit, 0)]
+    else:
+        positions = heapq.merge(*postings)
+    previous = -1
+    for position in positions:
+        if position != previous:
+            previous = position
+            yield ordered[position]
+
 
+def select_by_goals(goals: Iterable[str], limit: int = 6) -> List[Dict[str, Any]]:
+    catalog = load_catalog()
+    products = catalog["products"]
     selected: List[Dict[str, Any]] = []
-    for pid in catalog["ordered"]:
-        product = catalog["products"][pid]
-        product_goals = product.get("goals") or []
-        if not isinstance(product_goals, list):
-            continue
-        if goal_set.intersection({str(goal).lower() for goal in product_goals if goal}):
-            selected.append(product)
-            if len(selected) >= limit:
-                break
+    for pid in iter_goal_products(catalog, goals, limit=max(limit, 1)):
+        selected.append(products[pid])
+        if len(selected) >= limit:
+            break
     return selected
 
 
 __all__ = [
     "CatalogError",
+    "CatalogSnapshot",
+    "CatalogWatcher",
+    "catalog_revision",
+    "catalog_sha",
+    "current_snapshot",
+    "iter_goal_products",
     "load_catalog",
+    "on_catalog_reload",
+    "reload_catalog",
     "product_by_id",
     "product_by_alias",
+    "product_record",
     "catalog_version",
     "select_by_goals",
+    "write_catalog_snapshot",
 ]
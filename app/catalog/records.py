@@ -0,0 +1,131 @@
+"""Read-only product records shared by every catalog consumer."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Mapping
+
+MAX_PROPS = 5
+MAX_CARD_IMAGES = 3
+
+
+def select_help(raw: object, ctx: str | None) -> str | None:
+    """Pick the ``how_it_helps`` text for ``ctx``, preferring severe wording."""
+
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        return raw
+    if not isinstance(raw, dict):
+        return None
+    if ctx and ctx in raw:
+        value = raw[ctx]
+        if isinstance(value, str):
+            return value
+        if isinstance(value, dict):
+            for key in ("severe", "moderate", "mild"):
+                if key in value:
+                    maybe = value[key]
+                    if isinstance(maybe, str):
+                        return maybe
+            for item in value.values():
+                if isinstance(item, str):
+                    return item
+            return None
+    for maybe in raw.values():
+        if isinstance(maybe, str):
+            return maybe
+        if isinstance(maybe, dict):
+            for item in maybe.values():
+                if isinstance(item, str):
+                    return item
+    return None
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class ProductRecord(Mapping[str, Any]):
+    """Zero-copy, read-only view of one catalog product.
+
+    Reads go straight to the loader's product dict, which is never mutated
+    after the snapshot is published.  Card fields are derived once per
+    catalog build, and :meth:`card` memoizes the rendered card per context,
+    so rendering does not copy product dicts.
+    """
+
+    code: str
+    name: str
+    short: str
+    props: tuple[str, ...]
+    images: tuple[str, ...]
+    order_url: str | None
+    _product: Dict[str, Any] = field(repr=False)
+    _cards: Dict[str | None, Mapping[str, Any]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    @classmethod
+    def from_product(cls, product: Dict[str, Any]) -> ProductRecord:
+        order = product.get("order") or {}
+        props: list[str] = []
+        for collection in (product.get("props"), product.get("benefits")):
+            if isinstance(collection, list):
+                props.extend(str(item) for item in collection if item)
+        images: list[str] = []
+        raw_images = product.get("images")
+        if isinstance(raw_images, list):
+            images = [img for img in raw_images if isinstance(img, str) and img]
+        name = (
+            product.get("title")
+            or product.get("name")
+            or product.get("code")
+            or product.get("id")
+            or "Product"
+        )
+        return cls(
+            code=str(product.get("code") or product.get("id") or product.get("title") or name),
+            name=name,
+            short=product.get("short", ""),
+            props=tuple(props[:MAX_PROPS]),
+            images=tuple(images[:MAX_CARD_IMAGES]),
+            order_url=product.get("order_url") or order.get("velavie_link") or order.get("url"),
+            _product=product,
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Card memos hold mapping proxies, which do not pickle; rebuild instead.
+        return (ProductRecord.from_product, (self._product,))
+
+    def __getitem__(self, key: str) -> Any:
+        return self._product[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._product)
+
+    def __len__(self) -> int:
+        return len(self._product)
+
+    def card(self, ctx: str | None = None) -> Mapping[str, Any]:
+        """Return the read-only card rendered for ``ctx``."""
+
+        card = self._cards.get(ctx)
+        if card is None:
+            helps_text = self._product.get("helps_text") or select_help(
+                self._product.get("how_it_helps"), ctx
+            )
+            card = MappingProxyType(
+                {
+                    "code": self.code,
+                    "name": self.name,
+                    "short": self.short,
+                    "props": self.props,
+                    "images": self.images,
+                    "order_url": self.order_url,
+                    "helps_text": helps_text,
+                }
+            )
+            card = self._cards.setdefault(ctx, card)
+        return card
+
+
+__all__ = ["MAX_CARD_IMAGES", "MAX_PROPS", "ProductRecord", "select_help"]
@@ -0,0 +1,156 @@
+"""Tokenized full-text index over catalog titles and descriptions."""
+
+from __future__ import annotations
+
+import heapq
+import re
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+# Field weights: a hit in the title outranks one in the short description.
+FIELD_WEIGHTS: tuple[tuple[str, float], ...] = (("title", 3.0), ("name", 2.0), ("short", 1.0))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_MIN_STEM = 3
+_PREFIX_FACTOR = 0.7
+_FUZZY_FACTOR = 0.5
+_FUZZY_MIN_LEN = 4
+_FUZZY_THRESHOLD = 0.45
+
+# Inflection endings stripped by the light stemmer, longest first, so that
+# "витамины", "витаминов" and "витамином" all index as "витамин".
+_RU_ENDINGS: tuple[str, ...] = tuple(
+    sorted(
+        (  # noqa: SIM905 - a word list reads better as one string
+            "иями ями ами иях ием ого его ому ему ыми ими ией ия ии ию ья ие ье ий ый "
+            "ой ая яя ое ее ые ую юю ов ев ей ам ям ах ях ом ем ою ею а я о е ы и у ю ь"
+        ).split(),
+        key=len,
+        reverse=True,
+    )
+)
+
+_STOP_WORDS = frozenset(
+    "и в во на с со по от из к ко о об для при без до за не или а но the and for with of".split()  # noqa: SIM905
+)
+
+
+def normalize(text: str) -> str:
+    """Case-fold ``text`` and fold ``ё`` into ``е``."""
+
+    return text.casefold().replace("ё", "е")
+
+
+def stem(token: str) -> str:
+    """Strip one inflection ending, keeping at least three characters."""
+
+    if token.isascii():
+        if len(token) > _MIN_STEM + 1 and token.endswith("s"):
+            return token[:-1]
+        return token
+    for ending in _RU_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= _MIN_STEM:
+            return token[: -len(ending)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Split ``text`` into normalized, stemmed terms."""
+
+    return [stem(token) for token in _TOKEN_RE.findall(normalize(text)) if token not in _STOP_WORDS]
+
+
+def _trigrams(term: str) -> set[str]:
+    padded = f"#{term}#"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def product_terms(product: Mapping[str, Any]) -> Dict[str, float]:
+    """Return the weighted terms of one product for :class:`SearchIndex`."""
+
+    terms: Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS:
+        value = product.get(field)
+        if not value:
+            continue
+        for term in set(tokenize(str(value))):
+            terms[term] = terms.get(term, 0.0) + weight
+    return terms
+
+
+class SearchIndex:
+    """Inverted index from stemmed terms to catalog positions.
+
+    Query terms match exactly, as a prefix of an indexed term (for queries
+    typed incrementally) or, failing both, through trigram similarity to
+    tolerate typos.  Results are ranked by how many query terms matched, then
+    by the summed field weights, then by catalog order.
+    """
+
+    __slots__ = ("_ids", "_postings", "_vocabulary", "_trigrams")
+
+    def __init__(self, ids: Sequence[str], terms: Iterable[Mapping[str, float]]) -> None:
+        self._ids = list(ids)
+        self._postings: Dict[str, Dict[int, float]] = {}
+        for position, weighted in enumerate(terms):
+            for term, weight in weighted.items():
+                self._postings.setdefault(term, {})[position] = weight
+        self._vocabulary = sorted(self._postings)
+        self._trigrams: Dict[str, List[str]] = {}
+        for term in self._vocabulary:
+            if len(term) >= _FUZZY_MIN_LEN - 1:
+                for gram in _trigrams(term):
+                    self._trigrams.setdefault(gram, []).append(term)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _expand(self, term: str) -> Dict[str, float]:
+        """Map a query term to indexed terms with a match factor."""
+
+        if term in self._postings:
+            return {term: 1.0}
+        matches: Dict[str, float] = {}
+        start = bisect_left(self._vocabulary, term)
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(term):
+                break
+            matches[candidate] = _PREFIX_FACTOR
+        if matches or len(term) < _FUZZY_MIN_LEN:
+            return matches
+        grams = _trigrams(term)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._trigrams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        for candidate, count in shared.items():
+            similarity = count / (len(grams) + len(candidate) - count)
+            if similarity >= _FUZZY_THRESHOLD:
+                matches[candidate] = _FUZZY_FACTOR * similarity
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> List[str]:
+        """Return up to ``limit`` product ids ranked for ``query``."""
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        hits: Dict[int, List[float]] = {}
+        for term in terms:
+            best: Dict[int, float] = {}
+            for indexed, factor in self._expand(term).items():
+                for position, weight in self._postings[indexed].items():
+                    score = weight * factor
+                    if score > best.get(position, 0.0):
+                        best[position] = score
+            for position, score in best.items():
+                entry = hits.setdefault(position, [0.0, 0.0])
+                entry[0] += 1
+                entry[1] += score
+        ranked = heapq.nsmallest(
+            limit, hits.items(), key=lambda item: (-item[1][0], -item[1][1], item[0])
+        )
+        return [self._ids[position] for position, _ in ranked]
+
+
+__all__ = ["SearchIndex", "normalize", "product_terms", "stem", "tokenize"]
@@ -16,6 +16,13 @@ class LegacySettings(BaseSettings):
         default=True,
         validation_alias=AliasChoices("MIGRATE_ON_START", "DB_MIGRATE_ON_START"),
     )
+    # SQLite: WAL и PRAGMA при подключении, отдельный read-only пул для отчётов
+    SQLITE_TUNING_ENABLED: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = Field(default=268_435_456, ge=0)
+    SQLITE_CACHE_SIZE_KB: int = Field(default=65_536, ge=0)
+    SQLITE_BUSY_TIMEOUT_MS: int = Field(default=5_000, ge=0)
+    DB_READ_POOL_SIZE: int = Field(default=4, ge=1)
     REDIS_URL: str | None = None
     TIMEZONE: str = "Europe/Moscow"
 
@@ -46,9 +53,25 @@ class LegacySettings(BaseSettings):
     NOTIFY_HOUR_LOCAL: int = 9
     NOTIFY_WEEKDAYS: str | None = ""
     RETENTION_ENABLED: bool = False
+    # Сколько последних советов не повторять пользователю (0 — только предыдущий)
+    RETENTION_TIP_NO_REPEAT: int = Field(default=0, ge=0)
     SCHEDULER_ENABLE_NUDGES: bool = True
     WEEKLY_PLAN_ENABLED: bool = True
+    # Рассылки: общий лимит ~30 сообщений/с, не чаще раза в секунду на чат
+    BROADCAST_RATE: float = Field(default=30.0, gt=0)
+    BROADCAST_CONCURRENCY: int = Field(default=16, ge=1)
+    BROADCAST_PER_CHAT_INTERVAL: float = Field(default=1.0, ge=0)
+    BROADCAST_MAX_ATTEMPTS: int = Field(default=5, ge=1)
+    BROADCAST_KEEP_DAYS: int = Field(default=14, ge=0)
     ANALYTICS_EXPORT_ENABLED: bool = True
+    EVENT_ROLLUP_ENABLED: bool = True
+    EVENT_ARCHIVE_DAYS: int = Field(default=180, ge=0)
+    EVENT_ARCHIVE_DIR: str = "var/archive/events"
+    UTM_FUNNEL_REFRESH_MINUTES: int = Field(default=15, ge=0)
+    ADMIN_SNAPSHOT_MAX_AGE: float = Field(default=60.0, ge=0)
+    ADMIN_SNAPSHOT_REFRESH_MINUTES: int = Field(default=5, ge=0)
+    DASHBOARD_LIVE_HEARTBEAT: float = Field(default=15.0, gt=0)
+    DASHBOARD_LIVE_BUFFER: int = Field(default=1000, ge=1)
 
     # Прокси (если нужно)
     HTTP_PROXY_URL: str | None = None
@@ -12,16 +12,17 @@ from urllib.parse import quote
 
 import plotly.graph_objects as go
 from fastapi import Depends, FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
 from plotly.io import to_html
 from pydantic import BaseModel, Field
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.catalog.loader import load_catalog
+from app import http_cache, live, snapshots
+from app.catalog.loader import catalog_revision, load_catalog
 from app.config import settings
-from app.db.models import Event, Lead
-from app.db.session import session_scope
+from app.db.models import Lead
+from app.db.session import read_session_scope
 from app.growth import attribution as growth_attribution
 from app.link_manager import (
     active_set_name,
@@ -30,13 +31,15 @@ from app.link_manager import (
     export_set,
     get_all_product_links,
     get_register_link,
+    links_revision,
     list_sets,
     set_bulk_links,
     set_product_link,
     set_register_link,
     switch_set,
 )
-from app.repo import events as events_repo, leads as leads_repo
+from app.repo import events as events_repo, leads as leads_repo, rollups as rollups_repo
+from app.snapshots import SnapshotService
 from app.utils.build import get_build_info
 
 app = FastAPI(title="Five Keys Admin Dashboard")
@@ -85,40 +88,15 @@ async def _collect_event_stats(
     session: AsyncSession,
     name: str,
     key: str,
-    limit: int | None = None,
 ) -> Tuple[Counter[str], int]:
-    stmt = select(Event.meta, Event.ts).where(Event.name == name).order_by(Event.ts.desc())
-    if limit is not None:
-        stmt = stmt.limit(limit)
-    result = await session.execute(stmt)
-    rows = result.all()
-
-    counts: Counter[str] = Counter()
-    for meta, _ in rows:
-        payload = meta or {}
-        label = str(payload.get(key) or "unknown")
-        counts[label] += 1
+    counts = await rollups_repo.breakdown(session, name, key)
     return counts, sum(counts.values())
 
 
-async def _collect_plan_stats(
-    session: AsyncSession, limit: int | None = None
-) -> Tuple[int, Counter[str]]:
-    stmt = select(Event.meta).where(Event.name == "plan_generated").order_by(Event.ts.desc())
-    if limit is not None:
-        stmt = stmt.limit(limit)
-    result = await session.execute(stmt)
-    rows = result.scalars().all()
-
-    total = 0
-    products: Counter[str] = Counter()
-    for meta in rows:
-        total += 1
-        payload = meta or {}
-        for code in payload.get("products", []) or []:
-            if code:
-                products[str(code)] += 1
-    return total, products
+async def _collect_plan_stats(session: AsyncSession) -> Tuple[int, Counter[str]]:
+    totals = await rollups_repo.totals(session, ["plan_generated"])
+    products = await rollups_repo.breakdown(session, "plan_generated", "products")
+    return totals["plan_generated"], products
 
 
 async def _collect_lead_details(
@@ -139,8 +117,8 @@ async def _collect_lead_details(
     for lead in leads:
         quiz_event = quiz_map.get(lead.user_id) if lead.user_id is not None else None
         plan_event = plan_map.get(lead.user_id) if lead.user_id is not None else None
-        quiz_meta = quiz_event.meta if quiz_event is not None else {}
-        plan_meta = plan_event.meta if plan_event is not None else {}
+        quiz_meta = quiz_event.last_meta if quiz_event is not None else {}
+        plan_meta = plan_event.last_meta if plan_event is not None else {}
         rows.append(
             {
                 "name": lead.name,
@@ -262,8 +240,13 @@ def _parse_iso_timestamp(value: str | None) -> datetime | None:
         return None
 
 
+LOAD_REPORT_PATH = Path(__file__).resolve().parent.parent / "build" / "reports" / "load.json"
+# (mtime, latest run timestamp) of the load report as last seen by the dashboard.
+_LOAD_REPORT_SEEN: tuple[int, datetime | None] | None = None
+
+
 def _load_load_history() -> List[Dict[str, Any]]:
-    report_path = Path(__file__).resolve().parent.parent / "build" / "reports" / "load.json"
+    report_path = LOAD_REPORT_PATH
     try:
         payload = json.loads(report_path.read_text(encoding="utf-8"))
     except FileNotFoundError:
@@ -318,7 +301,67 @@ def _build_load_chart(history: List[Dict[str, Any]]) -> str:
         yaxis=dict(title="мс"),
         xaxis=dict(title="Запуск", tickangle=-35),
     )
-    return to_html(fig, include_plotlyjs=False, full_html=False)
+    return to_html(fig, include_plotlyjs=False, full_html=False, div_id="load-chart")
+
+
+def _run_timestamp(entry: Any) -> datetime | None:
+    if not isinstance(entry, dict):
+        return None
+    stamp = _parse_iso_timestamp(entry.get("timestamp"))
+    if stamp is not None and stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return stamp
+
+
+def _latest_run_timestamp(history: List[Dict[str, Any]]) -> datetime | None:
+    stamps = [stamp for entry in history if (stamp := _run_timestamp(entry)) is not None]
+    return max(stamps, default=None)
+
+
+def _mark_load_report_seen(history: List[Dict[str, Any]]) -> None:
+    global _LOAD_REPORT_SEEN
+    try:
+        mtime = LOAD_REPORT_PATH.stat().st_mtime_ns
+    except OSError:
+        mtime = 0
+    _LOAD_REPORT_SEEN = (mtime, _latest_run_timestamp(history))
+
+
+def _poll_load_report() -> None:
+    """Publish load-test runs written since the report was last read.
+
+    The report is produced by ``tools/stress_users.py`` in another process, so
+    live streams check its mtime on each heartbeat instead of being notified.
+    """
+
+    global _LOAD_REPORT_SEEN
+    seen = _LOAD_REPORT_SEEN
+    try:
+        mtime = LOAD_REPORT_PATH.stat().st_mtime_ns
+    except OSError:
+        mtime = 0
+    if seen is not None and seen[0] == mtime:
+        return
+    history = _load_load_history()
+    latest = _latest_run_timestamp(history)
+    _LOAD_REPORT_SEEN = (mtime, latest)
+    if seen is None:
+        return
+    new_runs = []
+    for entry in history:
+        stamp = _run_timestamp(entry)
+        if stamp is None or (seen[1] is not None and stamp <= seen[1]):
+            continue
+        new_runs.append((stamp, entry))
+    for stamp, entry in sorted(new_runs, key=lambda item: item[0]):
+        latency = entry.get("latency")
+        p95 = latency.get("p95") if isinstance(latency, dict) else None
+        errors = entry.get("errors")
+        live.record_load_run(
+            stamp.isoformat(),
+            float(p95) if isinstance(p95, (int, float)) else None,
+            errors if isinstance(errors, int) else None,
+        )
 
 
 def _render_dashboard_html(context: Dict[str, Any]) -> str:
@@ -330,6 +373,9 @@ def _render_dashboard_html(context: Dict[str, Any]) -> str:
     top_products_rows = _render_table(context["top_products"])
     goal_rows = _render_table(context["catalog_goals"])
     _commit = f"{context['build_commit_short']} : {context['build_info']['timestamp']}"
+    built_at = context.get("snapshot_built_at") or datetime.now(timezone.utc)
+    _snapshot_iso = built_at.isoformat()
+    _snapshot_label = built_at.strftime("%H:%M:%S UTC")
     lead_rows_html = (
         "".join(
             "<tr>"
@@ -445,33 +491,37 @@ def _render_dashboard_html(context: Dict[str, Any]) -> str:
   </style>
   {plotly_script}
 </head>
-<body>
+<body data-live-id="{context.get("live_last_id", "")}">
   <header>
     <h1>Аналитика Five Keys</h1>
     <p class="build-info">Версия {context["build_info"]["version"]} · commit {_commit}</p>
+    <p class="build-info">
+      Данные от <time id="snapshot-built" datetime="{_snapshot_iso}">{_snapshot_label}</time>
+      <span id="snapshot-age"></span> · <a id="snapshot-refresh" href="?refresh=1">обновить</a>
+    </p>
   </header>
   <main>
     <section class=\"cards\">
       <article class=\"card\">
         <h2>Лиды всего</h2>
-        <div class=\"metric\">{context["leads_total"]}</div>
-        <p class=\"muted\">За 7 дней: {context["leads_recent"]}</p>
+        <div class=\"metric\" id=\"leads_total\">{context["leads_total"]}</div>
+        <p class=\"muted\">За 7 дней: <span id=\"leads_recent\">{context["leads_recent"]}</span></p>
       </article>
       <article class=\"card\">
         <h2>Завершено квизов</h2>
-        <div class=\"metric\">{context["quiz_total"]}</div>
+        <div class=\"metric\" id=\"quiz_total\">{context["quiz_total"]}</div>
       </article>
       <article class=\"card\">
         <h2>Калькуляторы</h2>
-        <div class=\"metric\">{context["calc_total"]}</div>
+        <div class=\"metric\" id=\"calc_total\">{context["calc_total"]}</div>
       </article>
       <article class=\"card\">
         <h2>Планы рекомендаций</h2>
-        <div class=\"metric\">{context["plans_total"]}</div>
+        <div class=\"metric\" id=\"plans_total\">{context["plans_total"]}</div>
       </article>
       <article class=\"card\">
         <h2>CTR (квиз → план)</h2>
-        <div class=\"metric\">{context["ctr"]:.2f}%</div>
+        <div class=\"metric\" id=\"ctr\">{context["ctr"]:.2f}%</div>
       </article>
       <article class=\"card\">
         <h2>Каталог</h2>
@@ -480,8 +530,9 @@ def _render_dashboard_html(context: Dict[str, Any]) -> str:
       </article>
       <article class=\"card\">
         <h2>Нагрузочный тест P95</h2>
-        <div class=\"metric\">{context["load_p95"]}</div>
-        <p class=\"muted\">Ошибки: {context["load_errors"]} · {context["load_timestamp"]}</p>
+        <div class=\"metric\" id=\"load_p95\">{context["load_p95"]}</div>
+        <p class=\"muted\">Ошибки: <span id=\"load_errors\">{context["load_errors"]}</span> ·
+          <span id=\"load_timestamp\">{context["load_timestamp"]}</span></p>
       </article>
       <article class=\"card\">
         <h2>UTM регистрации</h2>
@@ -529,12 +580,98 @@ def _render_dashboard_html(context: Dict[str, Any]) -> str:
         <thead>
           <tr><th>Дата</th><th>Имя</th><th>Телефон</th><th>Квиз</th><th>План</th><th>Продукты</th></tr>
         </thead>
-        <tbody>
+        <tbody id=\"recent-leads\">
           {lead_rows_html}
         </tbody>
       </table>
     </section>
   </main>
+  <script>
+    // The page is cached per data snapshot, so its age and the refresh link
+    // (which must keep the token query) are filled in by the browser.
+    (() => {{
+      const built = document.getElementById("snapshot-built");
+      const age = document.getElementById("snapshot-age");
+      const startedAt = Date.parse(built.getAttribute("datetime"));
+      const tick = () => {{
+        const seconds = Math.max(0, Math.round((Date.now() - startedAt) / 1000));
+        const label = seconds < 60 ? `${{seconds}} с` : `${{Math.floor(seconds / 60)}} мин`;
+        age.textContent = `(${{label}} назад)`;
+      }};
+      tick();
+      setInterval(tick, 5000);
+      const url = new URL(window.location.href);
+      url.searchParams.set("refresh", "1");
+      document.getElementById("snapshot-refresh").href = url.toString();
+    }})();
+
+    // Live deltas since the snapshot was built; see /admin/dashboard/live.
+    (() => {{
+      if (!window.EventSource) return;
+      const setText = (id, value) => {{
+        const node = document.getElementById(id);
+        if (node) node.textContent = value;
+      }};
+      const bump = (id, by) => {{
+        const node = document.getElementById(id);
+        if (node) node.textContent = String((parseInt(node.textContent, 10) || 0) + by);
+      }};
+      const formatDt = (iso) => {{
+        const date = new Date(iso);
+        if (Number.isNaN(date.getTime())) return "—";
+        return date.toISOString().slice(0, 16).replace("T", " ") + " UTC";
+      }};
+      const refreshCtr = () => {{
+        const quiz = parseInt(document.getElementById("quiz_total").textContent, 10) || 0;
+        const plans = parseInt(document.getElementById("plans_total").textContent, 10) || 0;
+        setText("ctr", (quiz ? (plans / quiz) * 100 : 0).toFixed(2) + "%");
+      }};
+
+      const url = new URL(window.location.href);
+      url.pathname = url.pathname.replace(/[/]$/, "") + "/live";
+      url.searchParams.delete("refresh");
+      url.searchParams.set("last_event_id", document.body.dataset.liveId || "");
+      const source = new EventSource(url.toString());
+
+      source.addEventListener("counters", (event) => {{
+        const counts = JSON.parse(event.data);
+        for (const [id, by] of Object.entries(counts)) bump(id, by);
+        refreshCtr();
+      }});
+      source.addEventListener("lead", (event) => {{
+        const lead = JSON.parse(event.data);
+        bump("leads_total", 1);
+        bump("leads_recent", 1);
+        const body = document.getElementById("recent-leads");
+        const placeholder = body.querySelector("td.muted");
+        if (placeholder) placeholder.parentElement.remove();
+        const row = document.createElement("tr");
+        for (const value of [formatDt(lead.created_at), lead.name, lead.phone, "—", "—", "—"]) {{
+          const cell = document.createElement("td");
+          cell.textContent = value;
+          row.appendChild(cell);
+        }}
+        body.prepend(row);
+        while (body.rows.length > 15) body.deleteRow(-1);
+      }});
+      source.addEventListener("load", (event) => {{
+        const run = JSON.parse(event.data);
+        setText("load_p95", run.p95 === null ? "—" : `${{Math.round(run.p95)}} ms`);
+        setText("load_errors", run.errors === null ? "—" : String(run.errors));
+        setText("load_timestamp", formatDt(run.timestamp));
+        const chart = document.getElementById("load-chart");
+        if (chart && window.Plotly && run.p95 !== null) {{
+          const label = formatDt(run.timestamp).replace(" UTC", "");
+          window.Plotly.extendTraces(chart, {{ x: [[label]], y: [[run.p95]] }}, [0]);
+        }}
+      }});
+      source.addEventListener("reset", () => {{
+        // The missed deltas are gone: start again from a fresh snapshot.
+        source.close();
+        window.location.href = document.getElementById("snapshot-refresh").href;
+      }});
+    }})();
+  </script>
 </body>
 </html>
 """
@@ -542,13 +679,18 @@ def _render_dashboard_html(context: Dict[str, Any]) -> str:
 
 async def _gather_dashboard_context() -> Dict[str, Any]:
     build = get_build_info()
+    # Taken before the queries: the page replays live deltas from here on.
+    live_last_id = live.hub.last_id
     utm_metrics: Dict[growth_attribution.UtmKey, growth_attribution.UtmFunnelMetrics] = {}
-    async with session_scope() as session:
+    async with read_session_scope() as session:
         quiz_counts, quiz_total = await _collect_event_stats(session, "quiz_finish", "quiz")
         calc_counts, calc_total = await _collect_event_stats(session, "calc_finish", "calc")
         plans_total, products_counter = await _collect_plan_stats(session)
         leads_total, leads_recent, recent_leads = await _collect_lead_details(session)
-        utm_metrics = await growth_attribution.collect_funnel_metrics(session)
+        if settings.UTM_FUNNEL_REFRESH_MINUTES > 0:
+            utm_metrics = await growth_attribution.load_funnel_metrics(session)
+        else:
+            utm_metrics = await growth_attribution.collect_funnel_metrics(session)
 
     ctr = (plans_total / quiz_total * 100.0) if quiz_total else 0.0
 
@@ -573,6 +715,7 @@ async def _gather_dashboard_context() -> Dict[str, Any]:
     ctr_chart = _build_ctr_gauge(ctr)
 
     load_history = _load_load_history()
+    _mark_load_report_seen(load_history)
     load_chart = _build_load_chart(load_history)
     if load_history:
         latest_run = load_history[-1]
@@ -618,6 +761,7 @@ async def _gather_dashboard_context() -> Dict[str, Any]:
         "utm_total_reg": utm_total.registrations,
         "utm_ctr": utm_total.quiz_ctr,
         "utm_cr": utm_total.premium_cr,
+        "live_last_id": live_last_id,
         "build_info": build,
         "build_commit_short": (
             build["commit"][:7] if build["commit"] not in {"unknown", ""} else build["commit"]
@@ -1395,20 +1539,29 @@ async def _gather_links_state() -> Dict[str, Any]:
 
 
 @app.get("/links", response_class=HTMLResponse)
-async def links_page(_: None = Depends(_require_token)) -> HTMLResponse:
-    return HTMLResponse(_render_links_page())
+async def links_page(request: Request, _: None = Depends(_require_token)) -> Response:
+    async def _render() -> http_cache.CachedBody:
+        return http_cache.build_body(_render_links_page(), http_cache.HTML)
+
+    return http_cache.respond(request, await _responses.get("links_page", None, _render))
 
 
 @app.get("/links/data")
-async def links_data(_: None = Depends(_require_token)) -> Dict[str, Any]:
-    data = await _gather_links_state()
-    return {"ok": True, "data": data}
+async def links_data(request: Request, _: None = Depends(_require_token)) -> Response:
+    async def _render() -> http_cache.CachedBody:
+        return http_cache.json_body({"ok": True, "data": await _gather_links_state()})
+
+    version = (await links_revision(), catalog_revision())
+    return http_cache.respond(request, await _responses.get("links_data", version, _render))
 
 
 @app.get("/links/export")
-async def links_export(_: None = Depends(_require_token)) -> Dict[str, Any]:
-    data = await export_set(None)
-    return {"ok": True, "data": data}
+async def links_export(request: Request, _: None = Depends(_require_token)) -> Response:
+    async def _render() -> http_cache.CachedBody:
+        return http_cache.json_body({"ok": True, "data": await export_set(None)})
+
+    version = await links_revision()
+    return http_cache.respond(request, await _responses.get("links_export", version, _render))
 
 
 @app.post("/links/register")
@@ -1486,8 +1639,47 @@ async def links_switch(
     return {"ok": True, "message": f"Активный сет переключён на {payload.target}"}
 
 
+# Rendered pages and payloads, reused until their data version changes.
+_responses = http_cache.ResponseCache()
+
+dashboard_snapshot = snapshots.register(
+    SnapshotService("dashboard", _gather_dashboard_context, max_age=settings.ADMIN_SNAPSHOT_MAX_AGE)
+)
+
+
 @app.get("/admin/dashboard", response_class=HTMLResponse)
-async def dashboard(_: None = Depends(_require_token)) -> HTMLResponse:
-    context = await _gather_dashboard_context()
-    html = _render_dashboard_html(context)
-    return HTMLResponse(html)
+async def dashboard(
+    request: Request, refresh: bool = False, _: None = Depends(_require_token)
+) -> Response:
+    if refresh:
+        await dashboard_snapshot.refresh()
+        target = request.url.remove_query_params("refresh")
+        return RedirectResponse(str(target), status_code=303)
+
+    snapshot = await dashboard_snapshot.get()
+
+    async def _render() -> http_cache.CachedBody:
+        context = {**snapshot.value, "snapshot_built_at": snapshot.built_at}
+        return http_cache.build_body(_render_dashboard_html(context), http_cache.HTML)
+
+    cached = await _responses.get("dashboard", snapshot.built_at, _render)
+    return http_cache.respond(request, cached)
+
+
+@app.get("/admin/dashboard/live")
+async def dashboard_live(
+    request: Request, last_event_id: str | None = None, _: None = Depends(_require_token)
+) -> StreamingResponse:
+    # EventSource sends Last-Event-ID itself on reconnect; the query parameter
+    # only carries the id the page was rendered at.
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    frames = live.hub.stream(
+        resume_from,
+        heartbeat=settings.DASHBOARD_LIVE_HEARTBEAT,
+        on_heartbeat=_poll_load_report,
+    )
+    return StreamingResponse(
+        frames,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
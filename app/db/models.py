@@ -7,18 +7,21 @@ from sqlalchemy import (
     JSON,
     BigInteger,
     Boolean,
+    Computed,
     Date,
     DateTime,
     Float,
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     SmallInteger,
     String,
     Text,
     Time,
     UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
@@ -31,12 +34,18 @@ class Base(DeclarativeBase):
 _json_meta_type = JSONB().with_variant(JSON(), "sqlite")
 _bigint_pk = BigInteger().with_variant(Integer(), "sqlite")
 
+# ``->>`` extracts a top-level key as text on both SQLite (3.38+) and PostgreSQL.
+EVENT_META_COLUMNS = {
+    key: f"substr(meta ->> '{key}', 1, 128)" for key in ("quiz", "calc", "source")
+}
+
 
 class User(Base):
     __tablename__ = "users"
     __table_args__ = (
         Index("ix_users_username", "username"),
         Index("ix_users_referred_by", "referred_by"),
+        Index("ix_users_created", "created"),
     )
 
     id: Mapped[int] = mapped_column(_bigint_pk, primary_key=True)
@@ -61,7 +70,11 @@ class User(Base):
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
-    __table_args__ = (UniqueConstraint("user_id", name="uq_subscriptions_user"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", name="uq_subscriptions_user"),
+        Index("ix_subscriptions_until", "until"),
+        Index("ix_subscriptions_started_at", "started_at"),
+    )
 
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), primary_key=True)
     plan: Mapped[str] = mapped_column(String(16), nullable=False)
@@ -139,6 +152,7 @@ class Referral(Base):
     __tablename__ = "referrals"
     __table_args__ = (
         Index("ix_ref_user", "user_id"),
+        Index("ix_ref_user_joined", "user_id", "joined_at"),
         Index("ix_ref_invited", "invited_id"),
         Index("ix_ref_conv", "converted_at"),
         UniqueConstraint("user_id", "invited_id", name="uq_referrals_user_invited"),
@@ -173,8 +187,11 @@ class PromoUsage(Base):
 class Event(Base):
     __tablename__ = "events"
     __table_args__ = (
-        Index("ix_events_user", "user_id"),
-        Index("ix_events_name", "name"),
+        Index("ix_events_user_name_ts", "user_id", "name", "ts"),
+        Index("ix_events_user_ts", "user_id", "ts"),
+        # Covers (name, ts) lookups and lets windowed breakdowns read the
+        # generated meta columns from the index.
+        Index("ix_events_name_ts_meta", "name", "ts", "quiz", "calc", "source"),
         Index("ix_events_ts", "ts"),
     )
 
@@ -185,6 +202,66 @@ class Event(Base):
     ts: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=func.now()
     )
+    # Hot meta keys extracted by the database (virtual on SQLite, stored on
+    # PostgreSQL) so breakdowns group and filter without decoding ``meta``.
+    quiz: Mapped[Optional[str]] = mapped_column(
+        String(128), Computed(EVENT_META_COLUMNS["quiz"]), nullable=True
+    )
+    calc: Mapped[Optional[str]] = mapped_column(
+        String(128), Computed(EVENT_META_COLUMNS["calc"]), nullable=True
+    )
+    source: Mapped[Optional[str]] = mapped_column(
+        String(128), Computed(EVENT_META_COLUMNS["source"]), nullable=True
+    )
+
+
+class UserEventState(Base):
+    # Latest event per (user, name); kept in sync by app.repo.events on every write.
+    __tablename__ = "user_event_state"
+    __table_args__ = (Index("ix_user_event_state_name_ts", "name", "last_ts"),)
+
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    last_ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_meta: Mapped[dict] = mapped_column(_json_meta_type, nullable=False, default=dict)
+
+
+class EventDailyCount(Base):
+    # Per-day event counts; dimension "" holds the total, other rows break it down by a meta key.
+    __tablename__ = "event_daily_counts"
+    __table_args__ = (Index("ix_event_daily_counts_day", "day"),)
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    dimension: Mapped[str] = mapped_column(String(32), primary_key=True, default="")
+    value: Mapped[str] = mapped_column(String(128), primary_key=True, default="")
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    last_event_id: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()
+    )
+
+
+class BroadcastRecipient(Base):
+    # Per-recipient progress of a scheduler broadcast; see app.broadcast.
+    __tablename__ = "broadcast_recipients"
+    __table_args__ = (
+        Index("ix_broadcast_recipients_run_status", "run_key", "status", "user_id"),
+        Index("ix_broadcast_recipients_updated", "updated_at"),
+    )
+
+    run_key: Mapped[str] = mapped_column(String(96), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
 
 class Lead(Base):
@@ -206,6 +283,7 @@ class TrackEvent(Base):
     __tablename__ = "track_events"
     __table_args__ = (
         Index("ix_track_events_user_kind_ts", "user_id", "kind", "ts"),
+        Index("ix_track_events_user_ts", "user_id", "ts"),
         Index("ix_track_events_ts", "ts"),
     )
 
@@ -220,16 +298,41 @@ class TrackEvent(Base):
 
 class UserProfile(Base):
     __tablename__ = "user_profiles"
+    __table_args__ = (
+        Index("ix_user_profiles_utm_key", "utm_key"),
+        Index("ix_user_profiles_utm_updated_at", "utm_updated_at"),
+    )
 
     user_id: Mapped[int] = mapped_column(
         BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
     )
     plan_json: Mapped[dict | None] = mapped_column(_json_meta_type, nullable=True)
     utm: Mapped[dict | None] = mapped_column(_json_meta_type, nullable=True)
+    # Normalized ``utm`` (see app.growth.attribution.encode_utm_key), set on save.
+    utm_key: Mapped[Optional[str]] = mapped_column(String(520), nullable=True)
+    utm_updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
 
     user: Mapped["User"] = relationship(back_populates="profile")
 
 
+class UtmFunnelMember(Base):
+    # Funnel flags per attributed user; refreshed incrementally by app.growth.attribution.
+    __tablename__ = "utm_funnel_members"
+    __table_args__ = (
+        Index("ix_utm_funnel_members_key", "utm_key", "quiz_started", "recommended", "premium"),
+        Index("ix_utm_funnel_members_refreshed", "refreshed_at"),
+    )
+
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    utm_key: Mapped[str] = mapped_column(String(520), nullable=False)
+    quiz_started: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    recommended: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    premium: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
 class RetentionPush(Base):
     __tablename__ = "retention_pushes"
     __table_args__ = (UniqueConstraint("user_id", "flow", name="uq_retention_push"),)
@@ -263,6 +366,8 @@ class RetentionSetting(Base):
         DateTime(timezone=True), nullable=True
     )
     last_tip_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Bitmap of tip ids in the current no-repeat window; see app.services.tip_pool.
+    tips_seen: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
     water_enabled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     water_window_start: Mapped[time] = mapped_column(Time, nullable=False, default=time(9, 0))
     water_window_end: Mapped[time] = mapped_column(Time, nullable=False, default=time(21, 0))
@@ -278,7 +383,16 @@ class RetentionSetting(Base):
 
 class RetentionJourney(Base):
     __tablename__ = "retention_journeys"
-    __table_args__ = (Index("ix_retention_journeys_schedule", "journey", "scheduled_at"),)
+    __table_args__ = (
+        Index("ix_retention_journeys_schedule", "journey", "scheduled_at"),
+        Index("ix_retention_journeys_user", "user_id", "journey"),
+        Index(
+            "ix_retention_journeys_pending",
+            "scheduled_at",
+            sqlite_where=text("sent_at IS NULL"),
+            postgresql_where=text("sent_at IS NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
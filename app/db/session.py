@@ -5,15 +5,18 @@ import inspect
 import logging
 from contextlib import asynccontextmanager, suppress
 from pathlib import Path
-from typing import Any, AsyncIterator
+from typing import Any, AsyncIterator, Callable
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import settings
 
@@ -81,15 +84,83 @@ def _alembic_head_revision_sync(db_url: str) -> str | None:
     return script.get_current_head()
 
 
+_SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+DB_WRITE_POOL_SIZE = 5
+
+
+def _is_sqlite_file(db_url: str) -> bool:
+    url = make_url(db_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def sqlite_pragmas(*, read_only: bool = False) -> list[str]:
+    """Return the PRAGMA statements applied to every new SQLite connection."""
+
+    synchronous = str(settings.SQLITE_SYNCHRONOUS).upper()
+    if synchronous not in _SYNCHRONOUS_MODES:
+        synchronous = "NORMAL"
+    pragmas = [
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}",
+        # A negative cache_size is a budget in KiB rather than in pages.
+        f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def _install_pragmas(engine: AsyncEngine, pragmas: list[str]) -> None:
+    if not isinstance(getattr(engine, "sync_engine", None), Engine):
+        return  # engine factory patched out (import smoke tests)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def build_engine(db_url: str, *, read_only: bool = False, tuned: bool | None = None) -> AsyncEngine:
+    """Create an async engine, tuning SQLite file databases on connect.
+
+    ``read_only`` engines get ``query_only`` connections and their own pool so
+    reports never hold a writer connection.  With WAL they read a consistent
+    snapshot while bot handlers keep writing.
+    """
+
+    tuned = settings.SQLITE_TUNING_ENABLED if tuned is None else tuned
+    kwargs: dict[str, Any] = {"echo": False, "pool_pre_ping": True}
+    if read_only:
+        kwargs.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.DB_READ_POOL_SIZE,
+            max_overflow=0,
+        )
+    elif tuned and _is_sqlite_file(db_url):
+        # Keep connections (and their pragmas) instead of reopening the file per session.
+        kwargs.update(
+            poolclass=AsyncAdaptedQueuePool, pool_size=DB_WRITE_POOL_SIZE, max_overflow=10
+        )
+    engine = create_async_engine(db_url, **kwargs)
+    if tuned and _is_sqlite_file(db_url):
+        _install_pragmas(engine, sqlite_pragmas(read_only=read_only))
+    elif read_only and make_url(db_url).get_backend_name() == "sqlite":
+        _install_pragmas(engine, ["PRAGMA query_only=ON"])
+    return engine
+
+
 _DB_URL = settings.DB_URL
 _ensure_sqlite_dir(_DB_URL)
 
 try:
-    async_engine = create_async_engine(
-        _DB_URL,
-        echo=False,
-        pool_pre_ping=True,
-    )
+    async_engine = build_engine(_DB_URL)
 except ModuleNotFoundError as exc:  # pragma: no cover - driver missing only in CI sandbox
     if "aiosqlite" in str(exc):
         async_engine = None  # type: ignore[assignment]
@@ -104,8 +175,52 @@ if async_engine is not None:
         expire_on_commit=False,
         class_=AsyncSession,
     )
+    # An in-memory SQLite database exists per connection, so reads share the
+    # writer engine there; a file database gets its own read-only pool.
+    if _is_sqlite_file(_DB_URL):
+        read_engine = build_engine(_DB_URL, read_only=True)
+        read_session_factory = async_sessionmaker(
+            read_engine,
+            expire_on_commit=False,
+            class_=AsyncSession,
+        )
+    else:
+        read_engine = async_engine
+        read_session_factory = async_session_factory
 else:  # pragma: no cover - triggered only when driver missing
     async_session_factory = None
+    read_engine = None  # type: ignore[assignment]
+    read_session_factory = None
+
+
+_AFTER_COMMIT = "after_commit_callbacks"
+
+
+def after_commit(session: Any, callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the session's transaction commits; a rollback drops it.
+
+    Sessions without a real transaction (test doubles) run it immediately.
+    """
+
+    sync = getattr(session, "sync_session", session)
+    if not isinstance(sync, Session):
+        callback()
+        return
+    sync.info.setdefault(_AFTER_COMMIT, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session) -> None:
+    for callback in session.info.pop(_AFTER_COMMIT, ()):
+        try:
+            callback()
+        except Exception:  # noqa: BLE001 - the commit already happened
+            log.exception("after-commit callback failed")
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_after_commit(session: Session) -> None:
+    session.info.pop(_AFTER_COMMIT, None)
 
 
 @asynccontextmanager
@@ -118,6 +233,18 @@ async def session_scope() -> AsyncIterator[AsyncSession]:
         yield session
 
 
+@asynccontextmanager
+async def read_session_scope() -> AsyncIterator[AsyncSession]:
+    """Session on the read-only pool for dashboards and admin reports."""
+
+    if read_session_factory is None:
+        raise RuntimeError(
+            "aiosqlite driver is not installed; install aiosqlite to use database features",
+        ) from _ENGINE_IMPORT_ERROR
+    async with read_session_factory() as session:
+        yield session
+
+
 @asynccontextmanager
 async def compat_session(scope_factory) -> AsyncIterator[Any]:
     """Adapt patched session_scope replacements used in tests."""
@@ -0,0 +1,290 @@
+"""Buffered writer that batches analytics events into bulk inserts."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, AsyncContextManager, Callable, Dict, Optional
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import live
+from app.db.session import session_scope
+from app.metrics import record_events
+from app.repo import events as events_repo
+
+EVENT_SINK_MAXSIZE = int(os.getenv("EVENT_SINK_MAXSIZE", "10000"))
+EVENT_SINK_BATCH = int(os.getenv("EVENT_SINK_BATCH", "500"))
+EVENT_SINK_INTERVAL = float(os.getenv("EVENT_SINK_INTERVAL", "1.0"))
+# Consecutive failures of the same batch before it is split to find bad rows.
+EVENT_SINK_MAX_ATTEMPTS = int(os.getenv("EVENT_SINK_MAX_ATTEMPTS", "3"))
+# ``drop_new`` rejects events while the buffer is full, ``drop_oldest`` evicts
+# the oldest buffered event instead.
+EVENT_SINK_OVERFLOW = os.getenv("EVENT_SINK_OVERFLOW", "drop_new").strip().lower()
+
+SessionFactory = Callable[[], AsyncContextManager[AsyncSession]]
+
+# The database itself is unavailable; no row is to blame, so nothing is dropped.
+_TRANSIENT_ERRORS = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+
+
+class EventSink:
+    """Bounded in-process buffer flushed to ``events`` in batches.
+
+    :meth:`emit` never awaits: it stamps the event and appends it to the
+    buffer.  Once :meth:`start` runs, a flusher task writes a batch every
+    ``interval`` seconds, or as soon as ``batch_size`` events are waiting,
+    with one multi-row insert per batch; without it events wait for an
+    explicit :meth:`flush`.  When the buffer is full, :meth:`emit` applies
+    the overflow policy while :meth:`put` waits for room instead.  A failed
+    batch goes back to the front of the buffer and is retried on the next
+    flush; after ``max_attempts`` failures in a row it is written in halves,
+    and a row that still fails on its own is logged and dropped.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = EVENT_SINK_MAXSIZE,
+        batch_size: int = EVENT_SINK_BATCH,
+        interval: float = EVENT_SINK_INTERVAL,
+        overflow: str = EVENT_SINK_OVERFLOW,
+        max_attempts: int = EVENT_SINK_MAX_ATTEMPTS,
+        session_factory: SessionFactory = session_scope,
+    ) -> None:
+        if overflow not in ("drop_new", "drop_oldest"):
+            raise ValueError(f"unknown overflow policy: {overflow}")
+        self._maxsize = max(1, int(maxsize))
+        self._batch_size = max(1, int(batch_size))
+        self._interval = max(0.01, float(interval))
+        self._overflow = overflow
+        self._max_attempts = max(1, int(max_attempts))
+        self._head_failures = 0
+        self._session_factory = session_factory
+        self._buffer: deque[Dict[str, Any]] = deque()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._space: asyncio.Event | None = None
+        self._lock: asyncio.Lock | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._closing = False
+        self._log = logging.getLogger("events.sink")
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+        self.poisoned = 0
+
+    def _bind(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._space = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._task = None
+        return loop
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the flusher on the running loop (no-op when already running)."""
+
+        loop = self._bind()
+        if not self.started:
+            self._closing = False
+            self._task = loop.create_task(self._run(), name="event-sink")
+
+    async def stop(self) -> None:
+        """Stop the flusher and write every buffered event."""
+
+        task, self._task = self._task, None
+        if task is not None:
+            self._closing = True
+            self._wake.set()
+            await task
+        await self.flush()
+
+    def emit(
+        self, user_id: Optional[int], name: str, meta: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Queue one event without blocking; ``False`` when it was dropped."""
+
+        if len(self._buffer) >= self._maxsize:
+            self.dropped += 1
+            if self._overflow == "drop_new":
+                self._log.debug("event buffer full; dropped %s", name)
+                return False
+            self._buffer.popleft()
+        self._buffer.append(
+            {
+                "user_id": user_id,
+                "name": name,
+                "meta": meta or {},
+                "ts": datetime.now(timezone.utc),
+            }
+        )
+        self.enqueued += 1
+        if self._wake is not None and len(self._buffer) >= self._batch_size:
+            self._wake.set()
+        return True
+
+    async def put(
+        self, user_id: Optional[int], name: str, meta: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Queue one event, waiting for the flusher while the buffer is full."""
+
+        self.start()
+        while len(self._buffer) >= self._maxsize:
+            self._space.clear()
+            self._wake.set()
+            await self._space.wait()
+        self.emit(user_id, name, meta)
+
+    async def flush(self) -> int:
+        """Write everything buffered so far and return the number of events written."""
+
+        self._bind()
+        written = 0
+        async with self._lock:
+            while self._buffer:
+                count = min(self._batch_size, len(self._buffer))
+                batch = [self._buffer.popleft() for _ in range(count)]
+                self._space.set()
+                try:
+                    await self._write(batch)
+                except BaseException as exc:
+                    if not isinstance(exc, Exception):
+                        self._requeue(batch)
+                        raise
+                    self.failed_batches += 1
+                    self._head_failures += 1
+                    if self._head_failures < self._max_attempts:
+                        self._requeue(batch)
+                        self._log.exception("event batch of %s failed; will retry", len(batch))
+                        break
+                    self._head_failures = 0
+                    try:
+                        batch, pending = await self._isolate(batch)
+                    except BaseException:
+                        self._requeue(batch)
+                        raise
+                    self._requeue(pending)
+                else:
+                    self._head_failures = 0
+                    pending = []
+                self._done(batch)
+                written += len(batch)
+                if pending:
+                    break
+        return written
+
+    async def _write(self, batch: list[Dict[str, Any]]) -> None:
+        async with self._session_factory() as session:
+            await events_repo.insert_many(session, batch)
+            await session.commit()
+
+    def _done(self, batch: list[Dict[str, Any]]) -> None:
+        self.written += len(batch)
+        names = [row["name"] for row in batch]
+        record_events(names)
+        live.record_events(names)
+
+    async def _isolate(
+        self, batch: list[Dict[str, Any]]
+    ) -> tuple[list[Dict[str, Any]], list[Dict[str, Any]]]:
+        """Write a repeatedly failing batch in halves, dropping rows that fail alone.
+
+        Returns the rows written and the rows left for a later flush: all the
+        untried ones once the database itself turns out to be unavailable.
+        """
+
+        written: list[Dict[str, Any]] = []
+        parts = [batch]
+        while parts:
+            part = parts.pop()
+            try:
+                await self._write(part)
+            except _TRANSIENT_ERRORS:
+                self._log.exception("event database unavailable; will retry")
+                return written, [row for chunk in [part, *reversed(parts)] for row in chunk]
+            except Exception as exc:
+                if len(part) > 1:
+                    middle = len(part) // 2
+                    parts += [part[middle:], part[:middle]]
+                    continue
+                row = part[0]
+                self.poisoned += 1
+                self._log.error(
+                    "dropping event %s for user %s that cannot be written: %r (meta=%r)",
+                    row["name"],
+                    row["user_id"],
+                    exc,
+                    row["meta"],
+                )
+                continue
+            written += part
+        return written, []
+
+    def _requeue(self, batch: list[Dict[str, Any]]) -> None:
+        self._buffer.extendleft(reversed(batch))
+        while len(self._buffer) > self._maxsize:
+            self._buffer.pop()
+            self.dropped += 1
+
+    async def _run(self) -> None:
+        while not self._closing:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), self._interval)
+            self._wake.clear()
+            if self._closing:
+                break
+            try:
+                await self.flush()
+            except Exception:  # pragma: no cover - flush already logs batch failures
+                self._log.exception("event flush failed")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queued": len(self._buffer),
+            "maxsize": self._maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+            "poisoned": self.poisoned,
+        }
+
+
+event_sink = EventSink()
+
+
+def emit(user_id: Optional[int], name: str, meta: Optional[Dict[str, Any]] = None) -> bool:
+    """Queue an analytics event on the shared sink without awaiting the database."""
+
+    return event_sink.emit(user_id, name, meta)
+
+
+async def start_event_sink() -> EventSink:
+    event_sink.start()
+    return event_sink
+
+
+async def stop_event_sink() -> None:
+    await event_sink.stop()
+
+
+__all__ = [
+    "EventSink",
+    "emit",
+    "event_sink",
+    "start_event_sink",
+    "stop_event_sink",
+]
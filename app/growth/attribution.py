@@ -2,19 +2,33 @@
 
 from __future__ import annotations
 
+import os
 from collections import defaultdict
-from collections.abc import Mapping
+from collections.abc import Iterable, Mapping, Sequence
 from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
 from urllib.parse import parse_qsl, quote_plus, unquote_plus, urlencode
 
-from sqlalchemy import distinct, select
+from sqlalchemy import Join, and_, func, outerjoin, select, union
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.elements import ColumnElement
 
-from app.db.models import Event, Subscription, UserProfile
+from app.db.models import Subscription, UserEventState, UserProfile, UtmFunnelMember
 
 UTM_KEYS: tuple[str, ...] = ("utm_source", "utm_medium", "utm_campaign", "utm_content")
 UtmKey = tuple[str, str, str, str]
 
+# Events that move a user down the funnel.
+FUNNEL_EVENTS: tuple[str, ...] = ("quiz_start", "plan_generated")
+FUNNEL_BATCH = int(os.getenv("UTM_FUNNEL_BATCH", "5000"))
+# Event state rows carry the event time, which can trail the commit (the event
+# sink buffers writes), so each refresh looks back this far past the last run.
+FUNNEL_OVERLAP_SECONDS = float(os.getenv("UTM_FUNNEL_OVERLAP", "600"))
+_KEY_SEPARATOR = "\x1f"
+
 
 @dataclass(slots=True)
 class UtmFunnelMetrics:
@@ -106,6 +120,7 @@ def _key_from_payload(utm: Mapping[str, object] | None) -> UtmKey | None:
             cleaned = ""
         else:
             cleaned = str(raw).strip()
+        cleaned = cleaned.replace(_KEY_SEPARATOR, " ")
         if cleaned:
             has_value = True
             values.append(cleaned[:128])
@@ -116,61 +131,159 @@ def _key_from_payload(utm: Mapping[str, object] | None) -> UtmKey | None:
     return tuple(values)  # type: ignore[return-value]
 
 
-async def _load_utm_map(session: AsyncSession) -> dict[int, UtmKey]:
-    stmt = select(UserProfile.user_id, UserProfile.utm).where(UserProfile.utm.is_not(None))
-    result = await session.execute(stmt)
-    mapping: dict[int, UtmKey] = {}
-    for user_id, payload in result.all():
-        key = _key_from_payload(payload)
-        if key is None:
-            continue
-        mapping[int(user_id)] = key
-    return mapping
+def encode_utm_key(utm: Mapping[str, object] | None) -> str | None:
+    """Return the normalized key stored in ``user_profiles.utm_key``."""
 
+    key = _key_from_payload(utm)
+    if key is None:
+        return None
+    return _KEY_SEPARATOR.join(key)
 
-async def collect_funnel_metrics(session: AsyncSession) -> dict[UtmKey, UtmFunnelMetrics]:
-    """Aggregate registrations and key actions by UTM."""
 
-    utm_map = await _load_utm_map(session)
-    metrics: dict[UtmKey, UtmFunnelMetrics] = defaultdict(UtmFunnelMetrics)
-    if not utm_map:
-        return {}
+def decode_utm_key(value: str) -> UtmKey:
+    parts = value.split(_KEY_SEPARATOR)
+    parts += ["—"] * (len(UTM_KEYS) - len(parts))
+    return tuple(parts[: len(UTM_KEYS)])  # type: ignore[return-value]
+
 
-    for key in utm_map.values():
-        metrics[key].registrations += 1
+def _funnel_source() -> tuple[Join, list[ColumnElement[Any]]]:
+    """Attributed profiles joined to the per-user state rows and subscriptions.
 
-    user_ids = list(utm_map.keys())
+    ``user_event_state`` holds one row per user and event name, so every join
+    is a primary-key lookup and archived events still count.  The returned
+    columns are ``NULL`` unless the user reached that funnel step.
+    """
 
-    quiz_stmt = (
-        select(distinct(Event.user_id))
-        .where(Event.name == "quiz_start", Event.user_id.in_(user_ids))
-        .where(Event.user_id.is_not(None))
+    quiz = aliased(UserEventState)
+    plan = aliased(UserEventState)
+    source = (
+        outerjoin(
+            UserProfile,
+            quiz,
+            and_(quiz.user_id == UserProfile.user_id, quiz.name == "quiz_start"),
+        )
+        .outerjoin(plan, and_(plan.user_id == UserProfile.user_id, plan.name == "plan_generated"))
+        .outerjoin(Subscription, Subscription.user_id == UserProfile.user_id)
     )
-    quiz_users = (await session.execute(quiz_stmt)).scalars().all()
-    for user_id in quiz_users:
-        key = utm_map.get(int(user_id))
-        if key is not None:
-            metrics[key].quiz_starts += 1
-
-    recommend_stmt = (
-        select(distinct(Event.user_id))
-        .where(Event.name == "plan_generated", Event.user_id.in_(user_ids))
-        .where(Event.user_id.is_not(None))
+    return source, [quiz.user_id, plan.user_id, Subscription.user_id]
+
+
+def _metrics_from_rows(rows: Iterable[Sequence[Any]]) -> dict[UtmKey, UtmFunnelMetrics]:
+    metrics: dict[UtmKey, UtmFunnelMetrics] = defaultdict(UtmFunnelMetrics)
+    for utm_key, registrations, quiz_starts, recommendations, premium_buys in rows:
+        item = metrics[decode_utm_key(utm_key)]
+        item.registrations += int(registrations or 0)
+        item.quiz_starts += int(quiz_starts or 0)
+        item.recommendations += int(recommendations or 0)
+        item.premium_buys += int(premium_buys or 0)
+    return dict(metrics)
+
+
+async def collect_funnel_metrics(session: AsyncSession) -> dict[UtmKey, UtmFunnelMetrics]:
+    """Aggregate registrations and key actions by UTM."""
+
+    source, steps = _funnel_source()
+    stmt = (
+        select(UserProfile.utm_key, func.count(), *(func.count(step) for step in steps))
+        .select_from(source)
+        .where(UserProfile.utm_key.is_not(None))
+        .group_by(UserProfile.utm_key)
     )
-    recommend_users = (await session.execute(recommend_stmt)).scalars().all()
-    for user_id in recommend_users:
-        key = utm_map.get(int(user_id))
-        if key is not None:
-            metrics[key].recommendations += 1
-
-    premium_stmt = select(Subscription.user_id).where(Subscription.user_id.in_(user_ids))
-    premium_users = (await session.execute(premium_stmt)).scalars().all()
-    for user_id in premium_users:
-        key = utm_map.get(int(user_id))
-        if key is not None:
-            metrics[key].premium_buys += 1
-
-    return metrics
+    return _metrics_from_rows((await session.execute(stmt)).all())
+
+
+async def _upsert_members(session: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        module = postgresql if dialect == "postgresql" else sqlite
+        stmt = module.insert(UtmFunnelMember)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UtmFunnelMember.user_id],
+            set_={
+                column: stmt.excluded[column]
+                for column in ("utm_key", "quiz_started", "recommended", "premium", "refreshed_at")
+            },
+        )
+        await session.execute(stmt, rows)
+        return
+    for row in rows:
+        await session.merge(UtmFunnelMember(**row))
+    await session.flush()
+
+
+async def refresh_funnel(
+    session: AsyncSession, *, now: datetime | None = None, batch: int = FUNNEL_BATCH
+) -> int:
+    """Re-derive funnel flags for users changed since the previous refresh.
+
+    The previous run is the newest ``refreshed_at``; a user changed if their
+    UTM was saved, a funnel event was logged or a subscription started after
+    it (minus ``FUNNEL_OVERLAP_SECONDS`` for late commits).  The first run
+    covers every attributed profile.  Deleted subscriptions are only picked up
+    by :func:`collect_funnel_metrics`.  Returns the number of users refreshed;
+    the caller commits.
+    """
+
+    now = now or datetime.now(timezone.utc)
+    source, steps = _funnel_source()
+    conditions: list[ColumnElement[Any]] = [UserProfile.utm_key.is_not(None)]
+    last_run = (await session.execute(select(func.max(UtmFunnelMember.refreshed_at)))).scalar()
+    if last_run is not None:
+        if last_run.tzinfo is None:
+            last_run = last_run.replace(tzinfo=timezone.utc)
+        since = last_run - timedelta(seconds=FUNNEL_OVERLAP_SECONDS)
+        changed = union(
+            select(UserProfile.user_id).where(UserProfile.utm_updated_at >= since),
+            select(UserEventState.user_id).where(
+                UserEventState.name.in_(FUNNEL_EVENTS), UserEventState.last_ts >= since
+            ),
+            select(Subscription.user_id).where(Subscription.started_at >= since),
+        )
+        conditions.append(UserProfile.user_id.in_(changed.scalar_subquery()))
+
+    refreshed = 0
+    after: int | None = None
+    while True:
+        stmt = (
+            select(UserProfile.user_id, UserProfile.utm_key, *steps)
+            .select_from(source)
+            .where(*conditions)
+        )
+        if after is not None:
+            stmt = stmt.where(UserProfile.user_id > after)
+        result = await session.execute(stmt.order_by(UserProfile.user_id).limit(batch))
+        rows = [
+            {
+                "user_id": int(user_id),
+                "utm_key": utm_key,
+                "quiz_started": quiz_started is not None,
+                "recommended": recommended is not None,
+                "premium": premium is not None,
+                "refreshed_at": now,
+            }
+            for user_id, utm_key, quiz_started, recommended, premium in result.all()
+        ]
+        if not rows:
+            break
+        await _upsert_members(session, rows)
+        refreshed += len(rows)
+        after = rows[-1]["user_id"]
+        if len(rows) < batch:
+            break
+    return refreshed
+
+
+async def load_funnel_metrics(session: AsyncSession) -> dict[UtmKey, UtmFunnelMetrics]:
+    """Aggregate the funnel as of the last :func:`refresh_funnel` run."""
+
+    stmt = select(
+        UtmFunnelMember.utm_key,
+        func.count(),
+        func.count().filter(UtmFunnelMember.quiz_started),
+        func.count().filter(UtmFunnelMember.recommended),
+        func.count().filter(UtmFunnelMember.premium),
+    ).group_by(UtmFunnelMember.utm_key)
+    return _metrics_from_rows((await session.execute(stmt)).all())
 
 
 def summarize(metrics: Mapping[UtmKey, UtmFunnelMetrics]) -> UtmFunnelMetrics:
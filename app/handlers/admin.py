@@ -9,28 +9,31 @@ from aiogram import Router
 from aiogram.filters import Command, CommandObject
 from aiogram.types import BufferedInputFile, FSInputFile, Message
 
-from app.catalog.loader import CATALOG_FILE, CATALOG_SHA, CatalogError, load_catalog
+from app import snapshots
+from app.catalog import loader as catalog_loader
+from app.catalog.loader import CATALOG_FILE, CatalogError, load_catalog
 from app.catalog.report import CatalogReportError, get_catalog_report
 from app.config import settings
 from app.db.session import (
     compat_session,
     current_revision,
     head_revision,
-    session_scope,
+    read_session_scope,
     upgrade_to_head,
 )
 from app.feature_flags import feature_flags
 from app.link_manager import active_set_name
 from app.middlewares import is_callback_trace_enabled, set_callback_trace_enabled
 from app.repo import (
-    events as events_repo,
     leads as leads_repo,
     referrals as referrals_repo,
     retention as retention_repo,
+    rollups as rollups_repo,
     subscriptions as subscriptions_repo,
     users as users_repo,
 )
 from app.router_map import get_router_map, write_router_map
+from app.snapshots import SnapshotService
 from app.utils.build import get_build_info
 
 router = Router()
@@ -94,28 +97,69 @@ def _format_flag_snapshot() -> str:
     return "\n".join(lines) if lines else "• нет флагов"
 
 
+async def _collect_stats() -> dict[str, int]:
+    async with compat_session(read_session_scope) as session:
+        # Rollups keep counting events that were archived out of ``events``.
+        totals = await rollups_repo.totals(session, ["quiz_finish", "start"])
+        return {
+            "total_users": await users_repo.count(session),
+            "active_subs": await subscriptions_repo.count_active(session),
+            "quiz_finishes": totals["quiz_finish"],
+            "starts": totals["start"],
+            "leads": await leads_repo.count(session),
+            "referrals_conv": await referrals_repo.converted_count(session),
+        }
+
+
+async def _collect_retention() -> dict[str, int]:
+    since = datetime.now(timezone.utc) - timedelta(days=1)
+    async with compat_session(read_session_scope) as session:
+        totals = await rollups_repo.totals(
+            session, ["daily_tip_sent", "daily_tip_click"], since=since
+        )
+        return {
+            "tip_enabled": await retention_repo.count_tip_enabled(session),
+            "sent": totals["daily_tip_sent"],
+            "clicks": totals["daily_tip_click"],
+            "click_users": await retention_repo.count_tip_click_users(session, since=since),
+        }
+
+
+# Several admins asking at once share one set of COUNT queries; "/stats refresh"
+# waits for fresh numbers, plain "/stats" answers from the last snapshot.
+_stats_snapshot = snapshots.register(
+    SnapshotService("admin_stats", _collect_stats, max_age=settings.ADMIN_SNAPSHOT_MAX_AGE)
+)
+_retention_snapshot = snapshots.register(
+    SnapshotService("retention_report", _collect_retention, max_age=settings.ADMIN_SNAPSHOT_MAX_AGE)
+)
+
+
+def _wants_refresh(message: Message) -> bool:
+    parts = (message.text or "").split()
+    return len(parts) > 1 and parts[1].lower() in {"refresh", "обновить"}
+
+
 @router.message(Command("stats"))
 async def stats(m: Message):
     if not _is_admin(m.from_user.id if m.from_user else None):
         return
 
-    async with compat_session(session_scope) as session:
-        total_users = await users_repo.count(session)
-        active_subs = await subscriptions_repo.count_active(session)
-        quiz_finishes = await events_repo.stats(session, name="quiz_finish")
-        starts = await events_repo.stats(session, name="start")
-        leads_cnt = await leads_repo.count(session)
-        referrals_conv = await referrals_repo.converted_count(session)
+    service = _stats_snapshot
+    snapshot = await (service.refresh() if _wants_refresh(m) else service.get())
+    data = snapshot.value
 
     await m.answer(
         "📊 Статистика\n"
-        f"Пользователи: {total_users}\n"
-        f"Активные подписки: {active_subs}\n"
-        f"Стартов: {starts}\n"
-        f"Завершено квизов: {quiz_finishes}\n"
-        f"Лиды (всего): {leads_cnt}\n"
-        f"Рефералы (конверсии): {referrals_conv}\n\n"
+        f"Пользователи: {data['total_users']}\n"
+        f"Активные подписки: {data['active_subs']}\n"
+        f"Стартов: {data['starts']}\n"
+        f"Завершено квизов: {data['quiz_finishes']}\n"
+        f"Лиды (всего): {data['leads']}\n"
+        f"Рефералы (конверсии): {data['referrals_conv']}\n"
+        f"Обновлено {snapshots.format_age(snapshot.age)}\n\n"
         "Команды:\n"
+        "• /stats refresh — пересчитать сейчас\n"
         "• /leads — последние 10 лидов\n"
         "• /leads 20 — последние 20 лидов\n"
         "• /leads_csv — CSV последних 100\n"
@@ -128,22 +172,20 @@ async def retention_report(message: Message) -> None:
     if not _is_admin(message.from_user.id if message.from_user else None):
         return
 
-    now = datetime.now(timezone.utc)
-    since = now - timedelta(days=1)
-
-    async with compat_session(session_scope) as session:
-        tip_enabled = await retention_repo.count_tip_enabled(session)
-        sent = await events_repo.stats(session, name="daily_tip_sent", since=since)
-        clicks = await events_repo.stats(session, name="daily_tip_click", since=since)
-        click_users = await retention_repo.count_tip_click_users(session, since=since)
+    service = _retention_snapshot
+    snapshot = await (service.refresh() if _wants_refresh(message) else service.get())
+    data = snapshot.value
 
+    sent = data["sent"]
+    clicks = data["clicks"]
     ctr = (clicks / sent * 100.0) if sent else 0.0
     await message.answer(
         "📈 Retention-отчёт\n"
-        f"Советы включены у: {tip_enabled}\n"
+        f"Советы включены у: {data['tip_enabled']}\n"
         f"Отправлено за 24ч: {sent}\n"
-        f"Кликов за 24ч: {clicks} (уникальных: {click_users})\n"
-        f"CTR: {ctr:.1f}%",
+        f"Кликов за 24ч: {clicks} (уникальных: {data['click_users']})\n"
+        f"CTR: {ctr:.1f}%\n"
+        f"Обновлено {snapshots.format_age(snapshot.age)}",
     )
 
 
@@ -158,7 +200,7 @@ async def leads_list(m: Message):
     except Exception:
         limit = 10
 
-    async with compat_session(session_scope) as session:
+    async with compat_session(read_session_scope) as session:
         items = await leads_repo.list_last(session, limit)
 
     if not items:
@@ -194,7 +236,7 @@ async def leads_csv(m: Message):
     except Exception:
         limit = 100
 
-    async with compat_session(session_scope) as session:
+    async with compat_session(read_session_scope) as session:
         items = await leads_repo.list_last(session, limit)
 
     if not items:
@@ -351,7 +393,7 @@ async def doctor(message: Message) -> None:
     head = await head_revision()
     pending_marker = " ⚠️ pending" if current and head and current != head else ""
 
-    catalog_sha = CATALOG_SHA or "unknown"
+    catalog_sha = catalog_loader.CATALOG_SHA or "unknown"
     catalog_items: str
     try:
         catalog = load_catalog()
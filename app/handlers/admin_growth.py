@@ -10,7 +10,7 @@ from aiogram.filters import Command, CommandObject
 from aiogram.types import Message
 
 from app.config import settings
-from app.db.session import compat_session, session_scope
+from app.db.session import compat_session, read_session_scope
 from app.growth import attribution
 
 router = Router(name="admin_growth")
@@ -91,7 +91,7 @@ async def growth_report(message: Message) -> None:
     if not _is_admin(user_id):
         return
 
-    async with compat_session(session_scope) as session:
+    async with compat_session(read_session_scope) as session:
         metrics = await attribution.collect_funnel_metrics(session)
 
     if not metrics:
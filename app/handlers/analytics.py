@@ -9,7 +9,7 @@ from aiogram.filters import Command
 from aiogram.types import Message
 
 from app.config import settings
-from app.db.session import compat_session, session_scope
+from app.db.session import compat_session, read_session_scope
 from app.services import analytics_reports
 
 router = Router(name="analytics")
@@ -37,7 +37,7 @@ def _is_admin(user_id: int | None) -> bool:
 async def funnel_report(message: Message) -> None:
     if not _is_admin(message.from_user.id if message.from_user else None):
         return
-    async with compat_session(session_scope) as session:
+    async with compat_session(read_session_scope) as session:
         stats = await analytics_reports.gather_funnel(session)
     text = analytics_reports.format_funnel(stats)
     export_path = analytics_reports.export_funnel_csv(stats)
@@ -48,7 +48,7 @@ async def funnel_report(message: Message) -> None:
 async def cohort_report(message: Message) -> None:
     if not _is_admin(message.from_user.id if message.from_user else None):
         return
-    async with compat_session(session_scope) as session:
+    async with compat_session(read_session_scope) as session:
         rows = await analytics_reports.gather_cohorts(session)
     text = analytics_reports.format_cohorts(rows)
     export_path = analytics_reports.export_cohort_csv(rows)
@@ -59,7 +59,7 @@ async def cohort_report(message: Message) -> None:
 async def ctr_report(message: Message) -> None:
     if not _is_admin(message.from_user.id if message.from_user else None):
         return
-    async with compat_session(session_scope) as session:
+    async with compat_session(read_session_scope) as session:
         rows = await analytics_reports.gather_ctr(session)
     text = analytics_reports.format_ctr(rows)
     export_path = analytics_reports.export_ctr_csv(rows)
@@ -10,7 +10,7 @@ from app.keyboards import kb_back_home, kb_calc_menu
 from app.link_manager import get_register_link
 from app.reco import CTX, product_lines
 from app.repo import events as events_repo, users as users_repo
-from app.storage import SESSIONS, commit_safely, set_last_plan
+from app.storage import commit_safely, sessions, set_last_plan
 from app.utils import safe_edit_text
 from app.utils.premium_cta import send_premium_cta
 
@@ -72,7 +72,7 @@ async def calc_menu_shortcut(c: CallbackQuery):
 
 @router.callback_query(F.data == "calc:msd")
 async def calc_msd(c: CallbackQuery):
-    SESSIONS[c.from_user.id] = {"calc": "msd"}
+    await sessions.set(c.from_user.id, {"calc": "msd"})
     await c.answer()
     await safe_edit_text(
         c.message,
@@ -142,12 +142,12 @@ async def _process_msd(message: Message) -> None:
         utm_category="calc_msd",
     )
     await send_premium_cta(message, "💎 Получить полный план (AI)", source="calc:msd")
-    SESSIONS.pop(message.from_user.id, None)
+    await sessions.pop(message.from_user.id, None)
 
 
 @router.message(F.text)
 async def handle_calc_message(message: Message):
-    sess = SESSIONS.get(message.from_user.id)
+    sess = await sessions.get(message.from_user.id)
     if not sess:
         return
 
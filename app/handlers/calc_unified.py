@@ -21,7 +21,7 @@ from app.handlers.quiz_common import send_product_cards
 from app.i18n import resolve_locale
 from app.link_manager import get_register_link
 from app.repo import events as events_repo, users as users_repo
-from app.storage import SESSIONS, SessionData, commit_safely, set_last_plan
+from app.storage import SessionData, commit_safely, sessions, set_last_plan
 from app.texts import Texts
 from app.utils import safe_edit_text
 from app.utils.premium_cta import send_premium_cta
@@ -37,12 +37,9 @@ _COMMANDS = {
 }
 
 
-def _get_session(user_id: int) -> SessionData | None:
-    try:
-        session = SESSIONS[user_id]
-    except KeyError:
-        return None
-    if session.get("calc_engine") != "core":
+async def _get_session(user_id: int) -> SessionData | None:
+    session = await sessions.get(user_id)
+    if session is None or session.get("calc_engine") != "core":
         return None
     return session
 
@@ -51,10 +48,9 @@ def _get_definition(slug: str) -> CalculatorDefinition | None:
     return CALCULATORS.get(slug)
 
 
-def _ensure_session(user_id: int, slug: str) -> SessionData:
+async def _ensure_session(user_id: int, slug: str) -> SessionData:
     payload = {"calc": slug, "calc_engine": "core", "step_index": 0, "data": {}}
-    SESSIONS[user_id] = payload
-    return SESSIONS[user_id]
+    return await sessions.set(user_id, payload)
 
 
 def _texts_from_user(user) -> Texts:
@@ -162,7 +158,7 @@ async def _finish(
     )
     slug = getattr(definition, "slug", "unknown")
     await send_premium_cta(target, texts.calc.premium_cta(), source=f"calc:{slug}")
-    SESSIONS.pop(user.id, None)
+    await sessions.pop(user.id, None)
 
 
 async def _handle_input(
@@ -194,10 +190,7 @@ async def _handle_input(
             await message.answer(f"{error}\n\n{step.prompt}", reply_markup=markup)
             return
 
-    data = session.setdefault("data", {})
-    if isinstance(data, SessionData):
-        data = session["data"]
-    data[step.key] = value
+    session.setdefault("data", {})[step.key] = value
     session["step_index"] = index + 1
 
     if session["step_index"] >= len(definition.steps):
@@ -225,10 +218,7 @@ async def _handle_choice(
         await callback.answer()
         return
 
-    data = session.setdefault("data", {})
-    if isinstance(data, SessionData):
-        data = session["data"]
-    data[step.key] = option.value
+    session.setdefault("data", {})[step.key] = option.value
     session["step_index"] = index + 1
 
     if session["step_index"] >= len(definition.steps):
@@ -252,8 +242,6 @@ async def _handle_back(
     step = definition.steps[new_index]
     data = session.get("data")
     if isinstance(data, SessionData):
-        data = session["data"]
-    if isinstance(data, dict):
         data.pop(step.key, None)
 
     await callback.answer()
@@ -275,7 +263,7 @@ async def _start_flow(target: CallbackQuery | Message, slug: str) -> None:
         return
 
     user_id = target.from_user.id
-    session = _ensure_session(user_id, slug)
+    session = await _ensure_session(user_id, slug)
 
     if isinstance(target, CallbackQuery):
         await target.answer()
@@ -302,7 +290,7 @@ async def _entry_callback(callback: CallbackQuery) -> None:
 
 @router.message(F.text)
 async def _dispatch_message(message: Message) -> None:
-    session = _get_session(message.from_user.id)
+    session = await _get_session(message.from_user.id)
     if session is None:
         return
 
@@ -322,7 +310,7 @@ async def _dispatch_callback(callback: CallbackQuery) -> None:
         return
 
     _, _, slug, action, *rest = parts
-    session = _get_session(callback.from_user.id)
+    session = await _get_session(callback.from_user.id)
     if session is None or session.get("calc") != slug:
         await callback.answer()
         return
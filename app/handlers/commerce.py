@@ -16,7 +16,7 @@ from app.services.cart import (
     add_product_to_cart,
     clear_cart,
     get_cart,
-    save_cart,
+    save_coupon,
 )
 from app.services.checkout import calculate_total_with_coupon, create_order
 from app.services.coupons import apply_coupon, fetch_coupon, is_coupon_valid
@@ -25,7 +25,7 @@ router = Router(name="commerce")
 
 
 async def _reply_cart(message: Message, user_id: int) -> None:
-    cart = get_cart(user_id)
+    cart = await get_cart(user_id)
     if not cart.items:
         await message.answer("🛒 Твоя корзина пока пуста. Добавь продукты из рекомендаций!")
         return
@@ -53,7 +53,7 @@ async def cart_add_command(message: Message) -> None:
     if not product_id:
         await message.answer("Нужно указать идентификатор продукта")
         return
-    item = add_product_to_cart(message.from_user.id, product_id)
+    item = await add_product_to_cart(message.from_user.id, product_id)
     if not item:
         await message.answer("Не удалось найти продукт. Попробуй выбрать из каталога.")
         return
@@ -64,7 +64,7 @@ async def cart_add_command(message: Message) -> None:
 async def cart_clear_command(message: Message) -> None:
     if not message.from_user:
         return
-    clear_cart(message.from_user.id)
+    await clear_cart(message.from_user.id)
     await message.answer("Корзина очищена.")
 
 
@@ -74,7 +74,7 @@ async def cart_add_callback(callback: CallbackQuery) -> None:
         await callback.answer("Недоступно", show_alert=True)
         return
     product_id = (callback.data or "").split(":", 2)[-1]
-    item = add_product_to_cart(callback.from_user.id, product_id)
+    item = await add_product_to_cart(callback.from_user.id, product_id)
     if not item:
         await callback.answer("Товар не найден", show_alert=True)
         return
@@ -101,7 +101,7 @@ async def cart_add_many(callback: CallbackQuery) -> None:
         if code in seen:
             continue
         seen.add(code)
-        item = add_product_to_cart(callback.from_user.id, code)
+        item = await add_product_to_cart(callback.from_user.id, code)
         if item:
             added += 1
         else:
@@ -138,7 +138,7 @@ async def cart_add_bundle(callback: CallbackQuery) -> None:
     if bundle is None:
         await callback.answer("Бандл не найден", show_alert=True)
         return
-    add_bundle_to_cart(
+    await add_bundle_to_cart(
         callback.from_user.id,
         {
             "id": bundle.id,
@@ -168,7 +168,7 @@ async def coupon_command(message: Message) -> None:
     if not code:
         await message.answer("Введи код купона")
         return
-    cart = get_cart(message.from_user.id)
+    cart = await get_cart(message.from_user.id, fresh=True)
     if not cart.items:
         await message.answer("Сначала добавь товары в корзину.")
         return
@@ -183,12 +183,12 @@ async def coupon_command(message: Message) -> None:
         "discount": str(result.discount),
         "kind": coupon.kind,
     }
-    save_cart(message.from_user.id, cart)
+    await save_coupon(message.from_user.id, cart)
     await message.answer(_format_coupon_message(result, cart.currency))
 
 
 async def _resolve_coupon(user_id: int, *, session) -> tuple[object | None, object | None]:
-    cart = get_cart(user_id)
+    cart = await get_cart(user_id, fresh=True)
     if not cart.coupon_code:
         return cart, None
     coupon = await fetch_coupon(session, cart.coupon_code)
@@ -200,7 +200,7 @@ async def _resolve_coupon(user_id: int, *, session) -> tuple[object | None, obje
             "discount": str(coupon_result.discount),
             "kind": coupon.kind,
         }
-        save_cart(user_id, cart)
+        await save_coupon(user_id, cart)
     return cart, coupon_result
 
 
@@ -209,7 +209,7 @@ async def checkout_command(message: Message) -> None:
     if not message.from_user:
         return
     user_id = message.from_user.id
-    cart = get_cart(user_id)
+    cart = await get_cart(user_id, fresh=True)
     if not cart.items:
         await message.answer("Корзина пуста. Добавь товары перед оформлением заказа.")
         return
@@ -222,7 +222,7 @@ async def checkout_command(message: Message) -> None:
             coupon=coupon_result,
         )
         await session.commit()
-    clear_cart(user_id)
+    await clear_cart(user_id)
     lines = [
         "✅ Заказ оформлен!",
         f"Номер заказа: {checkout.order.id}",
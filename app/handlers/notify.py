@@ -36,9 +36,10 @@ async def _set_event(user_id: int, event_name: str) -> None:
 
 async def _is_enabled(user_id: int) -> bool:
     async with compat_session(session_scope) as session:
-        last_on = await events_repo.last_by(session, user_id, "notify_on")
-        last_off = await events_repo.last_by(session, user_id, "notify_off")
-    return bool(last_on and (not last_off or last_on.ts > last_off.ts))
+        states = await events_repo.latest_states(session, user_id, ("notify_on", "notify_off"))
+    last_on = states.get("notify_on")
+    last_off = states.get("notify_off")
+    return bool(last_on and (not last_off or last_on.last_ts > last_off.last_ts))
 
 
 async def _render(message: Message | CallbackQuery, enabled: bool) -> None:
@@ -11,7 +11,7 @@ from app.link_manager import get_register_link
 from app.products import GOAL_MAP, PRODUCTS
 from app.reco import product_lines
 from app.repo import events as events_repo, users as users_repo
-from app.storage import SESSIONS, commit_safely, set_last_plan
+from app.storage import commit_safely, sessions, set_last_plan
 from app.utils import safe_edit_text
 from app.utils.cards import build_order_link
 from app.utils.premium_cta import send_premium_cta
@@ -133,7 +133,8 @@ async def pick_goal(c: CallbackQuery):
         await _safe_edit(c, "Пока нет рекомендаций по этой цели.", kb_back_home())
         return
 
-    SESSIONS.setdefault(c.from_user.id, {})["pick"] = {"goal": goal_key}
+    session = await sessions.setdefault(c.from_user.id, {})
+    session["pick"] = {"goal": goal_key}
 
     kb = InlineKeyboardBuilder()
     kb.button(text="До 30", callback_data=f"pick:age:{goal_key}:u30")
@@ -151,7 +152,8 @@ async def pick_goal(c: CallbackQuery):
 async def pick_age(c: CallbackQuery):
     await c.answer()
     _, _, goal_key, age = c.data.split(":")
-    SESSIONS.setdefault(c.from_user.id, {}).setdefault("pick", {})["age"] = age
+    session = await sessions.setdefault(c.from_user.id, {})
+    session.setdefault("pick", {})["age"] = age
 
     kb = InlineKeyboardBuilder()
     kb.button(text="Офис/малоподвижный", callback_data=f"pick:life:{goal_key}:{age}:office")
@@ -168,7 +170,8 @@ async def pick_age(c: CallbackQuery):
 async def pick_life(c: CallbackQuery):
     await c.answer()
     _, _, goal_key, age, life = c.data.split(":")
-    SESSIONS.setdefault(c.from_user.id, {}).setdefault("pick", {})["life"] = life
+    session = await sessions.setdefault(c.from_user.id, {})
+    session.setdefault("pick", {})["life"] = life
 
     kb = InlineKeyboardBuilder()
     kb.button(text="🟢 Новичок", callback_data=f"pick:lvl:{goal_key}:{age}:{life}:basic")
@@ -187,7 +190,8 @@ async def pick_life(c: CallbackQuery):
 async def pick_level(c: CallbackQuery):
     await c.answer()
     _, _, goal_key, age, life, level = c.data.split(":")
-    SESSIONS.setdefault(c.from_user.id, {}).setdefault("pick", {})["level"] = level
+    session = await sessions.setdefault(c.from_user.id, {})
+    session.setdefault("pick", {})["level"] = level
 
     kb = InlineKeyboardBuilder()
     kb.button(text="Нет", callback_data=f"pick:all:{goal_key}:{age}:{life}:{level}:none")
@@ -211,7 +215,8 @@ async def pick_level(c: CallbackQuery):
 async def pick_allergies(c: CallbackQuery):
     await c.answer()
     _, _, goal_key, age, life, level, allerg = c.data.split(":")
-    SESSIONS.setdefault(c.from_user.id, {}).setdefault("pick", {})["allerg"] = allerg
+    session = await sessions.setdefault(c.from_user.id, {})
+    session.setdefault("pick", {})["allerg"] = allerg
 
     kb = InlineKeyboardBuilder()
     kb.button(
@@ -239,7 +244,8 @@ async def pick_allergies(c: CallbackQuery):
 async def pick_season(c: CallbackQuery):
     await c.answer()
     _, _, goal_key, age, life, level, allerg, season = c.data.split(":")
-    SESSIONS.setdefault(c.from_user.id, {}).setdefault("pick", {})["season"] = season
+    session = await sessions.setdefault(c.from_user.id, {})
+    session.setdefault("pick", {})["season"] = season
 
     kb = InlineKeyboardBuilder()
     kb.button(
@@ -12,7 +12,7 @@ from app.handlers.quiz_common import safe_edit, send_product_cards
 from app.link_manager import get_register_link
 from app.reco import product_lines
 from app.repo import events as events_repo, users as users_repo
-from app.storage import SESSIONS, commit_safely, set_last_plan
+from app.storage import commit_safely, sessions, set_last_plan
 from app.utils.premium_cta import send_premium_cta
 
 router = Router(name="quiz_deficits")
@@ -118,11 +118,14 @@ def _overall_level(levels: dict[str, str]) -> str:
 
 @router.callback_query(F.data == "quiz:deficits")
 async def quiz_deficits_start(c: CallbackQuery) -> None:
-    SESSIONS[c.from_user.id] = {
-        "quiz": "deficits",
-        "idx": 0,
-        "scores": {key: 0 for key in _QUESTION_KEYS},
-    }
+    await sessions.set(
+        c.from_user.id,
+        {
+            "quiz": "deficits",
+            "idx": 0,
+            "scores": {key: 0 for key in _QUESTION_KEYS},
+        },
+    )
     question, _ = QUESTIONS[0]
     await safe_edit(
         c,
@@ -133,7 +136,7 @@ async def quiz_deficits_start(c: CallbackQuery) -> None:
 
 @router.callback_query(F.data.regexp(r"^q:deficits:\d+:\d+$"))
 async def quiz_deficits_step(c: CallbackQuery) -> None:
-    sess = SESSIONS.get(c.from_user.id)
+    sess = await sessions.get(c.from_user.id)
     if not sess or sess.get("quiz") != "deficits":
         await c.answer()
         return
@@ -170,7 +173,7 @@ async def quiz_deficits_step(c: CallbackQuery) -> None:
 
 async def _finish_quiz(c: CallbackQuery) -> None:
     user_id = c.from_user.id
-    sess = SESSIONS.get(user_id)
+    sess = await sessions.get(user_id)
     if not sess:
         await c.answer()
         return
@@ -249,4 +252,4 @@ async def _finish_quiz(c: CallbackQuery) -> None:
         source="quiz:deficits",
     )
 
-    SESSIONS.pop(user_id, None)
+    await sessions.pop(user_id, None)
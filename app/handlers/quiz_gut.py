@@ -7,7 +7,7 @@ from app.handlers.quiz_common import safe_edit, send_product_cards
 from app.link_manager import get_register_link
 from app.reco import product_lines
 from app.repo import events as events_repo, users as users_repo
-from app.storage import SESSIONS, commit_safely, set_last_plan
+from app.storage import commit_safely, sessions, set_last_plan
 from app.utils.premium_cta import send_premium_cta
 
 router = Router()
@@ -76,7 +76,7 @@ def _gut_outcome(total: int) -> tuple[str, str, str, list[str]]:
 # ----------------------------
 @router.callback_query(F.data == "quiz:gut")
 async def quiz_gut_start(c: CallbackQuery):
-    SESSIONS[c.from_user.id] = {"quiz": "gut", "idx": 0, "score": 0}
+    await sessions.set(c.from_user.id, {"quiz": "gut", "idx": 0, "score": 0})
     qtext, _ = GUT_QUESTIONS[0]
     await safe_edit(
         c,
@@ -90,7 +90,7 @@ async def quiz_gut_start(c: CallbackQuery):
 # ----------------------------
 @router.callback_query(F.data.regexp(r"^q:gut:\d+:\d+$"))
 async def quiz_gut_step(c: CallbackQuery):
-    sess = SESSIONS.get(c.from_user.id, {})
+    sess = await sessions.get(c.from_user.id, {})
     if sess.get("quiz") != "gut":
         return
 
@@ -154,7 +154,7 @@ async def quiz_gut_step(c: CallbackQuery):
             source="quiz:gut",
         )
 
-        SESSIONS.pop(c.from_user.id, None)
+        await sessions.pop(c.from_user.id, None)
         return
 
     qtext, _ = GUT_QUESTIONS[idx]
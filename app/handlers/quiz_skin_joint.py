@@ -12,7 +12,7 @@ from app.handlers.quiz_common import safe_edit, send_product_cards
 from app.link_manager import get_register_link
 from app.reco import product_lines
 from app.repo import events as events_repo, users as users_repo
-from app.storage import SESSIONS, commit_safely, set_last_plan
+from app.storage import commit_safely, sessions, set_last_plan
 from app.utils.premium_cta import send_premium_cta
 
 router = Router(name="quiz_skin_joint")
@@ -86,7 +86,7 @@ def _level(score: int) -> tuple[str, str, str]:
 
 @router.callback_query(F.data == "quiz:skin_joint")
 async def quiz_skin_joint_start(c: CallbackQuery) -> None:
-    SESSIONS[c.from_user.id] = {"quiz": "skin_joint", "idx": 0, "score": 0}
+    await sessions.set(c.from_user.id, {"quiz": "skin_joint", "idx": 0, "score": 0})
     question, _ = QUESTIONS[0]
     await safe_edit(
         c,
@@ -97,7 +97,7 @@ async def quiz_skin_joint_start(c: CallbackQuery) -> None:
 
 @router.callback_query(F.data.regexp(r"^q:skin_joint:\d+:\d+$"))
 async def quiz_skin_joint_step(c: CallbackQuery) -> None:
-    sess = SESSIONS.get(c.from_user.id, {})
+    sess = await sessions.get(c.from_user.id, {})
     if sess.get("quiz") != "skin_joint":
         await c.answer()
         return
@@ -122,7 +122,7 @@ async def quiz_skin_joint_step(c: CallbackQuery) -> None:
 
 async def _finish_quiz(c: CallbackQuery) -> None:
     user_id = c.from_user.id
-    sess = SESSIONS.pop(user_id, None)
+    sess = await sessions.pop(user_id, None)
     if not sess:
         await c.answer()
         return
@@ -12,7 +12,7 @@ from app.quiz.engine import QuizDefinition, QuizHooks, QuizResultContext, regist
 from app.reco import product_lines
 from app.repo import events as events_repo, retention as retention_repo, users as users_repo
 from app.services import get_reco
-from app.storage import SESSIONS, commit_safely, set_last_plan
+from app.storage import commit_safely, sessions, set_last_plan
 from app.utils.nav import nav_footer
 from app.utils.premium_cta import send_premium_cta
 from app.utils.sender import chat_sender
@@ -150,7 +150,7 @@ def _sleep_outcome(total: int) -> tuple[str, str, str, list[str]]:
 
 @router.callback_query(F.data == "quiz:sleep")
 async def quiz_sleep_start(c: CallbackQuery):
-    SESSIONS[c.from_user.id] = {"quiz": "sleep", "idx": 0, "score": 0}
+    await sessions.set(c.from_user.id, {"quiz": "sleep", "idx": 0, "score": 0})
     qtext, _ = SLEEP_QUESTIONS[0]
     await safe_edit(
         c,
@@ -166,7 +166,7 @@ async def quiz_sleep_start(c: CallbackQuery):
 
 @router.callback_query(F.data.regexp(r"^q:sleep:\d+:\d+$"))
 async def quiz_sleep_step(c: CallbackQuery):
-    sess = SESSIONS.get(c.from_user.id, {})
+    sess = await sessions.get(c.from_user.id, {})
     if sess.get("quiz") != "sleep":
         return
 
@@ -236,7 +236,7 @@ async def quiz_sleep_step(c: CallbackQuery):
             source="quiz:sleep",
         )
 
-        SESSIONS.pop(c.from_user.id, None)
+        await sessions.pop(c.from_user.id, None)
         return
 
     qtext, _ = SLEEP_QUESTIONS[idx]
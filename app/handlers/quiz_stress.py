@@ -9,7 +9,7 @@ from app.handlers.quiz_common import safe_edit, send_product_cards
 from app.link_manager import get_register_link
 from app.reco import product_lines
 from app.repo import events as events_repo, retention as retention_repo, users as users_repo
-from app.storage import SESSIONS, commit_safely, set_last_plan
+from app.storage import commit_safely, sessions, set_last_plan
 from app.utils.premium_cta import send_premium_cta
 
 router = Router()
@@ -77,7 +77,7 @@ def _stress_outcome(total: int) -> tuple[str, str, str, list[str]]:
 
 @router.callback_query(F.data == "quiz:stress")
 async def quiz_stress_start(c: CallbackQuery):
-    SESSIONS[c.from_user.id] = {"quiz": "stress", "idx": 0, "score": 0}
+    await sessions.set(c.from_user.id, {"quiz": "stress", "idx": 0, "score": 0})
     qtext, _ = STRESS_QUESTIONS[0]
     await safe_edit(
         c,
@@ -93,7 +93,7 @@ async def quiz_stress_start(c: CallbackQuery):
 
 @router.callback_query(F.data.regexp(r"^q:stress:\d+:\d+$"))
 async def quiz_stress_step(c: CallbackQuery):
-    sess = SESSIONS.get(c.from_user.id, {})
+    sess = await sessions.get(c.from_user.id, {})
     if sess.get("quiz") != "stress":
         return
 
@@ -162,7 +162,7 @@ async def quiz_stress_step(c: CallbackQuery):
             source="quiz:stress",
         )
 
-        SESSIONS.pop(c.from_user.id, None)
+        await sessions.pop(c.from_user.id, None)
         return
 
     qtext, _ = STRESS_QUESTIONS[idx]
@@ -14,7 +14,7 @@ from app.handlers.quiz_common import safe_edit, send_product_cards
 from app.link_manager import get_register_link
 from app.reco import product_lines
 from app.repo import events as events_repo, retention as retention_repo, users as users_repo
-from app.storage import SESSIONS, commit_safely, set_last_plan
+from app.storage import commit_safely, sessions, set_last_plan
 from app.utils.premium_cta import send_premium_cta
 
 router = Router(name="quiz_stress2")
@@ -92,7 +92,7 @@ def _level(score: int) -> tuple[str, str, str]:
 
 @router.callback_query(F.data == "quiz:stress2")
 async def quiz_stress2_start(c: CallbackQuery) -> None:
-    SESSIONS[c.from_user.id] = {"quiz": "stress2", "idx": 0, "score": 0}
+    await sessions.set(c.from_user.id, {"quiz": "stress2", "idx": 0, "score": 0})
     question, _ = QUESTIONS[0]
     await safe_edit(
         c,
@@ -103,7 +103,7 @@ async def quiz_stress2_start(c: CallbackQuery) -> None:
 
 @router.callback_query(F.data.regexp(r"^q:stress2:\d+:\d+$"))
 async def quiz_stress2_step(c: CallbackQuery) -> None:
-    sess = SESSIONS.get(c.from_user.id, {})
+    sess = await sessions.get(c.from_user.id, {})
     if sess.get("quiz") != "stress2":
         await c.answer()
         return
@@ -128,7 +128,7 @@ async def quiz_stress2_step(c: CallbackQuery) -> None:
 
 async def _finish_quiz(c: CallbackQuery) -> None:
     user_id = c.from_user.id
-    sess = SESSIONS.pop(user_id, None)
+    sess = await sessions.pop(user_id, None)
     if not sess:
         await c.answer()
         return
@@ -4,8 +4,9 @@ from aiogram.types import CallbackQuery, Message
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from app.db.session import compat_session, session_scope
+from app.event_sink import event_sink
 from app.keyboards import kb_back_home
-from app.repo import events as events_repo, referrals as referrals_repo, users as users_repo
+from app.repo import referrals as referrals_repo, users as users_repo
 from app.storage import commit_safely
 from app.utils import safe_edit_text
 
@@ -35,8 +36,8 @@ async def ref_menu_cb(c: CallbackQuery):
     async with compat_session(session_scope) as session:
         await users_repo.get_or_create_user(session, uid, username)
         invited, converted = await referrals_repo.stats_for_referrer(session, uid)
-        await events_repo.log(session, uid, "ref_link_open", {})
         await commit_safely(session)
+    event_sink.emit(uid, "ref_link_open", {})
 
     link = await _ref_link(c.bot, uid)
     text = (
@@ -57,8 +58,8 @@ async def ref_menu_msg(m: Message):
     async with compat_session(session_scope) as session:
         await users_repo.get_or_create_user(session, uid, username)
         invited, converted = await referrals_repo.stats_for_referrer(session, uid)
-        await events_repo.log(session, uid, "ref_link_open", {})
         await commit_safely(session)
+    event_sink.emit(uid, "ref_link_open", {})
 
     link = await _ref_link(m.bot, uid)
     text = (
@@ -73,9 +74,7 @@ async def ref_menu_msg(m: Message):
 @router.callback_query(F.data == "ref:copy")
 async def ref_copy(c: CallbackQuery):
     await c.answer("Скопируйте ссылку из сообщения")
-    async with compat_session(session_scope) as session:
-        await events_repo.log(session, c.from_user.id, "ref_link_click", {})
-        await commit_safely(session)
+    event_sink.emit(c.from_user.id, "ref_link_click", {})
     link = await _ref_link(c.bot, c.from_user.id)
     kb = InlineKeyboardBuilder()
     for row in kb_back_home("ref:menu").inline_keyboard:
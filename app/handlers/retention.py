@@ -8,9 +8,12 @@ from aiogram.filters import Command, CommandObject
 from aiogram.types import CallbackQuery, Message
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from app.config import settings
 from app.db.session import compat_session, session_scope
+from app.event_sink import event_sink
 from app.repo import events as events_repo, retention as retention_repo
 from app.services import retention_messages
+from app.services.tip_pool import TipPool
 from app.storage import commit_safely
 
 router = Router(name="retention")
@@ -47,21 +50,25 @@ async def daily_tip_now(message: Message, command: CommandObject) -> None:
 
     async with compat_session(session_scope) as session:
         setting = await retention_repo.get_or_create_settings(session, message.from_user.id)
-        tip = await retention_repo.pick_tip(session, exclude_id=setting.last_tip_id)
-        if tip is None:
+        pool = TipPool(await retention_repo.list_tips(session))
+        deal = pool.deal(setting.last_tip_id, setting.tips_seen, settings.RETENTION_TIP_NO_REPEAT)
+        if deal is None:
             await message.answer("Пока нет советов, попробуй позже.")
             return
-        text = retention_messages.format_tip_message(tip.text)
+        tip_id, tips_seen = deal
+        text = retention_messages.format_tip_message(pool.text(tip_id))
         kb = InlineKeyboardBuilder()
-        kb.button(text="👍 Полезно", callback_data=f"tips:like:{tip.id}")
+        kb.button(text="👍 Полезно", callback_data=f"tips:like:{tip_id}")
         await message.answer(text, reply_markup=kb.as_markup())
         now = dt.datetime.now(dt.timezone.utc)
-        await retention_repo.update_tip_log(session, setting, tip=tip, sent_at=now)
+        await retention_repo.record_tips_sent(
+            session, [(message.from_user.id, tip_id, tips_seen)], sent_at=now
+        )
         await events_repo.log(
             session,
             message.from_user.id,
             "daily_tip_manual",
-            {"tip_id": tip.id},
+            {"tip_id": tip_id},
         )
         await commit_safely(session)
 
@@ -129,14 +136,7 @@ async def tips_like(callback: CallbackQuery) -> None:
     except Exception:
         tip_id_int = None
 
-    async with compat_session(session_scope) as session:
-        await events_repo.log(
-            session,
-            callback.from_user.id,
-            "daily_tip_click",
-            {"tip_id": tip_id_int},
-        )
-        await commit_safely(session)
+    event_sink.emit(callback.from_user.id, "daily_tip_click", {"tip_id": tip_id_int})
     await callback.answer(retention_messages.format_tip_click_ack())
 
 
@@ -145,9 +145,7 @@ async def journey_tracker_sleep(callback: CallbackQuery) -> None:
     if callback.from_user is None:
         return
     await callback.answer("Напоминаем про трекер сна")
-    async with compat_session(session_scope) as session:
-        await events_repo.log(session, callback.from_user.id, "journey_sleep_cta", {})
-        await commit_safely(session)
+    event_sink.emit(callback.from_user.id, "journey_sleep_cta", {})
     if callback.message:
         await callback.message.answer(
             (
@@ -162,9 +160,7 @@ async def journey_premium_plan(callback: CallbackQuery) -> None:
     if callback.from_user is None:
         return
     await callback.answer("Открываем Премиум")
-    async with compat_session(session_scope) as session:
-        await events_repo.log(session, callback.from_user.id, "journey_premium_cta", {})
-        await commit_safely(session)
+    event_sink.emit(callback.from_user.id, "journey_premium_cta", {})
     if callback.message:
         await callback.message.answer(
             "💡 Чтобы получить Премиум-план, перейди в раздел /premium — там доступно оформление подписки."
@@ -100,7 +100,7 @@ async def start_safe(message: Message) -> None:
 
     texts = _texts_for_user(getattr(message.from_user, "language_code", None))
 
-    remaining = touch_throttle(user_id, "start:command", START_THROTTLE_SECONDS)
+    remaining = await touch_throttle(user_id, "start:command", START_THROTTLE_SECONDS)
     if remaining > 0:
         log_start.info("START throttled uid=%s remaining=%.2f", user_id, remaining)
         await message.answer(texts.common.throttle_in_progress())
@@ -318,7 +318,7 @@ async def panel_command(message: Message) -> None:
         await message.answer(texts.common.admin_only())
         return
 
-    remaining = touch_throttle(user_id, "admin:panel", ADMIN_PANEL_THROTTLE)
+    remaining = await touch_throttle(user_id, "admin:panel", ADMIN_PANEL_THROTTLE)
     if remaining > 0:
         await message.answer(texts.common.panel_busy())
         return
@@ -0,0 +1,156 @@
+"""ETag-validated, precompressed response bodies for the admin dashboard.
+
+Pages and JSON payloads are rendered once per data version, hashed for the
+ETag and compressed up front (gzip always, brotli when the ``brotli`` package
+is installed).  Requests then cost a header comparison and a dictionary
+lookup: a matching ``If-None-Match`` gets ``304 Not Modified``, everything
+else the stored body in the best encoding the client accepts.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:  # pragma: no cover - optional dependency
+    import brotli
+except ImportError:  # pragma: no cover - gzip only
+    brotli = None
+
+# Below this size compression does not pay for its headers.
+MIN_COMPRESS_BYTES = 1024
+# Admin pages carry data behind a token: browsers may keep them, but must
+# revalidate every time, which is what turns reloads into 304s.
+CACHE_CONTROL = "private, no-cache"
+
+HTML = "text/html; charset=utf-8"
+JSON = "application/json"
+
+
+@dataclass(frozen=True, slots=True)
+class CachedBody:
+    body: bytes
+    media_type: str
+    etag: str
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+
+def build_body(content: bytes | str, media_type: str) -> CachedBody:
+    """Hash ``content`` and precompress it when that makes it smaller."""
+
+    raw = content.encode("utf-8") if isinstance(content, str) else content
+    # Weak, because the same tag covers every encoding of the body.
+    etag = f'W/"{hashlib.blake2b(raw, digest_size=16).hexdigest()}"'
+    encoded: dict[str, bytes] = {}
+    if len(raw) >= MIN_COMPRESS_BYTES:
+        candidates = {"gzip": gzip.compress(raw, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            candidates["br"] = brotli.compress(raw, quality=11)
+        encoded = {name: data for name, data in candidates.items() if len(data) < len(raw)}
+    return CachedBody(body=raw, media_type=media_type, etag=etag, encoded=encoded)
+
+
+def json_body(payload: Any) -> CachedBody:
+    # Same serialization as FastAPI's default JSONResponse.
+    content = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+    return build_body(content, JSON)
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """Weak ``If-None-Match`` comparison (RFC 9110, section 13.1.2)."""
+
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = _opaque(etag)
+    return any(_opaque(tag) == target for tag in header.split(","))
+
+
+def _accepted(header: str | None) -> dict[str, float]:
+    accepted: dict[str, float] = {}
+    for part in (header or "").split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def choose_encoding(header: str | None, available: dict[str, bytes]) -> str | None:
+    accepted = _accepted(header)
+    wildcard = accepted.get("*", 0.0)
+    best: tuple[float, str] | None = None
+    # Brotli first: it wins ties on quality.
+    for name in ("br", "gzip"):
+        if name not in available:
+            continue
+        quality = accepted.get(name, wildcard)
+        if quality > 0 and (best is None or quality > best[0]):
+            best = (quality, name)
+    return best[1] if best else None
+
+
+def respond(request: Request, cached: CachedBody) -> Response:
+    headers = {"ETag": cached.etag, "Vary": "Accept-Encoding", "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = choose_encoding(request.headers.get("accept-encoding"), cached.encoded)
+    body = cached.body
+    if encoding is not None:
+        body = cached.encoded[encoding]
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=cached.media_type, headers=headers)
+
+
+class ResponseCache:
+    """Last rendered body per name, reused while its data version is unchanged."""
+
+    def __init__(self) -> None:
+        self._entries: dict[str, tuple[Hashable, CachedBody]] = {}
+        self.renders = 0
+
+    async def get(
+        self, name: str, version: Hashable, render: Callable[[], Awaitable[CachedBody]]
+    ) -> CachedBody:
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        cached = await render()
+        self.renders += 1
+        self._entries[name] = (version, cached)
+        return cached
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+__all__ = [
+    "CachedBody",
+    "ResponseCache",
+    "build_body",
+    "choose_encoding",
+    "etag_matches",
+    "json_body",
+    "respond",
+]
@@ -39,6 +39,8 @@ _ACTIVE_LOCK = asyncio.Lock()
 
 _ACTIVE_SET: str | None = None
 _LOADED_SET: str | None = None
+# Bumped on every write through this module; see :func:`links_revision`.
+_REVISION = 0
 _REGISTER_LINK: str | None = None
 _PRODUCT_LINKS: dict[str, str] = {}
 
@@ -68,6 +70,7 @@ __all__ = [
     "export_set_csv",
     "import_set",
     "audit_actor",
+    "links_revision",
 ]
 
 
@@ -140,6 +143,7 @@ async def _write_active_set(name: str) -> None:
         ACTIVE_SET_FILE.write_text(name, encoding="utf-8")
 
     await asyncio.to_thread(_write)
+    _bump_revision()
 
 
 async def active_set_name() -> str:
@@ -187,6 +191,30 @@ async def _save_set_payload(name: str, payload: dict[str, Any]) -> None:
             fh.write("\n")
 
     await asyncio.to_thread(_write)
+    _bump_revision()
+
+
+def _bump_revision() -> None:
+    global _REVISION
+    _REVISION += 1
+
+
+async def links_revision() -> str:
+    """Token that changes whenever the link sets may have changed.
+
+    Combines the in-process write counter with the modification times of the
+    sets directory and the active set file, so edits made outside the bot are
+    noticed too.
+    """
+
+    name = await active_set_name()
+    stamps = []
+    for path in (SETS_DIR, SETS_DIR / f"{name}.json"):
+        try:
+            stamps.append(path.stat().st_mtime_ns)
+        except OSError:
+            stamps.append(0)
+    return f"{_REVISION}:{name}:{stamps[0]}:{stamps[1]}"
 
 
 def _canonicalise_mapping(mapping: Dict[str, Any]) -> dict[str, str]:
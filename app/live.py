@@ -0,0 +1,180 @@
+"""In-process fan-out of small dashboard deltas for the live SSE stream.
+
+Writers call :func:`record_events`, :func:`record_lead` or
+:func:`record_load_run`; each becomes one numbered :class:`Delta` kept in a
+bounded replay buffer and pushed to every connected stream.  A reconnecting
+client passes its last event id and receives only what it missed; when the
+gap is no longer in the buffer (or the process restarted) it gets a
+``reset`` and reloads the page instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Iterable, Mapping
+
+from app.config import settings
+
+# Event names whose counts the dashboard shows, keyed to its counter ids.
+COUNTED_EVENTS: Mapping[str, str] = {
+    "quiz_finish": "quiz_total",
+    "calc_finish": "calc_total",
+    "plan_generated": "plans_total",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Delta:
+    id: str
+    kind: str
+    data: Mapping[str, Any]
+
+    def encode(self) -> str:
+        payload = json.dumps(self.data, ensure_ascii=False, separators=(",", ":"), default=str)
+        return f"id: {self.id}\nevent: {self.kind}\ndata: {payload}\n\n"
+
+
+class _Subscriber:
+    __slots__ = ("queue", "overflowed")
+
+    def __init__(self, maxsize: int) -> None:
+        self.queue: asyncio.Queue[Delta] = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+
+class LiveHub:
+    """Numbered deltas with a replay buffer and one bounded queue per stream."""
+
+    def __init__(self, *, buffer_size: int = 1000, queue_size: int = 256) -> None:
+        # Ids carry the hub epoch so ids from before a restart never match.
+        self.epoch = format(time.time_ns() // 1_000_000, "x")
+        self._seq = 0
+        self._buffer: deque[tuple[int, Delta]] = deque(maxlen=buffer_size)
+        self._queue_size = queue_size
+        self._subscribers: set[_Subscriber] = set()
+        self.published = 0
+        self.dropped_streams = 0
+
+    @property
+    def last_id(self) -> str:
+        return f"{self.epoch}-{self._seq}"
+
+    @property
+    def streams(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, kind: str, data: Mapping[str, Any]) -> Delta:
+        self._seq += 1
+        delta = Delta(id=f"{self.epoch}-{self._seq}", kind=kind, data=data)
+        self._buffer.append((self._seq, delta))
+        self.published += 1
+        for subscriber in self._subscribers:
+            if subscriber.overflowed:
+                continue
+            try:
+                subscriber.queue.put_nowait(delta)
+            except asyncio.QueueFull:
+                # A stalled client is told to reload rather than slowing writers.
+                subscriber.overflowed = True
+                self.dropped_streams += 1
+        return delta
+
+    def since(self, last_id: str | None) -> list[Delta] | None:
+        """Deltas after ``last_id``; ``None`` when they can no longer be replayed."""
+
+        if not last_id:
+            return []
+        epoch, _, raw_seq = last_id.strip().rpartition("-")
+        try:
+            seq = int(raw_seq)
+        except ValueError:
+            return None
+        if epoch != self.epoch or seq > self._seq:
+            return None
+        if seq == self._seq:
+            return []
+        oldest = self._buffer[0][0] if self._buffer else self._seq + 1
+        if seq + 1 < oldest:
+            return None
+        return [delta for delta_seq, delta in self._buffer if delta_seq > seq]
+
+    async def stream(
+        self,
+        last_id: str | None,
+        *,
+        heartbeat: float,
+        on_heartbeat: Callable[[], None] | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield SSE frames: the replay, then live deltas and heartbeat comments.
+
+        ``on_heartbeat`` is called between deltas at most once per heartbeat
+        interval; the dashboard uses it to notice new load-test reports.
+        """
+
+        subscriber = _Subscriber(self._queue_size)
+        # Subscribe before reading the buffer so nothing falls in between.
+        self._subscribers.add(subscriber)
+        try:
+            yield f"retry: {int(heartbeat * 1000)}\n\n"
+            replay = self.since(last_id)
+            if replay is None:
+                yield self._reset_frame()
+                return
+            replayed = self._seq
+            for delta in replay:
+                yield delta.encode()
+            while True:
+                try:
+                    delta = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    if on_heartbeat is not None:
+                        on_heartbeat()
+                    if subscriber.queue.empty():
+                        yield ": ping\n\n"
+                    continue
+                if subscriber.overflowed:
+                    yield self._reset_frame()
+                    return
+                if int(delta.id.rpartition("-")[2]) <= replayed:
+                    continue
+                yield delta.encode()
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def _reset_frame(self) -> str:
+        return f"id: {self.last_id}\nevent: reset\ndata: {{}}\n\n"
+
+
+hub = LiveHub(buffer_size=settings.DASHBOARD_LIVE_BUFFER)
+
+
+def record_events(names: Iterable[str]) -> None:
+    """Publish one counter delta for events that were just written."""
+
+    counts = Counter(COUNTED_EVENTS[name] for name in names if name in COUNTED_EVENTS)
+    if counts:
+        hub.publish("counters", dict(counts))
+
+
+def record_lead(name: str, phone: str, created_at: datetime) -> None:
+    hub.publish("lead", {"name": name, "phone": phone, "created_at": created_at.isoformat()})
+
+
+def record_load_run(timestamp: str, p95: float | None, errors: int | None) -> None:
+    hub.publish("load", {"timestamp": timestamp, "p95": p95, "errors": errors})
+
+
+__all__ = [
+    "COUNTED_EVENTS",
+    "Delta",
+    "LiveHub",
+    "hub",
+    "record_events",
+    "record_lead",
+    "record_load_run",
+]
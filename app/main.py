@@ -20,10 +20,11 @@ from aiohttp import web
 
 from app import build_info
 from app.background import start_background_queue, stop_background_queue
-from app.catalog import handlers as h_catalog
-from app.catalog.loader import CATALOG_SHA
+from app.cache import cache_stats
+from app.catalog import handlers as h_catalog, loader as catalog_loader
 from app.config import settings
 from app.db.session import current_revision, head_revision, init_db, session_scope
+from app.event_sink import event_sink, start_event_sink, stop_event_sink
 from app.feature_flags import FF_FLOODWAIT_PATCH, feature_flags
 from app.handlers import (
     admin as h_admin,
@@ -65,18 +66,21 @@ from app.handlers import (
     tribute_webhook as h_tw,
 )
 from app.logging_config import setup_logging
+from app.metrics import EVENT_COUNTERS, REGISTRY, render as render_metrics, seed_event_totals
 from app.middlewares import (
     AuditMiddleware,
     CallbackDebounceMiddleware,
     CallbackTraceMiddleware,
     InputValidationMiddleware,
     RateLimitMiddleware,
+    SessionFlushMiddleware,
     UpdateDeduplicateMiddleware,
 )
 from app.quiz import handlers as quiz_engine_handlers
-from app.repo import events as events_repo
+from app.repo import rollups as rollups_repo
 from app.router_map import capture_router_map
 from app.scheduler.service import start_scheduler
+from app.storage import memory_stats
 from app.utils import safe_edit_text
 from app.utils.build import get_build_info
 from app.utils.telegram_session import FloodWaitRetrySession, log_aiogram_version
@@ -190,43 +194,71 @@ async def _handle_ping(_: web.Request) -> web.Response:
     )
 
 
-async def _handle_metrics(_: web.Request) -> web.Response:
-    uptime = max(0.0, time.time() - SERVICE_START_TS)
-    lines = [
-        "# HELP five_keys_bot_uptime_seconds Application uptime in seconds",
-        "# TYPE five_keys_bot_uptime_seconds gauge",
-        f"five_keys_bot_uptime_seconds {uptime:.0f}",
-    ]
+UPTIME_SECONDS = REGISTRY.gauge("five_keys_bot_uptime_seconds", "Application uptime in seconds")
+BUILD_INFO = REGISTRY.gauge(
+    "five_keys_bot_build_info", "Git branch and commit of the build", ("branch", "commit")
+)
+BOT_BUILD_INFO = REGISTRY.gauge(
+    "bot_build_info",
+    "Version, commit and timestamp of the build",
+    ("version", "commit", "timestamp"),
+)
+MEMORY_ENTRIES = REGISTRY.gauge(
+    "five_keys_bot_memory_entries", "Entries held by in-process storage maps", ("map",)
+)
+MEMORY_BYTES = REGISTRY.gauge(
+    "five_keys_bot_memory_bytes", "Approximate bytes held by in-process storage maps", ("map",)
+)
+CACHE_LOOKUPS = REGISTRY.gauge(
+    "five_keys_bot_cache_lookups", "Catalog cache lookups by result", ("cache", "result")
+)
+EVENT_SINK_EVENTS = REGISTRY.gauge(
+    "five_keys_bot_event_sink_events", "Analytics events seen by the buffered sink", ("state",)
+)
+
+_CACHE_RESULTS = ("l1_hits", "l2_hits", "misses", "negative_hits", "coalesced", "errors")
+_SINK_STATES = ("queued", "enqueued", "written", "dropped", "poisoned")
+
+
+@REGISTRY.on_collect
+def _collect_process_metrics() -> None:
+    UPTIME_SECONDS.set(round(max(0.0, time.time() - SERVICE_START_TS)))
+    for name, stats in memory_stats().items():
+        MEMORY_ENTRIES.set(stats["entries"], map=name)
+        MEMORY_BYTES.set(stats["approx_bytes"], map=name)
+    for name, stats in cache_stats().items():
+        for result in _CACHE_RESULTS:
+            CACHE_LOOKUPS.set(stats[result], cache=name, result=result)
+    sink = event_sink.stats()
+    for state in _SINK_STATES:
+        EVENT_SINK_EVENTS.set(sink[state], state=state)
+
+
+def _set_build_metrics() -> None:
     build = get_build_info()
     branch = getattr(build_info, "GIT_BRANCH", "unknown")
     commit = getattr(build_info, "GIT_COMMIT", "unknown")
-    lines.append(f'five_keys_bot_build_info{{branch="{branch}",commit="{commit}"}} 1')
-    lines.append(
-        'bot_build_info{version="%s",commit="%s",timestamp="%s"} 1'
-        % (build["version"], build["commit"], build["timestamp"])
+    BUILD_INFO.set(1, branch=branch, commit=commit)
+    BOT_BUILD_INFO.set(
+        1, version=build["version"], commit=build["commit"], timestamp=build["timestamp"]
     )
 
-    recommend_total: int | None = None
-    quiz_total: int | None = None
-    metrics_log = logging.getLogger("metrics")
+
+async def _reconcile_metrics() -> None:
+    """Seed the event counters from the database once; events update them afterwards."""
+
+    _set_build_metrics()
     try:
         async with session_scope() as session:
-            recommend_total = await events_repo.stats(session, name="plan_generated")
-            quiz_total = await events_repo.stats(session, name="quiz_finish")
+            totals = await rollups_repo.totals(session, list(EVENT_COUNTERS))
     except Exception:
-        metrics_log.exception("metrics counters fetch failed")
-
-    lines.extend(
-        [
-            "# HELP five_keys_bot_recommend_requests_total Total recommendation plans generated",
-            "# TYPE five_keys_bot_recommend_requests_total counter",
-            f"five_keys_bot_recommend_requests_total {recommend_total if recommend_total is not None else 'nan'}",
-            "# HELP five_keys_bot_quiz_completed_total Total completed quizzes",
-            "# TYPE five_keys_bot_quiz_completed_total counter",
-            f"five_keys_bot_quiz_completed_total {quiz_total if quiz_total is not None else 'nan'}",
-        ]
-    )
-    return web.Response(text="\n".join(lines) + "\n", content_type="text/plain")
+        logging.getLogger("metrics").exception("metrics reconcile failed")
+        return
+    seed_event_totals(totals)
+
+
+async def _handle_metrics(_: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type="text/plain")
 
 
 def _doctor_host_for_checks(host: str | None) -> str:
@@ -275,7 +307,7 @@ async def _handle_doctor(_: web.Request) -> web.Response:
     current = await current_revision()
     head = await head_revision()
     migrations = _collect_migration_files()
-    catalog_sha = CATALOG_SHA or "unknown"
+    catalog_sha = catalog_loader.CATALOG_SHA or "unknown"
     build = get_build_info()
     payload = {
         "status": "ok",
@@ -456,6 +488,15 @@ def _register_update_deduplicate_middleware(dp: Dispatcher) -> UpdateDeduplicate
     return deduplicate
 
 
+def _register_session_flush_middleware(dp: Dispatcher) -> SessionFlushMiddleware:
+    """Register middleware that persists dirty sessions once per update."""
+
+    session_flush = SessionFlushMiddleware()
+    dp.update.outer_middleware(session_flush)
+    startup_log.info("S4e: session flush middleware registered")
+    return session_flush
+
+
 def _register_audit_middleware(dp: Dispatcher) -> AuditMiddleware:
     """Register the audit middleware on every dispatcher layer."""
 
@@ -663,6 +704,7 @@ async def main() -> None:
     mark("S3: bot/dispatcher created")
 
     _register_update_deduplicate_middleware(dp)
+    _register_session_flush_middleware(dp)
     _register_audit_middleware(dp)
     _register_rate_limit_middleware(dp)
     _register_callback_middlewares(dp)
@@ -766,6 +808,16 @@ async def main() -> None:
         background_started = True
         mark("S6a: background queue started")
 
+    catalog_watcher = catalog_loader.CatalogWatcher()
+    if catalog_watcher.start():
+        mark("S6b: catalog watcher started")
+
+    await _reconcile_metrics()
+    mark("S6c: metrics reconciled")
+
+    await start_event_sink()
+    mark("S6d: event sink started")
+
     runner: web.AppRunner | None = None
     site: web.BaseSite | None = None
     runner, site = await _setup_service_app()
@@ -796,6 +848,11 @@ async def main() -> None:
         mark("S9: shutdown sequence")
         logging.info(">>> Polling stopped")
         await _cleanup_service_resources(runner, site)
+        catalog_watcher.stop()
+        try:
+            await stop_event_sink()
+        except Exception:
+            startup_log.exception("event sink flush failed")
         if background_started:
             with contextlib.suppress(Exception):
                 await stop_background_queue()
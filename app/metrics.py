@@ -0,0 +1,318 @@
+"""In-process Prometheus metrics rendered without touching the database."""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Mapping, Sequence
+
+LabelKey = tuple[str, ...]
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: tuple[str, ...] = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Mapping[str, object]) -> LabelKey:
+        if len(labels) != len(self.labelnames) or set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:  # pragma: no cover - overridden
+        return iter(())
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class _Value(_Metric):
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_Value):
+    """Monotonic counter; :meth:`seed` sets the baseline loaded at startup."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        if amount < 0:
+            raise ValueError("counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def seed(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Gauge(_Value):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Histogram over a fixed, sorted set of upper bounds (``+Inf`` is implied)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        bounds = sorted(float(bound) for bound in buckets if not math.isinf(bound))
+        if not bounds:
+            raise ValueError("histogram needs at least one finite bucket")
+        self.buckets: tuple[float, ...] = tuple(bounds)
+        # Per label set: per-bucket (non-cumulative) counts, then sum and count.
+        self._series: Dict[LabelKey, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            series[0][index] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: object) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return int(series[1][1]) if series else 0
+
+    def _samples(self) -> Iterator[str]:
+        names = self.labelnames + ("le",)
+        for key, (counts, (total, observed)) in self._series.items():
+            running = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts, strict=True):
+                running += count
+                labels = _labels(names, key + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {running}"
+            labels = _labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {_format_value(observed)}"
+
+
+class Registry:
+    """Named metrics plus collectors refreshed right before each render."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls: type, name: str, documentation: str, labelnames, **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered differently")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, documentation, labelnames)  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, documentation, labelnames)  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get(  # type: ignore[return-value]
+            Histogram, name, documentation, labelnames, buckets=buckets
+        )
+
+    def on_collect(self, collector: Callable[[], None]) -> Callable[[], None]:
+        """Register ``collector`` to refresh gauges from in-process state on render."""
+
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        """Return the Prometheus text exposition of every registered metric."""
+
+        for collector in list(self._collectors):
+            collector()
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+RECOMMEND_TOTAL = REGISTRY.counter(
+    "five_keys_bot_recommend_requests_total", "Total recommendation plans generated"
+)
+QUIZ_TOTAL = REGISTRY.counter("five_keys_bot_quiz_completed_total", "Total completed quizzes")
+UPDATE_SECONDS = REGISTRY.histogram(
+    "five_keys_bot_update_duration_seconds",
+    "Time spent handling one Telegram update",
+    ("outcome",),
+)
+JOB_SECONDS = REGISTRY.histogram(
+    "five_keys_bot_job_duration_seconds",
+    "Scheduler job run time",
+    ("job", "outcome"),
+)
+BROADCAST_MESSAGES = REGISTRY.counter(
+    "five_keys_bot_broadcast_messages_total",
+    "Broadcast send outcomes per scheduler job",
+    ("job", "outcome"),
+)
+BROADCAST_RATE = REGISTRY.gauge(
+    "five_keys_bot_broadcast_rate",
+    "Delivered messages per second in the job's last broadcast",
+    ("job",),
+)
+
+# Event names whose all-time totals are mirrored by a counter.
+EVENT_COUNTERS: Dict[str, Counter] = {
+    "plan_generated": RECOMMEND_TOTAL,
+    "quiz_finish": QUIZ_TOTAL,
+}
+
+
+def record_events(names: Iterable[str]) -> None:
+    """Count events that were just written to the database."""
+
+    for name in names:
+        counter = EVENT_COUNTERS.get(name)
+        if counter is not None:
+            counter.inc()
+
+
+def seed_event_totals(totals: Mapping[str, int]) -> None:
+    """Load persisted event totals into their counters (once, at startup)."""
+
+    for name, total in totals.items():
+        counter = EVENT_COUNTERS.get(name)
+        if counter is not None:
+            counter.seed(total)
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+__all__ = [
+    "BROADCAST_MESSAGES",
+    "BROADCAST_RATE",
+    "Counter",
+    "DEFAULT_BUCKETS",
+    "EVENT_COUNTERS",
+    "Gauge",
+    "Histogram",
+    "JOB_SECONDS",
+    "QUIZ_TOTAL",
+    "RECOMMEND_TOTAL",
+    "REGISTRY",
+    "Registry",
+    "UPDATE_SECONDS",
+    "record_events",
+    "render",
+    "seed_event_totals",
+]
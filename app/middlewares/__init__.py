@@ -9,6 +9,7 @@ from .callback_trace import (
 )
 from .input_validation import InputValidationMiddleware
 from .rate_limit import RateLimitMiddleware
+from .session_flush import SessionFlushMiddleware
 from .update_deduplicate import UpdateDeduplicateMiddleware
 
 __all__ = [
@@ -17,6 +18,7 @@ __all__ = [
     "CallbackTraceMiddleware",
     "InputValidationMiddleware",
     "RateLimitMiddleware",
+    "SessionFlushMiddleware",
     "UpdateDeduplicateMiddleware",
     "is_callback_trace_enabled",
     "set_callback_trace_enabled",
@@ -9,6 +9,8 @@ from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware, types
 from aiogram.types import CallbackQuery, Message, Update
 
+from app.metrics import UPDATE_SECONDS
+
 log = logging.getLogger("audit")
 
 
@@ -62,6 +64,7 @@ class AuditMiddleware(BaseMiddleware):
         data: Dict[str, Any],
     ) -> Any:
         started = time.perf_counter()
+        outcome = "ok"
         try:
             if isinstance(event, Update):
                 log.info(
@@ -97,8 +100,11 @@ class AuditMiddleware(BaseMiddleware):
                 _log_cb(None, event, chat_id)
             return await handler(event, data)
         except Exception:
+            outcome = "error"
             log.exception("Handler error on event")
             raise
         finally:
-            elapsed_ms = (time.perf_counter() - started) * 1000
-            log.debug("AUDIT latency_ms=%.2f", elapsed_ms)
+            elapsed = time.perf_counter() - started
+            if isinstance(event, Update):
+                UPDATE_SECONDS.observe(elapsed, outcome=outcome)
+            log.debug("AUDIT latency_ms=%.2f", elapsed * 1000)
@@ -0,0 +1,29 @@
+"""Middleware that writes dirty sessions once per handled update."""
+
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.storage import AsyncSessionStore, sessions
+
+
+class SessionFlushMiddleware(BaseMiddleware):
+    """Defer session persistence until the update handler has finished."""
+
+    def __init__(self, store: AsyncSessionStore | None = None) -> None:
+        self._sessions = store or sessions
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self._sessions.deferred():
+            return await handler(event, data)
+
+
+__all__ = ["SessionFlushMiddleware"]
@@ -22,11 +22,10 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from app.content.overrides import load_quiz_override
 from app.content.overrides.quiz_merge import apply_quiz_override
-from app.db.session import compat_session, session_scope
+from app.event_sink import event_sink
 from app.feature_flags import feature_flags
 from app.reco.ai_reasoner import ai_tip_for_quiz
-from app.repo import events as events_repo
-from app.storage import commit_safely, touch_throttle
+from app.storage import touch_throttle
 
 if TYPE_CHECKING:  # pragma: no cover - import only for typing
     pass
@@ -245,7 +244,7 @@ async def start_quiz(entry: CallbackQuery | Message, state: FSMContext, name: st
 
     user_id = getattr(getattr(entry, "from_user", None), "id", None)
     if feature_flags.is_enabled("FF_QUIZ_GUARD", user_id=user_id) and user_id:
-        remaining = touch_throttle(int(user_id), f"quiz:start:{name}", QUIZ_GUARD_COOLDOWN)
+        remaining = await touch_throttle(int(user_id), f"quiz:start:{name}", QUIZ_GUARD_COOLDOWN)
         if remaining > 0:
             warning = "Тест уже запущен. Давай завершим текущий и попробуем ещё раз чуть позже."
             if isinstance(entry, CallbackQuery):
@@ -283,12 +282,7 @@ async def start_quiz(entry: CallbackQuery | Message, state: FSMContext, name: st
                 await message_to_delete.delete()
 
     if user_id:
-        try:
-            async with compat_session(session_scope) as session:
-                await events_repo.log(session, int(user_id), "quiz_start", {"quiz": name})
-                await commit_safely(session)
-        except Exception:  # pragma: no cover - logging best-effort
-            logger.warning("quiz_start event logging failed", exc_info=True)
+        event_sink.emit(int(user_id), "quiz_start", {"quiz": name})
 
 
 async def answer_callback(
@@ -0,0 +1,96 @@
+"""Per-recipient progress of scheduler broadcasts (``broadcast_recipients``)."""
+
+from __future__ import annotations
+
+import datetime as dt
+from typing import Iterable, Sequence
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import BroadcastRecipient
+
+PENDING = "pending"
+SENT = "sent"
+BLOCKED = "blocked"
+FAILED = "failed"
+
+
+async def enqueue(session: AsyncSession, run_key: str, user_ids: Iterable[int]) -> int:
+    """Add recipients to ``run_key``; ones already recorded keep their status."""
+
+    now = dt.datetime.now(dt.timezone.utc)
+    rows = [
+        {
+            "run_key": run_key,
+            "user_id": int(uid),
+            "status": PENDING,
+            "attempts": 0,
+            "updated_at": now,
+        }
+        for uid in dict.fromkeys(user_ids)
+    ]
+    if not rows:
+        return 0
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        module = postgresql if dialect == "postgresql" else sqlite
+        stmt = module.insert(BroadcastRecipient).on_conflict_do_nothing(
+            index_elements=[BroadcastRecipient.run_key, BroadcastRecipient.user_id]
+        )
+        await session.execute(stmt, rows)
+        return len(rows)
+    known = set(
+        (
+            await session.execute(
+                select(BroadcastRecipient.user_id).where(BroadcastRecipient.run_key == run_key)
+            )
+        ).scalars()
+    )
+    fresh = [row for row in rows if row["user_id"] not in known]
+    if fresh:
+        await session.execute(insert(BroadcastRecipient), fresh)
+    return len(rows)
+
+
+async def pending(session: AsyncSession, run_key: str) -> list[int]:
+    stmt = (
+        select(BroadcastRecipient.user_id)
+        .where(BroadcastRecipient.run_key == run_key, BroadcastRecipient.status == PENDING)
+        .order_by(BroadcastRecipient.user_id)
+    )
+    return list((await session.execute(stmt)).scalars())
+
+
+async def record(
+    session: AsyncSession,
+    run_key: str,
+    outcomes: Sequence[tuple[int, str, int, str | None]],
+) -> None:
+    """Store ``(user_id, status, attempts, error)`` outcomes with one executemany."""
+
+    if not outcomes:
+        return
+    now = dt.datetime.now(dt.timezone.utc)
+    # Bulk UPDATE by primary key: one executemany for the whole batch.
+    await session.execute(
+        update(BroadcastRecipient),
+        [
+            {
+                "run_key": run_key,
+                "user_id": user_id,
+                "status": status,
+                "attempts": attempts,
+                "error": error[:255] if error else None,
+                "updated_at": now,
+            }
+            for user_id, status, attempts, error in outcomes
+        ],
+    )
+
+
+async def prune(session: AsyncSession, older_than: dt.datetime) -> int:
+    stmt = delete(BroadcastRecipient).where(BroadcastRecipient.updated_at < older_than)
+    result = await session.execute(stmt)
+    return result.rowcount or 0
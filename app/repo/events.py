@@ -3,13 +3,18 @@ from __future__ import annotations
 import inspect
 from contextlib import suppress
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, Optional, Sequence
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence
 
-from sqlalchemy import func, select
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import OperationalError, ProgrammingError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from app.db.models import Event
+from app import live
+from app.db.models import Event, UserEventState
+from app.db.session import after_commit
+from app.metrics import record_events
 
 
 async def log(
@@ -38,9 +43,96 @@ async def log(
                 with suppress(Exception):  # pragma: no cover - best effort cleanup
                     await result
         return event
+    await _touch_state(session, [_state_row(event.user_id, name, event.ts, event.meta)])
+    _count_on_commit(session, name)
     return event
 
 
+def _count_on_commit(session: AsyncSession, name: str) -> None:
+    """Update metrics and live dashboards once the caller's transaction commits."""
+
+    def _publish() -> None:
+        record_events((name,))
+        live.record_events((name,))
+
+    after_commit(session, _publish)
+
+
+async def insert_many(session: AsyncSession, rows: Sequence[Mapping[str, Any]]) -> int:
+    """Insert pre-stamped event rows with a single multi-row ``INSERT``."""
+
+    if not rows:
+        return 0
+    try:
+        await session.execute(insert(Event), [dict(row) for row in rows])
+        await _touch_state(
+            session,
+            [
+                _state_row(row.get("user_id"), row["name"], row["ts"], row.get("meta"))
+                for row in rows
+            ],
+        )
+    except (OperationalError, ProgrammingError) as exc:
+        if not _is_missing_table_error(exc):
+            raise
+        rollback = getattr(session, "rollback", None)
+        if callable(rollback):
+            result = rollback()
+            if inspect.isawaitable(result):
+                with suppress(Exception):  # pragma: no cover - best effort cleanup
+                    await result
+        return 0
+    return len(rows)
+
+
+def _state_row(
+    user_id: Optional[int], name: str, ts: datetime, meta: Optional[Dict[str, Any]]
+) -> Dict[str, Any] | None:
+    if user_id is None:
+        return None
+    return {"user_id": int(user_id), "name": name, "last_ts": ts, "last_meta": meta or {}}
+
+
+async def _touch_state(session: AsyncSession, rows: Iterable[Dict[str, Any] | None]) -> None:
+    """Advance ``user_event_state`` to the newest of ``rows`` per ``(user_id, name)``."""
+
+    latest: dict[tuple[int, str], Dict[str, Any]] = {}
+    for row in rows:
+        if row is None:
+            continue
+        key = (row["user_id"], row["name"])
+        current = latest.get(key)
+        if current is None or row["last_ts"] >= current["last_ts"]:
+            latest[key] = row
+    if not latest:
+        return
+
+    dialect = session.get_bind().dialect.name
+    try:
+        if dialect in ("postgresql", "sqlite"):
+            module = postgresql if dialect == "postgresql" else sqlite
+            stmt = module.insert(UserEventState)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserEventState.user_id, UserEventState.name],
+                set_={"last_ts": stmt.excluded.last_ts, "last_meta": stmt.excluded.last_meta},
+                # Batches may land out of order; never move the state backwards.
+                where=stmt.excluded.last_ts >= UserEventState.last_ts,
+            )
+            await session.execute(stmt, list(latest.values()))
+            return
+        for row in latest.values():
+            state = await session.get(UserEventState, (row["user_id"], row["name"]))
+            if state is None:
+                session.add(UserEventState(**row))
+            elif row["last_ts"] >= state.last_ts:
+                state.last_ts = row["last_ts"]
+                state.last_meta = row["last_meta"]
+        await session.flush()
+    except (OperationalError, ProgrammingError) as exc:
+        if not _is_missing_table_error(exc):
+            raise
+
+
 async def upsert(
     session: AsyncSession,
     user_id: Optional[int],
@@ -52,7 +144,7 @@ async def upsert(
     stmt = (
         select(Event)
         .where(Event.user_id == user_id, Event.name == name)
-        .order_by(Event.id.asc())
+        .order_by(Event.ts.asc(), Event.id.asc())
         .limit(1)
     )
     try:
@@ -83,6 +175,9 @@ async def upsert(
             if inspect.isawaitable(result):
                 with suppress(Exception):  # pragma: no cover
                     await result
+        return event
+    await _touch_state(session, [_state_row(user_id, name, now, payload)])
+    _count_on_commit(session, name)
     return event
 
 
@@ -156,25 +251,34 @@ async def latest_by_users(
     session: AsyncSession,
     name: str,
     user_ids: Iterable[int | None],
-) -> dict[int, Event]:
+) -> dict[int, UserEventState]:
     ids = sorted({int(uid) for uid in user_ids if uid is not None})
     if not ids:
         return {}
 
-    subq = (
-        select(Event.user_id, func.max(Event.ts).label("max_ts"))
-        .where(Event.name == name, Event.user_id.in_(ids))
-        .group_by(Event.user_id)
-        .subquery()
+    stmt = (
+        select(UserEventState)
+        .where(UserEventState.name == name, UserEventState.user_id.in_(ids))
+        .execution_options(populate_existing=True)
     )
+    try:
+        result = await session.execute(stmt)
+    except (OperationalError, ProgrammingError) as exc:
+        if _is_missing_table_error(exc):
+            return {}
+        raise
+    return {state.user_id: state for state in result.scalars()}
+
+
+async def latest_states(
+    session: AsyncSession, user_id: int, names: Iterable[str]
+) -> dict[str, UserEventState]:
+    """Return the latest state row for each of ``names`` recorded for ``user_id``."""
 
     stmt = (
-        select(Event)
-        .join(
-            subq,
-            (Event.user_id == subq.c.user_id) & (Event.ts == subq.c.max_ts),
-        )
-        .where(Event.name == name)
+        select(UserEventState)
+        .where(UserEventState.user_id == user_id, UserEventState.name.in_(list(names)))
+        .execution_options(populate_existing=True)
     )
     try:
         result = await session.execute(stmt)
@@ -182,26 +286,19 @@ async def latest_by_users(
         if _is_missing_table_error(exc):
             return {}
         raise
-    events = result.scalars().all()
-    return {event.user_id: event for event in events if event.user_id is not None}
+    return {state.name: state for state in result.scalars()}
 
 
 async def notify_recipients(session: AsyncSession) -> Sequence[int]:
-    status_events = ("notify_on", "notify_off")
-    subq = (
-        select(Event.user_id, func.max(Event.ts).label("last_ts"))
-        .where(Event.name.in_(status_events), Event.user_id.is_not(None))
-        .group_by(Event.user_id)
-        .subquery()
-    )
-
+    on = aliased(UserEventState)
+    off = aliased(UserEventState)
     stmt = (
-        select(Event.user_id)
-        .join(
-            subq,
-            (Event.user_id == subq.c.user_id) & (Event.ts == subq.c.last_ts),
+        select(on.user_id)
+        .outerjoin(off, (off.user_id == on.user_id) & (off.name == "notify_off"))
+        .where(
+            on.name == "notify_on",
+            or_(off.last_ts.is_(None), off.last_ts <= on.last_ts),
         )
-        .where(Event.name == "notify_on")
     )
     try:
         result = await session.execute(stmt)
@@ -209,7 +306,83 @@ async def notify_recipients(session: AsyncSession) -> Sequence[int]:
         if _is_missing_table_error(exc):
             return []
         raise
-    return [row[0] for row in result.all() if row[0] is not None]
+    return [row[0] for row in result.all()]
+
+
+async def rebuild_user_state(session: AsyncSession) -> int:
+    """Recompute ``user_event_state`` from the ``events`` history still in the table."""
+
+    ranked = (
+        select(
+            Event.user_id,
+            Event.name,
+            Event.ts,
+            Event.meta,
+            func.row_number()
+            .over(
+                partition_by=(Event.user_id, Event.name),
+                order_by=(Event.ts.desc(), Event.id.desc()),
+            )
+            .label("rank"),
+        )
+        .where(Event.user_id.is_not(None))
+        .subquery()
+    )
+    latest = select(ranked.c.user_id, ranked.c.name, ranked.c.ts, ranked.c.meta).where(
+        ranked.c.rank == 1
+    )
+    # Pairs whose raw events were all archived keep their existing state row.
+    remaining = (
+        select(Event.id)
+        .where(Event.user_id == UserEventState.user_id, Event.name == UserEventState.name)
+        .exists()
+    )
+    await session.execute(delete(UserEventState).where(remaining))
+    result = await session.execute(
+        insert(UserEventState).from_select(["user_id", "name", "last_ts", "last_meta"], latest)
+    )
+    return max(result.rowcount or 0, 0)
+
+
+def _superseded():
+    """Match events with a newer row of the same ``(user_id, name)``.
+
+    The newest row per user and name stays in ``events`` however old it is:
+    :func:`last_by`, :func:`upsert` and :func:`recent_plans` read it from there.
+    """
+
+    newer = aliased(Event)
+    return or_(
+        Event.user_id.is_(None),
+        select(newer.id)
+        .where(newer.user_id == Event.user_id, newer.name == Event.name, newer.ts > Event.ts)
+        .exists(),
+    )
+
+
+async def archivable(
+    session: AsyncSession, *, before: datetime, max_id: int, limit: int
+) -> Sequence[Event]:
+    """Return the oldest superseded events with ``ts < before`` and ``id <= max_id``, by id."""
+
+    stmt = (
+        select(Event)
+        .where(Event.id <= max_id, Event.ts < before, _superseded())
+        .order_by(Event.id.asc())
+        .limit(limit)
+    )
+    result = await session.execute(stmt)
+    return list(result.scalars())
+
+
+async def delete_archived(session: AsyncSession, ids: Sequence[int]) -> int:
+    """Delete exactly the events of an :func:`archivable` batch that was written out."""
+
+    if not ids:
+        return 0
+    stmt = delete(Event).where(Event.id.in_(ids))
+    result = await session.execute(stmt, execution_options={"synchronize_session": False})
+    return max(result.rowcount or 0, 0)
 
 
 def _is_missing_table_error(exc: BaseException) -> bool:
@@ -6,7 +6,9 @@ from typing import Sequence
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import live
 from app.db.models import Lead
+from app.db.session import after_commit
 
 
 async def add(
@@ -27,6 +29,7 @@ async def add(
     )
     session.add(lead)
     await session.flush()
+    after_commit(session, lambda: live.record_lead(name, phone, lead.ts))
     return lead
 
 
@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 from collections.abc import Mapping
+from datetime import datetime, timezone
 from typing import Any
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import UserProfile
+from app.growth.attribution import encode_utm_key
 
 
 async def get(session: AsyncSession, user_id: int) -> UserProfile | None:
@@ -53,5 +55,7 @@ async def save_utm(session: AsyncSession, user_id: int, utm: Mapping[str, str])
             updated = True
     if updated:
         profile.utm = existing
+        profile.utm_key = encode_utm_key(existing)
+        profile.utm_updated_at = datetime.now(timezone.utc)
         await session.flush()
     return profile
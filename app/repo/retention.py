@@ -3,11 +3,11 @@ from __future__ import annotations
 import datetime as dt
 from typing import Iterable, Sequence
 
-from sqlalchemy import delete, func, select
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.db.models import DailyTip, Event, RetentionJourney, RetentionSetting
+from app.db.models import DailyTip, Event, RetentionJourney, RetentionSetting, UserEventState
 
 _DEFAULT_TZ = settings.TIMEZONE or "UTC"
 
@@ -70,28 +70,33 @@ async def list_water_candidates(session: AsyncSession) -> Sequence[RetentionSett
     return list(result.scalars())
 
 
-async def pick_tip(session: AsyncSession, *, exclude_id: int | None = None) -> DailyTip | None:
-    stmt = select(DailyTip).order_by(func.random()).limit(1)
-    if exclude_id is not None:
-        stmt = stmt.where(DailyTip.id != exclude_id)
-    result = await session.execute(stmt)
-    tip = result.scalar_one_or_none()
-    if tip is None and exclude_id is not None:
-        fallback = await session.execute(select(DailyTip).limit(1))
-        return fallback.scalar_one_or_none()
-    return tip
+async def list_tips(session: AsyncSession) -> list[tuple[int, str]]:
+    result = await session.execute(select(DailyTip.id, DailyTip.text).order_by(DailyTip.id))
+    return [(tip_id, text) for tip_id, text in result.all()]
 
 
-async def update_tip_log(
+async def record_tips_sent(
     session: AsyncSession,
-    setting: RetentionSetting,
+    sent: Sequence[tuple[int, int, bytes | None]],
     *,
-    tip: DailyTip,
     sent_at: dt.datetime,
 ) -> None:
-    setting.last_tip_sent_at = sent_at
-    setting.last_tip_id = tip.id
-    await session.flush()
+    """Store ``(user_id, tip_id, tips_seen)`` for a whole tip run in one executemany."""
+
+    if not sent:
+        return
+    await session.execute(
+        update(RetentionSetting),
+        [
+            {
+                "user_id": user_id,
+                "last_tip_id": tip_id,
+                "last_tip_sent_at": sent_at,
+                "tips_seen": tips_seen,
+            }
+            for user_id, tip_id, tips_seen in sent
+        ],
+    )
 
 
 async def record_water_progress(
@@ -196,9 +201,10 @@ async def count_tip_enabled(session: AsyncSession) -> int:
 
 
 async def count_tip_click_users(session: AsyncSession, since: dt.datetime | None = None) -> int:
-    stmt = select(func.count(func.distinct(Event.user_id))).where(Event.name == "daily_tip_click")
+    # A user clicked since ``since`` exactly when their latest click is that recent.
+    stmt = select(func.count()).where(UserEventState.name == "daily_tip_click")
     if since is not None:
-        stmt = stmt.where(Event.ts >= since)
+        stmt = stmt.where(UserEventState.last_ts >= since)
     result = await session.execute(stmt)
     value = result.scalar_one()
     return int(value or 0)
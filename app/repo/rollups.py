@@ -0,0 +1,307 @@
+"""Daily event rollups maintained incrementally from the ``events`` table."""
+
+from __future__ import annotations
+
+import datetime as dt
+import os
+from collections import Counter
+from typing import Any, Iterable, Mapping
+
+from sqlalchemy import (
+    Date,
+    Select,
+    String,
+    case,
+    cast,
+    func,
+    literal,
+    literal_column,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement, UnaryExpression
+from sqlalchemy.sql.operators import custom_op
+from sqlalchemy.sql.selectable import TableValuedAlias
+
+from app.db.models import Event, EventDailyCount, RollupWatermark
+
+ROLLUP_BATCH = int(os.getenv("EVENT_ROLLUP_BATCH", "5000"))
+# Events younger than this stay in the raw tail so late commits with lower ids
+# are not skipped by the high-water mark.
+ROLLUP_LAG_SECONDS = float(os.getenv("EVENT_ROLLUP_LAG", "60"))
+WATERMARK = "event_daily_counts"
+
+# Meta keys each event is broken down by, in addition to the "" total row.
+DIMENSIONS: dict[str, tuple[str, ...]] = {
+    "quiz_finish": ("quiz",),
+    "calc_finish": ("calc",),
+    "plan_generated": ("products",),
+    "premium_cta_click": ("source",),
+    "premium_info_open": ("source",),
+}
+# List-valued keys count once per element and add nothing when missing.
+_MULTI_VALUED = frozenset({"products"})
+# Meta keys mirrored by generated ``events`` columns.
+_COLUMNS = {"quiz": Event.quiz, "calc": Event.calc, "source": Event.source}
+
+RollupKey = tuple[str, dt.date, str, str]
+
+
+def _aware(ts: dt.datetime) -> dt.datetime:
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=dt.timezone.utc)
+    return ts.astimezone(dt.timezone.utc)
+
+
+def _as_date(value: Any) -> dt.date:
+    return value if isinstance(value, dt.date) else dt.date.fromisoformat(str(value))
+
+
+def _day(dialect: str) -> ColumnElement[Any]:
+    if dialect == "postgresql":
+        return cast(func.timezone("UTC", Event.ts), Date)
+    return func.date(Event.ts)
+
+
+def _unindexed(dialect: str, column: ColumnElement[Any]) -> ColumnElement[Any]:
+    """Keep ``column`` from steering SQLite off a rowid range (unary ``+``).
+
+    Without ``ANALYZE`` statistics SQLite prefers an equality on an index
+    over ``id > ?``, which would walk a name's whole history.
+    """
+
+    if dialect != "sqlite":
+        return column
+    return UnaryExpression(column, operator=custom_op("+"), type_=column.type)
+
+
+def _elements(dialect: str, key: str) -> TableValuedAlias:
+    """Unnest the ``key`` array of ``meta``; non-array values yield no rows."""
+
+    if dialect == "postgresql":
+        items = Event.meta[key]
+        array = case(
+            (func.jsonb_typeof(items) == "array", items),
+            else_=literal_column("'[]'::jsonb"),
+        )
+        return func.jsonb_array_elements_text(array).table_valued("value")
+    return func.json_each(
+        case((func.json_type(Event.meta, f"$.{key}") == "array", Event.meta), else_="[]"),
+        case((func.json_type(Event.meta, f"$.{key}") == "array", f"$.{key}"), else_="$"),
+    ).table_valued("value")
+
+
+def _grouped(
+    dialect: str,
+    dimension: str,
+    names: Iterable[str] | None,
+    conditions: Iterable[ColumnElement[bool]],
+    *,
+    by_day: bool,
+    id_range: bool = False,
+) -> Select | None:
+    """Build ``SELECT name[, day], value, count(*)`` for one dimension.
+
+    ``dimension`` ``""`` counts events; otherwise only names configured for
+    that meta key in :data:`DIMENSIONS` are grouped by its value, mirroring
+    the rows :func:`roll_up` writes.  With ``id_range`` the conditions select
+    a short run of ids, so ``name`` must not pull SQLite onto an index.
+    ``None`` when no name qualifies.
+    """
+
+    if dimension:
+        configured = [name for name, keys in DIMENSIONS.items() if dimension in keys]
+        names = [name for name in (configured if names is None else names) if name in configured]
+        if not names:
+            return None
+    name = _unindexed(dialect, Event.name) if id_range else Event.name
+    keys: list[ColumnElement[Any]] = [name]
+    if by_day:
+        keys.append(_day(dialect))
+    source: Any = Event.__table__
+    conditions = list(conditions)
+    if names is not None:
+        conditions.append(name.in_(list(names)))
+    if not dimension:
+        value: ColumnElement[Any] = literal("")
+    elif dimension in _MULTI_VALUED:
+        elements = _elements(dialect, dimension)
+        value = func.substr(cast(elements.c.value, String), 1, 128)
+        source = source.join(elements, true())
+        conditions += [elements.c.value.is_not(None), value != ""]
+    else:
+        raw = _COLUMNS.get(dimension)
+        if raw is None:
+            raw = func.substr(Event.meta[dimension].as_string(), 1, 128)
+        value = func.coalesce(func.nullif(raw, ""), "unknown")
+    keys.append(value)
+    return select(*keys, func.count()).select_from(source).where(*conditions).group_by(*keys)
+
+
+async def watermark(session: AsyncSession) -> int:
+    stmt = select(RollupWatermark.last_event_id).where(RollupWatermark.name == WATERMARK)
+    return int((await session.execute(stmt)).scalar_one_or_none() or 0)
+
+
+async def _advance_watermark(session: AsyncSession, expected: int, last_event_id: int) -> None:
+    """Move the watermark from ``expected`` to ``last_event_id`` or fail.
+
+    The compare-and-set keeps two concurrent rollups from counting the same
+    events twice: the loser raises and its transaction is rolled back.
+    """
+
+    stmt = (
+        update(RollupWatermark)
+        .where(RollupWatermark.name == WATERMARK, RollupWatermark.last_event_id == expected)
+        .values(last_event_id=last_event_id, updated_at=func.now())
+    )
+    if (await session.execute(stmt)).rowcount == 1:
+        return
+    if expected == 0 and await session.get(RollupWatermark, WATERMARK) is None:
+        session.add(RollupWatermark(name=WATERMARK, last_event_id=last_event_id))
+        await session.flush()
+        return
+    raise RuntimeError("rollup watermark moved concurrently")
+
+
+async def _add_counts(session: AsyncSession, counts: Mapping[RollupKey, int]) -> None:
+    rows = [
+        {"name": name, "day": day, "dimension": dimension, "value": value, "count": count}
+        for (name, day, dimension, value), count in counts.items()
+    ]
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        module = postgresql if dialect == "postgresql" else sqlite
+        stmt = module.insert(EventDailyCount)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                EventDailyCount.name,
+                EventDailyCount.day,
+                EventDailyCount.dimension,
+                EventDailyCount.value,
+            ],
+            set_={"count": EventDailyCount.count + stmt.excluded["count"]},
+        )
+        await session.execute(stmt, rows)
+        return
+    for row in rows:
+        key = (row["name"], row["day"], row["dimension"], row["value"])
+        existing = await session.get(EventDailyCount, key)
+        if existing is None:
+            session.add(EventDailyCount(**row))
+        else:
+            existing.count += row["count"]
+    await session.flush()
+
+
+async def roll_up(
+    session: AsyncSession,
+    *,
+    batch: int = ROLLUP_BATCH,
+    lag: float = ROLLUP_LAG_SECONDS,
+    now: dt.datetime | None = None,
+) -> int:
+    """Fold the next batch of events past the watermark into the daily counts.
+
+    Only ids and timestamps are read to pick the batch; the counts themselves
+    are grouped by the database.  Returns the number of events consumed; the
+    caller commits, which moves the counts and the watermark together.
+    """
+
+    cutoff = (now or dt.datetime.now(dt.timezone.utc)) - dt.timedelta(seconds=lag)
+    start_id = last_id = await watermark(session)
+    stmt = select(Event.id, Event.ts).where(Event.id > start_id).order_by(Event.id).limit(batch)
+    consumed = 0
+    for event_id, ts in (await session.execute(stmt)).all():
+        if _aware(ts) > cutoff:
+            break
+        last_id = event_id
+        consumed += 1
+    if not consumed:
+        return 0
+
+    await _advance_watermark(session, start_id, last_id)
+    dialect = session.get_bind().dialect.name
+    window = [Event.id > start_id, Event.id <= last_id]
+    counts: Counter[RollupKey] = Counter()
+    dimensions = {""} | {key for keys in DIMENSIONS.values() for key in keys}
+    for dimension in sorted(dimensions):
+        grouped = _grouped(dialect, dimension, None, window, by_day=True, id_range=True)
+        if grouped is None:
+            continue
+        for name, day, value, count in (await session.execute(grouped)).all():
+            counts[(name, _as_date(day), dimension, str(value))] += int(count)
+    await _add_counts(session, counts)
+    return consumed
+
+
+async def _collect(
+    session: AsyncSession,
+    names: Iterable[str],
+    dimension: str,
+    since: dt.datetime | None,
+) -> Counter[tuple[str, str]]:
+    """Count ``(name, value)`` pairs for ``dimension`` from ``since`` until now.
+
+    Whole days come from the rollups, events past the watermark from the raw
+    tail, and the partial first day of ``since`` from the ``(name, ts)`` index;
+    both raw parts are grouped in SQL.
+    """
+
+    names = list(names)
+    totals: Counter[tuple[str, str]] = Counter()
+    first_day: dt.date | None = None
+    boundary: tuple[dt.datetime, dt.datetime] | None = None
+    if since is not None:
+        since = _aware(since)
+        first_day = since.date()
+        midnight = dt.datetime.combine(first_day, dt.time(), tzinfo=dt.timezone.utc)
+        if since > midnight:
+            first_day += dt.timedelta(days=1)
+            boundary = (since, midnight + dt.timedelta(days=1))
+
+    stmt = select(EventDailyCount.name, EventDailyCount.value, EventDailyCount.count).where(
+        EventDailyCount.name.in_(names), EventDailyCount.dimension == dimension
+    )
+    if first_day is not None:
+        stmt = stmt.where(EventDailyCount.day >= first_day)
+    for name, value, count in (await session.execute(stmt)).all():
+        totals[(name, value)] += int(count)
+
+    dialect = session.get_bind().dialect.name
+    tail = [Event.id > await watermark(session)]
+    if first_day is not None:
+        midnight = dt.datetime.combine(first_day, dt.time(), tzinfo=dt.timezone.utc)
+        tail.append(_unindexed(dialect, Event.ts) >= midnight)
+    raw = [(tail, True)]
+    if boundary is not None:
+        raw.append(([Event.ts >= boundary[0], Event.ts < boundary[1]], False))
+    for conditions, id_range in raw:
+        grouped = _grouped(dialect, dimension, names, conditions, by_day=False, id_range=id_range)
+        if grouped is None:
+            break
+        for name, value, count in (await session.execute(grouped)).all():
+            totals[(name, str(value))] += int(count)
+    return totals
+
+
+async def totals(
+    session: AsyncSession, names: Iterable[str], *, since: dt.datetime | None = None
+) -> dict[str, int]:
+    """Return event counts per name since ``since`` (all time when ``None``)."""
+
+    names = list(names)
+    counts = await _collect(session, names, "", since)
+    return {name: counts.get((name, ""), 0) for name in names}
+
+
+async def breakdown(
+    session: AsyncSession, name: str, dimension: str, *, since: dt.datetime | None = None
+) -> Counter[str]:
+    """Return counts of ``name`` events per value of the ``dimension`` meta key."""
+
+    counts = await _collect(session, [name], dimension, since)
+    return Counter({value: count for (_, value), count in counts.items()})
@@ -8,13 +8,18 @@ from zoneinfo import ZoneInfo
 from aiogram import Bot
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy import func, or_, select
+from sqlalchemy.orm import aliased
 
+from app.broadcast import broadcaster
 from app.config import settings
-from app.db.models import Event, Lead, Subscription
+from app.db.models import Lead, Subscription, UserEventState
 from app.db.session import session_scope
-from app.repo import events as events_repo, retention as retention_repo
-from app.services import retention_logic, retention_messages
+from app.event_sink import event_sink
+from app.growth import attribution
+from app.repo import events as events_repo, retention as retention_repo, rollups as rollups_repo
+from app.services import event_archive, retention_logic, retention_messages
 from app.services.reminders import ReminderConfig, ReminderPlanner
+from app.services.tip_pool import TipPool
 from app.utils_openai import ai_generate
 
 _analytics_log = logging.getLogger("scheduler.analytics")
@@ -41,78 +46,74 @@ async def send_nudges(bot: Bot, tz_name: str, weekdays: set[str]):
     async with session_scope() as session:
         user_ids = await events_repo.notify_recipients(session)
 
-    for uid in user_ids:
-        try:
-            await bot.send_message(uid, text)
-        except Exception:
-            continue
+    async def _send(uid: int) -> None:
+        await bot.send_message(uid, text)
+
+    # One run per local day: a restarted job only messages users still pending.
+    await broadcaster.run(f"nudges:{now_local.date().isoformat()}", user_ids, _send)
 
 
 async def send_daily_tips(bot: Bot) -> None:
     now = dt.datetime.now(dt.timezone.utc)
+    # Tips and due recipients are read once; sends run without an open session.
     async with session_scope() as session:
-        settings = await retention_repo.list_tip_candidates(session)
-        for setting in settings:
+        pool = TipPool(await retention_repo.list_tips(session))
+        if not pool:
+            return
+        candidates = await retention_repo.list_tip_candidates(session)
+        # Due tips grouped by the recipient's local date, which keys the broadcast run.
+        due: dict[dt.date, dict[int, tuple[int, bytes | None]]] = {}
+        for setting in candidates:
             tz = retention_logic.ensure_timezone(setting.timezone)
             local_now = now.astimezone(tz)
             if not retention_logic.should_send_tip(
                 local_now, setting.tips_time, setting.last_tip_sent_at
             ):
                 continue
-            tip = await retention_repo.pick_tip(session, exclude_id=setting.last_tip_id)
-            if tip is None:
-                continue
-            text = retention_messages.format_tip_message(tip.text)
-            kb = InlineKeyboardBuilder()
-            kb.button(text="👍 Полезно", callback_data=f"tips:like:{tip.id}")
-            try:
-                await bot.send_message(setting.user_id, text, reply_markup=kb.as_markup())
-            except Exception:
-                continue
-            await retention_repo.update_tip_log(session, setting, tip=tip, sent_at=now)
-            await events_repo.log(
-                session,
-                setting.user_id,
-                "daily_tip_sent",
-                {"tip_id": tip.id},
+            deal = pool.deal(
+                setting.last_tip_id, setting.tips_seen, settings.RETENTION_TIP_NO_REPEAT
             )
-        await session.commit()
+            due.setdefault(local_now.date(), {})[setting.user_id] = deal
+
+    sent: list[tuple[int, int, bytes | None]] = []
+    try:
+        for day, deliveries in due.items():
+
+            async def _send(uid: int, deliveries=deliveries) -> None:
+                tip_id = deliveries[uid][0]
+                kb = InlineKeyboardBuilder()
+                kb.button(text="👍 Полезно", callback_data=f"tips:like:{tip_id}")
+                text = retention_messages.format_tip_message(pool.text(tip_id))
+                await bot.send_message(uid, text, reply_markup=kb.as_markup())
+
+            def _sent(uid: int, deliveries=deliveries) -> None:
+                tip_id, seen = deliveries[uid]
+                sent.append((uid, tip_id, seen))
+                event_sink.emit(uid, "daily_tip_sent", {"tip_id": tip_id})
+
+            await broadcaster.run(f"daily_tips:{day.isoformat()}", deliveries, _send, on_sent=_sent)
+    finally:
+        # One executemany for the whole run, including a run cut short by an error.
+        if sent:
+            async with session_scope() as session:
+                await retention_repo.record_tips_sent(session, sent, sent_at=now)
+                await session.commit()
 
 
 async def _start_followup_candidates(session, cutoff: dt.datetime) -> list[int]:
-    latest_start = (
-        select(Event.user_id, func.max(Event.ts).label("ts"))
-        .where(Event.name == "start", Event.user_id.is_not(None))
-        .group_by(Event.user_id)
-        .subquery()
-    )
-    latest_quiz = (
-        select(Event.user_id, func.max(Event.ts).label("ts"))
-        .where(Event.name == "quiz_finish", Event.user_id.is_not(None))
-        .group_by(Event.user_id)
-        .subquery()
-    )
-    latest_nudge = (
-        select(Event.user_id, func.max(Event.ts).label("ts"))
-        .where(Event.name == "retention_test_nudge", Event.user_id.is_not(None))
-        .group_by(Event.user_id)
-        .subquery()
-    )
+    start = aliased(UserEventState)
+    quiz = aliased(UserEventState)
+    nudge = aliased(UserEventState)
 
     stmt = (
-        select(latest_start.c.user_id)
-        .outerjoin(latest_quiz, latest_quiz.c.user_id == latest_start.c.user_id)
-        .outerjoin(latest_nudge, latest_nudge.c.user_id == latest_start.c.user_id)
+        select(start.user_id)
+        .outerjoin(quiz, (quiz.user_id == start.user_id) & (quiz.name == "quiz_finish"))
+        .outerjoin(nudge, (nudge.user_id == start.user_id) & (nudge.name == "retention_test_nudge"))
         .where(
-            latest_start.c.ts <= cutoff,
-            or_(
-                latest_quiz.c.ts.is_(None),
-                latest_quiz.c.ts < latest_start.c.ts,
-            ),
-            or_(
-                latest_nudge.c.ts.is_(None),
-                latest_nudge.c.ts < latest_start.c.ts,
-            ),
+            start.name == "start",
+            start.last_ts <= cutoff,
+            or_(quiz.last_ts.is_(None), quiz.last_ts < start.last_ts),
+            or_(nudge.last_ts.is_(None), nudge.last_ts < start.last_ts),
         )
     )
     result = await session.execute(stmt)
@@ -120,31 +121,21 @@ async def _start_followup_candidates(session, cutoff: dt.datetime) -> list[int]:
 
 
 async def _premium_followup_candidates(session, cutoff: dt.datetime, now: dt.datetime) -> list[int]:
-    latest_quiz = (
-        select(Event.user_id, func.max(Event.ts).label("ts"))
-        .where(Event.name == "quiz_finish", Event.user_id.is_not(None))
-        .group_by(Event.user_id)
-        .subquery()
-    )
-    latest_nudge = (
-        select(Event.user_id, func.max(Event.ts).label("ts"))
-        .where(Event.name == "retention_premium_nudge", Event.user_id.is_not(None))
-        .group_by(Event.user_id)
-        .subquery()
-    )
+    quiz = aliased(UserEventState)
+    nudge = aliased(UserEventState)
     active_subs = select(Subscription.user_id).where(Subscription.until > now).subquery()
 
     stmt = (
-        select(latest_quiz.c.user_id)
-        .outerjoin(active_subs, active_subs.c.user_id == latest_quiz.c.user_id)
-        .outerjoin(latest_nudge, latest_nudge.c.user_id == latest_quiz.c.user_id)
+        select(quiz.user_id)
+        .outerjoin(active_subs, active_subs.c.user_id == quiz.user_id)
+        .outerjoin(
+            nudge, (nudge.user_id == quiz.user_id) & (nudge.name == "retention_premium_nudge")
+        )
         .where(
-            latest_quiz.c.ts <= cutoff,
+            quiz.name == "quiz_finish",
+            quiz.last_ts <= cutoff,
             active_subs.c.user_id.is_(None),
-            or_(
-                latest_nudge.c.ts.is_(None),
-                latest_nudge.c.ts < latest_quiz.c.ts,
-            ),
+            or_(nudge.last_ts.is_(None), nudge.last_ts < quiz.last_ts),
         )
     )
     result = await session.execute(stmt)
@@ -160,34 +151,27 @@ async def send_retention_reminders(bot: Bot) -> None:
         start_candidates = await _start_followup_candidates(session, start_cutoff)
         premium_candidates = await _premium_followup_candidates(session, premium_cutoff, now)
 
-    sent_start: list[int] = []
-    sent_premium: list[int] = []
-
-    for uid in start_candidates:
-        try:
-            await bot.send_message(uid, "⚡ Начать тест энергии")
-        except Exception:
+    hour = now.strftime("%Y-%m-%dT%H")
+    flows = (
+        ("retention_test", start_candidates, "⚡ Начать тест энергии"),
+        (
+            "retention_premium",
+            premium_candidates,
+            "💎 Включи Премиум — получай подборку каждую неделю",
+        ),
+    )
+    for flow, candidates, text in flows:
+        if not candidates:
             continue
-        else:
-            sent_start.append(uid)
 
-    for uid in premium_candidates:
-        try:
-            await bot.send_message(uid, "💎 Включи Премиум — получай подборку каждую неделю")
-        except Exception:
-            continue
-        else:
-            sent_premium.append(uid)
+        async def _send(uid: int, text=text) -> None:
+            await bot.send_message(uid, text)
 
-    if not sent_start and not sent_premium:
-        return
+        # The nudge event is what keeps the user out of the next candidate query.
+        def _sent(uid: int, event=f"{flow}_nudge") -> None:
+            event_sink.emit(uid, event, {})
 
-    async with session_scope() as session:
-        for uid in sent_start:
-            await events_repo.log(session, uid, "retention_test_nudge", {})
-        for uid in sent_premium:
-            await events_repo.log(session, uid, "retention_premium_nudge", {})
-        await session.commit()
+        await broadcaster.run(f"{flow}:{hour}", candidates, _send, on_sent=_sent)
 
 
 async def send_water_reminders(bot: Bot) -> None:
@@ -261,8 +245,7 @@ async def send_water_reminders(bot: Bot) -> None:
                 sent_date=local_now.date(),
                 sent_count=sent_count,
             )
-            await events_repo.log(
-                session,
+            event_sink.emit(
                 setting.user_id,
                 "water_reminder_sent",
                 {
@@ -310,18 +293,48 @@ async def process_retention_journeys(bot: Bot) -> None:
                 continue
 
             sent_entries.append(entry)
-            await events_repo.log(
-                session,
-                entry.user_id,
-                "journey_sent",
-                {"journey": entry.journey},
-            )
+            event_sink.emit(entry.user_id, "journey_sent", {"journey": entry.journey})
 
         if sent_entries:
             await retention_repo.mark_journeys_sent(session, sent_entries, sent_at=now)
         await session.commit()
 
 
+async def rollup_events() -> int:
+    """Fold new events into ``event_daily_counts`` until the backlog is drained."""
+
+    total = 0
+    while True:
+        async with session_scope() as session:
+            consumed = await rollups_repo.roll_up(session)
+            await session.commit()
+        total += consumed
+        if consumed < rollups_repo.ROLLUP_BATCH:
+            break
+    if total:
+        _analytics_log.info("rolled up %s events", total)
+    return total
+
+
+async def refresh_utm_funnel() -> int:
+    """Re-derive UTM funnel flags for users changed since the previous run."""
+
+    async with session_scope() as session:
+        refreshed = await attribution.refresh_funnel(session)
+        await session.commit()
+    if refreshed:
+        _analytics_log.info("refreshed utm funnel for %s users", refreshed)
+    return refreshed
+
+
+async def archive_old_events() -> int:
+    await rollup_events()
+    return await event_archive.archive_events(
+        older_than_days=settings.EVENT_ARCHIVE_DAYS,
+        directory=settings.EVENT_ARCHIVE_DIR,
+    )
+
+
 async def export_analytics_snapshot() -> Path | None:
     target = getattr(settings, "ANALYTICS_EXPORT_PATH", "")
     if not target:
@@ -334,22 +347,9 @@ async def export_analytics_snapshot() -> Path | None:
     week_ago = now - dt.timedelta(days=7)
 
     async with session_scope() as session:
-        quiz_24h = await events_repo.stats(session, name="quiz_finish", since=day_ago)
-        quiz_7d = await events_repo.stats(session, name="quiz_finish", since=week_ago)
-        plans_24h = await events_repo.stats(session, name="plan_generated", since=day_ago)
-        plans_7d = await events_repo.stats(session, name="plan_generated", since=week_ago)
-        retention_test_24h = await events_repo.stats(
-            session, name="retention_test_nudge", since=day_ago
-        )
-        retention_test_7d = await events_repo.stats(
-            session, name="retention_test_nudge", since=week_ago
-        )
-        retention_premium_24h = await events_repo.stats(
-            session, name="retention_premium_nudge", since=day_ago
-        )
-        retention_premium_7d = await events_repo.stats(
-            session, name="retention_premium_nudge", since=week_ago
-        )
+        names = ["quiz_finish", "plan_generated", "retention_test_nudge", "retention_premium_nudge"]
+        day = await rollups_repo.totals(session, names, since=day_ago)
+        week = await rollups_repo.totals(session, names, since=week_ago)
 
         total_leads_stmt = select(func.count(Lead.id))
         total_leads = (await session.execute(total_leads_stmt)).scalar_one()
@@ -365,11 +365,14 @@ async def export_analytics_snapshot() -> Path | None:
 
     payload = {
         "generated_at": now.isoformat(),
-        "quiz_finishes": {"24h": quiz_24h, "7d": quiz_7d},
-        "plans": {"24h": plans_24h, "7d": plans_7d},
+        "quiz_finishes": {"24h": day["quiz_finish"], "7d": week["quiz_finish"]},
+        "plans": {"24h": day["plan_generated"], "7d": week["plan_generated"]},
         "retention": {
-            "test": {"24h": retention_test_24h, "7d": retention_test_7d},
-            "premium": {"24h": retention_premium_24h, "7d": retention_premium_7d},
+            "test": {"24h": day["retention_test_nudge"], "7d": week["retention_test_nudge"]},
+            "premium": {
+                "24h": day["retention_premium_nudge"],
+                "7d": week["retention_premium_nudge"],
+            },
         },
         "leads": {"total": total_leads, "7d": leads_7d},
         "premium": {"active": active_subs, "new_7d": new_subs},
@@ -1,5 +1,9 @@
 import asyncio
+import functools
 import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
 
 from aiogram import Bot
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -7,15 +11,20 @@ from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
 from app.config import settings
+from app.metrics import JOB_SECONDS
 from app.scheduler.jobs import (
+    archive_old_events,
     export_analytics_snapshot,
     process_retention_journeys,
+    refresh_utm_funnel,
+    rollup_events,
     send_daily_tips,
     send_nudges,
     send_retention_reminders,
     send_water_reminders,
 )
 from app.services.weekly_ai_plan import weekly_ai_plan_job
+from app.snapshots import refresh_all as refresh_all_snapshots
 
 
 def _parse_weekdays(csv: str | None) -> set[str]:
@@ -25,6 +34,30 @@ def _parse_weekdays(csv: str | None) -> set[str]:
     return {x.strip().title()[:3] for x in csv.split(",") if x.strip()}
 
 
+def _timed(job: str, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Wrap a job coroutine so every run lands in the job duration histogram."""
+
+    @functools.wraps(func)
+    async def runner(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            JOB_SECONDS.observe(time.perf_counter() - started, job=job, outcome=outcome)
+
+    return runner
+
+
+def _add_job(
+    scheduler: AsyncIOScheduler, func: Callable[..., Awaitable[Any]], *, name: str, **kwargs: Any
+) -> None:
+    scheduler.add_job(_timed(name, func), name=name, **kwargs)
+
+
 def start_scheduler(bot: Bot) -> AsyncIOScheduler:
     """
     Поднимаем APScheduler и запускаем джобу рассылки по расписанию.
@@ -35,7 +68,8 @@ def start_scheduler(bot: Bot) -> AsyncIOScheduler:
     # Каждый день в NOTIFY_HOUR_LOCAL (локальное TZ); фильтр по weekday внутри job
     if getattr(settings, "SCHEDULER_ENABLE_NUDGES", True):
         trigger = CronTrigger(hour=settings.NOTIFY_HOUR_LOCAL, minute=0)
-        scheduler.add_job(
+        _add_job(
+            scheduler,
             send_nudges,
             trigger=trigger,
             args=[bot, settings.TIMEZONE, weekdays],
@@ -45,7 +79,8 @@ def start_scheduler(bot: Bot) -> AsyncIOScheduler:
             max_instances=1,
         )
 
-    scheduler.add_job(
+    _add_job(
+        scheduler,
         send_daily_tips,
         trigger=IntervalTrigger(minutes=5),
         args=[bot],
@@ -55,7 +90,8 @@ def start_scheduler(bot: Bot) -> AsyncIOScheduler:
         max_instances=1,
     )
 
-    scheduler.add_job(
+    _add_job(
+        scheduler,
         send_water_reminders,
         trigger=IntervalTrigger(minutes=10),
         args=[bot],
@@ -65,7 +101,8 @@ def start_scheduler(bot: Bot) -> AsyncIOScheduler:
         max_instances=1,
     )
 
-    scheduler.add_job(
+    _add_job(
+        scheduler,
         _log_heartbeat,
         trigger=IntervalTrigger(minutes=settings.HEARTBEAT_INTERVAL_MINUTES),
         name="heartbeat",
@@ -82,7 +119,8 @@ def start_scheduler(bot: Bot) -> AsyncIOScheduler:
                 "invalid WEEKLY_PLAN_CRON, falling back to Monday 10:00"
             )
             weekly_trigger = CronTrigger(day_of_week="mon", hour=10, minute=0)
-        scheduler.add_job(
+        _add_job(
+            scheduler,
             weekly_ai_plan_job,
             trigger=weekly_trigger,
             args=[bot, None],
@@ -93,7 +131,8 @@ def start_scheduler(bot: Bot) -> AsyncIOScheduler:
         )
 
     if getattr(settings, "RETENTION_ENABLED", False):
-        scheduler.add_job(
+        _add_job(
+            scheduler,
             send_retention_reminders,
             trigger=IntervalTrigger(hours=1),
             args=[bot],
@@ -103,7 +142,8 @@ def start_scheduler(bot: Bot) -> AsyncIOScheduler:
             max_instances=1,
         )
 
-        scheduler.add_job(
+        _add_job(
+            scheduler,
             process_retention_journeys,
             trigger=IntervalTrigger(minutes=10),
             args=[bot],
@@ -113,6 +153,53 @@ def start_scheduler(bot: Bot) -> AsyncIOScheduler:
             max_instances=1,
         )
 
+    if getattr(settings, "EVENT_ROLLUP_ENABLED", True):
+        _add_job(
+            scheduler,
+            rollup_events,
+            trigger=IntervalTrigger(minutes=5),
+            name="event_rollups",
+            misfire_grace_time=300,
+            coalesce=True,
+            max_instances=1,
+        )
+        if getattr(settings, "EVENT_ARCHIVE_DAYS", 0) > 0:
+            _add_job(
+                scheduler,
+                archive_old_events,
+                trigger=CronTrigger(hour=4, minute=0, timezone=settings.TIMEZONE),
+                name="event_archive",
+                misfire_grace_time=3600,
+                coalesce=True,
+                max_instances=1,
+            )
+
+    funnel_minutes = getattr(settings, "UTM_FUNNEL_REFRESH_MINUTES", 0)
+    if funnel_minutes > 0:
+        _add_job(
+            scheduler,
+            refresh_utm_funnel,
+            trigger=IntervalTrigger(minutes=funnel_minutes),
+            # Run once at startup so the dashboard has a funnel to show.
+            next_run_time=datetime.now(timezone.utc),
+            name="utm_funnel",
+            misfire_grace_time=300,
+            coalesce=True,
+            max_instances=1,
+        )
+
+    snapshot_minutes = getattr(settings, "ADMIN_SNAPSHOT_REFRESH_MINUTES", 0)
+    if snapshot_minutes > 0:
+        _add_job(
+            scheduler,
+            refresh_all_snapshots,
+            trigger=IntervalTrigger(minutes=snapshot_minutes),
+            name="admin_snapshots",
+            misfire_grace_time=60,
+            coalesce=True,
+            max_instances=1,
+        )
+
     if getattr(settings, "ANALYTICS_EXPORT_ENABLED", True):
         analytics_cron = getattr(settings, "ANALYTICS_EXPORT_CRON", None)
         if analytics_cron:
@@ -128,7 +215,8 @@ def start_scheduler(bot: Bot) -> AsyncIOScheduler:
         else:
             analytics_trigger = CronTrigger(hour=21, minute=0, timezone=settings.TIMEZONE)
 
-        scheduler.add_job(
+        _add_job(
+            scheduler,
             export_analytics_snapshot,
             trigger=analytics_trigger,
             name="analytics_export",
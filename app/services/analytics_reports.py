@@ -5,16 +5,16 @@ from __future__ import annotations
 import csv
 import datetime as dt
 import logging
-from collections import defaultdict
+from collections import Counter, defaultdict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Iterable, Mapping, Sequence
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import CommerceSubscription, Event, User
-from app.repo import events as events_repo
+from app.repo import rollups as rollups_repo
 
 LOG = logging.getLogger("analytics")
 EXPORT_DIR = Path("var/exports")
@@ -88,15 +88,20 @@ async def gather_funnel(session: AsyncSession, *, days: int = 30) -> FunnelStats
     """Collect funnel counters for the Premium upsell."""
 
     since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days)
-    shows = await events_repo.stats(session, name="premium_info_open", since=since)
-    clicks = await events_repo.stats(session, name="premium_cta_click", since=since)
-    buy_started = await events_repo.stats(session, name="premium_buy_open", since=since)
+    counts = await rollups_repo.totals(
+        session, ["premium_info_open", "premium_cta_click", "premium_buy_open"], since=since
+    )
 
     stmt = select(CommerceSubscription).where(CommerceSubscription.started_at >= since)
     result = await session.execute(stmt)
     success = sum(1 for _ in result.scalars())
 
-    return FunnelStats(shows=shows, clicks=clicks, buy_started=buy_started, buy_success=success)
+    return FunnelStats(
+        shows=counts["premium_info_open"],
+        clicks=counts["premium_cta_click"],
+        buy_started=counts["premium_buy_open"],
+        buy_success=success,
+    )
 
 
 def format_funnel(stats: FunnelStats, *, days: int = 30) -> str:
@@ -178,28 +183,35 @@ def format_cohorts(rows: Sequence[CohortRow]) -> str:
 
 async def gather_ctr(session: AsyncSession, *, days: int = 30) -> list[CTRRow]:
     since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days)
-    stmt = select(Event).where(Event.name.in_(["premium_cta_click", "premium_info_open"]))
-    stmt = stmt.where(Event.ts >= since)
-    result = await session.execute(stmt)
-    events = list(result.scalars())
-    return aggregate_ctr(events)
+    opens = await rollups_repo.breakdown(session, "premium_info_open", "source", since=since)
+    clicks = await rollups_repo.breakdown(session, "premium_cta_click", "source", since=since)
+    return ctr_rows(opens, clicks)
 
 
 def aggregate_ctr(events: Iterable[Event]) -> list[CTRRow]:
-    shows: defaultdict[str, int] = defaultdict(int)
-    clicks: defaultdict[str, int] = defaultdict(int)
+    opens: Counter[str] = Counter()
+    clicks: Counter[str] = Counter()
 
     for event in events:
         meta = event.meta if isinstance(event.meta, dict) else {}
         source = str(meta.get("source") or "unknown")
         if event.name == "premium_cta_click":
             clicks[source] += 1
-        elif event.name == "premium_info_open" and source.startswith("cta:"):
-            base = source.split("cta:", 1)[-1] or "cta"
-            shows[base] += 1
+        elif event.name == "premium_info_open":
+            opens[source] += 1
+    return ctr_rows(opens, clicks)
+
+
+def ctr_rows(opens: Mapping[str, int], clicks: Mapping[str, int]) -> list[CTRRow]:
+    """Build CTR rows from ``premium_info_open`` and ``premium_cta_click`` counts by source."""
+
+    shows: defaultdict[str, int] = defaultdict(int)
+    for source, count in opens.items():
+        if source.startswith("cta:"):
+            shows[source.split("cta:", 1)[-1] or "cta"] += count
 
     rows: list[CTRRow] = []
-    for key in sorted(set(list(shows) + list(clicks))):
+    for key in sorted(set(shows) | {source for source, count in clicks.items() if count}):
         rows.append(CTRRow(source=key, shows=shows.get(key, 0), clicks=clicks.get(key, 0)))
     return rows
 
@@ -263,6 +275,7 @@ __all__ = [
     "CTRRow",
     "aggregate_cohorts",
     "aggregate_ctr",
+    "ctr_rows",
     "export_csv",
     "export_cohort_csv",
     "export_ctr_csv",
@@ -2,38 +2,30 @@
 
 from __future__ import annotations
 
-import asyncio
+import os
 from dataclasses import dataclass, field
 from decimal import Decimal
-from threading import Thread
-from typing import Any
+from typing import Any, Mapping
 
-from app.catalog.loader import product_by_alias, product_by_id
+from app.catalog.loader import product_record
 from app.storage import USE_REDIS
+from app.utils.expiring import ExpiringDict
 
 try:
-    from app.storage_redis import cart_get, cart_pop, cart_set
+    from app.storage_redis import (
+        cart_add_item,
+        cart_delete,
+        cart_load,
+        cart_replace,
+        cart_set_coupon,
+    )
 except ImportError:  # pragma: no cover - redis optional
-    cart_get = cart_set = cart_pop = None  # type: ignore[assignment]
-
-
-if USE_REDIS and cart_get is not None:
-    _redis_loop = asyncio.new_event_loop()
-
-    def _redis_worker() -> None:  # pragma: no cover - background thread
-        asyncio.set_event_loop(_redis_loop)
-        _redis_loop.run_forever()
-
-    Thread(target=_redis_worker, name="cart-redis", daemon=True).start()
-
-    def _run_async(awaitable: Any) -> Any:
-        return asyncio.run_coroutine_threadsafe(awaitable, _redis_loop).result()
-
-else:
-    _redis_loop = None
+    cart_add_item = cart_delete = cart_load = cart_replace = None  # type: ignore[assignment]
+    cart_set_coupon = None  # type: ignore[assignment]
 
-    def _run_async(awaitable: Any) -> Any:  # pragma: no cover - no redis fallback
-        return awaitable
+CART_TTL = int(os.getenv("CART_TTL_SECONDS", "3600"))
+CART_CACHE_TTL = float(os.getenv("CART_CACHE_TTL_SECONDS", "60"))
+CART_CACHE_MAXSIZE = int(os.getenv("CART_CACHE_MAXSIZE", "10000"))
 
 
 @dataclass(slots=True)
@@ -61,6 +53,13 @@ class CartItem:
             "kind": self.kind,
         }
 
+    def meta_payload(self) -> dict[str, Any]:
+        """Payload without the identity and quantity, which the store keeps apart."""
+
+        payload = self.to_payload()
+        del payload["product_id"], payload["quantity"]
+        return payload
+
     @classmethod
     def from_payload(cls, data: dict[str, Any]) -> "CartItem":
         return cls(
@@ -138,67 +137,123 @@ class Cart:
 
 
 class CartStorage:
-    """Hybrid cart store with optional Redis backend."""
-
-    def __init__(self) -> None:
-        self._local: dict[int, dict[str, Any]] = {}
+    """Async cart store backed by per-user Redis hashes.
+
+    Cart payloads are cached locally in a bounded, short-lived map so repeated
+    plain reads skip Redis.  Another replica may have changed the cart since,
+    so reads that lead to a write pass ``fresh=True`` and every write drops the
+    cached entry.  Writes touch only what they change: adding an item is one
+    atomic script call that increments the quantity in place and a coupon is a
+    single hash field.  Without Redis the local map is the store itself and
+    carts expire after ``CART_TTL`` like their Redis hashes.
+    """
+
+    def __init__(
+        self,
+        *,
+        use_redis: bool | None = None,
+        ttl: int = CART_TTL,
+        cache_ttl: float = CART_CACHE_TTL,
+        maxsize: int = CART_CACHE_MAXSIZE,
+    ) -> None:
+        if use_redis is None:
+            use_redis = USE_REDIS and cart_load is not None
+        self._use_redis = use_redis
+        self._ttl = ttl
+        self._local: ExpiringDict[int, dict[str, Any]] = ExpiringDict(
+            ttl=cache_ttl if use_redis else ttl, maxsize=maxsize
+        )
 
-    def _load(self, user_id: int) -> dict[str, Any] | None:
-        if user_id in self._local:
-            return self._local[user_id]
-        if USE_REDIS and cart_get is not None:
-            payload = _run_async(cart_get(user_id))
+    async def _load(self, user_id: int, *, fresh: bool = False) -> dict[str, Any] | None:
+        if not self._use_redis:
+            return self._local.get(user_id)
+        if not fresh:
+            payload = self._local.get(user_id)
             if payload is not None:
-                self._local[user_id] = payload
-            return payload
-        return None
-
-    def _save(self, user_id: int, payload: dict[str, Any]) -> None:
-        self._local[user_id] = payload
-        if USE_REDIS and cart_set is not None:
-            _run_async(cart_set(user_id, payload))
+                return payload
+        payload = await cart_load(user_id, ttl=self._ttl)
+        if payload is not None:
+            self._local[user_id] = payload
+        return payload
 
-    def _delete(self, user_id: int) -> None:
-        self._local.pop(user_id, None)
-        if USE_REDIS and cart_pop is not None:
-            _run_async(cart_pop(user_id))
+    async def get(self, user_id: int, *, fresh: bool = False) -> Cart:
+        """Return the user's cart; ``fresh`` skips the local cache in Redis mode."""
 
-    def get(self, user_id: int) -> Cart:
-        payload = self._load(user_id)
+        payload = await self._load(user_id, fresh=fresh)
         if payload is None:
             return Cart()
         return Cart.from_payload(payload)
 
-    def set(self, user_id: int, cart: Cart) -> None:
-        self._save(user_id, cart.to_payload())
+    async def add(self, user_id: int, item: CartItem) -> int:
+        """Add ``item`` to the user's cart and return the resulting quantity."""
 
-    def clear(self, user_id: int) -> None:
-        self._delete(user_id)
+        if not self._use_redis:
+            cart = await self.get(user_id)
+            quantity = cart.add(item).quantity
+            self._local[user_id] = cart.to_payload()
+            return quantity
+
+        quantity = await cart_add_item(
+            user_id, item.product_id, item.meta_payload(), item.quantity, ttl=self._ttl
+        )
+        self._local.pop(user_id, None)
+        return quantity
+
+    async def set(self, user_id: int, cart: Cart) -> None:
+        payload = cart.to_payload()
+        if not self._use_redis:
+            self._local[user_id] = payload
+            return
+        await cart_replace(user_id, payload, ttl=self._ttl)
+        self._local.pop(user_id, None)
+
+    async def set_coupon(self, user_id: int, code: str | None, meta: Mapping[str, Any]) -> None:
+        """Store the applied coupon without rewriting the cart's items."""
+
+        if not self._use_redis:
+            payload = self._local.get(user_id)
+            if payload is not None:
+                payload["coupon_code"] = code
+                payload["coupon_meta"] = dict(meta)
+            return
+        await cart_set_coupon(user_id, code, dict(meta), ttl=self._ttl)
+        self._local.pop(user_id, None)
+
+    async def clear(self, user_id: int) -> None:
+        self._local.pop(user_id, None)
+        if self._use_redis:
+            await cart_delete(user_id)
+
+    def stats(self) -> dict[str, int]:
+        return self._local.stats()
 
 
 _CART = CartStorage()
 
 
-def get_cart(user_id: int) -> Cart:
-    return _CART.get(user_id)
+async def get_cart(user_id: int, *, fresh: bool = False) -> Cart:
+    return await _CART.get(user_id, fresh=fresh)
+
+
+async def save_cart(user_id: int, cart: Cart) -> None:
+    await _CART.set(user_id, cart)
 
 
-def save_cart(user_id: int, cart: Cart) -> None:
-    _CART.set(user_id, cart)
+async def save_coupon(user_id: int, cart: Cart) -> None:
+    await _CART.set_coupon(user_id, cart.coupon_code, cart.coupon_meta)
 
 
-def clear_cart(user_id: int) -> None:
-    _CART.clear(user_id)
+async def clear_cart(user_id: int) -> None:
+    await _CART.clear(user_id)
 
 
-def load_product(product_id: str) -> dict[str, Any] | None:
-    product = product_by_id(product_id)
-    if product:
-        return dict(product)
-    return product_by_alias(product_id)
+def load_product(product_id: str) -> Mapping[str, Any] | None:
+    return product_record(product_id)
 
 
-def add_product_to_cart(user_id: int, product_id: str, *, quantity: int = 1) -> CartItem | None:
+async def add_product_to_cart(
+    user_id: int, product_id: str, *, quantity: int = 1
+) -> CartItem | None:
     product = load_product(product_id)
     if not product:
         return None
@@ -211,7 +266,6 @@ def add_product_to_cart(user_id: int, product_id: str, *, quantity: int = 1) ->
         price = Decimal("0")
     currency = order.get("currency") or "RUB"
     utm = order.get("utm") or {}
-    cart = get_cart(user_id)
     item = CartItem(
         product_id=product_id,
         title=title,
@@ -220,13 +274,11 @@ def add_product_to_cart(user_id: int, product_id: str, *, quantity: int = 1) ->
         currency=currency,
         utm={str(k): str(v) for k, v in utm.items()},
     )
-    cart.add(item)
-    save_cart(user_id, cart)
+    await _CART.add(user_id, item)
     return item
 
 
-def add_bundle_to_cart(user_id: int, bundle: dict[str, Any]) -> CartItem:
-    cart = get_cart(user_id)
+async def add_bundle_to_cart(user_id: int, bundle: dict[str, Any]) -> CartItem:
     item = CartItem(
         product_id=f"bundle:{bundle['id']}",
         title=str(bundle.get("title", "Бандл")),
@@ -234,17 +286,18 @@ def add_bundle_to_cart(user_id: int, bundle: dict[str, Any]) -> CartItem:
         quantity=1,
         kind="bundle",
     )
-    cart.add(item)
-    save_cart(user_id, cart)
+    await _CART.add(user_id, item)
     return item
 
 
 __all__ = [
     "Cart",
     "CartItem",
+    "CartStorage",
     "add_product_to_cart",
     "add_bundle_to_cart",
     "clear_cart",
     "get_cart",
     "save_cart",
+    "save_coupon",
 ]
@@ -7,6 +7,7 @@ from typing import Any, Dict, List
 
 from app.cache import catalog_cached
 from app.catalog.loader import load_catalog
+from app.catalog.search import SearchIndex, product_terms
 from app.db.session import session_scope
 from app.products import GOAL_MAP
 from app.storage import get_last_plan
@@ -24,27 +25,23 @@ def _normalize_product_payload(product: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-@catalog_cached("catalog_search")
-async def catalog_search(query: str) -> List[Dict[str, Any]]:
-    if not query:
+async def catalog_search(query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Rank catalog products for ``query`` using the snapshot's search index.
+
+    Lookups are cheap enough to skip the shared cache: every query is served
+    from the in-process index that is rebuilt along with the catalog.
+    """
+
+    if not query or not query.strip():
         return []
     catalog = load_catalog()
     products = catalog["products"]
-    needle = query.strip().lower()
-    if not needle:
-        return []
+    index = catalog.get("search")
+    if index is None:
+        ordered = catalog.get("ordered") or list(products)
+        index = SearchIndex(ordered, (product_terms(products[pid]) for pid in ordered))
 
-    results: List[Dict[str, Any]] = []
-    for product in products.values():
-        haystack = " ".join(
-            str(product.get(field, ""))
-            for field in ("title", "name", "short")
-            if product.get(field)
-        ).lower()
-        if needle in haystack:
-            results.append(_normalize_product_payload(product))
-        if len(results) >= 20:
-            break
+    results = [_normalize_product_payload(products[pid]) for pid in index.search(query, limit)]
     if results:
         precache_remote_images(
             image for item in results for image in item.get("images", []) if isinstance(image, str)
@@ -0,0 +1,90 @@
+"""Move rolled-up raw events older than the retention window into JSONL archives."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, AsyncContextManager, Callable, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Event
+from app.db.session import session_scope
+from app.repo import events as events_repo, rollups as rollups_repo
+
+ARCHIVE_CHUNK = int(os.getenv("EVENT_ARCHIVE_CHUNK", "5000"))
+
+LOG = logging.getLogger("events.archive")
+
+
+def _record(event: Event) -> dict[str, Any]:
+    ts = event.ts
+    if ts is not None and ts.tzinfo is None:
+        ts = ts.replace(tzinfo=dt.timezone.utc)
+    return {
+        "id": event.id,
+        "user_id": event.user_id,
+        "name": event.name,
+        "meta": event.meta or {},
+        "ts": ts.isoformat() if ts is not None else None,
+    }
+
+
+def _write_chunk(path: Path, records: Sequence[dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+        for record in records:
+            fh.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            fh.write("\n")
+    with tmp.open("rb") as fh:
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+async def archive_events(
+    *,
+    older_than_days: int,
+    directory: str | Path,
+    chunk: int = ARCHIVE_CHUNK,
+    now: dt.datetime | None = None,
+    session_factory: Callable[[], AsyncContextManager[AsyncSession]] = session_scope,
+) -> int:
+    """Archive and delete events older than ``older_than_days``; return rows moved.
+
+    Only events already folded into the rollups (``id`` at or below the
+    rollup watermark) are touched.  Each chunk is written to
+    ``events-<first id>.jsonl.gz`` before its rows are deleted in a separate
+    transaction, so an interrupted run simply rewrites the same chunk next
+    time.
+    """
+
+    if older_than_days <= 0:
+        return 0
+    before = (now or dt.datetime.now(dt.timezone.utc)) - dt.timedelta(days=older_than_days)
+    directory = Path(directory)
+    moved = 0
+    while True:
+        async with session_factory() as session:
+            max_id = await rollups_repo.watermark(session)
+            batch = await events_repo.archivable(session, before=before, max_id=max_id, limit=chunk)
+            if not batch:
+                break
+            first_id, last_id = batch[0].id, batch[-1].id
+            path = directory / f"events-{first_id:012d}.jsonl.gz"
+            await asyncio.to_thread(_write_chunk, path, [_record(event) for event in batch])
+            await events_repo.delete_archived(session, [event.id for event in batch])
+            await session.commit()
+        moved += len(batch)
+        LOG.info("archived %s events (%s..%s) to %s", len(batch), first_id, last_id, path)
+        if len(batch) < chunk:
+            break
+    return moved
+
+
+__all__ = ["archive_events"]
@@ -0,0 +1,102 @@
+"""Daily tips held in memory for one scheduler run.
+
+:class:`TipPool` keeps tip ids in an ``array`` with an id-to-position map, so
+a uniform pick that skips the user's previous tip is a single ``randrange``
+and a shift.  An optional per-user no-repeat window is a bitmap over tip ids
+(stored as bytes in ``retention_settings.tips_seen``); picks reject tips whose
+bit is set, and the window restarts once it has covered ``window`` tips.
+"""
+
+from __future__ import annotations
+
+import random
+from array import array
+from typing import Iterable
+
+# Rejection sampling is O(1) while the window leaves a good share of the
+# pool unseen; after this many misses the unseen tips are listed instead.
+_MAX_REJECTIONS = 8
+
+
+def decode_seen(raw: bytes | None) -> int:
+    return int.from_bytes(raw, "little") if raw else 0
+
+
+def encode_seen(seen: int) -> bytes | None:
+    if not seen:
+        return None
+    return seen.to_bytes((seen.bit_length() + 7) // 8, "little")
+
+
+class TipPool:
+    __slots__ = ("_ids", "_texts", "_position", "_rng")
+
+    def __init__(
+        self, tips: Iterable[tuple[int, str]], *, rng: random.Random | None = None
+    ) -> None:
+        rows = list(tips)
+        self._ids = array("q", (tip_id for tip_id, _ in rows))
+        self._texts = tuple(text for _, text in rows)
+        self._position = {tip_id: index for index, tip_id in enumerate(self._ids)}
+        self._rng = rng or random.Random()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, tip_id: object) -> bool:
+        return tip_id in self._position
+
+    def text(self, tip_id: int) -> str:
+        return self._texts[self._position[tip_id]]
+
+    def _pick_excluding(self, exclude_id: int | None) -> int:
+        size = len(self._ids)
+        skip = self._position.get(exclude_id) if exclude_id is not None else None
+        if skip is None or size == 1:
+            return self._ids[self._rng.randrange(size)]
+        index = self._rng.randrange(size - 1)
+        return self._ids[index + 1 if index >= skip else index]
+
+    def pick(self, exclude_id: int | None = None, seen: int = 0) -> int | None:
+        """Uniform random tip id other than ``exclude_id`` and outside ``seen``.
+
+        Falls back to ignoring ``seen`` when every other tip is in it, and to
+        ``exclude_id`` itself only when it is the sole tip.
+        """
+
+        if not self._ids:
+            return None
+        if not seen:
+            return self._pick_excluding(exclude_id)
+        for _ in range(_MAX_REJECTIONS):
+            tip_id = self._pick_excluding(exclude_id)
+            if not seen >> tip_id & 1:
+                return tip_id
+        unseen = [tip_id for tip_id in self._ids if tip_id != exclude_id and not seen >> tip_id & 1]
+        if unseen:
+            return self._rng.choice(unseen)
+        return self._pick_excluding(exclude_id)
+
+    def remember(self, seen: int, tip_id: int, window: int) -> int:
+        """Mark ``tip_id`` as shown, restarting the window once it is full."""
+
+        seen |= 1 << tip_id
+        if seen.bit_count() >= min(window, len(self._ids) - 1):
+            seen = 1 << tip_id
+        return seen
+
+    def deal(
+        self, last_tip_id: int | None, tips_seen: bytes | None, window: int
+    ) -> tuple[int, bytes | None] | None:
+        """Pick a user's next tip and return it with their updated ``tips_seen``."""
+
+        seen = decode_seen(tips_seen) if window else 0
+        tip_id = self.pick(last_tip_id, seen)
+        if tip_id is None:
+            return None
+        if window:
+            seen = self.remember(seen, tip_id, window)
+        return tip_id, encode_seen(seen)
+
+
+__all__ = ["TipPool", "decode_seen", "encode_seen"]
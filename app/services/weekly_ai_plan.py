@@ -12,13 +12,11 @@ from typing import Any, Sequence
 from aiogram import Bot
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from app.broadcast import Broadcaster, broadcaster
 from app.config import settings
 from app.db.session import compat_session, session_scope
-from app.repo import (
-    events as events_repo,
-    profiles as profiles_repo,
-    subscriptions as subscriptions_repo,
-)
+from app.event_sink import event_sink
+from app.repo import profiles as profiles_repo, subscriptions as subscriptions_repo
 from app.services import premium_metrics
 from app.services.plan_storage import archive_plan
 
@@ -92,6 +90,7 @@ async def weekly_ai_plan_job(
 ) -> None:
     """Send the refreshed plan to all active premium subscribers."""
 
+    # Recipients and plans are built up front; sends run without an open session.
     async with compat_session(scope_factory) as session:
         active = await subscriptions_repo.active_users(session)
         deliveries: list[tuple[int, PlanPayload]] = []
@@ -100,36 +99,55 @@ async def weekly_ai_plan_job(
             plan = await plan_builder(profile)
             deliveries.append((subscription.user_id, plan))
 
-        premium_metrics.set_active_subs(len(deliveries))
-
-        for user_id, plan in deliveries:
-            text = plan.render()
-            plan_json = deepcopy(plan.plan_json or {})
-            plan_json.setdefault("recommendations", list(plan.recommendations))
-            plan_json.setdefault("summary", plan.text)
-            plan_json.setdefault("goals", [])
-            plan_json["source"] = plan_json.get("source") or "weekly"
-            try:
-                await bot.send_message(user_id, text, reply_markup=_keyboard())
-            except Exception:  # pragma: no cover - network errors mocked in tests
-                log.warning("weekly plan delivery failed", exc_info=True)
-                continue
-            try:
-                await profiles_repo.save_plan(session, user_id, plan_json)
-            except Exception:
-                log.warning("failed to persist plan in profile", exc_info=True)
-            try:
-                archive_plan(user_id, plan_json)
-            except Exception:
-                log.warning("failed to archive plan", exc_info=True)
-            premium_metrics.record_ai_plan(len(text))
-            await events_repo.log(
-                session,
-                user_id,
-                "ai_plan_sent",
-                {"plan_len": len(text), "rec_count": len(plan.recommendations)},
-            )
-        await session.commit()
+    premium_metrics.set_active_subs(len(deliveries))
+
+    rendered: dict[int, tuple[str, dict[str, Any], PlanPayload]] = {}
+    for user_id, plan in deliveries:
+        plan_json = deepcopy(plan.plan_json or {})
+        plan_json.setdefault("recommendations", list(plan.recommendations))
+        plan_json.setdefault("summary", plan.text)
+        plan_json.setdefault("goals", [])
+        plan_json["source"] = plan_json.get("source") or "weekly"
+        rendered[user_id] = (plan.render(), plan_json, plan)
+
+    async def _send(user_id: int) -> None:
+        await bot.send_message(user_id, rendered[user_id][0], reply_markup=_keyboard())
+
+    sent: list[int] = []
+
+    def _sent(user_id: int) -> None:
+        text, plan_json, plan = rendered[user_id]
+        sent.append(user_id)
+        try:
+            archive_plan(user_id, plan_json)
+        except Exception:
+            log.warning("failed to archive plan", exc_info=True)
+        premium_metrics.record_ai_plan(len(text))
+        event_sink.emit(
+            user_id,
+            "ai_plan_sent",
+            {"plan_len": len(text), "rec_count": len(plan.recommendations)},
+        )
+
+    # The shared engine keeps one rate limit per process; an injected scope gets its own.
+    engine = (
+        broadcaster
+        if scope_factory is session_scope
+        else Broadcaster(session_factory=scope_factory)
+    )
+    year, week, _ = dt.datetime.now(dt.timezone.utc).isocalendar()
+    try:
+        await engine.run(f"weekly_ai_plan:{year}-W{week:02d}", rendered, _send, on_sent=_sent)
+    finally:
+        # Profiles of everyone reached are saved in one session, even after an aborted run.
+        if sent:
+            async with compat_session(scope_factory) as session:
+                for user_id in sent:
+                    try:
+                        await profiles_repo.save_plan(session, user_id, rendered[user_id][1])
+                    except Exception:
+                        log.warning("failed to persist plan in profile", exc_info=True)
+                await session.commit()
 
 
 async def _resolve_profile(provider, user_id: int) -> dict:
@@ -0,0 +1,130 @@
+"""Stale-while-revalidate snapshots for admin reports.
+
+Each :class:`SnapshotService` keeps the last computed value of an expensive
+report.  Readers get it immediately together with its age; once it is older
+than ``max_age`` a single background rebuild starts, and concurrent readers
+or explicit refreshes join that rebuild instead of starting their own.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+_log = logging.getLogger("snapshots")
+
+
+@dataclass(frozen=True, slots=True)
+class Snapshot(Generic[T]):
+    value: T
+    built_at: datetime
+    build_seconds: float
+    _monotonic: float
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was built."""
+
+        return max(0.0, time.monotonic() - self._monotonic)
+
+
+class SnapshotService(Generic[T]):
+    """Serve the last snapshot of ``builder`` and rebuild it at most once at a time."""
+
+    def __init__(self, name: str, builder: Callable[[], Awaitable[T]], *, max_age: float) -> None:
+        self.name = name
+        self.max_age = max_age
+        self._builder = builder
+        self._snapshot: Snapshot[T] | None = None
+        self._task: asyncio.Task[Snapshot[T]] | None = None
+        self.builds = 0
+        self.failures = 0
+
+    @property
+    def current(self) -> Snapshot[T] | None:
+        return self._snapshot
+
+    async def get(self) -> Snapshot[T]:
+        """Return the last snapshot, scheduling a rebuild if it is stale.
+
+        Only the very first call (or one after every build failed) waits for
+        the builder.
+        """
+
+        snapshot = self._snapshot
+        if snapshot is None:
+            return await self.refresh()
+        if snapshot.age >= self.max_age:
+            self._start()
+        return snapshot
+
+    async def refresh(self) -> Snapshot[T]:
+        """Rebuild now, joining a rebuild that is already running."""
+
+        return await asyncio.shield(self._start())
+
+    def _start(self) -> asyncio.Task[Snapshot[T]]:
+        task = self._task
+        if task is None or task.done():
+            task = self._task = asyncio.create_task(self._build(), name=f"snapshot-{self.name}")
+        return task
+
+    async def _build(self) -> Snapshot[T]:
+        started = time.monotonic()
+        try:
+            value = await self._builder()
+        except Exception:
+            self.failures += 1
+            _log.exception("snapshot %s rebuild failed", self.name)
+            if self._snapshot is None:
+                raise
+            # Keep serving the previous snapshot; the next stale read retries.
+            return self._snapshot
+        finished = time.monotonic()
+        self.builds += 1
+        self._snapshot = Snapshot(
+            value=value,
+            built_at=datetime.now(timezone.utc),
+            build_seconds=finished - started,
+            _monotonic=finished,
+        )
+        return self._snapshot
+
+
+_SERVICES: dict[str, SnapshotService] = {}
+
+
+def register(service: SnapshotService[T]) -> SnapshotService[T]:
+    _SERVICES[service.name] = service
+    return service
+
+
+async def refresh_all() -> int:
+    """Rebuild every registered snapshot; used by the scheduler to keep them warm."""
+
+    refreshed = 0
+    for service in list(_SERVICES.values()):
+        try:
+            await service.refresh()
+        except Exception:
+            continue
+        refreshed += 1
+    return refreshed
+
+
+def format_age(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} с назад"
+    if seconds < 3600:
+        return f"{seconds // 60} мин назад"
+    return f"{seconds // 3600} ч {seconds % 3600 // 60} мин назад"
+
+
+__all__ = ["Snapshot", "SnapshotService", "format_age", "refresh_all", "register"]
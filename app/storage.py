@@ -7,76 +7,88 @@ import inspect
 import logging
 import os
 import time
-from collections import defaultdict
 from collections.abc import Iterable, Iterator, MutableMapping
-from copy import deepcopy
-from threading import Thread
-from typing import Any, Awaitable, Dict, Optional
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Mapping, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.repo import events
+from app.utils.expiring import ExpiringDict
 
 USE_REDIS = os.getenv("USE_REDIS", "0") == "1"
+SESSION_CACHE_MAXSIZE = int(os.getenv("SESSION_CACHE_MAXSIZE", "50000"))
+THROTTLE_MAXSIZE = int(os.getenv("THROTTLE_MAXSIZE", "100000"))
+ROLE_TTL = int(os.getenv("ROLE_TTL_SECONDS", "86400"))
+ROLE_MAXSIZE = int(os.getenv("ROLE_MAXSIZE", "10000"))
 
 if USE_REDIS:
     from app.storage_redis import (  # type: ignore
         session_get as redis_session_get,
+        session_get_many as redis_session_get_many,
         session_pop as redis_session_pop,
         session_set as redis_session_set,
+        session_set_many as redis_session_set_many,
         touch_throttle as redis_touch_throttle,
     )
 
-    _redis_loop = asyncio.new_event_loop()
+_log = logging.getLogger("storage")
 
-    def _redis_loop_worker() -> None:
-        asyncio.set_event_loop(_redis_loop)
-        _redis_loop.run_forever()
 
-    _redis_thread = Thread(target=_redis_loop_worker, name="redis-storage", daemon=True)
-    _redis_thread.start()
+class _WriteScope:
+    """Session keys dirtied while handling one update."""
 
-    def _run_async(coro: Awaitable[Any] | asyncio.Future[Any]) -> Any:
-        return asyncio.run_coroutine_threadsafe(coro, _redis_loop).result()
+    __slots__ = ("keys", "closed")
 
-else:
-    _redis_loop = None
+    def __init__(self) -> None:
+        self.keys: set[int] = set()
+        self.closed = False
+
+
+_WRITE_SCOPE: ContextVar[_WriteScope | None] = ContextVar("session_write_scope", default=None)
+
+
+def _active_scope() -> _WriteScope | None:
+    scope = _WRITE_SCOPE.get()
+    if scope is None or scope.closed:
+        return None
+    return scope
+
+
+def _unwrap(value: Any) -> Any:
+    if isinstance(value, SessionData):
+        return value._data
+    return value
 
 
 class SessionData(MutableMapping[str, Any]):
-    """A mutable mapping that persists changes back to the session store."""
+    """A mutable view over a session that marks it dirty on every change.
+
+    Nested dictionaries are returned as views over the same objects, so no
+    copies are made; values assigned into the session are stored by reference.
+    Persistence is deferred to the store (see :meth:`AsyncSessionStore.deferred`).
+    """
 
-    __slots__ = ("_store", "_user_id", "_data", "_parent")
+    __slots__ = ("_store", "_user_id", "_data")
 
-    def __init__(
-        self,
-        store: "SessionStore",
-        user_id: int,
-        data: Dict[str, Any],
-        parent: "SessionData" | None = None,
-    ) -> None:
+    def __init__(self, store: "SessionStore", user_id: int, data: Dict[str, Any]) -> None:
         self._store = store
         self._user_id = user_id
         self._data = data
-        self._parent = parent
 
     def __getitem__(self, key: str) -> Any:
         value = self._data[key]
         if isinstance(value, dict):
-            return SessionData(self._store, self._user_id, value, parent=self)
+            return SessionData(self._store, self._user_id, value)
         return value
 
     def __setitem__(self, key: str, value: Any) -> None:
-        if isinstance(value, SessionData):
-            value = value.to_dict()
-        elif isinstance(value, dict):
-            value = deepcopy(value)
-        self._data[key] = value
-        self._persist()
+        self._data[key] = _unwrap(value)
+        self._touch()
 
     def __delitem__(self, key: str) -> None:
         del self._data[key]
-        self._persist()
+        self._touch()
 
     def __iter__(self) -> Iterator[str]:
         return iter(self._data)
@@ -84,55 +96,57 @@ class SessionData(MutableMapping[str, Any]):
     def __len__(self) -> int:
         return len(self._data)
 
-    def _persist(self) -> None:
-        if self._parent is not None:
-            self._parent._persist()
-        else:
-            self._store._save(self._user_id, self._data)
+    def _touch(self) -> None:
+        self._store._mark_dirty(self._user_id)
 
     def clear(self) -> None:  # type: ignore[override]
-        self._data.clear()
-        self._persist()
+        if self._data:
+            self._data.clear()
+            self._touch()
 
     def update(self, *args: Iterable[Any], **kwargs: Any) -> None:  # type: ignore[override]
         self._data.update(*args, **kwargs)
-        self._persist()
+        self._touch()
 
     def setdefault(self, key: str, default: Any = None) -> Any:  # type: ignore[override]
         if key not in self._data:
-            value = default if default is not None else {}
-            if isinstance(value, SessionData):
-                value = value.to_dict()
-            elif isinstance(value, dict):
-                value = deepcopy(value)
-            self._data[key] = value
-            self._persist()
+            self._data[key] = _unwrap(default) if default is not None else {}
+            self._touch()
         value = self._data[key]
         if isinstance(value, dict):
-            return SessionData(self._store, self._user_id, value, parent=self)
+            return SessionData(self._store, self._user_id, value)
         return value
 
     def pop(self, key: str, default: Any = None) -> Any:  # type: ignore[override]
         if key in self._data:
             value = self._data.pop(key)
-            self._persist()
-            if isinstance(value, dict):
-                return deepcopy(value)
+            self._touch()
             return value
         return default
 
     def to_dict(self) -> Dict[str, Any]:
-        return deepcopy(self._data)
+        """Return a shallow copy; nested containers are shared with the session."""
+
+        return dict(self._data)
 
 
 class SessionStore(MutableMapping[int, SessionData]):
-    """Hybrid session store with optional Redis backend."""
+    """Hybrid session store with optional Redis backend.
 
-    __slots__ = ("_cache", "_ttl")
+    The synchronous mapping API only touches the in-process cache so it never
+    blocks the event loop.  With ``USE_REDIS=1`` dirty sessions are written to
+    Redis once per update when a write scope is active, otherwise they are
+    written behind on the running loop.  Without Redis the cache is the store,
+    so dirty sessions are set again instead, which restarts their TTL just as
+    the Redis write does.  Use :data:`sessions` to read through.
+    """
 
-    def __init__(self, ttl: int = 3600) -> None:
-        self._cache: Dict[int, Dict[str, Any]] = {}
+    __slots__ = ("_cache", "_ttl", "_pending")
+
+    def __init__(self, ttl: int = 3600, maxsize: int = SESSION_CACHE_MAXSIZE) -> None:
+        self._cache: ExpiringDict[int, Dict[str, Any]] = ExpiringDict(ttl=ttl, maxsize=maxsize)
         self._ttl = ttl
+        self._pending: Dict[int, asyncio.Task[None]] = {}
 
     def __getitem__(self, key: int) -> SessionData:
         data = self._load(key)
@@ -140,9 +154,8 @@ class SessionStore(MutableMapping[int, SessionData]):
             raise KeyError(key)
         return SessionData(self, key, data)
 
-    def __setitem__(self, key: int, value: Dict[str, Any] | SessionData) -> None:
-        payload = value.to_dict() if isinstance(value, SessionData) else deepcopy(value)
-        self._save(key, payload)
+    def __setitem__(self, key: int, value: Mapping[str, Any] | SessionData) -> None:
+        self._save(key, dict(_unwrap(value)))
 
     def __delitem__(self, key: int) -> None:
         self.pop(key)
@@ -154,30 +167,106 @@ class SessionStore(MutableMapping[int, SessionData]):
         return len(self._cache)
 
     def _load(self, key: int) -> Dict[str, Any] | None:
-        if key in self._cache:
-            return self._cache[key]
-        if USE_REDIS:
-            data = _run_async(redis_session_get(key))
-            if data is not None:
-                self._cache[key] = data
-                return data
-            return None
-        return None
+        return self._cache.get(key)
+
+    def set_ttl(self, ttl: int) -> None:
+        self._ttl = ttl
+        self._cache._ttl = ttl
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
 
     def _save(self, key: int, data: Dict[str, Any]) -> None:
         self._cache[key] = data
-        if USE_REDIS:
-            _run_async(redis_session_set(key, data, ttl=self._ttl))
+        self._mark_dirty(key)
 
     def _delete(self, key: int) -> Dict[str, Any] | None:
+        self._forget_write(key)
         cached = self._cache.pop(key, None)
         if USE_REDIS:
-            data = _run_async(redis_session_pop(key))
-            if data is not None:
-                return data
-            return cached
+            self._schedule_delete(key)
         return cached
 
+    def _mark_dirty(self, key: int) -> None:
+        scope = _active_scope()
+        if scope is not None:
+            scope.keys.add(key)
+        elif USE_REDIS:
+            self._schedule_write(key)
+        else:
+            self._restore_keys((key,))
+
+    def _restore_keys(self, keys: Iterable[int]) -> None:
+        """Set cached sessions again so their expiry restarts (in-memory mode)."""
+
+        for key in keys:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache[key] = data
+
+    def _forget_write(self, key: int) -> None:
+        scope = _active_scope()
+        if scope is not None:
+            scope.keys.discard(key)
+        task = self._pending.pop(key, None)
+        if task is not None and not task.done():
+            task.cancel()
+
+    def _schedule_write(self, key: int) -> None:
+        """Queue a write-behind of ``key``; repeated saves coalesce into one."""
+
+        if key in self._pending:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            _log.debug("session write for %s skipped: no running loop", key)
+            return
+        self._pending[key] = loop.create_task(self._write_behind(key))
+
+    def _schedule_delete(self, key: int) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self._delete_behind(key))
+
+    async def _write_behind(self, key: int) -> None:
+        try:
+            data = self._cache.get(key)
+            if data is not None:
+                await redis_session_set(key, data, ttl=self._ttl)
+        except asyncio.CancelledError:
+            raise
+        except Exception:  # pragma: no cover - redis runtime issues
+            _log.warning("session write-behind failed uid=%s", key, exc_info=True)
+        finally:
+            if self._pending.get(key) is asyncio.current_task():
+                self._pending.pop(key, None)
+
+    async def _delete_behind(self, key: int) -> None:
+        try:
+            await redis_session_pop(key)
+        except Exception:  # pragma: no cover - redis runtime issues
+            _log.warning("session delete failed uid=%s", key, exc_info=True)
+
+    async def _flush_keys(self, keys: Iterable[int]) -> None:
+        payloads: Dict[int, Dict[str, Any]] = {}
+        for key in keys:
+            data = self._cache.get(key)
+            if data is not None:
+                payloads[key] = data
+        if not payloads:
+            return
+        try:
+            if len(payloads) == 1:
+                ((key, data),) = payloads.items()
+                await redis_session_set(key, data, ttl=self._ttl)
+            else:
+                await redis_session_set_many(payloads, ttl=self._ttl)
+        except Exception:  # pragma: no cover - redis runtime issues
+            _log.warning("session flush failed uids=%s", sorted(payloads), exc_info=True)
+
     def get(self, key: int, default: Any = None) -> Any:  # type: ignore[override]
         data = self._load(key)
         if data is None:
@@ -187,21 +276,146 @@ class SessionStore(MutableMapping[int, SessionData]):
     def setdefault(self, key: int, default: Optional[Dict[str, Any]] = None) -> SessionData:  # type: ignore[override]
         data = self._load(key)
         if data is None:
-            payload = deepcopy(default) if default is not None else {}
-            self._save(key, payload)
-            data = self._cache[key]
+            data = dict(default) if default is not None else {}
+            self._save(key, data)
         return SessionData(self, key, data)
 
     def pop(self, key: int, default: Any = None) -> Any:  # type: ignore[override]
         data = self._delete(key)
         if data is None:
             return default
-        return deepcopy(data)
+        return data
+
+
+class AsyncSessionStore:
+    """Async-first session API sharing the cache of a :class:`SessionStore`.
+
+    Cache misses read through to Redis on the running loop (no helper thread),
+    and the ``*_many`` helpers batch several users into one MGET or pipeline.
+    """
+
+    __slots__ = ("_store",)
+
+    def __init__(self, store: SessionStore) -> None:
+        self._store = store
+
+    async def get(self, user_id: int, default: Any = None) -> Any:
+        data = await self._fetch(user_id)
+        if data is None:
+            return default
+        return SessionData(self._store, user_id, data)
+
+    async def get_many(self, user_ids: Iterable[int]) -> Dict[int, SessionData]:
+        store = self._store
+        found: Dict[int, SessionData] = {}
+        missing: list[int] = []
+        for user_id in dict.fromkeys(user_ids):
+            data = store._load(user_id)
+            if data is None:
+                missing.append(user_id)
+            else:
+                found[user_id] = SessionData(store, user_id, data)
+        if missing and USE_REDIS:
+            loaded = await redis_session_get_many(missing)
+            for user_id, data in loaded.items():
+                store._cache[user_id] = data
+                found[user_id] = SessionData(store, user_id, data)
+        return found
+
+    async def set(self, user_id: int, data: Mapping[str, Any] | SessionData) -> SessionData:
+        await self.set_many({user_id: data})
+        return SessionData(self._store, user_id, self._store._cache[user_id])
+
+    async def set_many(self, payloads: Mapping[int, Mapping[str, Any] | SessionData]) -> None:
+        store = self._store
+        scope = _active_scope()
+        prepared: Dict[int, Dict[str, Any]] = {}
+        for user_id, data in payloads.items():
+            payload = dict(_unwrap(data))
+            store._cache[user_id] = payload
+            if scope is not None:
+                scope.keys.add(user_id)
+            else:
+                store._forget_write(user_id)
+                prepared[user_id] = payload
+        if prepared and USE_REDIS:
+            await store._flush_keys(prepared)
+
+    async def setdefault(
+        self, user_id: int, default: Optional[Dict[str, Any]] = None
+    ) -> SessionData:
+        data = await self._fetch(user_id)
+        if data is None:
+            return await self.set(user_id, default or {})
+        return SessionData(self._store, user_id, data)
+
+    async def pop(self, user_id: int, default: Any = None) -> Any:
+        store = self._store
+        store._forget_write(user_id)
+        cached = store._cache.pop(user_id, None)
+        if USE_REDIS:
+            stored = await redis_session_pop(user_id)
+            if cached is None:
+                cached = stored
+        if cached is None:
+            return default
+        return cached
+
+    def deferred(self) -> "_DeferredWrites":
+        """Collect session changes made inside the block and write them once on exit."""
+
+        return _DeferredWrites(self._store)
+
+    async def flush(self) -> None:
+        """Wait until every queued write-behind has reached Redis."""
+
+        pending = list(self._store._pending.values())
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _fetch(self, user_id: int) -> Dict[str, Any] | None:
+        store = self._store
+        data = store._load(user_id)
+        if data is None and USE_REDIS:
+            data = await redis_session_get(user_id)
+            if data is not None:
+                store._cache[user_id] = data
+        return data
+
+
+class _DeferredWrites:
+    """Async context manager returned by :meth:`AsyncSessionStore.deferred`."""
+
+    __slots__ = ("_store", "_scope", "_token")
+
+    def __init__(self, store: SessionStore) -> None:
+        self._store = store
+        self._scope: _WriteScope | None = None
+        self._token: Token[_WriteScope | None] | None = None
+
+    async def __aenter__(self) -> None:
+        if _active_scope() is None:
+            self._scope = _WriteScope()
+            self._token = _WRITE_SCOPE.set(self._scope)
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        scope = self._scope
+        if scope is None or self._token is None:
+            return
+        scope.closed = True
+        _WRITE_SCOPE.reset(self._token)
+        if not scope.keys:
+            return
+        if USE_REDIS:
+            await self._store._flush_keys(scope.keys)
+        else:
+            self._store._restore_keys(scope.keys)
 
 
 SESSIONS = SessionStore()
-THROTTLES: dict[str, dict[int, float]] = defaultdict(dict)
-ACCESS_ROLES: dict[int, set[str]] = defaultdict(set)
+sessions = AsyncSessionStore(SESSIONS)
+THROTTLES: ExpiringDict[tuple[str, int], float] = ExpiringDict(maxsize=THROTTLE_MAXSIZE)
+ACCESS_ROLES: ExpiringDict[int, set[str]] = ExpiringDict(ttl=ROLE_TTL, maxsize=ROLE_MAXSIZE)
 
 
 async def set_last_plan(session: AsyncSession, user_id: int, plan: Dict[str, Any]) -> None:
@@ -236,22 +450,24 @@ async def commit_safely(session: Any) -> None:
         await result
 
 
-def touch_throttle(user_id: int, key: str, cooldown: float) -> float:
+async def touch_throttle(user_id: int, key: str, cooldown: float) -> float:
     """Return remaining cooldown for the key and update the throttle bucket."""
 
     if USE_REDIS:
-        return float(_run_async(redis_touch_throttle(user_id, key, cooldown)))
+        return float(await redis_touch_throttle(user_id, key, cooldown))
 
     if user_id is None or cooldown <= 0:
         return 0.0
 
+    # Mirrors the Redis script: the first caller claims the slot until its
+    # deadline and later callers only learn how long is left, whatever
+    # cooldown they pass.
+    slot = (key, user_id)
     now = time.monotonic()
-    bucket = THROTTLES[key]
-    last = bucket.get(user_id, 0.0)
-    remaining = (last + cooldown) - now
-    if remaining > 0:
-        return remaining
-    bucket[user_id] = now
+    deadline = THROTTLES.get(slot)
+    if deadline is not None and deadline > now:
+        return deadline - now
+    THROTTLES.set(slot, now + cooldown, ttl=cooldown)
     return 0.0
 
 
@@ -263,7 +479,7 @@ def session_get(user_id: int) -> Dict[str, Any]:
 
 
 def session_set(user_id: int, data: Dict[str, Any], ttl: int = 3600) -> None:
-    SESSIONS._ttl = ttl
+    SESSIONS.set_ttl(ttl)
     SESSIONS[user_id] = data
 
 
@@ -277,7 +493,11 @@ def session_pop(user_id: int) -> Dict[str, Any] | None:
 def grant_role(user_id: int, role: str) -> None:
     if user_id is None or not role:
         return
-    ACCESS_ROLES[user_id].add(role)
+    roles = ACCESS_ROLES.get(user_id)
+    if roles is None:
+        roles = set()
+    roles.add(role)
+    ACCESS_ROLES[user_id] = roles
 
 
 def revoke_role(user_id: int, role: str) -> None:
@@ -295,3 +515,13 @@ def has_role(user_id: int, role: str) -> bool:
     if user_id is None or not role:
         return False
     return role in ACCESS_ROLES.get(user_id, set())
+
+
+def memory_stats() -> Dict[str, Dict[str, int]]:
+    """Return entry counts and approximate sizes of the in-process maps."""
+
+    return {
+        "sessions": SESSIONS.stats(),
+        "throttles": THROTTLES.stats(),
+        "roles": ACCESS_ROLES.stats(),
+    }
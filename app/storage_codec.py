@@ -0,0 +1,149 @@
+"""Versioned payload codec for sessions and carts stored in Redis."""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Callable
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack optional
+    msgpack = None  # type: ignore[assignment]
+
+# First byte of a binary payload.  Legacy payloads are bare JSON documents and
+# therefore always start with ``{`` or ``[``, which never collide with these.
+FORMAT_MSGPACK_V1 = 0x01
+
+REDIS_CODEC = os.getenv("REDIS_CODEC", "msgpack").strip().lower()
+
+# Frequent dict keys written as small integers (one msgpack byte) instead of
+# strings.  The position is the wire id: only ever append to this tuple, a
+# reordering silently corrupts every stored v1 payload.
+_KEYS_V1: tuple[str, ...] = (
+    # sessions
+    "calc",
+    "calc_engine",
+    "step_index",
+    "data",
+    "quiz",
+    "idx",
+    "score",
+    "pick",
+    "goal",
+    "age",
+    "life",
+    "level",
+    "allerg",
+    "season",
+    "sex",
+    "weight",
+    "height",
+    "activity",
+    "climate",
+    "preference",
+    "_premium_cta_shown",
+    # carts
+    "items",
+    "coupon_code",
+    "coupon_meta",
+    "product_id",
+    "title",
+    "price",
+    "quantity",
+    "currency",
+    "utm",
+    "kind",
+    "discount",
+    "utm_source",
+    "utm_medium",
+    "utm_campaign",
+    "utm_content",
+)
+_KEY_IDS_V1 = {key: index for index, key in enumerate(_KEYS_V1)}
+
+
+def _compact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            _KEY_IDS_V1.get(key, key) if isinstance(key, str) else str(key): _compact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_compact(item) for item in value]
+    return value
+
+
+def _expand(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            _KEYS_V1[key] if isinstance(key, int) else key: _expand(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_expand(item) for item in value]
+    return value
+
+
+def _encode_msgpack_v1(payload: Any) -> bytes:
+    return bytes((FORMAT_MSGPACK_V1,)) + msgpack.packb(_compact(payload), use_bin_type=True)
+
+
+def _decode_msgpack_v1(body: bytes) -> Any:
+    if msgpack is None:
+        raise ValueError("msgpack payload found but msgpack is not installed")
+    return _expand(msgpack.unpackb(body, raw=False, strict_map_key=False))
+
+
+def _encode_json(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+_DECODERS: dict[int, Callable[[bytes], Any]] = {
+    FORMAT_MSGPACK_V1: _decode_msgpack_v1,
+}
+
+
+def current_format() -> int | None:
+    """Return the format byte new writes use, or ``None`` for legacy JSON."""
+
+    if REDIS_CODEC == "msgpack" and msgpack is not None:
+        return FORMAT_MSGPACK_V1
+    return None
+
+
+def encode(payload: Any) -> bytes:
+    """Serialize ``payload`` with the configured codec."""
+
+    if current_format() == FORMAT_MSGPACK_V1:
+        return _encode_msgpack_v1(payload)
+    return _encode_json(payload)
+
+
+def decode(raw: bytes | str | None) -> Any:
+    """Deserialize a stored payload written by any supported codec version."""
+
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        return json.loads(raw)
+    if not raw:
+        raise ValueError("empty payload")
+    decoder = _DECODERS.get(raw[0])
+    if decoder is not None:
+        return decoder(raw[1:])
+    return json.loads(raw)
+
+
+def is_current(raw: bytes | str) -> bool:
+    """Return ``True`` when ``raw`` is already in the format :func:`encode` produces."""
+
+    fmt = current_format()
+    if isinstance(raw, str) or not raw:
+        return fmt is None
+    if fmt is None:
+        return raw[0] not in _DECODERS
+    return raw[0] == fmt
+
+
+__all__ = ["FORMAT_MSGPACK_V1", "current_format", "decode", "encode", "is_current"]
@@ -1,11 +1,14 @@
-import asyncio
-import json
 import os
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
 import redis.asyncio as redis
+from redis.commands.core import AsyncScript
+
+from app import storage_codec
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "32"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
 _redis: Optional[redis.Redis] = None
 FEATURE_FLAGS_KEY = "feature_flags:v1"
 
@@ -13,48 +16,75 @@ FEATURE_FLAGS_KEY = "feature_flags:v1"
 async def _conn() -> redis.Redis:
     global _redis
     if _redis is None:
-        _redis = redis.from_url(REDIS_URL, decode_responses=True)
+        pool = redis.BlockingConnectionPool.from_url(
+            REDIS_URL,
+            max_connections=REDIS_POOL_SIZE,
+            timeout=REDIS_POOL_TIMEOUT,
+        )
+        _redis = redis.Redis(connection_pool=pool)
     return _redis
 
 
+# Atomically claim the throttle slot or report how long it stays taken.  The
+# key expires on the Redis clock, so replicas agree on the remaining cooldown.
+_THROTTLE_SCRIPT = """
+if redis.call('SET', KEYS[1], '1', 'NX', 'PX', ARGV[1]) then
+    return 0
+end
+local remaining = redis.call('PTTL', KEYS[1])
+if remaining < 0 then
+    redis.call('SET', KEYS[1], '1', 'PX', ARGV[1])
+    return 0
+end
+return remaining
+"""
+_throttle_script: Optional[AsyncScript] = None
+
+
 async def touch_throttle(user_id: int, key: str, cooldown: float) -> float:
+    global _throttle_script
     if user_id is None or cooldown <= 0:
         return 0.0
 
     client = await _conn()
-    loop = asyncio.get_running_loop()
-    now = loop.time()
-    redis_key = f"thr:{key}:{user_id}"
-
-    prev = await client.get(redis_key)
-    if prev is not None:
-        try:
-            prev_time = float(prev)
-        except (TypeError, ValueError):
-            prev_time = 0.0
-        remaining = (prev_time + cooldown) - now
-        if remaining > 0:
-            return remaining
-
-    await client.set(redis_key, str(now), ex=max(int(cooldown), 1))
-    return 0.0
+    if _throttle_script is None:
+        _throttle_script = client.register_script(_THROTTLE_SCRIPT)
+    cooldown_ms = max(int(cooldown * 1000), 1)
+    remaining_ms = await _throttle_script(keys=[f"thr:{key}:{user_id}"], args=[cooldown_ms])
+    return max(int(remaining_ms), 0) / 1000.0
 
 
 async def session_get(user_id: int) -> dict[str, Any] | None:
     client = await _conn()
-    raw = await client.get(f"sess:{user_id}")
-    if raw is None:
-        return None
-    return json.loads(raw)
+    return storage_codec.decode(await client.get(f"sess:{user_id}"))
 
 
 async def session_set(user_id: int, data: dict[str, Any], ttl: int = 3600) -> None:
     client = await _conn()
-    await client.set(
-        f"sess:{user_id}",
-        json.dumps(data, ensure_ascii=False),
-        ex=ttl,
-    )
+    await client.set(f"sess:{user_id}", storage_codec.encode(data), ex=ttl)
+
+
+async def session_get_many(user_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+    ids = list(user_ids)
+    if not ids:
+        return {}
+    client = await _conn()
+    raws = await client.mget([f"sess:{user_id}" for user_id in ids])
+    return {
+        user_id: storage_codec.decode(raw)
+        for user_id, raw in zip(ids, raws, strict=False)
+        if raw is not None
+    }
+
+
+async def session_set_many(payloads: dict[int, dict[str, Any]], ttl: int = 3600) -> None:
+    if not payloads:
+        return
+    client = await _conn()
+    pipe = client.pipeline(transaction=False)
+    for user_id, data in payloads.items():
+        pipe.set(f"sess:{user_id}", storage_codec.encode(data), ex=ttl)
+    await pipe.execute()
 
 
 async def session_pop(user_id: int) -> Optional[dict[str, Any]]:
@@ -64,34 +94,189 @@ async def session_pop(user_id: int) -> Optional[dict[str, Any]]:
     pipe.get(key)
     pipe.delete(key)
     raw, _ = await pipe.execute()
-    return json.loads(raw) if raw else None
+    return storage_codec.decode(raw) if raw else None
+
+
+# Carts are hashes: ``i:<id>`` holds the encoded item without its quantity,
+# ``q:<id>`` the quantity, ``o:<id>`` the insertion order (from ``seq``) and
+# ``coupon`` the applied coupon.  Legacy carts are whole payloads in
+# ``cart:<user_id>`` strings and are converted on first load.
+_CART_ADD_SCRIPT = """
+if redis.call('HSETNX', KEYS[1], 'i:' .. ARGV[1], ARGV[2]) == 1 then
+    redis.call('HSET', KEYS[1], 'o:' .. ARGV[1], redis.call('HINCRBY', KEYS[1], 'seq', 1))
+end
+local quantity = redis.call('HINCRBY', KEYS[1], 'q:' .. ARGV[1], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return quantity
+"""
+_cart_add_script: Optional[AsyncScript] = None
+
+
+def _cart_key(user_id: int) -> str:
+    return f"cart:h:{user_id}"
+
+
+def _cart_fields(payload: dict[str, Any]) -> dict[str, Any]:
+    fields: dict[str, Any] = {}
+    items = payload.get("items") or []
+    for order, item in enumerate(items, start=1):
+        meta = {k: v for k, v in item.items() if k not in ("product_id", "quantity")}
+        product_id = str(item.get("product_id"))
+        fields[f"i:{product_id}"] = storage_codec.encode(meta)
+        fields[f"q:{product_id}"] = int(item.get("quantity", 1))
+        fields[f"o:{product_id}"] = order
+    fields["seq"] = len(items)
+    if payload.get("coupon_code") or payload.get("coupon_meta"):
+        fields["coupon"] = storage_codec.encode(
+            {"code": payload.get("coupon_code"), "meta": payload.get("coupon_meta") or {}}
+        )
+    return fields
+
+
+def _cart_payload(fields: dict[Any, Any]) -> dict[str, Any]:
+    values = {_text(name): value for name, value in fields.items()}
+    items: list[tuple[int, dict[str, Any]]] = []
+    for name, raw in values.items():
+        if not name.startswith("i:"):
+            continue
+        product_id = name[2:]
+        item = dict(storage_codec.decode(raw))
+        item["product_id"] = product_id
+        item["quantity"] = int(values.get(f"q:{product_id}", 1))
+        items.append((int(values.get(f"o:{product_id}", 0)), item))
+    items.sort(key=lambda entry: entry[0])
+    coupon = storage_codec.decode(values["coupon"]) if "coupon" in values else {}
+    return {
+        "items": [item for _, item in items],
+        "coupon_code": coupon.get("code"),
+        "coupon_meta": dict(coupon.get("meta") or {}),
+    }
+
 
+async def cart_load(user_id: int, ttl: int = 3600) -> dict[str, Any] | None:
+    """Return the stored cart payload, converting a legacy string cart once."""
 
-async def cart_get(user_id: int) -> dict[str, Any] | None:
     client = await _conn()
-    raw = await client.get(f"cart:{user_id}")
+    fields = await client.hgetall(_cart_key(user_id))
+    if fields:
+        return _cart_payload(fields)
+    legacy_key = f"cart:{user_id}"
+    raw = await client.get(legacy_key)
     if raw is None:
         return None
-    return json.loads(raw)
+    payload = storage_codec.decode(raw)
+    await cart_replace(user_id, payload, ttl=ttl)
+    await client.delete(legacy_key)
+    return payload
 
 
-async def cart_set(user_id: int, data: dict[str, Any], ttl: int = 3600) -> None:
+async def cart_add_item(
+    user_id: int, product_id: str, meta: dict[str, Any], quantity: int = 1, ttl: int = 3600
+) -> int:
+    """Add ``quantity`` of an item in one atomic call and return the new quantity.
+
+    ``meta`` is only stored the first time the item enters the cart.
+    """
+
+    global _cart_add_script
     client = await _conn()
-    await client.set(
-        f"cart:{user_id}",
-        json.dumps(data, ensure_ascii=False),
-        ex=ttl,
+    if _cart_add_script is None:
+        _cart_add_script = client.register_script(_CART_ADD_SCRIPT)
+    result = await _cart_add_script(
+        keys=[_cart_key(user_id)],
+        args=[product_id, storage_codec.encode(meta), int(quantity), int(ttl)],
     )
+    return int(result)
 
 
-async def cart_pop(user_id: int) -> Optional[dict[str, Any]]:
+async def cart_replace(user_id: int, payload: dict[str, Any], ttl: int = 3600) -> None:
     client = await _conn()
-    key = f"cart:{user_id}"
-    pipe = client.pipeline()
-    pipe.get(key)
+    key = _cart_key(user_id)
+    pipe = client.pipeline(transaction=True)
     pipe.delete(key)
-    raw, _ = await pipe.execute()
-    return json.loads(raw) if raw else None
+    pipe.hset(key, mapping=_cart_fields(payload))
+    pipe.expire(key, ttl)
+    await pipe.execute()
+
+
+async def cart_set_coupon(
+    user_id: int, code: str | None, meta: dict[str, Any], ttl: int = 3600
+) -> None:
+    """Set or drop only the ``coupon`` field, leaving the items as they are in Redis."""
+
+    client = await _conn()
+    key = _cart_key(user_id)
+    pipe = client.pipeline(transaction=True)
+    if code or meta:
+        pipe.hset(key, "coupon", storage_codec.encode({"code": code, "meta": dict(meta)}))
+        pipe.expire(key, ttl)
+    else:
+        pipe.hdel(key, "coupon")
+    await pipe.execute()
+
+
+async def cart_delete(user_id: int) -> None:
+    client = await _conn()
+    await client.delete(_cart_key(user_id), f"cart:{user_id}")
+
+
+# Swap the payload only if nobody rewrote it since it was read, keeping its TTL.
+_RECODE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+    return 1
+end
+return 0
+"""
+_recode_script: Optional[AsyncScript] = None
+
+
+async def migrate_payloads(
+    prefixes: Iterable[str] = ("sess:", "cart:"), *, batch: int = 500
+) -> dict[str, int]:
+    """Re-encode stored sessions and carts with the current codec.
+
+    Payloads are also rewritten lazily on their next save, so this only
+    matters for keys that are read but rarely written (long-lived carts).
+    Returns ``scanned``/``migrated``/``skipped`` counters.
+    """
+
+    global _recode_script
+    client = await _conn()
+    if _recode_script is None:
+        _recode_script = client.register_script(_RECODE_SCRIPT)
+    stats = {"scanned": 0, "migrated": 0, "skipped": 0}
+    for prefix in prefixes:
+        keys: list[Any] = []
+        async for key in client.scan_iter(match=f"{prefix}*", count=batch):
+            keys.append(key)
+            if len(keys) >= batch:
+                await _recode_batch(client, keys, stats)
+                keys = []
+        if keys:
+            await _recode_batch(client, keys, stats)
+    return stats
+
+
+async def _recode_batch(client: redis.Redis, keys: list[Any], stats: dict[str, int]) -> None:
+    stats["scanned"] += len(keys)
+    raws = await client.mget(keys)
+    for key, raw in zip(keys, raws, strict=False):
+        if raw is None or storage_codec.is_current(raw):
+            continue
+        try:
+            payload = storage_codec.encode(storage_codec.decode(raw))
+        except ValueError:
+            stats["skipped"] += 1
+            continue
+        if await _recode_script(keys=[key], args=[raw, payload]):
+            stats["migrated"] += 1
+        else:
+            stats["skipped"] += 1
+
+
+def _text(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
 
 
 async def feature_flags_all() -> dict[str, bool]:
@@ -99,8 +284,8 @@ async def feature_flags_all() -> dict[str, bool]:
     raw = await client.hgetall(FEATURE_FLAGS_KEY)
     result: dict[str, bool] = {}
     for key, value in raw.items():
-        normalized = str(value).strip().lower()
-        result[str(key)] = normalized in {"1", "true", "yes", "on"}
+        normalized = _text(value).strip().lower()
+        result[_text(key)] = normalized in {"1", "true", "yes", "on"}
     return result
 
 
@@ -4,13 +4,15 @@ from __future__ import annotations
 
 import contextlib
 import logging
-from typing import TYPE_CHECKING, Iterable, Sequence
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Sequence
 from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from aiogram.types import CallbackQuery, Message
 from aiogram.utils.media_group import MediaGroupBuilder
 
-from app.catalog.loader import load_catalog, product_by_alias, product_by_id
+from app.catalog.loader import iter_goal_products, load_catalog, product_record
+from app.catalog.records import MAX_CARD_IMAGES, ProductRecord
 from app.keyboards import kb_actions, kb_back_home, kb_premium_cta
 from app.link_manager import get_product_link, get_register_link
 from app.services.upsell import soft_upsell_prompt
@@ -23,111 +25,33 @@ if TYPE_CHECKING:  # pragma: no cover - import for type hints only
 
 LOG = logging.getLogger(__name__)
 MAX_TEXT = 3500
-MAX_MEDIA = 3
 
 
-def _resolve_catalog_product(code: str) -> dict | None:
-    if not code:
-        return None
-    product = product_by_id(code)
-    if product:
-        return product
-    return product_by_alias(code)
-
-
-def _select_help(raw: object, ctx: str | None) -> str | None:
-    if raw is None:
-        return None
-    if isinstance(raw, str):
-        return raw
-    if not isinstance(raw, dict):
-        return None
-    if ctx and ctx in raw:
-        value = raw[ctx]
-        if isinstance(value, str):
-            return value
-        if isinstance(value, dict):
-            for key in ("severe", "moderate", "mild"):
-                if key in value:
-                    maybe = value[key]
-                    if isinstance(maybe, str):
-                        return maybe
-            for item in value.values():
-                if isinstance(item, str):
-                    return item
-            return None
-    for maybe in raw.values():
-        if isinstance(maybe, str):
-            return maybe
-        if isinstance(maybe, dict):
-            for item in maybe.values():
-                if isinstance(item, str):
-                    return item
-    return None
-
-
-def _normalize_product(item: str | dict, ctx: str | None) -> dict | None:
-    source: dict | None
+def _card(item: str | Mapping, ctx: str | None) -> Mapping | None:
     if isinstance(item, str):
-        source = _resolve_catalog_product(item)
-        if not source:
-            return None
-        source = dict(source)
-    elif isinstance(item, dict):
-        source = dict(item)
-    else:
-        return None
-
-    order = source.get("order") or {}
-    props = []
-    for collection in (source.get("props"), source.get("benefits")):
-        if isinstance(collection, list):
-            props.extend(str(p) for p in collection if p)
-    props = props[:5]
-
-    helps_text = source.get("helps_text")
-    if not helps_text:
-        helps_text = _select_help(source.get("how_it_helps"), ctx)
-
-    images: list[str] = []
-    raw_images = source.get("images")
-    if isinstance(raw_images, list):
-        for img in raw_images:
-            if isinstance(img, str) and img:
-                images.append(img)
-                if len(images) >= MAX_MEDIA:
-                    break
-
-    order_url = source.get("order_url") or order.get("velavie_link")
-    if not order_url:
-        order_url = order.get("url")
-
-    name = (
-        source.get("title")
-        or source.get("name")
-        or source.get("code")
-        or source.get("id")
-        or "Product"
-    )
+        record = product_record(item)
+        return record.card(ctx) if record is not None else None
+    if isinstance(item, ProductRecord):
+        return item.card(ctx)
+    if isinstance(item, dict):
+        return ProductRecord.from_product(item).card(ctx)
+    return None
 
-    return {
-        "code": source.get("code") or source.get("id") or source.get("title") or name,
-        "name": name,
-        "short": source.get("short", ""),
-        "props": props,
-        "images": images,
-        "order_url": order_url,
-        "helps_text": helps_text,
-    }
 
+def prepare_cards(
+    products: Iterable[str | Mapping], ctx: str | None = None
+) -> list[Mapping[str, Any]]:
+    """Normalize product descriptors to a unified card structure.
 
-def prepare_cards(products: Iterable[str | dict], ctx: str | None = None) -> list[dict]:
-    """Normalize product descriptors to a unified card structure."""
+    Catalog products resolve to the shared read-only cards of their
+    :class:`~app.catalog.records.ProductRecord`; plain dicts are wrapped in a
+    throwaway record so both render the same card.
+    """
 
-    return [card for card in (_normalize_product(item, ctx) for item in products) if card]
+    return [card for card in (_card(item, ctx) for item in products) if card]
 
 
-def render_product_text(product: dict, goal_ctx: str | None) -> tuple[str, list[str]]:
+def render_product_text(product: Mapping, goal_ctx: str | None) -> tuple[str, list[str]]:
     """Return a header and bullet list for the given product."""
 
     header = f"<b>— {product.get('name', 'Product')}</b>"
@@ -146,13 +70,13 @@ def render_product_text(product: dict, goal_ctx: str | None) -> tuple[str, list[
     return header, bullets
 
 
-def _collect_media(products: Sequence[dict]) -> list[str]:
+def _collect_media(products: Sequence[Mapping]) -> list[str]:
     media: list[str] = []
     for product in products:
         for img in product.get("images", []) or []:
             if img and img not in media:
                 media.append(img)
-            if len(media) >= MAX_MEDIA:
+            if len(media) >= MAX_CARD_IMAGES:
                 return media
     return media
 
@@ -233,7 +157,8 @@ async def send_product_cards(
             return
 
     async def _render() -> None:
-        cards = prepare_cards(products, ctx)
+        # Shared catalog cards are read-only; order links are per user.
+        cards = [dict(card) for card in prepare_cards(products, ctx)]
 
         message = target.message if isinstance(target, CallbackQuery) else target
         if isinstance(target, CallbackQuery):
@@ -355,17 +280,12 @@ def catalog_summary(goal: str | None = None) -> list[str]:
     """Return up to 6 product titles for a goal context."""
 
     data = load_catalog()
-    ordered = data["ordered"]
-    if goal:
-        goal = goal.lower()
+    products = data["products"]
+    pids = iter_goal_products(data, [goal], limit=6) if goal else data["ordered"]
     result = []
-    for pid in ordered:
-        product = data["products"][pid]
-        goals = product.get("goals") or []
-        if not goal or goal in {str(g).lower() for g in goals}:
-            result.append(product.get("title") or product.get("name") or pid)
-        if len(result) >= 6:
-            break
+    for pid in islice(pids, 6):
+        product = products[pid]
+        result.append(product.get("title") or product.get("name") or pid)
     return result
 
 
@@ -0,0 +1,181 @@
+"""Bounded in-memory mapping with per-entry expiry."""
+
+from __future__ import annotations
+
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Iterator, MutableMapping
+from itertools import islice
+from typing import Any, Callable, Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+_MISSING = object()
+_SIZE_SAMPLE = 64
+
+
+def _approx_size(value: Any, depth: int = 2) -> int:
+    size = sys.getsizeof(value)
+    if depth <= 0:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += _approx_size(key, depth - 1) + _approx_size(item, depth - 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += _approx_size(item, depth - 1)
+    return size
+
+
+class ExpiringDict(MutableMapping[K, V], Generic[K, V]):
+    """A size-capped mapping whose entries expire after a TTL.
+
+    Expiry uses a coarse timing wheel: every write drops the key into the
+    bucket of its expiry tick and sweeps run only over buckets whose tick has
+    passed, so each entry is expired at most once and the cost is amortised
+    O(1) per write.  Reads check the exact deadline, so an expired entry is
+    never returned even before its bucket is swept.  When ``maxsize`` is
+    reached the least recently used entry is evicted.
+    """
+
+    __slots__ = (
+        "_data",
+        "_wheel",
+        "_cursor",
+        "_ttl",
+        "_maxsize",
+        "_resolution",
+        "_clock",
+        "expired",
+        "evicted",
+    )
+
+    def __init__(
+        self,
+        *,
+        ttl: float | None = None,
+        maxsize: int = 10_000,
+        resolution: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._wheel: dict[int, list[K]] = {}
+        self._ttl = ttl
+        self._maxsize = max(1, int(maxsize))
+        self._resolution = max(0.001, float(resolution))
+        self._clock = clock
+        self._cursor = self._tick(clock())
+        self.expired = 0
+        self.evicted = 0
+
+    def _tick(self, moment: float) -> int:
+        return int(moment // self._resolution)
+
+    def __getitem__(self, key: K) -> V:
+        expires_at, value = self._data[key]
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.expired += 1
+            raise KeyError(key)
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: K) -> None:
+        del self._data[key]
+
+    def __contains__(self, key: object) -> bool:
+        entry = self._data.get(key)  # type: ignore[arg-type]
+        return entry is not None and entry[0] > self._clock()
+
+    def __iter__(self) -> Iterator[K]:
+        self.purge()
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K, default: Any = None) -> Any:  # type: ignore[override]
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key: K, default: Any = _MISSING) -> Any:  # type: ignore[override]
+        entry = self._data.pop(key, None)
+        if entry is None or entry[0] <= self._clock():
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        return entry[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Store ``value`` for ``ttl`` seconds (the map default when omitted)."""
+
+        now = self._clock()
+        self.purge(now)
+        lifetime = self._ttl if ttl is None else ttl
+        expires_at = float("inf") if lifetime is None else now + max(0.0, float(lifetime))
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        if lifetime is not None:
+            self._wheel.setdefault(self._tick(expires_at), []).append(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+            self.evicted += 1
+
+    def purge(self, now: float | None = None) -> int:
+        """Drop entries whose expiry tick has passed and return how many were removed."""
+
+        now = self._clock() if now is None else now
+        current = self._tick(now)
+        if current <= self._cursor:
+            return 0
+        if current - self._cursor <= len(self._wheel):
+            ticks = range(self._cursor, current)
+        else:
+            ticks = sorted(tick for tick in self._wheel if tick < current)
+        removed = 0
+        data = self._data
+        for tick in ticks:
+            for key in self._wheel.pop(tick, ()):
+                entry = data.get(key)
+                if entry is not None and entry[0] <= now:
+                    del data[key]
+                    removed += 1
+        self._cursor = current
+        self.expired += removed
+        return removed
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._wheel.clear()
+
+    def approx_bytes(self) -> int:
+        """Estimate the memory held by the map from a sample of its entries."""
+
+        base = sys.getsizeof(self._data) + sys.getsizeof(self._wheel)
+        base += sum(sys.getsizeof(bucket) for bucket in self._wheel.values())
+        count = len(self._data)
+        if not count:
+            return base
+        sample = list(islice(self._data.items(), _SIZE_SAMPLE))
+        sampled = sum(_approx_size(key) + _approx_size(entry) for key, entry in sample)
+        return base + sampled * count // len(sample)
+
+    def stats(self) -> dict[str, int]:
+        self.purge()
+        return {
+            "entries": len(self._data),
+            "maxsize": self._maxsize,
+            "approx_bytes": self.approx_bytes(),
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+__all__ = ["ExpiringDict"]
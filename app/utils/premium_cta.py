@@ -5,16 +5,16 @@ from __future__ import annotations
 from aiogram.types import CallbackQuery, Message
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from app.storage import SESSIONS
+from app.storage import sessions
 
 CTA_BUTTON_TEXT = "💎 Получить полный план (AI)"
 _CTA_SEEN_KEY = "_premium_cta_shown"
 
 
-def _mark_cta_shown(user_id: int | None) -> bool:
+async def _mark_cta_shown(user_id: int | None) -> bool:
     if user_id is None:
         return False
-    session = SESSIONS.setdefault(user_id, {})
+    session = await sessions.setdefault(user_id, {})
     already = bool(session.get(_CTA_SEEN_KEY))
     if not already:
         session[_CTA_SEEN_KEY] = True
@@ -35,7 +35,7 @@ async def send_premium_cta(
 
     user = target.from_user if isinstance(target, CallbackQuery) else target.from_user
     user_id = getattr(user, "id", None)
-    if _mark_cta_shown(user_id):
+    if await _mark_cta_shown(user_id):
         return
 
     if isinstance(target, CallbackQuery):
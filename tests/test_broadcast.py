@@ -0,0 +1,100 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.broadcast import Broadcaster, TokenBucket
+from app.db.models import Base, BroadcastRecipient
+
+pytest.importorskip("aiosqlite")
+
+
+class _Database:
+    def __init__(self) -> None:
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def create(self) -> None:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    @asynccontextmanager
+    async def scope(self):
+        async with self.sessions() as session:
+            yield session
+
+    async def statuses(self, run_key: str) -> dict[int, tuple[str, int]]:
+        async with self.sessions() as session:
+            rows = await session.execute(
+                select(
+                    BroadcastRecipient.user_id,
+                    BroadcastRecipient.status,
+                    BroadcastRecipient.attempts,
+                ).where(BroadcastRecipient.run_key == run_key)
+            )
+            return {user_id: (status, attempts) for user_id, status, attempts in rows.all()}
+
+
+def test_token_bucket_spaces_sends_after_the_burst():
+    async def _test():
+        now = [0.0]
+
+        async def _sleep(seconds: float) -> None:
+            now[0] += seconds
+
+        bucket = TokenBucket(2, clock=lambda: now[0], sleep=_sleep)
+        for _ in range(4):
+            await bucket.acquire()
+        assert now[0] == pytest.approx(1.0)
+
+    asyncio.run(_test())
+
+
+def test_run_retries_records_outcomes_and_resumes():
+    async def _test():
+        db = _Database()
+        await db.create()
+        engine = Broadcaster(
+            rate=1000,
+            concurrency=4,
+            per_chat_interval=0,
+            max_attempts=2,
+            flush_every=2,
+            backoff=0,
+            session_factory=db.scope,
+        )
+        method = SendMessage(chat_id=0, text="hi")
+        calls: dict[int, int] = {}
+        followed_up: list[int] = []
+
+        async def _send(uid: int) -> None:
+            calls[uid] = calls.get(uid, 0) + 1
+            if uid == 2 and calls[uid] == 1:
+                raise TelegramRetryAfter(method=method, message="flood", retry_after=0)
+            if uid == 3:
+                raise TelegramForbiddenError(method=method, message="bot was blocked")
+            if uid == 4:
+                raise ConnectionError("network down")
+
+        report = await engine.run("nudges:test", [1, 2, 3, 4, 1], _send, on_sent=followed_up.append)
+        assert (report.total, report.sent, report.blocked, report.failed) == (4, 2, 1, 1)
+        assert report.retried == 2
+        assert sorted(report.sent_ids) == sorted(followed_up) == [1, 2]
+        assert calls == {1: 1, 2: 2, 3: 1, 4: 2}
+        assert await db.statuses("nudges:test") == {
+            1: ("sent", 1),
+            2: ("sent", 2),
+            3: ("blocked", 1),
+            4: ("failed", 2),
+        }
+
+        # A restarted run with the same key only reaches recipients still pending.
+        resumed = await engine.run("nudges:test", [1, 2, 3, 4, 5], _send)
+        assert (resumed.total, resumed.skipped, resumed.sent_ids) == (1, 4, [5])
+        assert calls[1] == 1 and calls[5] == 1
+
+    asyncio.run(_test())
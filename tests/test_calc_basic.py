@@ -7,6 +7,7 @@ import pytest
 pytest.importorskip("aiosqlite")
 
 from app.handlers import calc
+from app.storage import SESSIONS
 
 
 @asynccontextmanager
@@ -32,7 +33,7 @@ async def test_msd_success_saves_plan_and_cards(monkeypatch):
     monkeypatch.setattr(calc, "send_product_cards", send_mock)
 
     user_id = 101
-    calc.SESSIONS[user_id] = {"calc": "msd"}
+    SESSIONS[user_id] = {"calc": "msd"}
     message = _make_message(user_id, "165 Ж")
 
     await calc.handle_calc_message(message)
@@ -42,7 +43,7 @@ async def test_msd_success_saves_plan_and_cards(monkeypatch):
     send_mock.assert_awaited()
     _, kwargs = send_mock.await_args
     assert kwargs["back_cb"] == "calc:menu"
-    assert user_id not in calc.SESSIONS
+    assert user_id not in SESSIONS
 
 
 @pytest.mark.asyncio
@@ -54,11 +55,11 @@ async def test_msd_invalid_input_prompts_retry(monkeypatch):
     monkeypatch.setattr(calc, "send_product_cards", AsyncMock())
 
     user_id = 202
-    calc.SESSIONS[user_id] = {"calc": "msd"}
+    SESSIONS[user_id] = {"calc": "msd"}
     message = _make_message(user_id, "рост 165")
 
     await calc.handle_calc_message(message)
 
     message.answer.assert_awaited()
-    assert user_id in calc.SESSIONS
-    calc.SESSIONS.pop(user_id, None)
+    assert user_id in SESSIONS
+    SESSIONS.pop(user_id, None)
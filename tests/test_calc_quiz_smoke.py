@@ -6,7 +6,7 @@ import json
 import sys
 from contextlib import asynccontextmanager
 from types import SimpleNamespace
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from aiogram.fsm.context import FSMContext
@@ -16,6 +16,7 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from app.handlers import calc, calc_unified
 from app.quiz import engine as quiz_engine
 from app.quiz.engine import answer_callback, build_answer_callback_data, load_quiz, start_quiz
+from app.storage import SESSIONS
 
 
 @asynccontextmanager
@@ -144,7 +145,7 @@ async def test_msd_calculator_smoke(monkeypatch):
     send_cards, premium_mock = _patch_calc_infrastructure(monkeypatch)
 
     user_id = 9001
-    calc.SESSIONS[user_id] = {"calc": "msd"}
+    SESSIONS[user_id] = {"calc": "msd"}
     message = _make_message(user_id, "170 М")
 
     await calc.handle_calc_message(message)
@@ -153,7 +154,7 @@ async def test_msd_calculator_smoke(monkeypatch):
     calc.events_repo.log.assert_awaited()
     send_cards.assert_awaited()
     premium_mock.assert_awaited()
-    assert user_id not in calc.SESSIONS
+    assert user_id not in SESSIONS
 
 
 @pytest.mark.asyncio
@@ -161,7 +162,7 @@ async def test_bmi_calculator_smoke(monkeypatch):
     send_cards, premium_mock = _patch_calc_unified_infrastructure(monkeypatch)
 
     user_id = 9002
-    calc_unified.SESSIONS.pop(user_id, None)
+    SESSIONS.pop(user_id, None)
     start_cb = _make_callback(user_id, "calc:bmi")
 
     await calc_unified._start_flow(start_cb, "bmi")
@@ -173,7 +174,7 @@ async def test_bmi_calculator_smoke(monkeypatch):
     calc_unified.events_repo.log.assert_awaited()
     send_cards.assert_awaited()
     premium_mock.assert_awaited()
-    assert calc_unified.SESSIONS.get(user_id) is None
+    assert SESSIONS.get(user_id) is None
 
 
 @pytest.mark.asyncio
@@ -258,9 +259,7 @@ async def test_quiz_flow_smoke(
     original_hooks = dict(quiz_engine.QUIZ_HOOKS)
     quiz_engine.QUIZ_HOOKS.clear()
     monkeypatch.setattr(quiz_engine, "DATA_ROOT", tmp_path)
-    monkeypatch.setattr(quiz_engine, "session_scope", _dummy_scope)
-    monkeypatch.setattr(quiz_engine.events_repo, "log", AsyncMock())
-    monkeypatch.setattr(quiz_engine, "commit_safely", AsyncMock())
+    monkeypatch.setattr(quiz_engine.event_sink, "emit", MagicMock())
     monkeypatch.setattr(quiz_engine, "ai_tip_for_quiz", AsyncMock(return_value=None))
 
     _write_quiz(tmp_path)
@@ -13,7 +13,7 @@ def _clear_cache():
     asyncio.run(cache_module.clear_cache())
 
 
-def test_catalog_search_cache_hit(monkeypatch):
+def test_product_get_cache_hit(monkeypatch):
     calls = {"count": 0}
     catalog_payload = {
         "products": {
@@ -34,20 +34,19 @@ def test_catalog_search_cache_hit(monkeypatch):
         return catalog_payload
 
     monkeypatch.setattr(catalog_service, "load_catalog", fake_load_catalog)
-    monkeypatch.setattr(cache_module, "catalog_version", lambda: "v1")
 
     async def _runner():
-        result1 = await catalog_service.catalog_search("foo")
-        result2 = await catalog_service.catalog_search("foo")
+        result1 = await catalog_service.product_get("foo")
+        result2 = await catalog_service.product_get("foo")
 
         assert calls["count"] == 1
         assert result1 == result2
-        assert result1[0]["id"] == "foo"
+        assert result1["id"] == "foo"
 
     asyncio.run(_runner())
 
 
-def test_catalog_cache_invalidation_on_version_change(monkeypatch):
+def test_catalog_cache_invalidation_on_new_epoch(monkeypatch):
     calls = {"count": 0}
     catalog_payload = {
         "products": {
@@ -69,16 +68,13 @@ def test_catalog_cache_invalidation_on_version_change(monkeypatch):
 
     monkeypatch.setattr(catalog_service, "load_catalog", fake_load_catalog)
 
-    version_holder = {"value": "v1"}
-    monkeypatch.setattr(cache_module, "catalog_version", lambda: version_holder["value"])
-
     async def _first_call():
-        await catalog_service.catalog_search("foo")
+        await catalog_service.product_get("foo")
 
     asyncio.run(_first_call())
     assert calls["count"] == 1
 
-    version_holder["value"] = "v2"
+    cache_module.invalidate()
     catalog_payload = {
         "products": {
             "foo": {
@@ -94,12 +90,25 @@ def test_catalog_cache_invalidation_on_version_change(monkeypatch):
     }
 
     async def _second_call():
-        await catalog_service.catalog_search("foo")
+        await catalog_service.product_get("foo")
 
     asyncio.run(_second_call())
     assert calls["count"] == 2
 
 
+def test_l2_keys_use_the_bare_catalog_revision(monkeypatch):
+    monkeypatch.setattr(cache_module, "catalog_revision", lambda: "rev-a")
+    cache_module.invalidate()
+    fresh = cache_module._make_key("f", ("x",), {})
+
+    class _Snapshot:
+        revision = "rev-a"
+
+    cache_module._on_catalog_swap(_Snapshot())
+    assert cache_module._make_key("f", ("x",), {}) == fresh
+    assert fresh.startswith("rev-a:f:")
+
+
 def test_get_reco_uses_cache(monkeypatch):
     calls = {"count": 0}
 
@@ -108,7 +117,6 @@ def test_get_reco_uses_cache(monkeypatch):
         return [f"item-{user_id}"]
 
     monkeypatch.setattr(catalog_service, "_load_user_plan_products", fake_loader)
-    monkeypatch.setattr(cache_module, "catalog_version", lambda: "v1")
 
     async def _runner():
         result1 = await catalog_service.get_reco(42)
@@ -118,3 +126,64 @@ def test_get_reco_uses_cache(monkeypatch):
         assert result1 == result2 == ["item-42"]
 
     asyncio.run(_runner())
+
+
+def test_concurrent_misses_share_one_call():
+    calls = {"count": 0}
+
+    @cache_module.catalog_cached("test_single_flight")
+    async def slow_lookup(key: str) -> str:
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def _runner():
+        return await asyncio.gather(*(slow_lookup("abc") for _ in range(5)))
+
+    assert asyncio.run(_runner()) == ["ABC"] * 5
+    assert calls["count"] == 1
+    stats = cache_module.cache_stats()["test_single_flight"]
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 4
+
+
+def test_none_results_are_cached_briefly(monkeypatch):
+    calls = {"count": 0}
+
+    @cache_module.catalog_cached("test_negative", negative_ttl=30)
+    async def missing(key: str) -> None:
+        calls["count"] += 1
+        return None
+
+    async def _runner():
+        assert await missing("x") is None
+        assert await missing("x") is None
+
+    asyncio.run(_runner())
+    assert calls["count"] == 1
+    stats = cache_module.cache_stats()["test_negative"]
+    assert stats["negative_hits"] == 1
+    assert stats["l1_hits"] == 1
+    assert 0 < stats["hit_ratio"] < 1
+
+    cache_module.invalidate()
+    asyncio.run(_runner())
+    assert calls["count"] == 2
+
+
+def test_failures_propagate_to_every_waiter():
+    calls = {"count": 0}
+
+    @cache_module.catalog_cached("test_failure")
+    async def broken(key: str) -> str:
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def _runner():
+        return await asyncio.gather(broken("k"), broken("k"), return_exceptions=True)
+
+    results = asyncio.run(_runner())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert calls["count"] == 1
+    assert cache_module.cache_stats()["test_failure"]["errors"] == 1
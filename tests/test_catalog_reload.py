@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import time
+
+import pytest
+
+from app.catalog import loader, overrides
+
+_STAMPS = itertools.count(1)
+
+
+def _product(pid: str, title: str, goals: list[str] | None = None) -> dict:
+    return {
+        "id": pid,
+        "title": title,
+        "goals": goals or [],
+        "order": {"velavie_link": f"https://example.com/{pid}"},
+    }
+
+
+def _write(path, payload) -> None:
+    path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    # Make sure mtime polling sees the edit even on coarse filesystems.
+    stamp = time.time() + next(_STAMPS)
+    os.utime(path, (stamp, stamp))
+
+
+@pytest.fixture
+def catalog_files(tmp_path, monkeypatch):
+    products = tmp_path / "products.json"
+    aliases = tmp_path / "aliases.json"
+    override_file = tmp_path / "overrides.json"
+    _write(products, {"products": [_product("a", "Alpha"), _product("b", "Beta")]})
+    monkeypatch.setattr(loader, "CATALOG_PATH", str(products))
+    monkeypatch.setattr(loader, "CATALOG_FILE", products)
+    monkeypatch.setattr(loader, "ALIASES_PATH", str(aliases))
+    monkeypatch.setattr(loader, "CATALOG_SNAPSHOT_PATH", str(tmp_path / "products.snapshot"))
+    monkeypatch.setattr(overrides, "CATALOG_OVERRIDES_PATH", override_file)
+    monkeypatch.setattr(loader, "_SNAPSHOT", None)
+    monkeypatch.setattr(loader, "_LISTENERS", [])
+    monkeypatch.setattr(loader, "CATALOG_SHA", loader.CATALOG_SHA)
+    monkeypatch.setattr(loader, "_SHA_CACHE", None)
+    return products, override_file
+
+
+def test_reload_swaps_snapshot_and_reuses_unchanged_products(catalog_files):
+    products, override_file = catalog_files
+    first = loader.current_snapshot()
+    data = loader.load_catalog()
+    beta = data["products"]["b"]
+    assert loader.reload_catalog() is False
+
+    _write(products, {"products": [_product("a", "Alpha v2"), _product("b", "Beta")]})
+    assert loader.reload_catalog() is True
+
+    second = loader.current_snapshot()
+    assert second.epoch == first.epoch + 1
+    assert second.reindexed == 1
+    assert second.revision != first.revision
+    assert loader.CATALOG_SHA == second.sha != first.sha
+    assert loader.load_catalog()["products"]["a"]["title"] == "Alpha v2"
+    assert loader.load_catalog()["products"]["b"] is beta
+    # Readers holding the old snapshot still see a consistent catalog.
+    assert data["products"]["a"]["title"] == "Alpha"
+
+    _write(override_file, {"b": {"title": "Beta override"}})
+    assert loader.reload_catalog() is True
+    third = loader.current_snapshot()
+    assert third.reindexed == 1
+    assert third.revision != second.revision
+    assert loader.product_by_id("b")["title"] == "Beta override"
+
+
+def test_broken_edit_keeps_last_good_snapshot(catalog_files):
+    products, _ = catalog_files
+    published = []
+    loader.on_catalog_reload(published.append)
+    before = loader.current_snapshot()
+
+    products.write_text("{not json", encoding="utf-8")
+    with pytest.raises(loader.CatalogError):
+        loader.reload_catalog()
+    assert loader.current_snapshot() is before
+
+    _write(products, {"products": [_product("c", "Gamma")]})
+    assert loader.reload_catalog() is True
+    assert list(loader.load_catalog()["ordered"]) == ["c"]
+    assert [snap.epoch for snap in published] == [before.epoch, before.epoch + 1]
+
+
+def test_watcher_picks_up_edits(catalog_files):
+    products, _ = catalog_files
+    loader.current_snapshot()
+    watcher = loader.CatalogWatcher(interval=0.01)
+    assert watcher.start() is True
+    try:
+        _write(products, {"products": [_product("a", "Hot")]})
+        deadline = time.monotonic() + 2
+        while loader.load_catalog()["products"]["a"]["title"] != "Hot":
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        watcher.stop()
+    assert loader.CatalogWatcher(interval=0).start() is False
+
+
+def test_goal_index_merges_postings_in_catalog_order(catalog_files):
+    products, _ = catalog_files
+    _write(
+        products,
+        {
+            "products": [
+                _product("a", "Alpha", ["Sleep"]),
+                _product("b", "Beta", ["energy", "sleep"]),
+                _product("c", "Gamma", ["gut"]),
+                _product("d", "Delta", ["energy", "energy"]),
+            ]
+        },
+    )
+    catalog = loader.load_catalog(refresh=True)
+    assert catalog["goals"] == {"sleep": [0, 1], "energy": [1, 3], "gut": [2]}
+
+    assert [p["id"] for p in loader.select_by_goals(["sleep", "ENERGY"])] == ["a", "b", "d"]
+    assert [p["id"] for p in loader.select_by_goals(["energy", "gut"], limit=2)] == ["b", "c"]
+    assert list(loader.iter_goal_products(catalog, ["sleep", "energy", "gut"])) == [
+        "a",
+        "b",
+        "c",
+        "d",
+    ]
+    assert loader.select_by_goals(["unknown", ""]) == []
+
+    from app.utils.cards import catalog_summary
+
+    assert catalog_summary("Energy") == ["Beta", "Delta"]
+    assert catalog_summary() == ["Alpha", "Beta", "Gamma", "Delta"]
+
+
+@pytest.fixture
+def json_reads(monkeypatch):
+    calls = []
+    read_raw = loader._read_raw
+
+    def _counting():
+        calls.append(1)
+        return read_raw()
+
+    monkeypatch.setattr(loader, "_read_raw", _counting)
+    return calls
+
+
+def test_compiled_snapshot_serves_cold_start(catalog_files, json_reads):
+    products, _ = catalog_files
+    loader.write_catalog_snapshot()
+    json_reads.clear()
+
+    snapshot = loader.current_snapshot()
+    assert json_reads == []
+    assert snapshot.epoch == 1
+    assert snapshot.mtimes == loader._watched_mtimes()
+    assert loader.load_catalog()["ordered"] == ["a", "b"]
+    assert loader.load_catalog()["search"].search("beta") == ["b"]
+    assert loader.reload_catalog() is False
+
+    _write(products, {"products": [_product("a", "Alpha"), _product("b", "Beta v2")]})
+    assert loader.reload_catalog() is True
+    assert loader.current_snapshot().reindexed == 1
+
+
+def test_cold_start_hashes_products_json_once(catalog_files, monkeypatch):
+    loader.write_catalog_snapshot()
+    monkeypatch.setattr(loader, "_SHA_CACHE", None)
+    hashes = []
+    compute = loader._compute_catalog_sha
+    monkeypatch.setattr(loader, "_compute_catalog_sha", lambda: hashes.append(1) or compute())
+
+    snapshot = loader.current_snapshot()
+    assert len(hashes) == 1
+    assert loader.catalog_sha() == snapshot.sha == compute()
+
+
+def test_stale_or_broken_compiled_snapshot_falls_back_to_json(
+    catalog_files, json_reads, monkeypatch
+):
+    products, _ = catalog_files
+    path = loader.write_catalog_snapshot()
+    _write(products, {"products": [_product("c", "Gamma")]})
+    json_reads.clear()
+
+    assert loader.load_catalog()["ordered"] == ["c"]
+    assert len(json_reads) == 1
+
+    path.write_bytes(b"not a pickle")
+    monkeypatch.setattr(loader, "_SNAPSHOT", None)
+    assert loader.load_catalog()["ordered"] == ["c"]
+    assert len(json_reads) == 2
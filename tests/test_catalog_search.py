@@ -0,0 +1,58 @@
+import asyncio
+
+from app.catalog.search import SearchIndex, product_terms, tokenize
+from app.services import catalog_service
+
+PRODUCTS = {
+    "beet": {"id": "beet", "title": "Свёкла Shot", "short": "Энергия и выносливость"},
+    "omega": {"id": "omega", "title": "Омега-3", "short": "Жирные кислоты для сердца"},
+    "mag": {"id": "mag", "title": "Магний B6", "short": "Поддержка энергии и сна"},
+    "tea": {"id": "tea", "title": "Таёжный чай", "short": "Чай с лимоном и омегой"},
+}
+
+
+def _index() -> SearchIndex:
+    ordered = list(PRODUCTS)
+    return SearchIndex(ordered, (product_terms(PRODUCTS[pid]) for pid in ordered))
+
+
+def test_tokenize_folds_case_yo_and_endings():
+    assert tokenize("Свёкла СВЕКЛЫ") == ["свекл", "свекл"]
+    assert tokenize("витаминов для энергии") == ["витамин", "энерг"]
+
+
+def test_search_ranks_title_hits_and_all_terms_first():
+    index = _index()
+
+    assert index.search("омега") == ["omega", "tea"]
+    assert index.search("энергия") == ["beet", "mag"]
+    assert index.search("энергия сон") == ["beet", "mag"]
+    assert index.search("энергия магний") == ["mag", "beet"]
+    assert index.search("") == []
+
+
+def test_search_prefix_and_typo_tolerance():
+    index = _index()
+
+    assert index.search("маг") == ["mag"]
+    assert index.search("выносливасть") == ["beet"]
+    assert index.search("zzzz") == []
+
+
+def test_catalog_search_uses_loaded_index(monkeypatch):
+    catalog = {"products": PRODUCTS, "ordered": list(PRODUCTS), "search": _index()}
+    monkeypatch.setattr(catalog_service, "load_catalog", lambda: catalog)
+
+    results = asyncio.run(catalog_service.catalog_search("чай"))
+    assert [item["id"] for item in results] == ["tea"]
+    assert results[0]["title"] == "Таёжный чай"
+
+    # Catalogs without a prebuilt index are indexed on the fly.
+    del catalog["search"]
+    results = asyncio.run(catalog_service.catalog_search("B6", limit=1))
+    assert [item["id"] for item in results] == ["mag"]
+
+
+def test_catalog_search_real_catalog_handles_inflections():
+    results = asyncio.run(catalog_service.catalog_search("свёклы"))
+    assert results and results[0]["id"] == "t8-beet-shot"
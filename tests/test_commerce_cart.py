@@ -2,32 +2,141 @@ from decimal import Decimal
 
 import pytest
 
-from app.services.cart import add_product_to_cart, clear_cart, get_cart
+from app import storage_redis
+from app.services.cart import CartItem, CartStorage, add_product_to_cart, clear_cart, get_cart
 
 
+@pytest.mark.asyncio
 @pytest.mark.parametrize("product_id", ["t8-beet-shot", "t8-blend-90"])
-def test_add_product_to_cart_roundtrip(product_id):
+async def test_add_product_to_cart_roundtrip(product_id):
     user_id = 4242
-    clear_cart(user_id)
-    item = add_product_to_cart(user_id, product_id)
+    await clear_cart(user_id)
+    item = await add_product_to_cart(user_id, product_id)
     assert item is not None
-    cart = get_cart(user_id)
+    cart = await get_cart(user_id)
     assert product_id in cart.items
     stored = cart.items[product_id]
     assert stored.title
     assert stored.quantity == 1
     assert isinstance(stored.price, Decimal)
-    clear_cart(user_id)
+    await clear_cart(user_id)
 
 
-def test_cart_summary_includes_coupon(monkeypatch):
+@pytest.mark.asyncio
+async def test_local_cart_coupon_updates_the_stored_cart():
+    store = CartStorage(use_redis=False)
+    await store.add(6, _item("omega"))
+    await store.set_coupon(6, "WELCOME", {"discount": "10"})
+    cart = await store.get(6)
+    assert cart.coupon_code == "WELCOME"
+    assert "omega" in cart.items
+
+
+@pytest.mark.asyncio
+async def test_cart_summary_includes_coupon(monkeypatch):
     user_id = 5252
-    clear_cart(user_id)
-    add_product_to_cart(user_id, "t8-beet-shot")
-    cart = get_cart(user_id)
+    await clear_cart(user_id)
+    await add_product_to_cart(user_id, "t8-beet-shot")
+    cart = await get_cart(user_id)
     cart.coupon_code = "TEST"
     cart.coupon_meta = {"discount": "10"}
     lines = cart.summary_lines()
     assert any("Купон TEST" in line for line in lines)
     assert any("Итого" in line for line in lines)
-    clear_cart(user_id)
+    await clear_cart(user_id)
+
+
+@pytest.fixture
+def redis_cart(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(storage_redis, "_redis", client)
+    monkeypatch.setattr(storage_redis, "_cart_add_script", None)
+    return client, CartStorage(use_redis=True)
+
+
+def _item(product_id: str, price: str = "990.00") -> CartItem:
+    return CartItem(product_id=product_id, title=product_id.upper(), price=Decimal(price))
+
+
+@pytest.mark.asyncio
+async def test_redis_cart_increments_items_in_place(redis_cart):
+    client, store = redis_cart
+
+    assert await store.add(7, _item("omega")) == 1
+    assert await store.add(7, _item("mag")) == 1
+    assert await store.add(7, _item("omega", price="1.00")) == 2
+
+    assert await client.hget("cart:h:7", "q:omega") == b"2"
+    assert 0 < await client.ttl("cart:h:7") <= 3600
+    cart = await CartStorage(use_redis=True).get(7)
+    assert list(cart.items) == ["omega", "mag"]
+    assert cart.items["omega"].quantity == 2
+    # Item details are kept from the first add, like Cart.add.
+    assert cart.items["omega"].price == Decimal("990.00")
+    assert cart.total == Decimal("2970.00")
+
+
+@pytest.mark.asyncio
+async def test_redis_cart_writes_drop_the_cached_payload(redis_cart):
+    client, store = redis_cart
+    await store.add(8, _item("omega"))
+    assert (await store.get(8)).items["omega"].quantity == 1
+
+    await client.hset("cart:h:8", "q:omega", 5)
+    # Plain reads may be served from the cache for a while.
+    assert (await store.get(8)).items["omega"].quantity == 1
+    assert (await store.get(8, fresh=True)).items["omega"].quantity == 5
+
+    await store.add(8, _item("zinc"))
+    cart = await store.get(8)
+    assert cart.items["omega"].quantity == 5
+    assert "zinc" in cart.items
+
+
+@pytest.mark.asyncio
+async def test_redis_coupon_keeps_items_added_on_another_replica(redis_cart):
+    client, store = redis_cart
+    other = CartStorage(use_redis=True)
+    await store.add(11, _item("omega"))
+    stale = await store.get(11)
+
+    await other.add(11, _item("zinc"))
+    stale.coupon_code = "WELCOME"
+    stale.coupon_meta = {"discount": "99"}
+    await store.set_coupon(11, stale.coupon_code, stale.coupon_meta)
+
+    cart = await other.get(11, fresh=True)
+    assert list(cart.items) == ["omega", "zinc"]
+    assert cart.coupon_code == "WELCOME"
+    assert cart.coupon_meta == {"discount": "99"}
+
+    await store.set_coupon(11, None, {})
+    assert not await client.hexists("cart:h:11", "coupon")
+    assert (await store.get(11)).coupon_code is None
+
+
+@pytest.mark.asyncio
+async def test_redis_cart_replace_clear_and_legacy_upgrade(redis_cart):
+    client, store = redis_cart
+    cart = await store.get(9)
+    cart.add(_item("omega"))
+    cart.coupon_code = "WELCOME"
+    cart.coupon_meta = {"discount": "99"}
+    await store.set(9, cart)
+
+    loaded = await CartStorage(use_redis=True).get(9)
+    assert loaded.coupon_code == "WELCOME"
+    assert loaded.items["omega"].title == "OMEGA"
+
+    await store.clear(9)
+    assert not await client.exists("cart:h:9")
+    assert not (await store.get(9)).items
+
+    legacy = {"items": [_item("zinc").to_payload()], "coupon_code": None, "coupon_meta": {}}
+    await client.set("cart:10", storage_redis.storage_codec.encode(legacy), ex=600)
+    upgraded = await CartStorage(use_redis=True).get(10)
+    assert upgraded.items["zinc"].quantity == 1
+    assert not await client.exists("cart:10")
+    assert await client.hget("cart:h:10", "q:zinc") == b"1"
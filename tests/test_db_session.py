@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.db import session as db_session
+
+pytest.importorskip("aiosqlite")
+
+
+def test_sqlite_file_engines_apply_pragmas_and_split_reads(tmp_path):
+    async def _test():
+        url = f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}"
+        writer = db_session.build_engine(url, tuned=True)
+        reader = db_session.build_engine(url, read_only=True, tuned=True)
+        async with writer.begin() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1
+            assert (await conn.execute(text("PRAGMA busy_timeout"))).scalar() == 5000
+            await conn.execute(text("CREATE TABLE notes (id INTEGER PRIMARY KEY)"))
+            await conn.execute(text("INSERT INTO notes DEFAULT VALUES"))
+
+        async with reader.connect() as conn:
+            assert (await conn.execute(text("PRAGMA query_only"))).scalar() == 1
+            assert (await conn.execute(text("SELECT count(*) FROM notes"))).scalar() == 1
+            with pytest.raises(OperationalError):
+                await conn.execute(text("INSERT INTO notes DEFAULT VALUES"))
+        await writer.dispose()
+        await reader.dispose()
+
+    asyncio.run(_test())
+
+
+def test_in_memory_engine_is_left_untuned():
+    async def _test():
+        engine = db_session.build_engine("sqlite+aiosqlite:///:memory:", tuned=True)
+        async with engine.connect() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "memory"
+            assert (await conn.execute(text("PRAGMA query_only"))).scalar() == 0
+        await engine.dispose()
+
+    asyncio.run(_test())
+
+
+def test_invalid_synchronous_mode_falls_back(monkeypatch):
+    monkeypatch.setattr(db_session.settings, "SQLITE_SYNCHRONOUS", "fast; DROP TABLE users")
+    pragmas = db_session.sqlite_pragmas(read_only=True)
+    assert "PRAGMA synchronous=NORMAL" in pragmas
+    assert pragmas[-1] == "PRAGMA query_only=ON"
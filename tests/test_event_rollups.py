@@ -0,0 +1,320 @@
+import asyncio
+import datetime as dt
+import gzip
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import storage
+from app.db.models import Base, Event, EventDailyCount
+from app.repo import events, rollups
+from app.services.event_archive import archive_events
+
+pytest.importorskip("aiosqlite")
+
+NOW = dt.datetime(2024, 6, 10, 12, 30, tzinfo=dt.timezone.utc)
+
+
+def _events() -> list[dict]:
+    rows = []
+    for hours in range(0, 24 * 12, 5):
+        ts = NOW - dt.timedelta(hours=hours)
+        quiz = ("energy", "sleep", None)[hours % 3]
+        rows.append({"user_id": hours, "name": "quiz_finish", "meta": {"quiz": quiz}, "ts": ts})
+        rows.append(
+            {
+                "user_id": hours,
+                "name": "plan_generated",
+                "meta": {"products": ["T8_BLEND", "OMEGA3"][: hours % 3]},
+                "ts": ts,
+            }
+        )
+    return sorted(rows, key=lambda row: row["ts"])
+
+
+class _Database:
+    def __init__(self) -> None:
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def seed(self, rows: list[dict]) -> None:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(Event), rows)
+
+    @asynccontextmanager
+    async def scope(self):
+        async with self.sessions() as session:
+            yield session
+
+    async def roll_up(self, **kwargs) -> int:
+        async with self.sessions() as session:
+            consumed = await rollups.roll_up(session, now=NOW, **kwargs)
+            await session.commit()
+        return consumed
+
+
+def _expected(rows, name, since=None, key=None):
+    selected = [
+        row for row in rows if row["name"] == name and (since is None or row["ts"] >= since)
+    ]
+    if key is None:
+        return len(selected)
+    counts = {}
+    for row in selected:
+        values = row["meta"].get(key)
+        values = values if isinstance(values, list) else [values or "unknown"]
+        for value in values:
+            counts[value] = counts.get(value, 0) + 1
+    return counts
+
+
+def test_rollups_match_raw_counts_across_rollup_tail_and_boundary():
+    async def _test():
+        rows = _events()
+        db = _Database()
+        await db.seed(rows)
+        # Roll up in small batches, leaving the last hour in the raw tail.
+        while await db.roll_up(batch=7, lag=3600):
+            pass
+
+        async with db.sessions() as session:
+            assert await rollups.watermark(session) > 0
+            since = NOW - dt.timedelta(days=3, hours=7)
+            totals = await rollups.totals(session, ["quiz_finish", "plan_generated", "missing"])
+            assert totals == {
+                "quiz_finish": _expected(rows, "quiz_finish"),
+                "plan_generated": _expected(rows, "plan_generated"),
+                "missing": 0,
+            }
+            windowed = await rollups.totals(session, ["quiz_finish"], since=since)
+            assert windowed["quiz_finish"] == _expected(rows, "quiz_finish", since)
+            assert windowed["quiz_finish"] == await events.stats(
+                session, name="quiz_finish", since=since
+            )
+            quizzes = await rollups.breakdown(session, "quiz_finish", "quiz", since=since)
+            assert dict(quizzes) == _expected(rows, "quiz_finish", since, "quiz")
+            products = await rollups.breakdown(session, "plan_generated", "products")
+            assert dict(products) == _expected(rows, "plan_generated", None, "products")
+        await db.engine.dispose()
+
+    asyncio.run(_test())
+
+
+def test_roll_up_is_incremental_and_guards_the_watermark():
+    async def _test():
+        db = _Database()
+        await db.seed(_events())
+        assert await db.roll_up(batch=10_000, lag=0) == len(_events())
+        assert await db.roll_up(batch=10_000, lag=0) == 0
+
+        async with db.sessions() as session:
+            session.add(Event(user_id=1, name="quiz_finish", meta={"quiz": "energy"}, ts=NOW))
+            await session.commit()
+        assert await db.roll_up(lag=0) == 1
+
+        async with db.sessions() as session:
+            stmt = select(func.sum(EventDailyCount.count)).where(
+                EventDailyCount.name == "quiz_finish", EventDailyCount.dimension == ""
+            )
+            assert (await session.execute(stmt)).scalar_one() == _expected(
+                _events(), "quiz_finish"
+            ) + 1
+            with pytest.raises(RuntimeError):
+                await rollups._advance_watermark(session, 1, 2)
+        await db.engine.dispose()
+
+    asyncio.run(_test())
+
+
+def _superseded(rows: list[dict], cutoff: dt.datetime) -> int:
+    newest: dict[tuple, dt.datetime] = {}
+    for row in rows:
+        key = (row["user_id"], row["name"])
+        newest[key] = max(newest.get(key, row["ts"]), row["ts"])
+    return sum(
+        1 for row in rows if row["ts"] < cutoff and row["ts"] < newest[row["user_id"], row["name"]]
+    )
+
+
+def test_archive_moves_only_rolled_up_events(tmp_path):
+    async def _test():
+        rows = _events()
+        # Half the users act again today, which supersedes their older rows.
+        rows += [dict(row, ts=NOW) for row in rows if row["user_id"] % 10]
+        db = _Database()
+        await db.seed(rows)
+        async with db.sessions() as session:
+            before = await rollups.totals(session, ["quiz_finish", "plan_generated"])
+
+        # Nothing has been rolled up yet, so nothing may be archived.
+        assert (
+            await archive_events(
+                older_than_days=5, directory=tmp_path, now=NOW, session_factory=db.scope
+            )
+            == 0
+        )
+
+        await db.roll_up(batch=10_000, lag=0)
+        moved = await archive_events(
+            older_than_days=5, directory=tmp_path, chunk=25, now=NOW, session_factory=db.scope
+        )
+        cutoff = NOW - dt.timedelta(days=5)
+        assert moved == _superseded(rows, cutoff) > 0
+
+        archived = []
+        for path in sorted(tmp_path.glob("events-*.jsonl.gz")):
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                archived.extend(json.loads(line) for line in fh)
+        assert len(archived) == moved
+        assert all(dt.datetime.fromisoformat(item["ts"]) < cutoff for item in archived)
+        assert not list(tmp_path.glob("*.tmp"))
+
+        async with db.sessions() as session:
+            remaining = (await session.execute(select(func.count(Event.id)))).scalar_one()
+            assert remaining == len(rows) - moved
+            assert await rollups.totals(session, ["quiz_finish", "plan_generated"]) == before
+
+        assert (
+            await archive_events(
+                older_than_days=5, directory=tmp_path, now=NOW, session_factory=db.scope
+            )
+            == 0
+        )
+        await db.engine.dispose()
+
+    asyncio.run(_test())
+
+
+def test_archive_keeps_the_newest_event_per_user_and_name(tmp_path):
+    async def _test():
+        old = NOW - dt.timedelta(days=30)
+        rows = [
+            {"user_id": 1, "name": "plan_generated", "meta": {"plan": "v1"}, "ts": old},
+            {"user_id": 2, "name": "plan_generated", "meta": {"plan": "only"}, "ts": old},
+            {
+                "user_id": 1,
+                "name": "plan_generated",
+                "meta": {"plan": "v2"},
+                "ts": old + dt.timedelta(days=1),
+            },
+            {"user_id": None, "name": "plan_generated", "meta": {}, "ts": old},
+        ]
+        db = _Database()
+        await db.seed(rows)
+        await db.roll_up(batch=10_000, lag=0)
+        moved = await archive_events(
+            older_than_days=5, directory=tmp_path, now=NOW, session_factory=db.scope
+        )
+        assert moved == 2
+
+        async with db.sessions() as session:
+            assert await storage.get_last_plan(session, 1) == {"plan": "v2"}
+            assert await storage.get_last_plan(session, 2) == {"plan": "only"}
+        await db.engine.dispose()
+
+    asyncio.run(_test())
+
+
+def test_archive_deletes_only_the_rows_it_wrote(tmp_path, monkeypatch):
+    async def _test():
+        old = NOW - dt.timedelta(days=30)
+        rows = [
+            {"user_id": 1, "name": "start", "meta": {}, "ts": old},
+            {"user_id": 2, "name": "start", "meta": {}, "ts": old},
+            {"user_id": 1, "name": "start", "meta": {}, "ts": old + dt.timedelta(hours=1)},
+            {"user_id": 1, "name": "start", "meta": {}, "ts": old + dt.timedelta(hours=2)},
+        ]
+        db = _Database()
+        await db.seed(rows)
+        await db.roll_up(batch=10_000, lag=0)
+        archivable = events.archivable
+
+        async def _racing(session, **kwargs):
+            batch = await archivable(session, **kwargs)
+            # User 2 acts again after rows 1 and 3 were selected, superseding row 2.
+            async with db.sessions() as other:
+                await events.log(other, 2, "start", {})
+                await other.commit()
+            return batch
+
+        monkeypatch.setattr(events, "archivable", _racing)
+        moved = await archive_events(
+            older_than_days=5, directory=tmp_path, chunk=10, now=NOW, session_factory=db.scope
+        )
+        assert moved == 2
+
+        async with db.sessions() as session:
+            remaining = (await session.execute(select(Event.id).order_by(Event.id))).scalars()
+            assert list(remaining) == [2, 4, 5]
+        await db.engine.dispose()
+
+    asyncio.run(_test())
+
+
+def test_admin_stats_survive_archiving(tmp_path, monkeypatch):
+    from app.handlers import admin
+
+    async def _test():
+        rows = _events()
+        rows += [dict(row, ts=NOW) for row in rows]
+        db = _Database()
+        await db.seed(rows)
+        monkeypatch.setattr(admin, "read_session_scope", db.scope)
+        before = await admin._collect_stats()
+
+        await db.roll_up(batch=10_000, lag=0)
+        assert await archive_events(
+            older_than_days=5, directory=tmp_path, now=NOW, session_factory=db.scope
+        )
+        after = await admin._collect_stats()
+        assert after["quiz_finishes"] == before["quiz_finishes"] == len(rows) // 2
+        assert after["starts"] == before["starts"] == 0
+        await db.engine.dispose()
+
+    asyncio.run(_test())
+
+
+def test_sql_grouping_handles_odd_meta_the_same_in_rollups_and_tail():
+    async def _test():
+        metas = [
+            ("quiz_finish", {"quiz": ""}),
+            ("quiz_finish", {"quiz": 5}),
+            ("quiz_finish", {}),
+            ("quiz_finish", {"quiz": "x" * 300}),
+            ("plan_generated", {"products": "T8_BLEND"}),
+            ("plan_generated", {"products": ["OMEGA3", "", None, "OMEGA3"]}),
+            ("plan_generated", {}),
+            ("premium_cta_click", {"source": "menu"}),
+        ]
+        rows = [
+            {"user_id": 1, "name": name, "meta": meta, "ts": NOW - dt.timedelta(days=2)}
+            for name, meta in metas
+        ]
+        db = _Database()
+        await db.seed(rows)
+
+        async def _snapshot():
+            async with db.sessions() as session:
+                return (
+                    dict(await rollups.breakdown(session, "quiz_finish", "quiz")),
+                    dict(await rollups.breakdown(session, "plan_generated", "products")),
+                    dict(await rollups.breakdown(session, "premium_cta_click", "source")),
+                    await rollups.totals(session, ["quiz_finish", "plan_generated"]),
+                )
+
+        tail = await _snapshot()
+        await db.roll_up(lag=0)
+        assert await _snapshot() == tail
+        assert tail == (
+            {"unknown": 2, "5": 1, "x" * 128: 1},
+            {"OMEGA3": 2},
+            {"menu": 1},
+            {"quiz_finish": 4, "plan_generated": 3},
+        )
+        await db.engine.dispose()
+
+    asyncio.run(_test())
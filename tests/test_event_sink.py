@@ -0,0 +1,174 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.models import Base, Event
+from app.event_sink import EventSink
+
+pytest.importorskip("aiosqlite")
+
+
+class _Database:
+    def __init__(self) -> None:
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
+        self.opened = 0
+
+    async def create(self) -> None:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    @asynccontextmanager
+    async def scope(self):
+        self.opened += 1
+        async with self.sessions() as session:
+            yield session
+
+    async def names(self) -> list[str]:
+        async with self.sessions() as session:
+            rows = await session.execute(select(Event.name).order_by(Event.id))
+            return list(rows.scalars())
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_emit_buffers_until_flush_and_writes_in_batches():
+    async def _test():
+        db = _Database()
+        await db.create()
+        sink = EventSink(maxsize=10000, batch_size=2, session_factory=db.scope)
+        for index in range(5):
+            assert sink.emit(index, f"event_{index}", {"n": index}) is True
+        assert db.opened == 0
+        assert sink.stats()["queued"] == 5
+
+        assert await sink.flush() == 5
+        assert db.opened == 3
+        assert await db.names() == [f"event_{index}" for index in range(5)]
+        assert sink.stats() == {
+            "queued": 0,
+            "maxsize": 10000,
+            "enqueued": 5,
+            "written": 5,
+            "dropped": 0,
+            "failed_batches": 0,
+            "poisoned": 0,
+        }
+        await db.engine.dispose()
+
+    run(_test())
+
+
+def test_overflow_policies():
+    newest = EventSink(maxsize=2, overflow="drop_new")
+    assert [newest.emit(1, name) for name in ("a", "b", "c")] == [True, True, False]
+    assert [row["name"] for row in newest._buffer] == ["a", "b"]
+    assert newest.dropped == 1
+
+    oldest = EventSink(maxsize=2, overflow="drop_oldest")
+    assert [oldest.emit(1, name) for name in ("a", "b", "c")] == [True, True, True]
+    assert [row["name"] for row in oldest._buffer] == ["b", "c"]
+    assert oldest.dropped == 1
+
+    with pytest.raises(ValueError):
+        EventSink(overflow="block")
+
+
+def test_flusher_writes_full_batches_and_stop_drains():
+    async def _test():
+        db = _Database()
+        await db.create()
+        sink = EventSink(batch_size=3, interval=60, session_factory=db.scope)
+        sink.start()
+        for index in range(4):
+            sink.emit(index, "tick")
+        # One wake-up drains the buffer as a batch of 3 followed by a batch of 1.
+        for _ in range(200):
+            if sink.written >= 4:
+                break
+            await asyncio.sleep(0.01)
+        assert sink.written == 4
+
+        sink.emit(9, "last")
+        await sink.stop()
+        assert not sink.started
+        assert await db.names() == ["tick"] * 4 + ["last"]
+        await db.engine.dispose()
+
+    run(_test())
+
+
+def test_failed_batch_is_requeued():
+    @asynccontextmanager
+    async def broken():
+        raise RuntimeError("database down")
+        yield  # pragma: no cover
+
+    async def _test():
+        sink = EventSink(session_factory=broken)
+        sink.emit(1, "kept")
+        assert await sink.flush() == 0
+        assert sink.failed_batches == 1
+        assert [row["name"] for row in sink._buffer] == ["kept"]
+
+    run(_test())
+
+
+def test_poison_row_is_isolated_and_dropped_after_retries():
+    async def _test():
+        db = _Database()
+        await db.create()
+        sink = EventSink(batch_size=4, max_attempts=2, session_factory=db.scope)
+        for name in ("a", "b", "c"):
+            sink.emit(1, name)
+        sink.emit(1, "bad", {"unserializable": object()})
+        for name in ("d", "e"):
+            sink.emit(1, name)
+
+        assert await sink.flush() == 0
+        assert sink.stats()["queued"] == 6
+        assert await sink.flush() == 5
+        assert (sink.poisoned, sink.failed_batches, sink.stats()["queued"]) == (1, 2, 0)
+        assert await db.names() == ["a", "b", "c", "d", "e"]
+        await db.engine.dispose()
+
+    run(_test())
+
+
+def test_unavailable_database_never_drops_rows():
+    @asynccontextmanager
+    async def down():
+        raise OperationalError("connect", {}, Exception("database is locked"))
+        yield  # pragma: no cover
+
+    async def _test():
+        sink = EventSink(batch_size=4, max_attempts=1, session_factory=down)
+        for name in ("a", "b", "c"):
+            sink.emit(1, name)
+        for _ in range(3):
+            assert await sink.flush() == 0
+        assert sink.poisoned == 0
+        assert [row["name"] for row in sink._buffer] == ["a", "b", "c"]
+
+    run(_test())
+
+
+def test_put_waits_for_room():
+    async def _test():
+        db = _Database()
+        await db.create()
+        sink = EventSink(maxsize=1, interval=60, session_factory=db.scope)
+        await sink.put(1, "first")
+        await asyncio.wait_for(sink.put(1, "second"), timeout=2)
+        await sink.stop()
+        assert await db.names() == ["first", "second"]
+        assert sink.dropped == 0
+        await db.engine.dispose()
+
+    run(_test())
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app import storage
+from app.utils.expiring import ExpiringDict
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_and_are_swept() -> None:
+    clock = _Clock()
+    cache: ExpiringDict[str, int] = ExpiringDict(ttl=10, maxsize=100, clock=clock)
+    cache["a"] = 1
+    cache.set("b", 2, ttl=30)
+
+    clock.now += 11
+    assert "a" not in cache
+    assert cache.get("b") == 2
+
+    # A write sweeps the elapsed buckets without touching live entries.
+    cache["c"] = 3
+    assert len(cache) == 2
+    assert cache.expired == 1
+
+    clock.now += 25
+    assert cache.purge() == 2
+    assert len(cache) == 0
+
+
+def test_size_cap_evicts_least_recently_used() -> None:
+    clock = _Clock()
+    cache: ExpiringDict[int, str] = ExpiringDict(ttl=60, maxsize=3, clock=clock)
+    for key in range(3):
+        cache[key] = str(key)
+    assert cache[0] == "0"  # refresh recency of key 0
+
+    cache[3] = "3"
+
+    assert list(cache) == [2, 0, 3]
+    assert cache.evicted == 1
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["approx_bytes"] > 0
+
+
+def test_rewrite_extends_lifetime() -> None:
+    clock = _Clock()
+    cache: ExpiringDict[str, int] = ExpiringDict(ttl=10, clock=clock)
+    cache["k"] = 1
+    clock.now += 8
+    cache["k"] = 2
+    clock.now += 8
+    cache.purge()
+    assert cache["k"] == 2
+
+
+@pytest.mark.asyncio
+async def test_throttle_entries_expire_with_cooldown(monkeypatch: pytest.MonkeyPatch) -> None:
+    throttles: ExpiringDict = ExpiringDict(maxsize=10, resolution=0.01)
+    monkeypatch.setattr(storage, "THROTTLES", throttles)
+
+    assert await storage.touch_throttle(1, "start", 0.05) == 0.0
+    assert await storage.touch_throttle(1, "start", 0.05) > 0
+
+    await asyncio.sleep(0.08)
+    throttles.purge()
+    assert len(throttles) == 0
+    assert await storage.touch_throttle(1, "start", 0.05) == 0.0
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import datetime as dt
+
 import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from app.db.models import Base, User
 from app.growth import attribution
+from app.repo import events, profiles, subscriptions
 
 
 @pytest.mark.parametrize(
@@ -62,3 +68,61 @@ def test_build_start_payload_encodes_query() -> None:
 )
 def test_format_utm_label(key: attribution.UtmKey, label: str) -> None:
     assert attribution.format_utm_label(key) == label
+
+
+def test_utm_key_round_trip() -> None:
+    key = attribution.encode_utm_key({"utm_source": " ads ", "utm_campaign": "spring"})
+    assert attribution.decode_utm_key(key) == ("ads", "—", "spring", "—")
+    assert attribution.encode_utm_key({"utm_term": "x"}) is None
+
+
+def test_funnel_joins_and_incremental_refresh(monkeypatch) -> None:
+    pytest.importorskip("aiosqlite")
+    monkeypatch.setattr(attribution, "FUNNEL_OVERLAP_SECONDS", 0)
+    ads = ("ads", "cpc", "—", "—")
+    blog = ("blog", "—", "—", "—")
+
+    async def _test() -> None:
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async with sessions() as session:
+            session.add_all(User(id=user_id) for user_id in range(1, 6))
+            for user_id in (1, 2, 3):
+                await profiles.save_utm(
+                    session, user_id, {"utm_source": "ads", "utm_medium": "cpc"}
+                )
+            await profiles.save_utm(session, 4, {"utm_source": "blog"})
+            await profiles.get_or_create(session, 5)
+            await events.log(session, 1, "quiz_start")
+            await events.log(session, 1, "plan_generated")
+            await events.log(session, 2, "quiz_start")
+            await events.log(session, 5, "quiz_start")
+            await subscriptions.set_plan(session, 1, "pro", days=30)
+            await session.commit()
+
+            exact = await attribution.collect_funnel_metrics(session)
+            assert set(exact) == {ads, blog}
+            assert (exact[ads].registrations, exact[ads].quiz_starts) == (3, 2)
+            assert (exact[ads].recommendations, exact[ads].premium_buys) == (1, 1)
+            assert exact[blog].registrations == 1 and exact[blog].quiz_starts == 0
+
+            first = dt.datetime.now(dt.timezone.utc)
+            assert await attribution.refresh_funnel(session, now=first, batch=2) == 4
+            await session.commit()
+            assert await attribution.load_funnel_metrics(session) == exact
+
+            await events.log(session, 4, "quiz_start")
+            await session.commit()
+            # Only the user with a new funnel event is re-derived.
+            assert await attribution.refresh_funnel(session) == 1
+            await session.commit()
+            assert (await attribution.load_funnel_metrics(session))[blog].quiz_starts == 1
+            assert await attribution.load_funnel_metrics(
+                session
+            ) == await attribution.collect_funnel_metrics(session)
+        await engine.dispose()
+
+    asyncio.run(_test())
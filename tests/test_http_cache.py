@@ -0,0 +1,92 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import dashboard, http_cache, link_manager
+from app.config import settings
+
+
+def test_build_body_precompresses_large_payloads_only():
+    small = http_cache.build_body("ok", http_cache.HTML)
+    assert small.encoded == {}
+
+    page = "<p>" + "снимок данных " * 200 + "</p>"
+    cached = http_cache.build_body(page, http_cache.HTML)
+    assert gzip.decompress(cached.encoded["gzip"]) == page.encode("utf-8")
+    assert cached.etag == http_cache.build_body(page, http_cache.HTML).etag
+    assert cached.etag != small.etag
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("gzip, deflate", "gzip"),
+        ("gzip;q=0, identity", None),
+        ("*;q=0.5", "gzip"),
+        ("br;q=0.2, gzip;q=0.8", "gzip"),
+    ],
+)
+def test_choose_encoding(header, expected):
+    assert http_cache.choose_encoding(header, {"gzip": b"x"}) == expected
+
+
+def test_etag_matching_is_weak():
+    etag = 'W/"abc"'
+    assert http_cache.etag_matches('"abc"', etag)
+    assert http_cache.etag_matches('W/"zzz", W/"abc"', etag)
+    assert http_cache.etag_matches("*", etag)
+    assert not http_cache.etag_matches('"abd"', etag)
+    assert not http_cache.etag_matches(None, etag)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    base = tmp_path / "links"
+    monkeypatch.setattr(link_manager, "SETS_DIR", base / "sets")
+    monkeypatch.setattr(link_manager, "ACTIVE_SET_FILE", base / "active_set.txt")
+    monkeypatch.setattr(link_manager, "AUDIT_LOG", base / "audit.jsonl")
+    monkeypatch.setattr(link_manager, "_CACHE_LOCK", asyncio.Lock())
+    monkeypatch.setattr(link_manager, "_ACTIVE_LOCK", asyncio.Lock())
+    monkeypatch.setattr(link_manager, "_ACTIVE_SET", None)
+    monkeypatch.setattr(link_manager, "_schedule_ping", lambda url: None)
+    monkeypatch.setattr(settings, "DASHBOARD_TOKEN", "secret")
+    monkeypatch.setattr(dashboard, "_responses", http_cache.ResponseCache())
+    with TestClient(dashboard.app) as test_client:
+        test_client.headers["Authorization"] = "Bearer secret"
+        yield test_client
+
+
+def test_links_export_revalidates_until_links_change(client):
+    first = client.get("/links/export")
+    assert first.status_code == 200
+    assert first.json()["ok"] is True
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    cached = client.get("/links/export", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert dashboard._responses.renders == 1
+
+    changed = client.post(
+        "/links/register",
+        json={"url": "https://example.com/reg"},
+        headers={"X-Admin": "tester"},
+    )
+    assert changed.status_code == 200
+    fresh = client.get("/links/export", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert json.loads(fresh.content)["data"]["register"] == "https://example.com/reg"
+
+
+def test_links_page_is_served_gzip_encoded(client):
+    response = client.get("/links", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "<html" in response.text.lower()
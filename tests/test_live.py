@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from app import live
+from app.live import LiveHub
+
+
+def test_since_replays_only_what_is_still_buffered():
+    hub = LiveHub(buffer_size=3)
+    start = hub.last_id
+    first = hub.publish("counters", {"quiz_total": 1})
+    for _ in range(2):
+        hub.publish("counters", {"calc_total": 1})
+
+    assert [delta.id for delta in hub.since(first.id)] == [
+        f"{hub.epoch}-2",
+        f"{hub.epoch}-3",
+    ]
+    assert len(hub.since(start)) == 3
+    assert hub.since(hub.last_id) == []
+    assert hub.since(None) == []
+
+    hub.publish("counters", {"calc_total": 1})
+    assert hub.since(start) is None  # delta 1 fell out of the buffer
+    assert hub.since(f"other-{hub.epoch}-1") is None
+    assert hub.since("0-1") is None
+    assert hub.since("garbage") is None
+
+
+def test_stream_replays_then_follows_with_heartbeats():
+    async def _test():
+        hub = LiveHub()
+        polls = []
+        start = hub.last_id
+        hub.publish("lead", {"name": "Анна"})
+
+        frames = hub.stream(start, heartbeat=0.01, on_heartbeat=lambda: polls.append(1))
+        assert await anext(frames) == "retry: 10\n\n"
+        replayed = await anext(frames)
+        assert replayed.startswith(f"id: {hub.epoch}-1\nevent: lead\n")
+        assert '"name":"Анна"' in replayed
+        assert hub.streams == 1
+
+        assert await anext(frames) == ": ping\n\n"
+        assert polls
+
+        hub.publish("counters", {"plans_total": 2})
+        assert await anext(frames) == (
+            f'id: {hub.epoch}-2\nevent: counters\ndata: {{"plans_total":2}}\n\n'
+        )
+        await frames.aclose()
+        assert hub.streams == 0
+
+    asyncio.run(_test())
+
+
+def test_stalled_stream_and_unknown_id_get_reset():
+    async def _test():
+        hub = LiveHub(queue_size=1)
+        frames = hub.stream(hub.last_id, heartbeat=1)
+        await anext(frames)
+        hub.publish("counters", {"quiz_total": 1})
+        assert "event: counters" in await anext(frames)  # served by the replay
+        hub.publish("counters", {"quiz_total": 1})  # its queue is already full
+        assert hub.dropped_streams == 1
+        assert "event: reset" in await anext(frames)
+        assert [frame async for frame in frames] == []
+        assert hub.streams == 0
+
+        stale = hub.stream("deadbeef-1", heartbeat=1)
+        await anext(stale)
+        assert await anext(stale) == f"id: {hub.last_id}\nevent: reset\ndata: {{}}\n\n"
+
+    asyncio.run(_test())
+
+
+def test_record_events_coalesces_dashboard_counters(monkeypatch):
+    hub = LiveHub()
+    monkeypatch.setattr(live, "hub", hub)
+
+    live.record_events(["quiz_finish", "calc_finish", "quiz_finish", "tip_sent"])
+    live.record_events(["tip_sent"])
+
+    assert hub.published == 1
+    (delta,) = hub.since(f"{hub.epoch}-0")
+    assert delta.kind == "counters"
+    assert delta.data == {"quiz_total": 2, "calc_total": 1}
+
+
+def test_writes_are_published_only_once_committed(monkeypatch):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.db.models import Base
+    from app.repo import events as events_repo, leads as leads_repo
+
+    hub = LiveHub()
+    monkeypatch.setattr(live, "hub", hub)
+
+    async def _test() -> None:
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+        async with sessions() as session:
+            await leads_repo.add(session, 1, "anna", "Анна", "+7900", None)
+            await events_repo.log(session, 1, "quiz_finish", {})
+            await session.rollback()
+        assert hub.published == 0
+
+        async with sessions() as session:
+            await leads_repo.add(session, 1, "anna", "Анна", "+7900", None)
+            await events_repo.log(session, 1, "quiz_finish", {})
+            assert hub.published == 0
+            await session.commit()
+        assert [delta.kind for delta in hub.since(f"{hub.epoch}-0")] == ["lead", "counters"]
+        await engine.dispose()
+
+    asyncio.run(_test())
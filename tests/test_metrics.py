@@ -0,0 +1,124 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app import metrics
+from app.metrics import Registry
+
+
+def test_registry_renders_counters_gauges_and_histograms():
+    registry = Registry()
+    requests = registry.counter("demo_requests_total", "Requests served", ("route",))
+    depth = registry.gauge("demo_queue_depth", "Items waiting")
+    latency = registry.histogram("demo_latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests.inc(route="/a")
+    requests.inc(2, route='/"b"')
+    depth.set(5)
+    depth.dec()
+    for value in (0.0625, 0.5, 0.75, 3.0):
+        latency.observe(value)
+
+    assert registry.counter("demo_requests_total", "Requests served", ("route",)) is requests
+    with pytest.raises(ValueError):
+        registry.gauge("demo_requests_total", "Requests served", ("route",))
+    with pytest.raises(ValueError):
+        requests.inc(-1, route="/a")
+    with pytest.raises(ValueError):
+        requests.inc(route="/a", method="GET")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE demo_requests_total counter" in lines
+    assert 'demo_requests_total{route="/a"} 1' in lines
+    assert 'demo_requests_total{route="/\\"b\\""} 2' in lines
+    assert "demo_queue_depth 4" in lines
+    assert lines[-5:] == [
+        'demo_latency_seconds_bucket{le="0.1"} 1',
+        'demo_latency_seconds_bucket{le="1"} 3',
+        'demo_latency_seconds_bucket{le="+Inf"} 4',
+        "demo_latency_seconds_sum 4.3125",
+        "demo_latency_seconds_count 4",
+    ]
+
+
+def test_collectors_refresh_before_render():
+    registry = Registry()
+    gauge = registry.gauge("demo_items", "Items", ("kind",))
+    state = {"a": 1}
+
+    @registry.on_collect
+    def _collect() -> None:
+        for kind, count in state.items():
+            gauge.set(count, kind=kind)
+
+    assert 'demo_items{kind="a"} 1' in registry.render()
+    state["a"] = 7
+    assert 'demo_items{kind="a"} 7' in registry.render()
+
+
+def test_event_counters_are_seeded_then_incremented(monkeypatch):
+    for counter in metrics.EVENT_COUNTERS.values():
+        monkeypatch.setattr(counter, "_values", {(): 0.0})
+
+    metrics.seed_event_totals({"plan_generated": 40, "quiz_finish": 12, "start": 99})
+    metrics.record_events(["quiz_finish", "start", "plan_generated", "quiz_finish"])
+
+    assert metrics.RECOMMEND_TOTAL.value() == 41
+    assert metrics.QUIZ_TOTAL.value() == 14
+
+
+def test_logged_events_are_counted_only_once_committed(monkeypatch):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.db.models import Base
+    from app.repo import events as events_repo
+
+    monkeypatch.setattr(metrics.QUIZ_TOTAL, "_values", {(): 0.0})
+
+    async def _test() -> None:
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+        async with sessions() as session:
+            await events_repo.log(session, 1, "quiz_finish", {})
+            await session.rollback()
+        async with sessions() as session:
+            await events_repo.upsert(session, 2, "quiz_finish", {})
+        assert metrics.QUIZ_TOTAL.value() == 0
+
+        async with sessions() as session:
+            await events_repo.log(session, 1, "quiz_finish", {})
+            await events_repo.upsert(session, 2, "quiz_finish", {})
+            assert metrics.QUIZ_TOTAL.value() == 0
+            await session.commit()
+        assert metrics.QUIZ_TOTAL.value() == 2
+        await engine.dispose()
+
+    asyncio.run(_test())
+
+
+def test_metrics_endpoint_does_not_touch_the_database(monkeypatch):
+    from app import main
+
+    @asynccontextmanager
+    async def _forbidden():
+        raise AssertionError("/metrics must not open a database session")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(main, "session_scope", _forbidden)
+    monkeypatch.setattr(metrics.QUIZ_TOTAL, "_values", {(): 3.0})
+
+    async def _scrape() -> str:
+        response = await main._handle_metrics(None)
+        return response.text
+
+    body = asyncio.run(_scrape())
+    lines = body.splitlines()
+    assert "five_keys_bot_quiz_completed_total 3" in lines
+    assert any(line.startswith("five_keys_bot_uptime_seconds ") for line in lines)
+    assert any(line.startswith('five_keys_bot_event_sink_events{state="queued"}') for line in lines)
+    assert "# TYPE five_keys_bot_update_duration_seconds histogram" in lines
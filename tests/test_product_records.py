@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import pickle
+
+import pytest
+
+from app.catalog import ProductRecord, load_catalog, product_by_id, product_record
+from app.catalog.api import load_catalog_map
+from app.catalog.records import MAX_CARD_IMAGES
+from app.services.cart import load_product
+from app.utils.cards import prepare_cards
+
+
+def _first_id() -> str:
+    return load_catalog()["ordered"][0]
+
+
+def test_record_is_a_read_only_view_of_the_catalog_product():
+    pid = _first_id()
+    record = product_record(pid)
+    assert isinstance(record, ProductRecord)
+    assert record is product_record(pid.upper())
+    assert record is load_product(pid)
+    assert dict(record) == product_by_id(pid)
+    assert record["id"] == pid
+    with pytest.raises(TypeError):
+        record["title"] = "changed"  # type: ignore[index]
+    with pytest.raises(AttributeError):
+        record.name = "changed"  # type: ignore[misc]
+    assert product_record("missing-product") is None
+
+    products = load_catalog_map()
+    assert products[pid] is product_by_id(pid)
+    with pytest.raises(TypeError):
+        products["new"] = {}  # type: ignore[index]
+
+
+def test_prepare_cards_shares_cards_per_context():
+    pid = _first_id()
+    first = prepare_cards([pid], "energy")[0]
+    assert prepare_cards([pid], "energy")[0] is first
+    assert first["code"] == pid
+    assert first["name"] == product_by_id(pid)["title"]
+    with pytest.raises(TypeError):
+        first["order_url"] = "https://example.com"  # type: ignore[index]
+
+    plain = {"id": "x", "title": "X", "benefits": ["a", "", "b"], "images": ["1", "2", "3", "4"]}
+    card = prepare_cards([plain])[0]
+    assert card == ProductRecord.from_product(plain).card()
+    assert card["props"] == ("a", "b")
+    assert card["code"] == "x"
+    assert len(card["images"]) == MAX_CARD_IMAGES
+
+
+def test_record_survives_pickling():
+    record = product_record(_first_id())
+    record.card("sleep")
+    clone = pickle.loads(pickle.dumps(record))
+    assert clone.code == record.code
+    assert dict(clone) == dict(record)
+    assert dict(clone.card("sleep")) == dict(record.card("sleep"))
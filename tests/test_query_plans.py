@@ -0,0 +1,303 @@
+"""EXPLAIN QUERY PLAN regression checks for every repository query."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import inspect
+import re
+from typing import Any, Awaitable, Callable
+
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.models import (
+    Base,
+    BroadcastRecipient,
+    DailyTip,
+    Event,
+    Lead,
+    Referral,
+    RetentionJourney,
+    RetentionSetting,
+    Subscription,
+    TrackEvent,
+    User,
+)
+from app.repo import (
+    broadcasts,
+    events,
+    habits,
+    leads,
+    profiles,
+    promo,
+    referrals,
+    retention,
+    rollups,
+    subscriptions,
+    users,
+)
+
+pytest.importorskip("aiosqlite")
+
+MODULES = (
+    broadcasts,
+    events,
+    habits,
+    leads,
+    profiles,
+    promo,
+    referrals,
+    retention,
+    rollups,
+    subscriptions,
+    users,
+)
+
+USERS = 2_000
+EVENTS_PER_USER = 15
+NOW = dt.datetime(2024, 6, 1, tzinfo=dt.timezone.utc)
+NAMES = ("start", "quiz_finish", "plan_generated", "notify_on", "notify_off", "daily_tip_click")
+
+# Queries whose full scan or sort is inherent to what they compute.
+ALLOWED = {
+    "events.rebuild_user_state": "maintenance rebuild of every state row",
+    "referrals.top_referrers": "ranks referrers by an aggregate",
+    "retention.count_tip_enabled": "counts almost every settings row",
+    "retention.list_tip_candidates": "returns almost every settings row",
+    "retention.list_water_candidates": "returns almost every settings row",
+    "retention.list_tips": "loads the small daily_tips table into a TipPool",
+}
+
+# Rollups group a bounded id range (or one partial day) in SQL; the sort for
+# the group key is expected there, scans still are not.
+GROUPED = {"rollups.roll_up", "rollups.totals", "rollups.breakdown"}
+
+_EXPLAINED = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+_BAD_PLAN = re.compile(r"^SCAN \w+$|USE TEMP B-TREE")
+_GROUP_SORT = "USE TEMP B-TREE FOR GROUP BY"
+
+
+def _seed_rows() -> dict[type, list[dict[str, Any]]]:
+    rows: dict[type, list[dict[str, Any]]] = {
+        User: [],
+        Event: [],
+        TrackEvent: [],
+        Referral: [],
+        Subscription: [],
+        RetentionSetting: [],
+        RetentionJourney: [],
+        Lead: [],
+        DailyTip: [{"text": f"tip {index}"} for index in range(50)],
+        BroadcastRecipient: [],
+    }
+    for uid in range(1, USERS + 1):
+        created = NOW - dt.timedelta(minutes=uid)
+        rows[User].append({"id": uid, "username": f"user{uid}", "created": created})
+        for index in range(EVENTS_PER_USER):
+            ts = NOW - dt.timedelta(hours=index, minutes=uid)
+            name = NAMES[(uid + index) % len(NAMES)]
+            rows[Event].append({"user_id": uid, "name": name, "meta": {}, "ts": ts})
+            kind = ("water", "sleep", "steps")[index % 3]
+            rows[TrackEvent].append({"user_id": uid, "kind": kind, "value": 1.0, "ts": ts})
+        if uid > 1:
+            rows[Referral].append(
+                {"user_id": (uid % 50) + 1, "invited_id": uid, "joined_at": created}
+            )
+        if uid % 10 == 0:
+            until = NOW + dt.timedelta(days=uid % 60 - 30)
+            rows[Subscription].append(
+                {"user_id": uid, "plan": "pro", "since": created, "until": until}
+            )
+        rows[RetentionSetting].append({"user_id": uid, "timezone": "UTC"})
+        rows[BroadcastRecipient].append(
+            {
+                "run_key": f"nudges:{uid % 7}",
+                "user_id": uid,
+                "status": "sent" if uid % 4 else "pending",
+                "attempts": 1,
+                "updated_at": created,
+            }
+        )
+        rows[RetentionJourney].append(
+            {
+                "user_id": uid,
+                "journey": "sleep",
+                "scheduled_at": created,
+                "sent_at": created if uid % 3 else None,
+                "payload": {},
+            }
+        )
+        if uid % 5 == 0:
+            rows[Lead].append({"user_id": uid, "name": "Lead", "phone": "+7", "ts": created})
+    return rows
+
+
+Case = Callable[[AsyncSession], Awaitable[Any]]
+
+
+def _cases() -> dict[str, Case]:
+    since = NOW - dt.timedelta(days=1)
+    day_start = NOW - dt.timedelta(days=2)
+    partial = NOW - dt.timedelta(hours=30)
+
+    async def water_progress(session: AsyncSession) -> None:
+        setting = await retention.get_or_create_settings(session, 5)
+        await retention.record_water_progress(
+            session, setting, goal_ml=2000, reminders=3, sent_date=NOW.date(), sent_count=1
+        )
+
+    async def weight(session: AsyncSession) -> None:
+        setting = await retention.get_or_create_settings(session, 5)
+        await retention.update_weight(session, setting, 70.0)
+
+    async def journeys_sent(session: AsyncSession) -> None:
+        entries = await retention.pending_journeys(session, now=NOW, limit=5)
+        await retention.mark_journeys_sent(session, entries, sent_at=NOW)
+
+    return {
+        "broadcasts.enqueue": lambda s: broadcasts.enqueue(s, "nudges:1", [1, 8, 9]),
+        "broadcasts.pending": lambda s: broadcasts.pending(s, "nudges:1"),
+        "broadcasts.record": lambda s: broadcasts.record(
+            s, "nudges:1", [(8, "sent", 1, None), (15, "failed", 2, "boom")]
+        ),
+        "broadcasts.prune": lambda s: broadcasts.prune(s, NOW - dt.timedelta(minutes=100)),
+        "events.log": lambda s: events.log(s, 11, "start", {}),
+        "events.insert_many": lambda s: events.insert_many(
+            s,
+            [
+                {"user_id": 12, "name": "start", "meta": {}, "ts": NOW},
+                {"user_id": 13, "name": "start", "meta": {}, "ts": NOW},
+            ],
+        ),
+        "events.upsert": lambda s: events.upsert(s, 13, "notify_on", {}),
+        "events.last_by": lambda s: events.last_by(s, 14, "start"),
+        "events.recent_plans": lambda s: events.recent_plans(s, 15),
+        "events.recent_events": lambda s: events.recent_events(s),
+        "events.stats": lambda s: events.stats(s, "start", since=since, until=NOW),
+        "events.latest_by_users": lambda s: events.latest_by_users(s, "quiz_finish", [1, 2, 3]),
+        "events.latest_states": lambda s: events.latest_states(s, 4, ["notify_on", "notify_off"]),
+        "events.notify_recipients": events.notify_recipients,
+        "events.rebuild_user_state": events.rebuild_user_state,
+        "events.archivable": lambda s: events.archivable(s, before=since, max_id=5000, limit=10),
+        "events.delete_archived": lambda s: events.delete_archived(s, [1, 5, 10]),
+        "rollups.watermark": rollups.watermark,
+        "rollups.roll_up": lambda s: rollups.roll_up(s, batch=1000, now=NOW),
+        "rollups.totals": lambda s: rollups.totals(s, ["start", "quiz_finish"], since=partial),
+        "rollups.breakdown": lambda s: rollups.breakdown(s, "quiz_finish", "quiz", since=partial),
+        "habits.add_event": lambda s: habits.add_event(s, 21, "water", 250),
+        "habits.events_between": lambda s: habits.events_between(s, 22, day_start, NOW),
+        "habits.last_event": lambda s: habits.last_event(s, 23, "sleep"),
+        "habits.unique_event_dates": lambda s: habits.unique_event_dates(
+            s, 24, "steps", dt.timezone.utc
+        ),
+        "leads.add": lambda s: leads.add(s, 31, "lead", "Lead", "+7", None),
+        "leads.list_last": lambda s: leads.list_last(s),
+        "leads.count": leads.count,
+        "profiles.get": lambda s: profiles.get(s, 41),
+        "profiles.get_or_create": lambda s: profiles.get_or_create(s, 42),
+        "profiles.save_plan": lambda s: profiles.save_plan(s, 43, {"title": "plan"}),
+        "profiles.get_plan": lambda s: profiles.get_plan(s, 44),
+        "profiles.save_utm": lambda s: profiles.save_utm(s, 45, {"utm_source": "ads"}),
+        "promo.was_used": lambda s: promo.was_used(s, 51, "WELCOME"),
+        "promo.mark_used": lambda s: promo.mark_used(s, 52, "WELCOME"),
+        "referrals.upsert_referral": lambda s: referrals.upsert_referral(s, 1, 61),
+        "referrals.create": lambda s: referrals.create(s, 1, 62),
+        "referrals.convert": lambda s: referrals.convert(s, 63, bonus_days=3),
+        "referrals.get_by_invited": lambda s: referrals.get_by_invited(s, 64),
+        "referrals.top_referrers": lambda s: referrals.top_referrers(s, (since, NOW)),
+        "referrals.converted_count": referrals.converted_count,
+        "referrals.stats_for_referrer": lambda s: referrals.stats_for_referrer(s, 2),
+        "referrals.list_for": lambda s: referrals.list_for(s, 3, 10, 0, "30d"),
+        "referrals.count_for": lambda s: referrals.count_for(s, 4, "7d"),
+        "retention.get_or_create_settings": lambda s: retention.get_or_create_settings(s, 71),
+        "retention.set_tips_enabled": lambda s: retention.set_tips_enabled(s, 72, False),
+        "retention.set_tips_time": lambda s: retention.set_tips_time(s, 73, dt.time(9)),
+        "retention.set_timezone": lambda s: retention.set_timezone(s, 74, "Europe/Moscow"),
+        "retention.list_tip_candidates": retention.list_tip_candidates,
+        "retention.list_water_candidates": retention.list_water_candidates,
+        "retention.list_tips": retention.list_tips,
+        "retention.record_tips_sent": lambda s: retention.record_tips_sent(
+            s, [(5, 2, b"\x04"), (6, 3, None)], sent_at=NOW
+        ),
+        "retention.record_water_progress": water_progress,
+        "retention.update_weight": weight,
+        "retention.latest_weight_from_events": lambda s: retention.latest_weight_from_events(s, 7),
+        "retention.schedule_journey": lambda s: retention.schedule_journey(s, 75, "sleep", NOW),
+        "retention.pending_journeys": lambda s: retention.pending_journeys(s, now=NOW),
+        "retention.mark_journeys_sent": journeys_sent,
+        "retention.count_tip_enabled": retention.count_tip_enabled,
+        "retention.count_tip_click_users": lambda s: retention.count_tip_click_users(s, since),
+        "subscriptions.get": lambda s: subscriptions.get(s, 80),
+        "subscriptions.set_plan": lambda s: subscriptions.set_plan(s, 81, "pro", days=30),
+        "subscriptions.is_active": lambda s: subscriptions.is_active(s, 90),
+        "subscriptions.count_active": subscriptions.count_active,
+        "subscriptions.delete": lambda s: subscriptions.delete(s, 100),
+        "subscriptions.active_users": subscriptions.active_users,
+        "users.get_user": lambda s: users.get_user(s, 1),
+        "users.get_or_create_user": lambda s: users.get_or_create_user(s, 2, "renamed"),
+        "users.set_referrer": lambda s: users.set_referrer(s, 3, 1),
+        "users.count": lambda s: users.count(s, "user1"),
+        "users.find": lambda s: users.find(s, "user1", 10, 0),
+        "users.get_by_id": lambda s: users.get_by_id(s, 4),
+    }
+
+
+def _public_repo_functions() -> set[str]:
+    names = set()
+    for module in MODULES:
+        for name, func in inspect.getmembers(module, inspect.iscoroutinefunction):
+            if not name.startswith("_") and func.__module__ == module.__name__:
+                names.add(f"{module.__name__.rsplit('.', 1)[-1]}.{name}")
+    return names
+
+
+def test_every_repo_query_is_covered():
+    assert _public_repo_functions() <= set(_cases())
+
+
+def test_repo_queries_use_indexes(tmp_path):
+    async def _collect() -> dict[str, list[str]]:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'plans.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            for model, rows in _seed_rows().items():
+                await conn.execute(insert(model), rows)
+
+        statements: list[tuple[str, Any]] = []
+
+        def _capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(_EXPLAINED):
+                # A bulk statement runs one plan per parameter set; the first one shows it.
+                statements.append((statement, parameters[0] if executemany else parameters))
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _capture)
+        sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+        captured: dict[str, list[tuple[str, Any]]] = {}
+        for label, case in _cases().items():
+            statements.clear()
+            async with sessions() as session:
+                await case(session)
+                await session.rollback()
+            captured[label] = list(statements)
+        event.remove(engine.sync_engine, "before_cursor_execute", _capture)
+
+        problems: dict[str, list[str]] = {}
+        async with engine.connect() as conn:
+            for label, queries in captured.items():
+                for statement, parameters in queries:
+                    plan = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                    details = [row[-1] for row in plan]
+                    bad = [detail for detail in details if _BAD_PLAN.search(detail)]
+                    if label in GROUPED:
+                        bad = [detail for detail in bad if detail != _GROUP_SORT]
+                    if bad:
+                        problems.setdefault(label, []).extend(bad)
+        await engine.dispose()
+        return problems
+
+    problems = asyncio.run(_collect())
+    unexpected = {label: plan for label, plan in problems.items() if label not in ALLOWED}
+    assert unexpected == {}
+    assert set(ALLOWED) | GROUPED <= set(_cases())
@@ -7,6 +7,7 @@ import pytest
 pytest.importorskip("aiosqlite")
 
 from app.handlers import quiz_deficits, quiz_skin_joint, quiz_sleep, quiz_stress2
+from app.storage import SESSIONS
 
 
 @asynccontextmanager
@@ -44,7 +45,7 @@ async def test_quiz_deficits_flow(monkeypatch):
     quiz_deficits.set_last_plan.assert_awaited()
     quiz_deficits.events_repo.log.assert_awaited()
     send_mock.assert_awaited()
-    assert user_id not in quiz_deficits.SESSIONS
+    assert user_id not in SESSIONS
 
 
 @pytest.mark.asyncio
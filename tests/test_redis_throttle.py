@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app import storage, storage_redis
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+@pytest.fixture
+def fake_redis(monkeypatch: pytest.MonkeyPatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(storage_redis, "_redis", client)
+    monkeypatch.setattr(storage_redis, "_throttle_script", None)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_redis_throttle_claims_slot_once(fake_redis) -> None:
+    assert await storage_redis.touch_throttle(1, "start:command", 3.0) == 0.0
+
+    remaining = await storage_redis.touch_throttle(1, "start:command", 3.0)
+    assert 2.5 < remaining <= 3.0
+    assert 0 < await fake_redis.pttl("thr:start:command:1") <= 3000
+
+    # Other users and keys are independent.
+    assert await storage_redis.touch_throttle(2, "start:command", 3.0) == 0.0
+    assert await storage_redis.touch_throttle(1, "admin:panel", 3.0) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_redis_throttle_is_atomic_under_concurrency(fake_redis) -> None:
+    results = await asyncio.gather(
+        *(storage_redis.touch_throttle(5, "quiz:answer", 2.0) for _ in range(20))
+    )
+    assert results.count(0.0) == 1
+    assert all(value > 0 for value in results if value != 0.0)
+
+
+@pytest.mark.asyncio
+async def test_redis_throttle_reloads_flushed_script(fake_redis) -> None:
+    assert await storage_redis.touch_throttle(3, "cta", 0.05) == 0.0
+    await fake_redis.script_flush()
+    await asyncio.sleep(0.08)
+    assert await storage_redis.touch_throttle(3, "cta", 0.05) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_redis_throttle_ignores_anonymous_and_zero_cooldown(fake_redis) -> None:
+    assert await storage_redis.touch_throttle(None, "start:command", 3.0) == 0.0
+    assert await storage_redis.touch_throttle(1, "start:command", 0) == 0.0
+    assert await fake_redis.keys("thr:*") == []
+
+
+@pytest.mark.asyncio
+async def test_in_process_throttle_matches_redis_semantics(fake_redis) -> None:
+    storage.THROTTLES.clear()
+    for touch in (storage.touch_throttle, storage_redis.touch_throttle):
+        assert await touch(9, "calc:step", 0.2) == 0.0
+        # A shorter cooldown from a later caller does not shrink the claimed slot.
+        assert 0.1 < await touch(9, "calc:step", 0.01) <= 0.2
+        await asyncio.sleep(0.25)
+        assert await touch(9, "calc:step", 0.2) == 0.0
+    storage.THROTTLES.clear()
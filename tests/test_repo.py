@@ -3,10 +3,10 @@ import os
 from datetime import datetime, timedelta, timezone
 
 import pytest
-from sqlalchemy import func, select
+from sqlalchemy import delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-from app.db.models import Base, Event
+from app.db.models import Base, Event, UserEventState
 from app.repo import events, leads, referrals, subscriptions, users
 
 os.environ.setdefault("BOT_TOKEN", "test-token")
@@ -193,3 +193,46 @@ def test_events_upsert_idempotent():
             assert latest.meta == {"status": "still_on"}
 
     run(_test())
+
+
+def test_user_event_state_tracks_latest_event():
+    async def _test():
+        async with SessionManager() as session:
+            await events.log(session, 1, "quiz_finish", {"level": "low"})
+            now = datetime.now(timezone.utc) + timedelta(minutes=1)
+            await events.insert_many(
+                session,
+                [
+                    {"user_id": 1, "name": "quiz_finish", "meta": {"level": "high"}, "ts": now},
+                    {"user_id": 2, "name": "quiz_finish", "meta": {}, "ts": now},
+                    {"user_id": None, "name": "quiz_finish", "meta": {}, "ts": now},
+                ],
+            )
+            # A late batch must not move the state backwards.
+            await events.insert_many(
+                session,
+                [
+                    {
+                        "user_id": 1,
+                        "name": "quiz_finish",
+                        "meta": {"level": "stale"},
+                        "ts": now - timedelta(hours=1),
+                    }
+                ],
+            )
+            await session.commit()
+
+            latest = await events.latest_by_users(session, "quiz_finish", [1, 2, 3, None])
+            assert set(latest) == {1, 2}
+            assert latest[1].last_meta == {"level": "high"}
+
+            states = await events.latest_states(session, 1, ["quiz_finish", "start"])
+            assert list(states) == ["quiz_finish"]
+
+            await session.execute(delete(UserEventState))
+            assert await events.rebuild_user_state(session) == 2
+            await session.commit()
+            rebuilt = await events.latest_by_users(session, "quiz_finish", [1, 2])
+            assert rebuilt[1].last_meta == {"level": "high"}
+
+    run(_test())
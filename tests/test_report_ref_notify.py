@@ -63,14 +63,18 @@ async def test_notify_toggle_flow(monkeypatch):
     async def fake_upsert(session, user_id: int, name: str, meta: dict | None = None):
         await fake_log(session, user_id, name, meta or {})
 
-    async def fake_last_by(session, user_id: int, name: str):
-        items = [item for item in events.get(name, []) if item.user_id == user_id]
-        return items[-1] if items else None
+    async def fake_latest_states(session, user_id: int, names):
+        states = {}
+        for name in names:
+            items = [item for item in events.get(name, []) if item.user_id == user_id]
+            if items:
+                states[name] = SimpleNamespace(last_ts=items[-1].ts)
+        return states
 
     monkeypatch.setattr(notify, "session_scope", fake_scope)
     monkeypatch.setattr(notify.events_repo, "log", fake_log)
     monkeypatch.setattr(notify.events_repo, "upsert", fake_upsert)
-    monkeypatch.setattr(notify.events_repo, "last_by", fake_last_by)
+    monkeypatch.setattr(notify.events_repo, "latest_states", fake_latest_states)
 
     await notify._set_event(42, "notify_on")
     assert await notify._is_enabled(42) is True
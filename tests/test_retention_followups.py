@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.models import Base, Subscription
+from app.repo import events
+from app.scheduler import jobs
+
+pytest.importorskip("aiosqlite")
+
+
+def test_followup_candidates_read_user_event_state():
+    async def _test():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        now = datetime.now(timezone.utc)
+        old = now - timedelta(days=4)
+
+        def row(user_id, name, ts):
+            return {"user_id": user_id, "name": name, "meta": {}, "ts": ts}
+
+        async with async_sessionmaker(engine, class_=AsyncSession)() as session:
+            await events.insert_many(
+                session,
+                [
+                    row(1, "start", old),  # started, never finished the quiz
+                    row(2, "start", old),
+                    row(2, "quiz_finish", old + timedelta(minutes=5)),
+                    row(3, "start", old),
+                    row(3, "retention_test_nudge", old + timedelta(hours=1)),
+                    row(4, "start", now),  # too recent
+                    row(5, "quiz_finish", old),
+                    row(5, "retention_premium_nudge", old - timedelta(hours=1)),
+                ],
+            )
+            session.add(
+                Subscription(user_id=5, plan="pro", since=old, until=now - timedelta(days=1))
+            )
+            await session.commit()
+
+            start = await jobs._start_followup_candidates(session, now - timedelta(hours=24))
+            premium = await jobs._premium_followup_candidates(
+                session, now - timedelta(hours=72), now
+            )
+            assert sorted(start) == [1]
+            assert sorted(premium) == [2, 5]
+        await engine.dispose()
+
+    asyncio.run(_test())
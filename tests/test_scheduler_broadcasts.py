@@ -0,0 +1,203 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.broadcast import Broadcaster
+from app.db.models import Base, BroadcastRecipient, DailyTip, RetentionSetting, Subscription
+from app.repo import events, profiles
+from app.scheduler import jobs
+from app.services import weekly_ai_plan
+
+pytest.importorskip("aiosqlite")
+
+
+class _Database:
+    def __init__(self) -> None:
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def create(self) -> None:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    @asynccontextmanager
+    async def scope(self):
+        async with self.sessions() as session:
+            yield session
+
+    async def recipients(self) -> dict[str, dict[int, str]]:
+        async with self.sessions() as session:
+            rows = await session.execute(
+                select(
+                    BroadcastRecipient.run_key,
+                    BroadcastRecipient.user_id,
+                    BroadcastRecipient.status,
+                )
+            )
+            runs: dict[str, dict[int, str]] = {}
+            for run_key, user_id, status in rows.all():
+                runs.setdefault(run_key.partition(":")[0], {})[user_id] = status
+            return runs
+
+
+class _Bot:
+    def __init__(self, blocked=()) -> None:
+        self.sent: list[tuple[int, str]] = []
+        self.blocked = set(blocked)
+
+    async def send_message(self, chat_id: int, text: str, **_kwargs) -> None:
+        if chat_id in self.blocked:
+            raise TelegramForbiddenError(
+                method=SendMessage(chat_id=chat_id, text=text), message="bot was blocked"
+            )
+        self.sent.append((chat_id, text))
+
+
+class _Sink:
+    def __init__(self) -> None:
+        self.emitted: list[tuple[int, str, dict]] = []
+
+    def emit(self, user_id: int, name: str, meta: dict) -> None:
+        self.emitted.append((user_id, name, meta))
+
+
+@pytest.fixture
+def wired(monkeypatch):
+    db = _Database()
+    sink = _Sink()
+    monkeypatch.setattr(jobs, "session_scope", db.scope)
+    monkeypatch.setattr(
+        jobs,
+        "broadcaster",
+        Broadcaster(rate=1000, per_chat_interval=0, backoff=0, session_factory=db.scope),
+    )
+    monkeypatch.setattr(jobs, "event_sink", sink)
+    monkeypatch.setattr(weekly_ai_plan, "event_sink", sink)
+    return db, sink
+
+
+def _row(user_id: int, name: str, ts: datetime) -> dict:
+    return {"user_id": user_id, "name": name, "meta": {}, "ts": ts}
+
+
+def test_send_nudges_submits_opted_in_users(wired, monkeypatch):
+    db, _sink = wired
+
+    async def _generate(_prompt: str) -> str:
+        return "nudge"
+
+    monkeypatch.setattr(jobs, "ai_generate", _generate)
+
+    async def _test():
+        await db.create()
+        now = datetime.now(timezone.utc)
+        async with db.scope() as session:
+            await events.insert_many(
+                session,
+                [
+                    _row(1, "notify_on", now - timedelta(days=2)),
+                    _row(2, "notify_on", now - timedelta(days=2)),
+                    _row(2, "notify_off", now - timedelta(days=1)),
+                    _row(3, "notify_on", now),
+                ],
+            )
+            await session.commit()
+
+        bot = _Bot(blocked={3})
+        await jobs.send_nudges(bot, "UTC", set())
+        assert bot.sent == [(1, "nudge")]
+        assert (await db.recipients())["nudges"] == {1: "sent", 3: "blocked"}
+
+    asyncio.run(_test())
+
+
+def test_send_daily_tips_records_every_delivered_tip(wired):
+    db, sink = wired
+
+    async def _test():
+        await db.create()
+        async with db.scope() as session:
+            session.add_all([DailyTip(id=1, text="drink water"), DailyTip(id=2, text="sleep")])
+            for user_id in (1, 2, 3):
+                session.add(RetentionSetting(user_id=user_id, tips_time=time(0, 0), last_tip_id=1))
+            await session.commit()
+
+        await jobs.send_daily_tips(_Bot(blocked={2}))
+        assert (await db.recipients())["daily_tips"] == {1: "sent", 2: "blocked", 3: "sent"}
+        assert sorted((uid, name) for uid, name, _meta in sink.emitted) == [
+            (1, "daily_tip_sent"),
+            (3, "daily_tip_sent"),
+        ]
+        async with db.scope() as session:
+            rows = (await session.execute(select(RetentionSetting))).scalars().all()
+            delivered = {row.user_id: (row.last_tip_id, row.last_tip_sent_at) for row in rows}
+        assert delivered[1][0] == delivered[3][0] == 2
+        assert delivered[2] == (1, None)
+
+    asyncio.run(_test())
+
+
+def test_send_retention_reminders_emits_the_nudge_event(wired):
+    db, sink = wired
+
+    async def _test():
+        await db.create()
+        old = datetime.now(timezone.utc) - timedelta(days=4)
+        async with db.scope() as session:
+            await events.insert_many(session, [_row(1, "start", old), _row(2, "quiz_finish", old)])
+            await session.commit()
+
+        bot = _Bot()
+        await jobs.send_retention_reminders(bot)
+        assert sorted(uid for uid, _text in bot.sent) == [1, 2]
+        runs = await db.recipients()
+        assert runs["retention_test"] == {1: "sent"}
+        assert runs["retention_premium"] == {2: "sent"}
+        assert sorted((uid, name) for uid, name, _meta in sink.emitted) == [
+            (1, "retention_test_nudge"),
+            (2, "retention_premium_nudge"),
+        ]
+
+    asyncio.run(_test())
+
+
+def test_weekly_ai_plan_follows_up_only_delivered_plans(wired, monkeypatch):
+    db, sink = wired
+    archived: list[int] = []
+    monkeypatch.setattr(
+        weekly_ai_plan, "archive_plan", lambda user_id, _plan: archived.append(user_id)
+    )
+
+    async def _test():
+        await db.create()
+        now = datetime.now(timezone.utc)
+        async with db.scope() as session:
+            for user_id in (1, 2):
+                session.add(
+                    Subscription(
+                        user_id=user_id,
+                        plan="pro",
+                        since=now - timedelta(days=1),
+                        until=now + timedelta(days=30),
+                    )
+                )
+            await session.commit()
+
+        bot = _Bot(blocked={2})
+        await weekly_ai_plan.weekly_ai_plan_job(bot, None, scope_factory=db.scope)
+        assert [uid for uid, _text in bot.sent] == [1]
+        # The injected scope also backs the broadcast bookkeeping.
+        assert (await db.recipients())["weekly_ai_plan"] == {1: "sent", 2: "blocked"}
+        assert archived == [1]
+        assert [(uid, name) for uid, name, _meta in sink.emitted] == [(1, "ai_plan_sent")]
+        async with db.scope() as session:
+            assert (await profiles.get_plan(session, 1))["source"] == "auto"
+            assert await profiles.get_plan(session, 2) is None
+
+    asyncio.run(_test())
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.snapshots import SnapshotService, format_age
+
+
+def test_stale_snapshot_is_served_while_one_rebuild_runs():
+    async def _test():
+        calls = 0
+        release = asyncio.Event()
+
+        async def _build() -> int:
+            nonlocal calls
+            calls += 1
+            if calls > 1:
+                await release.wait()
+            return calls
+
+        service = SnapshotService("demo", _build, max_age=0)
+        first = await service.get()
+        assert first.value == 1
+
+        # Stale: every reader gets the old value at once, one rebuild starts.
+        served = await asyncio.gather(*(service.get() for _ in range(5)))
+        assert {snapshot.value for snapshot in served} == {1}
+        await asyncio.sleep(0)
+        assert calls == 2
+
+        waiting = asyncio.gather(service.refresh(), service.refresh())
+        await asyncio.sleep(0)
+        release.set()
+        refreshed = await waiting
+        assert [snapshot.value for snapshot in refreshed] == [2, 2]
+        assert calls == 2 and service.builds == 2
+
+    asyncio.run(_test())
+
+
+def test_failed_rebuild_keeps_previous_snapshot():
+    async def _test():
+        results = [RuntimeError("db down"), 7, RuntimeError("db down")]
+
+        async def _build() -> int:
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        service = SnapshotService("demo", _build, max_age=60)
+        with pytest.raises(RuntimeError):
+            await service.get()
+        assert (await service.get()).value == 7
+        assert (await service.refresh()).value == 7
+        assert service.failures == 2
+
+    asyncio.run(_test())
+
+
+def test_format_age():
+    assert format_age(5.9) == "5 с назад"
+    assert format_age(125) == "2 мин назад"
+    assert format_age(3 * 3600 + 600) == "3 ч 10 мин назад"
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app import storage_codec, storage_redis
+
+msgpack = pytest.importorskip("msgpack")
+
+SESSION = {
+    "calc": "kcal",
+    "step_index": 2,
+    "data": {"sex": "f", "age": 29, "weight": 61.5},
+    "custom": [1, {"nested": None}],
+}
+
+
+def test_msgpack_roundtrip_is_versioned_and_compact() -> None:
+    raw = storage_codec.encode(SESSION)
+
+    assert raw[0] == storage_codec.FORMAT_MSGPACK_V1
+    assert storage_codec.decode(raw) == SESSION
+    assert len(raw) < len(json.dumps(SESSION).encode())
+    assert storage_codec.is_current(raw)
+
+
+def test_legacy_json_payloads_still_decode() -> None:
+    legacy = json.dumps(SESSION, ensure_ascii=False)
+
+    assert storage_codec.decode(legacy) == SESSION
+    assert storage_codec.decode(legacy.encode()) == SESSION
+    assert not storage_codec.is_current(legacy.encode())
+
+
+def test_json_codec_writes_legacy_format(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(storage_codec, "REDIS_CODEC", "json")
+    raw = storage_codec.encode(SESSION)
+
+    assert json.loads(raw) == SESSION
+    assert storage_codec.is_current(raw)
+    # Binary payloads from a rolled-back deploy remain readable.
+    monkeypatch.setattr(storage_codec, "REDIS_CODEC", "msgpack")
+    packed = storage_codec.encode(SESSION)
+    monkeypatch.setattr(storage_codec, "REDIS_CODEC", "json")
+    assert storage_codec.decode(packed) == SESSION
+
+
+def test_non_string_keys_match_json_semantics() -> None:
+    payload = {"answers": {1: "a", 2: "b"}}
+    assert storage_codec.decode(storage_codec.encode(payload)) == json.loads(json.dumps(payload))
+
+
+@pytest.mark.asyncio
+async def test_migrate_payloads_recodes_legacy_keys(monkeypatch: pytest.MonkeyPatch) -> None:
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(storage_redis, "_redis", client)
+    monkeypatch.setattr(storage_redis, "_recode_script", None)
+
+    cart = {"items": [{"product_id": "T8", "price": "990.00", "quantity": 1}]}
+    await client.set("cart:1", json.dumps(cart), ex=600)
+    await client.set("sess:2", json.dumps(SESSION), ex=600)
+    await storage_redis.session_set(3, {"quiz": "sleep"})
+    await client.set("sess:4", b"\x7f garbage")
+
+    stats = await storage_redis.migrate_payloads()
+
+    assert stats == {"scanned": 4, "migrated": 2, "skipped": 1}
+    raw = await client.get("cart:1")
+    assert raw[0] == storage_codec.FORMAT_MSGPACK_V1
+    assert storage_codec.decode(raw) == cart
+    assert await storage_redis.session_get(2) == SESSION
+    assert 0 < await client.ttl("cart:1") <= 600
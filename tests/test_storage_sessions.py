@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from app import storage
+from app.utils.expiring import ExpiringDict
+
+
+class _FakeRedisSessions:
+    """In-memory stand-in for the ``storage_redis`` session helpers."""
+
+    def __init__(self) -> None:
+        self.data: dict[int, str] = {}
+        self.calls: list[str] = []
+
+    async def get(self, user_id: int):
+        self.calls.append("get")
+        raw = self.data.get(user_id)
+        return json.loads(raw) if raw is not None else None
+
+    async def get_many(self, user_ids):
+        self.calls.append("mget")
+        return {uid: json.loads(self.data[uid]) for uid in user_ids if uid in self.data}
+
+    async def set(self, user_id: int, data, ttl: int = 3600) -> None:
+        self.calls.append("set")
+        self.data[user_id] = json.dumps(data)
+
+    async def set_many(self, payloads, ttl: int = 3600) -> None:
+        self.calls.append("pipeline")
+        for user_id, data in payloads.items():
+            self.data[user_id] = json.dumps(data)
+
+    async def pop(self, user_id: int):
+        self.calls.append("pop")
+        raw = self.data.pop(user_id, None)
+        return json.loads(raw) if raw is not None else None
+
+
+@pytest.fixture
+def redis_sessions(monkeypatch: pytest.MonkeyPatch):
+    fake = _FakeRedisSessions()
+    monkeypatch.setattr(storage, "USE_REDIS", True)
+    monkeypatch.setattr(storage, "redis_session_get", fake.get, raising=False)
+    monkeypatch.setattr(storage, "redis_session_get_many", fake.get_many, raising=False)
+    monkeypatch.setattr(storage, "redis_session_set", fake.set, raising=False)
+    monkeypatch.setattr(storage, "redis_session_set_many", fake.set_many, raising=False)
+    monkeypatch.setattr(storage, "redis_session_pop", fake.pop, raising=False)
+    store = storage.SessionStore()
+    return fake, store, storage.AsyncSessionStore(store)
+
+
+@pytest.mark.asyncio
+async def test_async_sessions_in_memory_roundtrip() -> None:
+    store = storage.SessionStore()
+    sessions = storage.AsyncSessionStore(store)
+
+    assert await sessions.get(1) is None
+    session = await sessions.set(1, {"quiz": "sleep", "score": 0})
+    session["score"] += 2
+
+    loaded = await sessions.get(1)
+    assert loaded["score"] == 2
+    assert store[1]["quiz"] == "sleep"
+
+    assert await sessions.pop(1) == {"quiz": "sleep", "score": 2}
+    assert await sessions.get(1, {}) == {}
+
+
+@pytest.mark.asyncio
+async def test_in_memory_writes_restart_the_session_ttl() -> None:
+    from app.middlewares.session_flush import SessionFlushMiddleware
+
+    now = [0.0]
+    store = storage.SessionStore(ttl=10)
+    store._cache = ExpiringDict(ttl=10, maxsize=100, clock=lambda: now[0])
+    sessions = storage.AsyncSessionStore(store)
+    await sessions.set(5, {"step": 0})
+
+    async def handler(event, data):
+        (await sessions.get(5))["step"] = 1
+
+    now[0] = 8.0
+    await SessionFlushMiddleware(sessions)(handler, object(), {})
+    now[0] = 15.0
+    session = store.get(5)
+    assert session == {"step": 1}
+
+    # Without a write scope the mutation itself sets the session again.
+    session["step"] = 2
+    now[0] = 24.0
+    assert store.get(5) == {"step": 2}
+    now[0] = 26.0
+    assert store.get(5) is None
+
+
+@pytest.mark.asyncio
+async def test_async_sessions_read_through_and_batch(redis_sessions) -> None:
+    fake, store, sessions = redis_sessions
+    fake.data[7] = json.dumps({"calc": "bmi"})
+    fake.data[8] = json.dumps({"calc": "water"})
+
+    batch = await sessions.get_many([7, 8, 9])
+    assert set(batch) == {7, 8}
+    assert fake.calls == ["mget"]
+
+    # Cached entries are served without another Redis round-trip.
+    assert (await sessions.get(7))["calc"] == "bmi"
+    assert fake.calls == ["mget"]
+
+    await sessions.set_many({10: {"a": 1}, 11: {"b": 2}})
+    assert fake.calls[-1] == "pipeline"
+    assert json.loads(fake.data[11]) == {"b": 2}
+
+
+@pytest.mark.asyncio
+async def test_session_mutations_coalesce_write_behind(redis_sessions) -> None:
+    fake, store, sessions = redis_sessions
+    session = await sessions.set(5, {"step_index": 0, "data": {}})
+    fake.calls.clear()
+
+    session["step_index"] = 1
+    session["data"]["weight"] = 70
+    session["step_index"] = 2
+    await sessions.flush()
+
+    assert fake.calls == ["set"]
+    assert json.loads(fake.data[5]) == {"step_index": 2, "data": {"weight": 70}}
+
+    session["step_index"] = 3
+    assert await sessions.pop(5) == {"step_index": 3, "data": {"weight": 70}}
+    await asyncio.sleep(0)
+    assert 5 not in fake.data
+    assert not store._pending
+
+
+@pytest.mark.asyncio
+async def test_deferred_scope_writes_each_session_once(redis_sessions) -> None:
+    fake, store, sessions = redis_sessions
+    from app.middlewares.session_flush import SessionFlushMiddleware
+
+    async def handler(event, data):
+        session = await sessions.set(21, {"calc": "kcal", "step_index": 0, "data": {}})
+        session.setdefault("data", {})["sex"] = "m"
+        session["step_index"] = 1
+        other = await sessions.setdefault(22, {})
+        other["seen"] = True
+        assert fake.calls == ["get"]
+        return "ok"
+
+    middleware = SessionFlushMiddleware(sessions)
+    assert await middleware(handler, object(), {}) == "ok"
+
+    assert fake.calls == ["get", "pipeline"]
+    assert json.loads(fake.data[21]) == {"calc": "kcal", "step_index": 1, "data": {"sex": "m"}}
+    assert json.loads(fake.data[22]) == {"seen": True}
+    assert not store._pending
+
+
+def test_session_views_share_nested_state() -> None:
+    store = storage.SessionStore()
+    payload = {"pick": {"goal": "sleep"}}
+    store[3] = payload
+
+    view = store[3]["pick"]
+    view["age"] = "u30"
+
+    assert store._cache[3]["pick"] is payload["pick"]
+    assert payload["pick"] == {"goal": "sleep", "age": "u30"}
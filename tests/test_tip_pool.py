@@ -0,0 +1,56 @@
+import random
+from collections import Counter
+
+from app.services.tip_pool import TipPool, decode_seen, encode_seen
+
+
+def _pool(ids, seed: int = 1) -> TipPool:
+    return TipPool(((tip_id, f"tip {tip_id}") for tip_id in ids), rng=random.Random(seed))
+
+
+def test_pick_is_uniform_and_skips_previous_tip():
+    pool = _pool([3, 7, 11, 20])
+    counts = Counter(pool.pick(exclude_id=7) for _ in range(3000))
+    assert set(counts) == {3, 11, 20}
+    assert min(counts.values()) > 850
+    assert pool.text(11) == "tip 11"
+
+
+def test_pick_edge_cases():
+    assert _pool([]).pick() is None
+    assert _pool([5]).pick(exclude_id=5) == 5
+    assert _pool([1, 2]).pick(exclude_id=99) in {1, 2}
+
+
+def test_seen_window_avoids_repeats_until_it_restarts():
+    pool = _pool(range(1, 9))
+    seen, shown = 0, []
+    for _ in range(4):
+        tip_id = pool.pick(shown[-1] if shown else None, seen)
+        seen = pool.remember(seen, tip_id, window=4)
+        shown.append(tip_id)
+    assert len(set(shown)) == 4
+    # The fourth tip filled the window, so only it is remembered now.
+    assert seen == 1 << shown[-1]
+
+
+def test_pick_ignores_window_when_everything_else_was_seen():
+    pool = _pool([1, 2, 3])
+    seen = (1 << 1) | (1 << 2) | (1 << 3)
+    assert pool.pick(exclude_id=2, seen=seen) in {1, 3}
+
+
+def test_seen_bitmap_roundtrip():
+    assert encode_seen(0) is None and decode_seen(None) == 0
+    seen = (1 << 3) | (1 << 700)
+    assert decode_seen(encode_seen(seen)) == seen
+
+
+def test_deal_updates_the_window_only_when_enabled():
+    pool = _pool([1, 2, 3, 4])
+    tip_id, raw = pool.deal(2, encode_seen(1 << 1), window=3)
+    assert tip_id in {3, 4}
+    assert decode_seen(raw) == (1 << 1) | (1 << tip_id)
+    tip_id, raw = pool.deal(2, encode_seen(1 << 1), window=0)
+    assert tip_id != 2 and raw is None
+    assert _pool([]).deal(None, None, window=3) is None
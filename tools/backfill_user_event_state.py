@@ -0,0 +1,41 @@
+"""Rebuild the ``user_event_state`` table from the full ``events`` history.
+
+Run once after applying migration ``0007_user_event_state`` on a database that
+received events from an older release, or whenever the state table is
+suspected to have drifted:
+
+    python -m tools.backfill_user_event_state
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.db.session import session_scope  # noqa: E402
+from app.repo import events as events_repo  # noqa: E402
+
+
+async def run() -> int:
+    async with session_scope() as session:
+        rows = await events_repo.rebuild_user_state(session)
+        await session.commit()
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args(argv)
+    rows = asyncio.run(run())
+    print(f"[user-event-state] rebuilt {rows} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,165 @@
+"""Benchmark goal lookups on an enlarged catalog.
+
+Builds a synthetic catalog ``--scale`` times the size of
+``app/catalog/products.json`` (product copies with goals assigned from the
+quiz goal map, since the shipped catalog carries none yet), indexes it with
+the real loader and compares the previous linear scan of ``select_by_goals`` /
+``catalog_summary`` with the goal posting-list merge.
+
+Example:
+
+    python -m tools.bench_catalog_goals --scale 10 --rounds 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+
+from app.catalog import loader
+from app.products import GOAL_MAP
+
+GOALS = sorted(GOAL_MAP)
+
+
+def _legacy_select_by_goals(
+    catalog: Dict[str, Any], goals: Iterable[str], limit: int = 6
+) -> List[Dict[str, Any]]:
+    goal_set = {goal.lower() for goal in goals if goal}
+    if not goal_set:
+        return []
+    selected: List[Dict[str, Any]] = []
+    for pid in catalog["ordered"]:
+        product = catalog["products"][pid]
+        product_goals = product.get("goals") or []
+        if not isinstance(product_goals, list):
+            continue
+        if goal_set.intersection({str(goal).lower() for goal in product_goals if goal}):
+            selected.append(product)
+            if len(selected) >= limit:
+                break
+    return selected
+
+
+def _legacy_catalog_summary(catalog: Dict[str, Any], goal: str) -> list[str]:
+    result = []
+    for pid in catalog["ordered"]:
+        product = catalog["products"][pid]
+        goals = product.get("goals") or []
+        if goal in {str(g).lower() for g in goals}:
+            result.append(product.get("title") or product.get("name") or pid)
+        if len(result) >= 6:
+            break
+    return result
+
+
+def _indexed_select_by_goals(
+    catalog: Dict[str, Any], goals: Iterable[str], limit: int = 6
+) -> List[Dict[str, Any]]:
+    products = catalog["products"]
+    selected: List[Dict[str, Any]] = []
+    for pid in loader.iter_goal_products(catalog, goals, limit=limit):
+        selected.append(products[pid])
+        if len(selected) >= limit:
+            break
+    return selected
+
+
+def _indexed_catalog_summary(catalog: Dict[str, Any], goal: str) -> list[str]:
+    products = catalog["products"]
+    return [
+        products[pid].get("title") or products[pid].get("name") or pid
+        for pid in islice(loader.iter_goal_products(catalog, [goal], limit=6), 6)
+    ]
+
+
+def _scaled_catalog(scale: int, seed: int) -> dict[str, Any]:
+    source = json.loads(Path(loader.CATALOG_PATH).read_text(encoding="utf-8"))
+    rng = random.Random(seed)
+    products = []
+    for copy in range(scale):
+        for item in source["products"]:
+            clone = dict(item, id=f"{item['id']}-{copy}", aliases=[])
+            # Most products serve one goal; a rare goal only shows up deep in the list.
+            clone["goals"] = rng.sample(GOALS[:-1], k=rng.choice((1, 1, 2)))
+            products.append(clone)
+    products[-1]["goals"] = [GOALS[-1]]
+    return {"version": "bench", "products": products}
+
+
+def _timed(func: Callable[[], Any], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10, help="catalog size multiplier")
+    parser.add_argument("--rounds", type=int, default=2000, help="calls per measurement")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    rounds = max(1, args.rounds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "products.json"
+        path.write_text(json.dumps(_scaled_catalog(max(1, args.scale), args.seed)), "utf-8")
+        loader.CATALOG_PATH = str(path)
+        loader.CATALOG_FILE = path
+        loader.ALIASES_PATH = str(Path(tmp) / "aliases.json")
+        loader._SNAPSHOT = None
+        catalog = loader.load_catalog()
+
+    rare = GOALS[-1]
+    cases: list[tuple[str, Callable[[], Any], Callable[[], Any]]] = [
+        (
+            f"select {GOALS[0]}",
+            lambda: _legacy_select_by_goals(catalog, [GOALS[0]]),
+            lambda: _indexed_select_by_goals(catalog, [GOALS[0]]),
+        ),
+        (
+            "select 3 goals",
+            lambda: _legacy_select_by_goals(catalog, GOALS[:3]),
+            lambda: _indexed_select_by_goals(catalog, GOALS[:3]),
+        ),
+        (
+            f"select {rare}",
+            lambda: _legacy_select_by_goals(catalog, [rare]),
+            lambda: _indexed_select_by_goals(catalog, [rare]),
+        ),
+        (
+            "select unknown",
+            lambda: _legacy_select_by_goals(catalog, ["unknown"]),
+            lambda: _indexed_select_by_goals(catalog, ["unknown"]),
+        ),
+        (
+            f"summary {GOALS[1]}",
+            lambda: _legacy_catalog_summary(catalog, GOALS[1]),
+            lambda: _indexed_catalog_summary(catalog, GOALS[1]),
+        ),
+        (
+            f"summary {rare}",
+            lambda: _legacy_catalog_summary(catalog, rare),
+            lambda: _indexed_catalog_summary(catalog, rare),
+        ),
+    ]
+
+    print(f"catalog: {len(catalog['ordered'])} products, {len(catalog['goals'])} goals")
+    print(f"{'query':<24}{'scan µs':>10}{'index µs':>10}{'speedup':>9}")
+    for name, legacy, indexed in cases:
+        assert legacy() == indexed(), name
+        before = _timed(legacy, rounds)
+        after = _timed(indexed, rounds)
+        print(f"{name:<24}{before:>10.2f}{after:>10.2f}{before / after:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
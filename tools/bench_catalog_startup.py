@@ -0,0 +1,104 @@
+"""Measure catalog cold start with and without the prebuilt snapshot.
+
+Each round runs a fresh interpreter that imports the loader and calls
+``load_catalog()`` once, so the numbers include unpickling or JSON parsing
+plus indexing, but not the interpreter start itself.  ``--scale`` enlarges the
+catalog with product copies to show how both paths grow.
+
+Example:
+
+    python -m tools.bench_catalog_startup --scale 10 --rounds 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from app.catalog import loader
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_CHILD = """
+import sys, time
+start = time.perf_counter()
+from app.catalog import loader
+imported = time.perf_counter()
+loader.CATALOG_PATH = sys.argv[1]
+loader.CATALOG_FILE = loader.Path(sys.argv[1])
+loader.ALIASES_PATH = sys.argv[2]
+loaded = loader.load_catalog()
+done = time.perf_counter()
+print((imported - start) * 1e3, (done - imported) * 1e3, len(loaded["ordered"]))
+"""
+
+
+def _scaled_catalog(scale: int) -> dict[str, Any]:
+    source = json.loads(Path(loader.CATALOG_PATH).read_text(encoding="utf-8"))
+    products = [
+        dict(item, id=f"{item['id']}-{copy}", aliases=[])
+        for copy in range(scale)
+        for item in source["products"]
+    ]
+    return {"version": "bench", "products": products}
+
+
+def _run(catalog: Path, aliases: Path, snapshot: str, rounds: int) -> tuple[float, float, int]:
+    env = dict(os.environ, CATALOG_SNAPSHOT_PATH=snapshot, PYTHONPATH=str(ROOT))
+    imports, loads = [], []
+    count = 0
+    for _ in range(rounds):
+        out = subprocess.run(
+            [sys.executable, "-c", _CHILD, str(catalog), str(aliases)],
+            capture_output=True,
+            check=True,
+            cwd=ROOT,
+            env=env,
+            text=True,
+        ).stdout.split()
+        imports.append(float(out[0]))
+        loads.append(float(out[1]))
+        count = int(out[2])
+    return statistics.median(imports), statistics.median(loads), count
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1, help="catalog size multiplier")
+    parser.add_argument("--rounds", type=int, default=15, help="interpreter starts per mode")
+    args = parser.parse_args(argv)
+    rounds = max(1, args.rounds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = Path(tmp) / "products.json"
+        aliases = Path(tmp) / "aliases.json"
+        snapshot = Path(tmp) / "products.snapshot"
+        if args.scale > 1:
+            catalog.write_text(json.dumps(_scaled_catalog(args.scale)), encoding="utf-8")
+        else:
+            catalog.write_bytes(Path(loader.CATALOG_PATH).read_bytes())
+        if Path(loader.ALIASES_PATH).exists():
+            aliases.write_bytes(Path(loader.ALIASES_PATH).read_bytes())
+
+        loader.CATALOG_PATH = str(catalog)
+        loader.CATALOG_FILE = catalog
+        loader.ALIASES_PATH = str(aliases)
+        loader.write_catalog_snapshot(snapshot)
+
+        print(f"snapshot: {snapshot.stat().st_size / 1024:.0f} KiB")
+        print(f"{'mode':<10}{'products':>10}{'import ms':>11}{'load ms':>10}")
+        for mode, path in (("json", ""), ("snapshot", str(snapshot))):
+            imported, loaded, count = _run(catalog, aliases, path, rounds)
+            print(f"{mode:<10}{count:>10}{imported:>11.2f}{loaded:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
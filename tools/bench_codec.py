@@ -0,0 +1,118 @@
+"""Benchmark the Redis payload codecs on realistic sessions and carts.
+
+Compares the legacy JSON strings with the versioned msgpack codec from
+``app.storage_codec`` for a finished ``kcal`` calculator session, a quiz in
+progress, a product picker session and a three-item cart.  Reports payload
+size and the mean encode/decode time per payload.
+
+Example:
+
+    python -m tools.bench_codec --rounds 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from decimal import Decimal
+from typing import Any, Callable
+
+from app import storage_codec
+from app.services.cart import Cart, CartItem
+
+_UTM = {"utm_source": "tg_bot", "utm_medium": "catalog", "utm_campaign": "five_keys"}
+
+
+def _sample_cart() -> dict[str, Any]:
+    cart = Cart()
+    for product_id, title, price, quantity in (
+        ("T8_BLEND", "T8 BLEND — коктейль для энергии", "2290.00", 1),
+        ("OMEGA_3", "Омега-3 Premium", "1590.00", 2),
+        ("MAG_B6", "Магний B6", "990.00", 1),
+    ):
+        cart.add(
+            CartItem(
+                product_id=product_id,
+                title=title,
+                price=Decimal(price),
+                quantity=quantity,
+                utm=dict(_UTM),
+            )
+        )
+    cart.coupon_code = "WELCOME10"
+    cart.coupon_meta = {"discount": "489.00"}
+    return cart.to_payload()
+
+
+SAMPLES: dict[str, dict[str, Any]] = {
+    "calc kcal": {
+        "calc": "kcal",
+        "calc_engine": "core",
+        "step_index": 6,
+        "data": {
+            "sex": "m",
+            "age": 32,
+            "weight": 80.0,
+            "height": 182.0,
+            "activity": 1.55,
+            "goal": "maintain",
+        },
+        "_premium_cta_shown": True,
+    },
+    "quiz": {"quiz": "sleep", "idx": 4, "score": 7},
+    "picker": {
+        "pick": {
+            "goal": "energy",
+            "age": "u30",
+            "life": "office",
+            "level": "beginner",
+            "allerg": "none",
+            "season": "winter",
+        }
+    },
+    "cart": _sample_cart(),
+}
+
+
+def _legacy_encode(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _timed(func: Callable[[Any], Any], arg: Any, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(arg)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10_000, help="iterations per measurement")
+    args = parser.parse_args(argv)
+    rounds = max(1, args.rounds)
+
+    if storage_codec.current_format() is None:
+        print("msgpack codec unavailable (REDIS_CODEC or missing msgpack); nothing to compare")
+        return 1
+
+    print(
+        f"{'payload':<12}{'json B':>8}{'v1 B':>7}{'ratio':>7}"
+        f"{'json enc µs':>13}{'v1 enc µs':>11}{'json dec µs':>13}{'v1 dec µs':>11}"
+    )
+    for name, payload in SAMPLES.items():
+        legacy = _legacy_encode(payload)
+        packed = storage_codec.encode(payload)
+        assert storage_codec.decode(packed) == json.loads(legacy)
+        print(
+            f"{name:<12}{len(legacy):>8}{len(packed):>7}{len(packed) / len(legacy):>7.2f}"
+            f"{_timed(_legacy_encode, payload, rounds):>13.2f}"
+            f"{_timed(storage_codec.encode, payload, rounds):>11.2f}"
+            f"{_timed(json.loads, legacy, rounds):>13.2f}"
+            f"{_timed(storage_codec.decode, packed, rounds):>11.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
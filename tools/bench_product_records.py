@@ -0,0 +1,138 @@
+"""Compare card rendering on shared product records with the old dict copies.
+
+The legacy path copied each catalog product dict and normalized it into a new
+card on every render; ``prepare_cards`` now returns the memoized read-only
+cards of :class:`app.catalog.records.ProductRecord`.  Reports allocations per
+render (tracemalloc) and the peak RSS of a fresh interpreter that loads the
+catalog and renders ``--renders`` card lists with either path.
+
+Example:
+
+    python -m tools.bench_product_records --renders 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+from app.catalog.loader import load_catalog
+from app.catalog.records import MAX_CARD_IMAGES, select_help
+from app.utils.cards import prepare_cards
+
+ROOT = Path(__file__).resolve().parents[1]
+CTX = "energy"
+
+
+def _legacy_card(code: str, ctx: str | None) -> dict[str, Any] | None:
+    catalog = load_catalog()
+    source = catalog["products"].get(code)
+    if source is None:
+        pid = catalog["aliases"].get(code.lower())
+        source = catalog["products"].get(pid) if pid else None
+    if not source:
+        return None
+    source = dict(source)
+    order = source.get("order") or {}
+    props: list[str] = []
+    for collection in (source.get("props"), source.get("benefits")):
+        if isinstance(collection, list):
+            props.extend(str(p) for p in collection if p)
+    images = [img for img in source.get("images") or [] if isinstance(img, str) and img]
+    name = source.get("title") or source.get("name") or source.get("id") or "Product"
+    return {
+        "code": source.get("code") or source.get("id") or name,
+        "name": name,
+        "short": source.get("short", ""),
+        "props": props[:5],
+        "images": images[:MAX_CARD_IMAGES],
+        "order_url": source.get("order_url") or order.get("velavie_link") or order.get("url"),
+        "helps_text": source.get("helps_text") or select_help(source.get("how_it_helps"), ctx),
+    }
+
+
+def _legacy_prepare(codes: list[str]) -> list[dict[str, Any]]:
+    return [card for card in (_legacy_card(code, CTX) for code in codes) if card]
+
+
+def _shared_prepare(codes: list[str]) -> list[Any]:
+    return prepare_cards(codes, CTX)
+
+
+def _allocations(func: Callable[[], Any], renders: int) -> tuple[float, float]:
+    func()  # warm the card memo and the catalog
+    tracemalloc.start()
+    kept = []
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(renders):
+        kept.append(func())
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (current - before) / renders, peak / 1024
+
+
+def _timed(func: Callable[[], Any], renders: int) -> float:
+    start = time.perf_counter()
+    for _ in range(renders):
+        func()
+    return (time.perf_counter() - start) / renders * 1e6
+
+
+def _child_rss(mode: str, renders: int) -> float:
+    out = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "tools.bench_product_records",
+            "--child",
+            mode,
+            "--renders",
+            str(renders),
+        ],
+        capture_output=True,
+        check=True,
+        cwd=ROOT,
+        text=True,
+    ).stdout
+    return float(out.strip())
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=20000, help="card lists per measurement")
+    parser.add_argument("--child", choices=("legacy", "shared"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    renders = max(1, args.renders)
+    codes = list(load_catalog()["ordered"])[:6]
+    paths = {"legacy": lambda: _legacy_prepare(codes), "shared": lambda: _shared_prepare(codes)}
+
+    if args.child:
+        kept = [paths[args.child]() for _ in range(renders)]
+        assert len(kept) == renders
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+        return 0
+
+    assert [dict(card) for card in paths["shared"]()] == [
+        {**card, "props": tuple(card["props"]), "images": tuple(card["images"])}
+        for card in paths["legacy"]()
+    ]
+    print(f"{len(codes)} cards per render, {renders} renders kept alive")
+    print(f"{'path':<8}{'µs/render':>11}{'bytes/render':>14}{'peak KiB':>10}{'RSS MiB':>9}")
+    # Linux children inherit the parent's RSS high-water mark: spawn them first.
+    rss = {name: _child_rss(name, renders) for name in paths}
+    for name, func in paths.items():
+        per_render, peak = _allocations(func, renders)
+        elapsed = _timed(func, renders)
+        print(f"{name:<8}{elapsed:>11.2f}{per_render:>14.0f}{peak:>10.0f}{rss[name]:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,226 @@
+"""Benchmark session persistence for a calculator flow.
+
+Replays the session operations ``app.handlers.calc_unified`` performs for the
+six-step ``kcal`` calculator and reports, per step, how many Redis writes were
+issued, how many bytes were serialized, how many memory blocks the step left
+allocated and the transient allocation peak (both via ``tracemalloc``).
+
+``legacy`` reproduces the previous ``SessionData`` (deep copies on assignment
+and a full re-save after every mutation); ``deferred`` uses the current
+dirty-tracking store inside a ``sessions.deferred()`` scope, which is what the
+``SessionFlushMiddleware`` wraps around every update.
+
+Example:
+
+    python -m tools.bench_sessions --rounds 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tracemalloc
+from collections.abc import MutableMapping
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+from app import storage, storage_codec
+
+# (step key, value) pairs in the order the kcal calculator asks for them.
+KCAL_STEPS: tuple[tuple[str, Any], ...] = (
+    ("sex", "m"),
+    ("age", 32),
+    ("weight", 80.0),
+    ("height", 182.0),
+    ("activity", 1.55),
+    ("goal", "maintain"),
+)
+
+
+@dataclass
+class StepStats:
+    writes: int = 0
+    bytes: int = 0
+    alloc_blocks: int = 0
+    alloc_peak: int = 0
+
+
+class _Sink:
+    """Fake Redis backend that serializes payloads the way ``storage_redis`` does."""
+
+    def __init__(self) -> None:
+        self.writes = 0
+        self.bytes = 0
+
+    def record(self, data: dict[str, Any]) -> None:
+        self.writes += 1
+        self.bytes += len(storage_codec.encode(data))
+
+    async def session_set(self, user_id: int, data: dict[str, Any], ttl: int = 3600) -> None:
+        self.record(data)
+
+    async def session_set_many(self, payloads: dict[int, dict[str, Any]], ttl: int = 3600) -> None:
+        for data in payloads.values():
+            self.record(data)
+
+
+class _LegacySessionData(MutableMapping[str, Any]):
+    """Copy of the pre-dirty-tracking SessionData semantics."""
+
+    def __init__(self, sink: _Sink, data: dict[str, Any], parent: Any = None) -> None:
+        self._sink = sink
+        self._data = data
+        self._parent = parent
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._data[key]
+        if isinstance(value, dict):
+            return _LegacySessionData(self._sink, value, parent=self)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._data[key] = deepcopy(value) if isinstance(value, dict) else value
+        self._persist()
+
+    def __delitem__(self, key: str) -> None:
+        del self._data[key]
+        self._persist()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _persist(self) -> None:
+        if self._parent is not None:
+            self._parent._persist()
+        else:
+            self._sink.record(self._data)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:  # type: ignore[override]
+        if key not in self._data:
+            value = default if default is not None else {}
+            self._data[key] = deepcopy(value) if isinstance(value, dict) else value
+            self._persist()
+        value = self._data[key]
+        if isinstance(value, dict):
+            return _LegacySessionData(self._sink, value, parent=self)
+        return value
+
+    def to_dict(self) -> dict[str, Any]:
+        return deepcopy(self._data)
+
+
+def _apply_step(session: Any, index: int) -> None:
+    """Mirror ``calc_unified._handle_choice`` / ``_handle_input`` for one step."""
+
+    key, value = KCAL_STEPS[index]
+    int(session.get("step_index", 0))
+    session.setdefault("data", {})[key] = value
+    session["step_index"] = index + 1
+    session["step_index"]
+
+
+def _new_payload() -> dict[str, Any]:
+    return {"calc": "kcal", "calc_engine": "core", "step_index": 0, "data": {}}
+
+
+async def _measure(sink: _Sink, run_step: Callable[[int], Any], stats: list[StepStats]) -> None:
+    for index in range(len(KCAL_STEPS)):
+        writes, written = sink.writes, sink.bytes
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        base, _ = tracemalloc.get_traced_memory()
+        await run_step(index)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        entry = stats[index]
+        entry.writes += sink.writes - writes
+        entry.bytes += sink.bytes - written
+        entry.alloc_blocks += sum(
+            max(item.count_diff, 0) for item in after.compare_to(before, "filename")
+        )
+        entry.alloc_peak += max(peak - base, 0)
+
+
+async def _run_legacy(rounds: int) -> list[StepStats]:
+    stats = [StepStats() for _ in KCAL_STEPS]
+    for _ in range(rounds):
+        sink = _Sink()
+        session = _LegacySessionData(sink, _new_payload())
+
+        async def run_step(index: int, session: Any = session) -> None:
+            _apply_step(session, index)
+
+        await _measure(sink, run_step, stats)
+    return stats
+
+
+async def _run_deferred(rounds: int) -> list[StepStats]:
+    stats = [StepStats() for _ in KCAL_STEPS]
+    original = (
+        storage.USE_REDIS,
+        getattr(storage, "redis_session_set", None),
+        getattr(storage, "redis_session_set_many", None),
+    )
+    try:
+        for round_no in range(rounds):
+            sink = _Sink()
+            storage.USE_REDIS = True
+            storage.redis_session_set = sink.session_set  # type: ignore[attr-defined]
+            storage.redis_session_set_many = sink.session_set_many  # type: ignore[attr-defined]
+            store = storage.SessionStore()
+            sessions = storage.AsyncSessionStore(store)
+            user_id = 10_000 + round_no
+            store._cache[user_id] = _new_payload()
+
+            async def run_step(index: int, sessions=sessions, user_id=user_id) -> None:
+                async with sessions.deferred():
+                    session = await sessions.get(user_id)
+                    _apply_step(session, index)
+
+            await _measure(sink, run_step, stats)
+    finally:
+        storage.USE_REDIS = original[0]
+        for name, value in zip(
+            ("redis_session_set", "redis_session_set_many"), original[1:], strict=True
+        ):
+            if value is None:
+                storage.__dict__.pop(name, None)
+            else:
+                setattr(storage, name, value)
+    return stats
+
+
+def _print_table(label: str, stats: list[StepStats], rounds: int) -> None:
+    print(f"{label}:")
+    print(f"  {'step':<10}{'writes':>8}{'bytes':>10}{'blocks':>8}{'peak KiB':>10}")
+    for (key, _), entry in zip(KCAL_STEPS, stats, strict=True):
+        print(
+            f"  {key:<10}{entry.writes / rounds:>8.1f}{entry.bytes / rounds:>10.0f}"
+            f"{entry.alloc_blocks / rounds:>8.1f}{entry.alloc_peak / rounds / 1024:>10.2f}"
+        )
+    total_writes = sum(item.writes for item in stats) / rounds
+    total_bytes = sum(item.bytes for item in stats) / rounds
+    print(f"  {'total':<10}{total_writes:>8.1f}{total_bytes:>10.0f}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=100, help="calculator runs to average")
+    args = parser.parse_args(argv)
+    rounds = max(1, args.rounds)
+
+    legacy = asyncio.run(_run_legacy(rounds))
+    deferred = asyncio.run(_run_deferred(rounds))
+    _print_table("legacy (persist per mutation)", legacy, rounds)
+    _print_table("deferred (one flush per update)", deferred, rounds)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,190 @@
+"""Benchmark handler writes while the admin dashboard renders on SQLite.
+
+Seeds a temporary database file, then runs ``--writers`` tasks that log one
+event and commit per iteration (as bot handlers do) while ``--readers`` tasks
+keep collecting the dashboard statistics.  The ``default`` profile is the
+previous setup: one engine, rollback journal, no pragmas.  The ``tuned``
+profile uses :func:`app.db.session.build_engine` for the writer engine and a
+separate read-only engine for the dashboard.
+
+Example:
+
+    python -m tools.bench_sqlite_concurrency --writers 8 --events 100 --readers 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from app import dashboard
+from app.db.models import Base, Event, Lead
+from app.db.session import build_engine
+from app.repo import events as events_repo, rollups as rollups_repo
+
+NAMES = ("start", "quiz_finish", "plan_generated", "calc_finish", "daily_tip_click")
+QUIZZES = ("energy", "sleep", "stress", "gut")
+
+
+def _seed_rows(count: int, seed: int) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    now = dt.datetime.now(dt.timezone.utc)
+    rows = []
+    for index in range(count):
+        name = NAMES[index % len(NAMES)]
+        meta: dict[str, Any] = {}
+        if name == "quiz_finish":
+            meta = {"quiz": rng.choice(QUIZZES)}
+        elif name == "plan_generated":
+            meta = {"products": rng.sample(["T8_BLEND", "OMEGA3", "MAG_B6", "D3"], k=2)}
+        ts = now - dt.timedelta(minutes=count - index)
+        rows.append({"user_id": index % 5000, "name": name, "meta": meta, "ts": ts})
+    return rows
+
+
+async def _prepare(url: str, events: int, seed: int) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        rows = _seed_rows(events, seed)
+        for start in range(0, len(rows), 5000):
+            await conn.execute(insert(Event), rows[start : start + 5000])
+        await conn.execute(
+            insert(Lead),
+            [{"user_id": uid, "name": "Lead", "phone": "+7"} for uid in range(200)],
+        )
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    while True:
+        async with sessions() as session:
+            consumed = await rollups_repo.roll_up(session, lag=0)
+            await session.commit()
+        if not consumed:
+            break
+    await engine.dispose()
+
+
+async def _render(sessions: async_sessionmaker[AsyncSession]) -> None:
+    async with sessions() as session:
+        await dashboard._collect_event_stats(session, "quiz_finish", "quiz")
+        await dashboard._collect_event_stats(session, "calc_finish", "calc")
+        await dashboard._collect_plan_stats(session)
+        await dashboard._collect_lead_details(session)
+
+
+async def _run_profile(
+    url: str, profile: str, writers: int, per_writer: int, readers: int
+) -> dict[str, Any]:
+    if profile == "tuned":
+        write_engine: AsyncEngine = build_engine(url, tuned=True)
+        read_engine = build_engine(url, read_only=True, tuned=True)
+    else:
+        write_engine = read_engine = create_async_engine(url, pool_pre_ping=True)
+    write_sessions = async_sessionmaker(write_engine, expire_on_commit=False, class_=AsyncSession)
+    read_sessions = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+
+    latencies: list[float] = []
+    errors = 0
+    renders: list[float] = []
+    done = asyncio.Event()
+
+    async def _writer(worker: int) -> None:
+        nonlocal errors
+        for index in range(per_writer):
+            started = time.perf_counter()
+            try:
+                async with write_sessions() as session:
+                    await events_repo.log(session, worker, "quiz_finish", {"quiz": "energy"})
+                    await session.commit()
+            except OperationalError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if index % 10 == 0:
+                await asyncio.sleep(0)
+
+    async def _reader() -> None:
+        while not done.is_set():
+            started = time.perf_counter()
+            try:
+                await _render(read_sessions)
+            except OperationalError:
+                continue
+            renders.append(time.perf_counter() - started)
+
+    reader_tasks = [asyncio.create_task(_reader()) for _ in range(readers)]
+    started = time.perf_counter()
+    await asyncio.gather(*(_writer(worker) for worker in range(writers)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*reader_tasks)
+    await write_engine.dispose()
+    if read_engine is not write_engine:
+        await read_engine.dispose()
+
+    ordered = sorted(latencies) or [0.0]
+    return {
+        "profile": profile,
+        "writes": len(latencies),
+        "errors": errors,
+        "writes_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[int(len(ordered) * 0.95) - 1 if len(ordered) > 1 else 0] * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "renders": len(renders),
+        "render_ms": statistics.mean(renders) * 1000 if renders else 0.0,
+    }
+
+
+async def _main(args: argparse.Namespace) -> list[dict[str, Any]]:
+    results = []
+    for profile in ("default", "tuned"):
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+            await _prepare(url, args.seed_events, args.seed)
+            results.append(
+                await _run_profile(url, profile, args.writers, args.events, args.readers)
+            )
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8, help="concurrent writer tasks")
+    parser.add_argument("--events", type=int, default=100, help="events per writer")
+    parser.add_argument("--readers", type=int, default=2, help="concurrent dashboard renders")
+    parser.add_argument("--seed-events", type=int, default=50_000, help="events seeded first")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(_main(args))
+    print(
+        f"{'profile':<10}{'writes':>8}{'errors':>8}{'writes/s':>10}{'p50 ms':>9}"
+        f"{'p95 ms':>9}{'max ms':>9}{'renders':>9}{'render ms':>11}"
+    )
+    for row in results:
+        print(
+            f"{row['profile']:<10}{row['writes']:>8}{row['errors']:>8}"
+            f"{row['writes_per_s']:>10.1f}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+            f"{row['max_ms']:>9.2f}{row['renders']:>9}{row['render_ms']:>11.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1219,6 +1219,10 @@ def main(argv: Sequence[str] | None = None) -> int:
                 fail_on_mismatch=args.fail_on_mismatch,
             )
             print(f"Built catalog with {count} products → {path}")
+            if path.resolve() == CATALOG_PATH:
+                from app.catalog.loader import write_catalog_snapshot
+
+                print(f"Catalog snapshot → {write_catalog_snapshot()}")
             return 0
         if args.command == "validate":
             count = validate_catalog(args.source)
@@ -208,6 +208,11 @@ def main(argv: list[str] | None = None) -> int:
         default=None,
         help="Path to the JSON schema file (default: app/catalog/schema.json)",
     )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Also write the prebuilt index loaded at startup (app/catalog/products.snapshot)",
+    )
     args = parser.parse_args(argv)
 
     try:
@@ -217,6 +222,13 @@ def main(argv: list[str] | None = None) -> int:
 
     products = payload.get("products")
     count = len(products) if isinstance(products, list) else 0
+    if args.compile:
+        if args.source is not None and args.source.resolve() != CATALOG_PATH:
+            parser.exit(status=1, message="error: --compile only applies to the bundled catalog\n")
+        from app.catalog.loader import write_catalog_snapshot
+
+        snapshot = write_catalog_snapshot()
+        print(f"Catalog snapshot → {snapshot}")
     parser.exit(status=0, message=f"Catalog OK ({count} products)\n")
 
 
@@ -123,8 +123,8 @@ async def _build_rows() -> list[LeadExportRow]:
     for lead in leads:
         quiz_event = quiz_events.get(lead.user_id) if lead.user_id is not None else None
         plan_event = plan_events.get(lead.user_id) if lead.user_id is not None else None
-        quiz_meta = quiz_event.meta if quiz_event is not None else {}
-        plan_meta = plan_event.meta if plan_event is not None else {}
+        quiz_meta = quiz_event.last_meta if quiz_event is not None else {}
+        plan_meta = plan_event.last_meta if plan_event is not None else {}
         rows.append(
             LeadExportRow(
                 lead_id=lead.id,
@@ -137,11 +137,11 @@ async def _build_rows() -> list[LeadExportRow]:
                 quiz_type=quiz_meta.get("quiz"),
                 quiz_score=quiz_meta.get("score"),
                 quiz_level=quiz_meta.get("level"),
-                quiz_completed_at=getattr(quiz_event, "ts", None),
+                quiz_completed_at=getattr(quiz_event, "last_ts", None),
                 recommendation_title=plan_meta.get("title"),
                 recommendation_context=plan_meta.get("context"),
                 recommendation_level=plan_meta.get("level"),
-                recommendation_created_at=getattr(plan_event, "ts", None),
+                recommendation_created_at=getattr(plan_event, "last_ts", None),
                 recommended_products=[str(item) for item in plan_meta.get("products", []) if item],
                 recommendation_order_url=(plan_meta.get("order_url") or plan_meta.get("order")),
             )
@@ -0,0 +1,40 @@
+"""Re-encode Redis sessions and carts with the current payload codec.
+
+New writes already use the codec configured by ``REDIS_CODEC``; this walks
+the existing ``sess:*`` and ``cart:*`` keys so long-lived entries do not stay
+in the legacy JSON format until their next save.  Each key is swapped with a
+compare-and-set script that keeps its TTL, so it is safe to run against a live
+bot.
+
+Example:
+
+    REDIS_URL=redis://localhost:6379/0 python -m tools.migrate_redis_payloads
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from app import storage_redis
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--prefix",
+        action="append",
+        dest="prefixes",
+        help="key prefix to migrate (repeatable, default: sess: and cart:)",
+    )
+    parser.add_argument("--batch", type=int, default=500, help="keys per SCAN/MGET batch")
+    args = parser.parse_args(argv)
+
+    prefixes = tuple(args.prefixes or ("sess:", "cart:"))
+    stats = asyncio.run(storage_redis.migrate_payloads(prefixes, batch=max(1, args.batch)))
+    print(f"scanned={stats['scanned']} migrated={stats['migrated']} skipped={stats['skipped']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())